@@ -8,6 +8,7 @@ a model.
     $ allennlp dry-run --help
     usage: allennlp dry-run [-h] -s SERIALIZATION_DIR [-o OVERRIDES]
                                       [--include-package INCLUDE_PACKAGE]
+                                      [--cache-directory CACHE_DIRECTORY]
                                       param_path
 
     Create a vocabulary, compute dataset statistics and other training utilities.
@@ -25,6 +26,9 @@ a model.
                             configuration
     --include-package INCLUDE_PACKAGE
                             additional packages to include
+    --cache-directory CACHE_DIRECTORY
+                            directory in which to cache the instances read by the
+                            dataset readers
 """
 import argparse
 import logging
@@ -64,6 +68,11 @@ class DryRun(Subcommand):
                                default="",
                                help='a JSON structure used to override the experiment configuration')
 
+        subparser.add_argument('--cache-directory',
+                               type=str,
+                               default=None,
+                               help='directory in which to cache the instances read by the dataset readers')
+
         subparser.set_defaults(func=dry_run_from_args)
 
         return subparser
@@ -79,9 +88,9 @@ def dry_run_from_args(args: argparse.Namespace):
 
     params = Params.from_file(parameter_path, overrides)
 
-    dry_run_from_params(params, serialization_dir)
+    dry_run_from_params(params, serialization_dir, args.cache_directory)
 
-def dry_run_from_params(params: Params, serialization_dir: str) -> None:
+def dry_run_from_params(params: Params, serialization_dir: str, cache_directory: str = None) -> None:
     prepare_environment(params)
 
     vocab_params = params.pop("vocabulary", {})
@@ -92,7 +101,7 @@ def dry_run_from_params(params: Params, serialization_dir: str) -> None:
         raise ConfigurationError("The 'vocabulary' directory in the provided "
                                  "serialization directory is non-empty")
 
-    all_datasets = datasets_from_params(params)
+    all_datasets = datasets_from_params(params, cache_directory)
     datasets_for_vocab_creation = set(params.pop("datasets_for_vocab_creation", all_datasets))
 
     for dataset in datasets_for_vocab_creation:
@@ -17,7 +17,10 @@ https://arxiv.org/abs/1802.05365
    usage: allennlp elmo [-h] (--all | --top | --average)
                         [--vocab-path VOCAB_PATH] [--options-file OPTIONS_FILE]
                         [--weight-file WEIGHT_FILE] [--batch-size BATCH_SIZE]
-                        [--cuda-device CUDA_DEVICE] [--forget-sentences]
+                        [--max-sentences-in-memory MAX_SENTENCES_IN_MEMORY]
+                        [--cuda-device CUDA_DEVICE]
+                        [--token-cache-directory TOKEN_CACHE_DIRECTORY]
+                        [--no-token-cache] [--forget-sentences]
                         [--use-sentence-keys] [--include-package INCLUDE_PACKAGE]
                         input_file output_file
 
@@ -40,8 +43,16 @@ https://arxiv.org/abs/1802.05365
                            The path to the ELMo weight file.
      --batch-size BATCH_SIZE
                            The batch size to use.
+     --max-sentences-in-memory MAX_SENTENCES_IN_MEMORY
+                           The number of sentences to read at a time. Sentences
+                           are sorted by length within each of these chunks
+                           before they are batched.
      --cuda-device CUDA_DEVICE
                            The cuda_device to run on.
+     --token-cache-directory TOKEN_CACHE_DIRECTORY
+                           A directory in which to cache the character CNN
+                           outputs for tokens across runs.
+     --no-token-cache      Don't cache the character CNN outputs for tokens.
      --forget-sentences    If this flag is specified, and --use-sentence-keys is
                            not, remove the string serialized JSON dictionary that
                            associates sentences with their line number (its HDF5
@@ -57,7 +68,10 @@ https://arxiv.org/abs/1802.05365
 import argparse
 import json
 import logging
-from typing import IO, List, Iterable, Tuple
+import os
+import queue
+import threading
+from typing import IO, List, Iterable, Optional, Tuple
 import warnings
 
 with warnings.catch_warnings():
@@ -72,7 +86,7 @@ from allennlp.common.util import lazy_groups_of
 from allennlp.common.checks import ConfigurationError
 from allennlp.data.token_indexers.elmo_indexer import ELMoTokenCharactersIndexer
 from allennlp.nn.util import remove_sentence_boundaries
-from allennlp.modules.elmo import _ElmoBiLm, batch_to_ids
+from allennlp.modules.elmo import _ElmoBiLm, batch_to_ids, DEFAULT_TOKEN_CACHE_DIRECTORY
 from allennlp.commands.subcommand import Subcommand
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -80,6 +94,7 @@ logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 DEFAULT_OPTIONS_FILE = "https://s3-us-west-2.amazonaws.com/allennlp/models/elmo/2x4096_512_2048cnn_2xhighway/elmo_2x4096_512_2048cnn_2xhighway_options.json" # pylint: disable=line-too-long
 DEFAULT_WEIGHT_FILE = "https://s3-us-west-2.amazonaws.com/allennlp/models/elmo/2x4096_512_2048cnn_2xhighway/elmo_2x4096_512_2048cnn_2xhighway_weights.hdf5" # pylint: disable=line-too-long
 DEFAULT_BATCH_SIZE = 64
+DEFAULT_MAX_SENTENCES_IN_MEMORY = 10000
 
 
 class Elmo(Subcommand):
@@ -116,7 +131,20 @@ class Elmo(Subcommand):
                 default=DEFAULT_WEIGHT_FILE,
                 help='The path to the ELMo weight file.')
         subparser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='The batch size to use.')
+        subparser.add_argument(
+                '--max-sentences-in-memory',
+                type=int,
+                default=DEFAULT_MAX_SENTENCES_IN_MEMORY,
+                help='The number of sentences to read at a time.  Sentences are sorted by length '
+                     'within each of these chunks before they are batched.')
         subparser.add_argument('--cuda-device', type=int, default=-1, help='The cuda_device to run on.')
+        subparser.add_argument(
+                '--token-cache-directory',
+                type=str,
+                default=DEFAULT_TOKEN_CACHE_DIRECTORY,
+                help='A directory in which to cache the character CNN outputs for tokens across runs.')
+        subparser.add_argument('--no-token-cache', action='store_true',
+                               help="Don't cache the character CNN outputs for tokens.")
         subparser.add_argument(
                 '--forget-sentences',
                 action='store_true',
@@ -144,7 +172,8 @@ class ElmoEmbedder():
     def __init__(self,
                  options_file: str = DEFAULT_OPTIONS_FILE,
                  weight_file: str = DEFAULT_WEIGHT_FILE,
-                 cuda_device: int = -1) -> None:
+                 cuda_device: int = -1,
+                 token_cache_directory: str = DEFAULT_TOKEN_CACHE_DIRECTORY) -> None:
         """
         Parameters
         ----------
@@ -154,11 +183,14 @@ class ElmoEmbedder():
             A path or URL to an ELMo weights file.
         cuda_device : ``int``, optional, (default=-1)
             The GPU device to run on.
+        token_cache_directory : ``str``, optional, (default = ``DEFAULT_TOKEN_CACHE_DIRECTORY``)
+            A directory in which to keep the character CNN outputs for the tokens we see, so that
+            they are only computed once, even across runs.  Pass ``None`` to always run the CNN.
         """
         self.indexer = ELMoTokenCharactersIndexer()
 
         logger.info("Initializing ELMo.")
-        self.elmo_bilm = _ElmoBiLm(options_file, weight_file)
+        self.elmo_bilm = _ElmoBiLm(options_file, weight_file, token_cache_directory=token_cache_directory)
         if cuda_device >= 0:
             self.elmo_bilm = self.elmo_bilm.cuda(device=cuda_device)
 
@@ -278,12 +310,24 @@ class ElmoEmbedder():
                    output_format: str = "all",
                    batch_size: int = DEFAULT_BATCH_SIZE,
                    forget_sentences: bool = False,
-                   use_sentence_keys: bool = False) -> None:
+                   use_sentence_keys: bool = False,
+                   max_sentences_in_memory: int = DEFAULT_MAX_SENTENCES_IN_MEMORY) -> None:
         """
         Computes ELMo embeddings from an input_file where each line contains a sentence tokenized by whitespace.
         The ELMo embeddings are written out in HDF5 format, where each sentence embedding
         is saved in a dataset with the line number in the original file as the key.
 
+        The input file is read ``max_sentences_in_memory`` lines at a time, and the sentences in
+        each of these chunks are sorted by length before they are batched, so that batches contain
+        as little padding as possible.  The embeddings are written to the output file by a
+        background thread, which overlaps with the computation of the next batches.  Only a chunk
+        of sentences and a few batches of embeddings are held in memory at once, whatever the size
+        of the input file (apart from the ``"sentence_to_index"`` mapping, when it is written).
+
+        Because the file is read lazily, an empty line is only detected when the chunk that
+        contains it is reached, after the earlier chunks have been embedded.  If that (or anything
+        else) fails, the partially written output file is deleted.
+
         Parameters
         ----------
         input_file : ``IO``, required
@@ -304,64 +348,149 @@ class ElmoEmbedder():
         use_sentence_keys : ``bool``, optional, (default = False).
             Whether or not to use full sentences as keys. By default,
             the line numbers of the input file are used as ids, which is more robust.
+        max_sentences_in_memory : ``int``, optional, (default = 10000).
+            The number of lines to read from the input file at a time.  Sentences are only sorted
+            by length within each chunk of this many lines.
         """
 
         assert output_format in ["all", "top", "average"]
 
-        # Tokenizes the sentences.
-        sentences = [line.strip() for line in input_file]
-
-        blank_lines = [i for (i, line) in enumerate(sentences) if line == ""]
-        if blank_lines:
-            raise ConfigurationError(f"Your input file contains empty lines at indexes "
-                                     f"{blank_lines}. Please remove them.")
-        split_sentences = [sentence.split() for sentence in sentences]
-        # Uses the sentence index as the key.
-
         if use_sentence_keys:
             logger.warning("Using sentences as keys can fail if sentences "
                            "contain forward slashes or colons. Use with caution.")
-            embedded_sentences = zip(sentences, self.embed_sentences(split_sentences, batch_size))
-        else:
-            embedded_sentences = ((str(i), x) for i, x in
-                                  enumerate(self.embed_sentences(split_sentences, batch_size)))
 
-        sentence_to_index = {}
+        writer = _EmbeddingsWriter(output_file_path,
+                                   output_format,
+                                   record_sentences=not forget_sentences and not use_sentence_keys,
+                                   use_sentence_keys=use_sentence_keys)
+        writer.start()
         logger.info("Processing sentences.")
-        with h5py.File(output_file_path, 'w') as fout:
-            for key, embeddings in Tqdm.tqdm(embedded_sentences):
-                if use_sentence_keys and key in fout.keys():
-                    raise ConfigurationError(f"Key already exists in {output_file_path}. "
-                                             f"To encode duplicate sentences, do not pass "
-                                             f"the --use-sentence-keys flag.")
-
-                if not forget_sentences and not use_sentence_keys:
-                    sentence = sentences[int(key)]
-                    sentence_to_index[sentence] = key
-
-                if output_format == "all":
-                    output = embeddings
-                elif output_format == "top":
-                    output = embeddings[-1]
-                elif output_format == "average":
-                    output = numpy.average(embeddings, axis=0)
-
-                fout.create_dataset(
-                        str(key),
-                        output.shape, dtype='float32',
-                        data=output
-                )
-            if not forget_sentences and not use_sentence_keys:
+        try:
+            with Tqdm.tqdm(unit=" sentences") as progress:
+                for chunk in lazy_groups_of(enumerate(input_file), max_sentences_in_memory):
+                    # Tokenizes the sentences.
+                    sentences = [(index, line.strip()) for index, line in chunk]
+                    blank_lines = [index for (index, sentence) in sentences if sentence == ""]
+                    if blank_lines:
+                        raise ConfigurationError(f"Your input file contains empty lines at indexes "
+                                                 f"{blank_lines}. Please remove them.")
+                    sentences.sort(key=lambda pair: len(pair[1].split()))
+                    for batch in lazy_groups_of(iter(sentences), batch_size):
+                        embeddings = self.embed_batch([sentence.split() for _, sentence in batch])
+                        # Uses the sentence index as the key.
+                        writer.put([(sentence if use_sentence_keys else str(index), sentence, embedding)
+                                    for (index, sentence), embedding in zip(batch, embeddings)])
+                        progress.update(len(batch))
+            writer.finish()
+        except BaseException:
+            writer.abort()
+            raise
+
+        input_file.close()
+
+
+class _EmbeddingsWriter(threading.Thread):
+    """
+    A background thread that writes the embeddings computed by
+    :func:`ElmoEmbedder.embed_file` to an HDF5 file, so that writing the output overlaps with
+    computing the next batches.  Batches of ``(key, sentence, embeddings)`` triples are passed in
+    with :func:`put`, through a queue holding at most ``max_queued_batches`` batches.  If the
+    thread fails, the error is raised in the calling thread by the next call to :func:`put` or by
+    :func:`finish`.
+    """
+    def __init__(self,
+                 output_file_path: str,
+                 output_format: str,
+                 record_sentences: bool,
+                 use_sentence_keys: bool,
+                 max_queued_batches: int = 16) -> None:
+        super().__init__(daemon=True)
+        self._output_file_path = output_file_path
+        self._output_format = output_format
+        self._record_sentences = record_sentences
+        self._use_sentence_keys = use_sentence_keys
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued_batches)
+        self._error: Optional[Exception] = None
+        self._received_last_batch = False
+
+    def put(self, batch: List[Tuple[str, str, numpy.ndarray]]) -> None:
+        self._raise_error()
+        self._queue.put(batch)
+
+    def finish(self) -> None:
+        """
+        Waits until everything that was put on the queue has been written, then closes the file.
+        """
+        self._queue.put(None)
+        self.join()
+        self._raise_error()
+
+    def abort(self) -> None:
+        """
+        Stops the thread without finishing the output file (if it hasn't already stopped), and
+        deletes whatever was written so far, so that an incomplete file can't be mistaken for a
+        complete one.  Any error in the thread is ignored, since the caller is already handling
+        one.
+        """
+        if self.is_alive():
+            self._queue.put(None)
+            self.join()
+        if os.path.exists(self._output_file_path):
+            os.remove(self._output_file_path)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def run(self) -> None:
+        try:
+            self._write()
+        except Exception as error:  # pylint: disable=broad-except
+            self._error = error
+            # Keep emptying the queue, so that the calling thread doesn't block before it notices.
+            while not self._received_last_batch:
+                self._received_last_batch = self._queue.get() is None
+
+    def _write(self) -> None:
+        sentence_to_index = {}
+        with h5py.File(self._output_file_path, 'w') as fout:
+            batch = self._queue.get()
+            while batch is not None:
+                for key, sentence, embeddings in batch:
+                    if self._use_sentence_keys and key in fout:
+                        raise ConfigurationError(f"Key already exists in {self._output_file_path}. "
+                                                 f"To encode duplicate sentences, do not pass "
+                                                 f"the --use-sentence-keys flag.")
+
+                    if self._record_sentences:
+                        sentence_to_index[sentence] = key
+
+                    if self._output_format == "all":
+                        output = embeddings
+                    elif self._output_format == "top":
+                        output = embeddings[-1]
+                    elif self._output_format == "average":
+                        output = numpy.average(embeddings, axis=0)
+
+                    fout.create_dataset(
+                            str(key),
+                            output.shape, dtype='float32',
+                            data=output
+                    )
+                batch = self._queue.get()
+            self._received_last_batch = True
+
+            if self._record_sentences:
                 sentence_index_dataset = fout.create_dataset(
                         "sentence_to_index",
                         (1,),
                         dtype=h5py.special_dtype(vlen=str))
                 sentence_index_dataset[0] = json.dumps(sentence_to_index)
 
-        input_file.close()
 
 def elmo_command(args):
-    elmo_embedder = ElmoEmbedder(args.options_file, args.weight_file, args.cuda_device)
+    token_cache_directory = None if args.no_token_cache else args.token_cache_directory
+    elmo_embedder = ElmoEmbedder(args.options_file, args.weight_file, args.cuda_device, token_cache_directory)
     output_format = ""
     if args.all:
         output_format = "all"
@@ -377,4 +506,5 @@ def elmo_command(args):
                 output_format,
                 args.batch_size,
                 args.forget_sentences,
-                args.use_sentence_keys)
+                args.use_sentence_keys,
+                args.max_sentences_in_memory)
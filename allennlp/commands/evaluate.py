@@ -10,6 +10,7 @@ and report any metrics calculated by the model.
                              [--weights-file WEIGHTS_FILE]
                              [--cuda-device CUDA_DEVICE] [-o OVERRIDES]
                              [--include-package INCLUDE_PACKAGE]
+                             [--cache-directory CACHE_DIRECTORY]
                              archive_file input_file
 
     Evaluate the specified model + dataset
@@ -31,6 +32,9 @@ and report any metrics calculated by the model.
                             configuration
     --include-package INCLUDE_PACKAGE
                             additional packages to include
+    --cache-directory CACHE_DIRECTORY
+                            directory in which to cache the instances read by the
+                            dataset reader
 """
 from typing import Dict, Any, Iterable
 import argparse
@@ -44,7 +48,7 @@ from allennlp.common.checks import check_for_gpu
 from allennlp.common.util import prepare_environment
 from allennlp.common.tqdm import Tqdm
 from allennlp.data import Instance
-from allennlp.data.dataset_readers.dataset_reader import DatasetReader
+from allennlp.data.dataset_readers.dataset_reader import dataset_reader_from_params
 from allennlp.data.iterators import DataIterator
 from allennlp.models.archival import load_archive
 from allennlp.models.model import Model
@@ -80,6 +84,11 @@ class Evaluate(Subcommand):
                                default="",
                                help='a JSON structure used to override the experiment configuration')
 
+        subparser.add_argument('--cache-directory',
+                               type=str,
+                               default=None,
+                               help='directory in which to cache the instances read by the dataset reader')
+
         subparser.set_defaults(func=evaluate_from_args)
 
         return subparser
@@ -131,9 +140,9 @@ def evaluate_from_args(args: argparse.Namespace) -> Dict[str, Any]:
     # to the default dataset_reader used for both training and validation.
     validation_dataset_reader_params = config.pop('validation_dataset_reader', None)
     if validation_dataset_reader_params is not None:
-        dataset_reader = DatasetReader.from_params(validation_dataset_reader_params)
+        dataset_reader = dataset_reader_from_params(validation_dataset_reader_params, args.cache_directory)
     else:
-        dataset_reader = DatasetReader.from_params(config.pop('dataset_reader'))
+        dataset_reader = dataset_reader_from_params(config.pop('dataset_reader'), args.cache_directory)
     evaluation_data_path = args.input_file
     logger.info("Reading evaluation data from %s", evaluation_data_path)
     instances = dataset_reader.read(evaluation_data_path)
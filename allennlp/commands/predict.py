@@ -8,8 +8,10 @@ or dataset to JSON predictions using a trained model and its
     $ allennlp predict -h
     usage: allennlp predict [-h] [--output-file OUTPUT_FILE]
                             [--weights-file WEIGHTS_FILE]
-                            [--batch-size BATCH_SIZE] [--silent]
-                            [--cuda-device CUDA_DEVICE] [--use-dataset-reader]
+                            [--batch-size BATCH_SIZE] [--num-workers NUM_WORKERS]
+                            [--sort-by-length SUB_BATCH_SIZE]
+                            [--silent] [--cuda-device CUDA_DEVICE]
+                            [--use-dataset-reader]
                             [-o OVERRIDES] [--predictor PREDICTOR]
                             [--include-package INCLUDE_PACKAGE]
                             archive_file input_file
@@ -27,6 +29,16 @@ or dataset to JSON predictions using a trained model and its
     --weights-file WEIGHTS_FILE
                             a path that overrides which weights file to use
     --batch-size BATCH_SIZE The batch size to use for processing
+    --num-workers NUM_WORKERS
+                            if greater than 0, parse the inputs in this many
+                            worker processes and write the outputs on a
+                            separate thread, so that the model runs batches
+                            back to back
+    --sort-by-length SUB_BATCH_SIZE
+                            sort each batch of inputs by length and run the
+                            model on sub-batches of at most this many inputs
+                            of similar length; the outputs keep the input
+                            order
     --silent                do not print output to stdout
     --cuda-device CUDA_DEVICE
                             id of GPU to use (if any)
@@ -39,10 +51,16 @@ or dataset to JSON predictions using a trained model and its
     --include-package INCLUDE_PACKAGE
                             additional packages to include
 """
-from typing import List, Iterator, Optional
+from typing import Dict, List, Iterator, Optional, Tuple
 import argparse
+import logging
+import multiprocessing
+import queue
 import sys
 import json
+import threading
+import time
+import traceback
 
 from allennlp.commands.subcommand import Subcommand
 from allennlp.common.checks import check_for_gpu, ConfigurationError
@@ -51,6 +69,8 @@ from allennlp.models.archival import load_archive
 from allennlp.predictors.predictor import Predictor, JsonDict
 from allennlp.data import Instance
 
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
 class Predict(Subcommand):
     def add_subparser(self, name: str, parser: argparse._SubParsersAction) -> argparse.ArgumentParser:
         # pylint: disable=protected-access
@@ -69,6 +89,19 @@ class Predict(Subcommand):
         batch_size = subparser.add_mutually_exclusive_group(required=False)
         batch_size.add_argument('--batch-size', type=int, default=1, help='The batch size to use for processing')
 
+        subparser.add_argument('--num-workers',
+                               type=int,
+                               default=0,
+                               help='if greater than 0, parse the inputs in this many worker processes and '
+                                    'write the outputs on a separate thread, so that the model runs batches '
+                                    'back to back')
+
+        subparser.add_argument('--sort-by-length',
+                               type=int,
+                               metavar='SUB_BATCH_SIZE',
+                               help='sort each batch of inputs by length and run the model on sub-batches of '
+                                    'at most this many inputs of similar length; the outputs keep the input order')
+
         subparser.add_argument('--silent', action='store_true', help='do not print output to stdout')
 
         cuda_device = subparser.add_mutually_exclusive_group(required=False)
@@ -101,6 +134,31 @@ def _get_predictor(args: argparse.Namespace) -> Predictor:
     return Predictor.from_archive(archive, args.predictor)
 
 
+def _prepare_json_batches(predictor: Predictor,
+                          to_instances: bool,
+                          input_queue: multiprocessing.Queue,
+                          output_queue: multiprocessing.Queue) -> None:
+    """
+    Worker loop for pipelined prediction.  Pulls ``(batch_index, lines)`` pairs off of the
+    ``input_queue`` until it sees a ``None``, parses the lines with ``predictor.load_line`` and (if
+    ``to_instances``) converts them to instances, and puts ``(batch_index, json_dicts, instances)``
+    on the ``output_queue``.  When it's done it puts ``(None, None, None)`` there; if something
+    goes wrong it puts ``(None, formatted_traceback, None)`` there instead.
+    """
+    # pylint: disable=protected-access
+    try:
+        item = input_queue.get()
+        while item is not None:
+            batch_index, lines = item
+            batch_json = [predictor.load_line(line) for line in lines]
+            instances = predictor._batch_json_to_instances(batch_json) if to_instances else None
+            output_queue.put((batch_index, batch_json, instances))
+            item = input_queue.get()
+        output_queue.put((None, None, None))
+    except Exception:  # pylint: disable=broad-except
+        output_queue.put((None, traceback.format_exc(), None))
+
+
 class _PredictManager:
 
     def __init__(self,
@@ -109,7 +167,9 @@ class _PredictManager:
                  output_file: Optional[str],
                  batch_size: int,
                  print_to_console: bool,
-                 has_dataset_reader: bool) -> None:
+                 has_dataset_reader: bool,
+                 num_workers: int = 0,
+                 queue_size: int = 100) -> None:
 
         self._predictor = predictor
         self._input_file = input_file
@@ -119,6 +179,8 @@ class _PredictManager:
             self._output_file = None
         self._batch_size = batch_size
         self._print_to_console = print_to_console
+        self._num_workers = num_workers
+        self._queue_size = queue_size
         if has_dataset_reader:
             self._dataset_reader = predictor._dataset_reader # pylint: disable=protected-access
         else:
@@ -151,9 +213,10 @@ class _PredictManager:
             self._output_file.write(prediction)
 
     def _get_json_data(self) -> Iterator[JsonDict]:
-        for line in open(self._input_file):
-            if not line.isspace():
-                yield self._predictor.load_line(line)
+        with open(self._input_file) as input_file:
+            for line in input_file:
+                if not line.isspace():
+                    yield self._predictor.load_line(line)
 
     def _get_instance_data(self) -> Iterator[Instance]:
         if self._dataset_reader is None:
@@ -161,22 +224,188 @@ class _PredictManager:
         else:
             yield from self._dataset_reader.read(self._input_file)
 
-    def run(self) -> None:
+    def _get_json_lines(self) -> Iterator[str]:
+        with open(self._input_file) as input_file:
+            for line in input_file:
+                if not line.isspace():
+                    yield line
+
+    def _can_predict_json_from_instances(self) -> bool:
+        """
+        Whether predicting a batch of JSON inputs is the same as converting them to instances and
+        predicting those, which lets the workers do the conversion.  Predictors that override
+        ``predict_json`` or ``predict_batch_json`` (e.g., to make several instances per input)
+        only get their inputs parsed by the workers.
+        """
+        predictor_class = type(self._predictor)
+        return (predictor_class.predict_json is Predictor.predict_json and
+                predictor_class.predict_batch_json is Predictor.predict_batch_json)
+
+    def _prepared_json_batches(self) -> Iterator[Tuple[List[JsonDict], Optional[List[Instance]]]]:
+        """
+        Reads the input file on a background thread and hands batches of lines to
+        ``self._num_workers`` worker processes to prepare, yielding the prepared batches in the
+        order they appear in the input file.
+        """
+        to_instances = self._can_predict_json_from_instances()
+        input_queue = multiprocessing.Queue(self._queue_size)
+        output_queue = multiprocessing.Queue(self._queue_size)
+        workers = []
+        for _ in range(self._num_workers):
+            worker = multiprocessing.Process(target=_prepare_json_batches,
+                                             args=(self._predictor, to_instances, input_queue, output_queue),
+                                             daemon=True)
+            worker.start()
+            workers.append(worker)
+
+        def feed() -> None:
+            try:
+                for batch_index, lines in enumerate(lazy_groups_of(self._get_json_lines(), self._batch_size)):
+                    input_queue.put((batch_index, lines))
+            except Exception:  # pylint: disable=broad-except
+                output_queue.put((None, traceback.format_exc(), None))
+            finally:
+                for _ in range(self._num_workers):
+                    input_queue.put(None)
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+
+        # Workers finish batches out of order, so we hold on to the ones that arrive early.
+        finished: Dict[int, Tuple[List[JsonDict], Optional[List[Instance]]]] = {}
+        next_index = 0
+        num_workers_done = 0
+        try:
+            while num_workers_done < self._num_workers:
+                batch_index, batch_json, instances = output_queue.get()
+                if batch_index is None:
+                    if batch_json is not None:
+                        # The traceback of an error in a worker, or in reading the input file.
+                        raise RuntimeError(f"Preparing the input failed:\n{batch_json}")
+                    num_workers_done += 1
+                    continue
+                finished[batch_index] = (batch_json, instances)
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+
+    def _prepared_instance_batches(self) -> Iterator[Tuple[None, List[Instance]]]:
+        """
+        Reads instances with the dataset reader on a background thread, a few batches ahead of the
+        model.
+        """
+        batch_queue: queue.Queue = queue.Queue(self._queue_size)
+        errors: List[str] = []
+
+        def feed() -> None:
+            try:
+                for batch in lazy_groups_of(self._get_instance_data(), self._batch_size):
+                    batch_queue.put(batch)
+            except Exception:  # pylint: disable=broad-except
+                errors.append(traceback.format_exc())
+            batch_queue.put(None)
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+
+        batch = batch_queue.get()
+        while batch is not None:
+            yield None, batch
+            batch = batch_queue.get()
+        if errors:
+            raise RuntimeError(f"Reading instances failed:\n{errors[0]}")
+
+    def _write_results(self, results_queue: queue.Queue, errors: List[str]) -> None:
+        """
+        Writer loop for pipelined prediction.  Serializes and writes out ``(model_inputs, results)``
+        pairs from the ``results_queue`` until it sees a ``None``.
+        """
+        try:
+            item = results_queue.get()
+            while item is not None:
+                model_inputs, results = item
+                for model_input, result in zip(model_inputs, results):
+                    self._maybe_print_to_console_and_file(self._predictor.dump_line(result), model_input)
+                item = results_queue.get()
+        except Exception:  # pylint: disable=broad-except
+            errors.append(traceback.format_exc())
+            # Keep draining the queue so that the model thread doesn't block forever.
+            while results_queue.get() is not None:
+                pass
+
+    def _run_pipelined(self) -> int:
+        if self._dataset_reader is not None:
+            prepared_batches = self._prepared_instance_batches()
+        else:
+            prepared_batches = self._prepared_json_batches()
+
+        results_queue: queue.Queue = queue.Queue(self._queue_size)
+        errors: List[str] = []
+        writer = threading.Thread(target=self._write_results, args=(results_queue, errors), daemon=True)
+        writer.start()
+
+        num_predictions = 0
+        try:
+            for batch_json, instances in prepared_batches:
+                if instances is None:
+                    if len(batch_json) == 1:
+                        results = [self._predictor.predict_json(batch_json[0])]
+                    else:
+                        results = self._predictor.predict_batch_json(batch_json)
+                elif len(instances) == 1:
+                    results = [self._predictor.predict_instance(instances[0])]
+                else:
+                    results = self._predictor.predict_batch_instance(instances)
+                if batch_json is None:
+                    model_inputs: List[Optional[str]] = [None] * len(results)
+                else:
+                    model_inputs = [json.dumps(model_input) for model_input in batch_json]
+                results_queue.put((model_inputs, results))
+                num_predictions += len(results)
+        finally:
+            results_queue.put(None)
+            writer.join()
+        if errors:
+            raise RuntimeError(f"Writing predictions failed:\n{errors[0]}")
+        return num_predictions
+
+    def _run_sequential(self) -> int:
+        num_predictions = 0
         has_reader = self._dataset_reader is not None
         if has_reader:
             for batch in lazy_groups_of(self._get_instance_data(), self._batch_size):
                 for result in self._predict_instances(batch):
                     self._maybe_print_to_console_and_file(result)
+                    num_predictions += 1
         else:
             for batch_json in lazy_groups_of(self._get_json_data(), self._batch_size):
                 for model_input, result in zip(batch_json, self._predict_json(batch_json)):
                     self._maybe_print_to_console_and_file(result, json.dumps(model_input))
+                    num_predictions += 1
+        return num_predictions
 
-        if self._output_file is not None:
-            self._output_file.close()
+    def run(self) -> None:
+        start_time = time.time()
+        try:
+            if self._num_workers > 0:
+                num_predictions = self._run_pipelined()
+            else:
+                num_predictions = self._run_sequential()
+        finally:
+            if self._output_file is not None:
+                self._output_file.close()
+
+        elapsed_time = time.time() - start_time
+        logger.info("Made %d predictions in %.2f seconds (%.2f predictions per second)",
+                    num_predictions, elapsed_time, num_predictions / max(elapsed_time, 1e-6))
 
 def _predict(args: argparse.Namespace) -> None:
     predictor = _get_predictor(args)
+    if args.sort_by_length is not None:
+        predictor.sort_batches_by_length(args.sort_by_length)
 
     if args.silent and not args.output_file:
         print("--silent specified without --output-file.")
@@ -188,5 +417,6 @@ def _predict(args: argparse.Namespace) -> None:
                               args.output_file,
                               args.batch_size,
                               not args.silent,
-                              args.use_dataset_reader)
+                              args.use_dataset_reader,
+                              args.num_workers)
     manager.run()
@@ -10,6 +10,7 @@ which to write the results.
                               [-o OVERRIDES]
                               [--include-package INCLUDE_PACKAGE]
                               [--file-friendly-logging]
+                              [--cache-directory CACHE_DIRECTORY]
                               param_path
 
    Train the specified model on the specified dataset.
@@ -30,15 +31,21 @@ which to write the results.
    --file-friendly-logging
                            outputs tqdm status on separate lines and slows tqdm
                            refresh rate
+   --cache-directory CACHE_DIRECTORY
+                           directory in which to cache the instances read by the
+                           dataset readers, so later runs can skip reading them
 """
-from typing import Dict, Iterable
+from typing import Any, Dict, Iterable, Set
 import argparse
 import json
 import logging
 import os
+import queue
 import re
+import traceback
 
 import torch
+import torch.multiprocessing as multiprocessing
 
 from allennlp.commands.evaluate import evaluate
 from allennlp.commands.subcommand import Subcommand
@@ -48,10 +55,11 @@ from allennlp.common.util import prepare_environment, prepare_global_logging, \
                                  get_frozen_and_tunable_parameter_names
 from allennlp.data import Vocabulary
 from allennlp.data.instance import Instance
-from allennlp.data.dataset_readers.dataset_reader import DatasetReader
+from allennlp.data.dataset_readers.dataset_reader import DatasetReader, dataset_reader_from_params
 from allennlp.data.iterators.data_iterator import DataIterator
 from allennlp.models.archival import archive_model, CONFIG_NAME
 from allennlp.models.model import Model, _DEFAULT_WEIGHTS
+from allennlp.training import distributed
 from allennlp.training.trainer import Trainer
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -87,6 +95,11 @@ class Train(Subcommand):
                                default=False,
                                help='outputs tqdm status on separate lines and slows tqdm refresh rate')
 
+        subparser.add_argument('--cache-directory',
+                               type=str,
+                               default=None,
+                               help='directory in which to cache the instances read by the dataset readers')
+
         subparser.set_defaults(func=train_model_from_args)
 
         return subparser
@@ -99,14 +112,16 @@ def train_model_from_args(args: argparse.Namespace):
                           args.serialization_dir,
                           args.overrides,
                           args.file_friendly_logging,
-                          args.recover)
+                          args.recover,
+                          args.cache_directory)
 
 
 def train_model_from_file(parameter_filename: str,
                           serialization_dir: str,
                           overrides: str = "",
                           file_friendly_logging: bool = False,
-                          recover: bool = False) -> Model:
+                          recover: bool = False,
+                          cache_directory: str = None) -> Model:
     """
     A wrapper around :func:`train_model` which loads the params from a file.
 
@@ -126,23 +141,28 @@ def train_model_from_file(parameter_filename: str,
         If ``True``, we will try to recover a training run from an existing serialization
         directory.  This is only intended for use when something actually crashed during the middle
         of a run.  For continuing training a model on new data, see the ``fine-tune`` command.
+    cache_directory : ``str``, optional (default=None)
+        If given, the dataset readers cache the instances they read in this directory.  We just
+        pass this along to :func:`train_model`.
     """
     # Load the experiment config from a file and pass it to ``train_model``.
     params = Params.from_file(parameter_filename, overrides)
-    return train_model(params, serialization_dir, file_friendly_logging, recover)
+    return train_model(params, serialization_dir, file_friendly_logging, recover, cache_directory)
 
 
-def datasets_from_params(params: Params) -> Dict[str, Iterable[Instance]]:
+def datasets_from_params(params: Params, cache_directory: str = None) -> Dict[str, Iterable[Instance]]:
     """
-    Load all the datasets specified by the config.
+    Load all the datasets specified by the config.  If a ``cache_directory`` is given, the
+    instances are cached there (see :func:`DatasetReader.cache_data`).
     """
-    dataset_reader = DatasetReader.from_params(params.pop('dataset_reader'))
+    dataset_reader = dataset_reader_from_params(params.pop('dataset_reader'), cache_directory)
     validation_dataset_reader_params = params.pop("validation_dataset_reader", None)
 
     validation_and_test_dataset_reader: DatasetReader = dataset_reader
     if validation_dataset_reader_params is not None:
         logger.info("Using a separate dataset reader to load validation and test data.")
-        validation_and_test_dataset_reader = DatasetReader.from_params(validation_dataset_reader_params)
+        validation_and_test_dataset_reader = dataset_reader_from_params(validation_dataset_reader_params,
+                                                                        cache_directory)
 
     train_data_path = params.pop('train_data_path')
     logger.info("Reading training data from %s", train_data_path)
@@ -225,7 +245,8 @@ def create_serialization_dir(params: Params, serialization_dir: str, recover: bo
 def train_model(params: Params,
                 serialization_dir: str,
                 file_friendly_logging: bool = False,
-                recover: bool = False) -> Model:
+                recover: bool = False,
+                cache_directory: str = None) -> Model:
     """
     Trains the model specified in the given :class:`Params` object, using the data and training
     parameters also specified in that object, and saves the results in ``serialization_dir``.
@@ -243,6 +264,9 @@ def train_model(params: Params,
         If ``True``, we will try to recover a training run from an existing serialization
         directory.  This is only intended for use when something actually crashed during the middle
         of a run.  For continuing training a model on new data, see the ``fine-tune`` command.
+    cache_directory : ``str``, optional (default=None)
+        If given, the dataset readers cache the instances they read in this directory, and later
+        runs with the same reader config and unchanged data files read them from there.
 
     Returns
     -------
@@ -258,7 +282,7 @@ def train_model(params: Params,
 
     params.to_file(os.path.join(serialization_dir, CONFIG_NAME))
 
-    all_datasets = datasets_from_params(params)
+    all_datasets = datasets_from_params(params, cache_directory)
     datasets_for_vocab_creation = set(params.pop("datasets_for_vocab_creation", all_datasets))
 
     for dataset in datasets_for_vocab_creation:
@@ -292,6 +316,8 @@ def train_model(params: Params,
 
     trainer_params = params.pop("trainer")
     no_grad_regexes = trainer_params.pop("no_grad", ())
+    num_processes = trainer_params.pop_int("num_processes", 1)
+    master_port = trainer_params.pop_int("master_port", 29500)
     for name, parameter in model.named_parameters():
         if any(re.search(regex, name) for regex in no_grad_regexes):
             parameter.requires_grad_(False)
@@ -305,19 +331,30 @@ def train_model(params: Params,
     for name in tunable_parameter_names:
         logger.info(name)
 
-    trainer = Trainer.from_params(model,
-                                  serialization_dir,
-                                  iterator,
-                                  train_data,
-                                  validation_data,
-                                  trainer_params,
-                                  validation_iterator=validation_iterator)
-
     evaluate_on_test = params.pop_bool("evaluate_on_test", False)
+
+    if num_processes > 1:
+        # The trainers are created in the worker processes.
+        trainer = None
+        cuda_device = -1
+    else:
+        trainer = Trainer.from_params(model,
+                                      serialization_dir,
+                                      iterator,
+                                      train_data,
+                                      validation_data,
+                                      trainer_params,
+                                      validation_iterator=validation_iterator)
+        cuda_device = trainer._cuda_devices[0] # pylint: disable=protected-access
+
     params.assert_empty('base train command')
 
     try:
-        metrics = trainer.train()
+        if trainer is None:
+            metrics = _train_distributed(num_processes, master_port, model, serialization_dir, iterator,
+                                         train_data, validation_data, trainer_params, validation_iterator)
+        else:
+            metrics = trainer.train()
     except KeyboardInterrupt:
         # if we have completed an epoch, try to create a model archive.
         if os.path.exists(os.path.join(serialization_dir, _DEFAULT_WEIGHTS)):
@@ -337,10 +374,7 @@ def train_model(params: Params,
 
     if test_data and evaluate_on_test:
         logger.info("The model will be evaluated using the best epoch weights.")
-        test_metrics = evaluate(
-                best_model, test_data, validation_iterator or iterator,
-                cuda_device=trainer._cuda_devices[0] # pylint: disable=protected-access
-        )
+        test_metrics = evaluate(best_model, test_data, validation_iterator or iterator, cuda_device=cuda_device)
         for key, value in test_metrics.items():
             metrics["test_" + key] = value
 
@@ -354,3 +388,97 @@ def train_model(params: Params,
     logger.info("Metrics: %s", metrics_json)
 
     return best_model
+
+
+def _train_worker(rank: int,
+                  num_processes: int,
+                  master_port: int,
+                  model: Model,
+                  serialization_dir: str,
+                  iterator: DataIterator,
+                  train_data: Iterable[Instance],
+                  validation_data: Iterable[Instance],
+                  trainer_params: Params,
+                  validation_iterator: DataIterator,
+                  output_queue: multiprocessing.Queue) -> None:
+    """
+    Worker loop for distributed training.  Joins the process group, trains with a ``Trainer`` for
+    this rank, and puts ``(rank, metrics, None)`` on the ``output_queue`` when it's done, or
+    ``(rank, None, formatted_traceback)`` if something goes wrong.
+    """
+    try:
+        if rank > 0:
+            # Only the first process reports progress.
+            logging.getLogger().setLevel(logging.WARNING)
+        # Otherwise each process would use a thread per core, and they would fight over them.
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // num_processes))
+        distributed.init_process_group(rank, num_processes, master_port)
+        # The processes must shuffle their data identically, but shouldn't all use the same dropout.
+        torch.manual_seed(torch.initial_seed() + rank)
+        trainer = Trainer.from_params(model,
+                                      serialization_dir,
+                                      iterator,
+                                      train_data,
+                                      validation_data,
+                                      trainer_params,
+                                      validation_iterator=validation_iterator,
+                                      distributed_rank=rank,
+                                      distributed_world_size=num_processes)
+        output_queue.put((rank, trainer.train(), None))
+    except Exception:  # pylint: disable=broad-except
+        output_queue.put((rank, None, traceback.format_exc()))
+
+
+def _train_distributed(num_processes: int,
+                       master_port: int,
+                       model: Model,
+                       serialization_dir: str,
+                       iterator: DataIterator,
+                       train_data: Iterable[Instance],
+                       validation_data: Iterable[Instance],
+                       trainer_params: Params,
+                       validation_iterator: DataIterator) -> Dict[str, Any]:
+    """
+    Trains the model with ``num_processes`` CPU processes using ``torch.distributed`` with the
+    ``gloo`` backend, and returns the metrics from the first process, which is also the one that
+    writes the checkpoints.  The processes are forked from this one, so they all start with the
+    same model parameters and random state.  (They aren't daemons, so that they can use a
+    :class:`~allennlp.data.iterators.MultiprocessIterator`.)  See the ``distributed_rank`` argument of
+    :class:`~allennlp.training.trainer.Trainer` for how the work is split up.
+    """
+    logger.info("Training with %d processes.", num_processes)
+    output_queue = multiprocessing.Queue()
+    workers = []
+    for rank in range(num_processes):
+        worker = multiprocessing.Process(target=_train_worker,
+                                         args=(rank, num_processes, master_port, model, serialization_dir,
+                                               iterator, train_data, validation_data, trainer_params.duplicate(),
+                                               validation_iterator, output_queue))
+        worker.start()
+        workers.append(worker)
+
+    metrics: Dict[str, Any] = {}
+    finished_ranks: Set[int] = set()
+    try:
+        while len(finished_ranks) < num_processes:
+            try:
+                rank, worker_metrics, error = output_queue.get(timeout=1)
+            except queue.Empty:
+                # A process that was killed (e.g., by the OOM killer) never reports back, and the
+                # others would wait for it forever.
+                for rank, worker in enumerate(workers):
+                    if rank not in finished_ranks and worker.exitcode not in (None, 0):
+                        raise RuntimeError(f"Distributed training process {rank} died "
+                                           f"with exit code {worker.exitcode}.")
+                continue
+            if error is not None:
+                raise RuntimeError(f"Distributed training process {rank} failed:\n{error}")
+            finished_ranks.add(rank)
+            if rank == 0:
+                metrics = worker_metrics
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+    return metrics
@@ -0,0 +1,283 @@
+"""
+A :class:`Profiler` measures how long each phase of training takes (waiting for the data
+iterator, the forward pass, the backward pass, the optimizer step, logging and so on), and
+optionally how long the forward pass of each module of the model takes, so that you can tell
+what a training run is bound by.  The :class:`~allennlp.training.trainer.Trainer` uses one when
+it is created with ``profile=True``.
+
+Code outside of the trainer can time its own phases with :func:`record`, which reports to the
+profiler of the trainer that is currently training, if there is one.
+
+Phases can happen inside other phases: the data iterator records the ``"tensorization"`` of each
+batch, which happens while the trainer is waiting for the iterator (``"iterator_wait"``).  The
+profiler keeps track of which phase each one happened in, and a nested phase's time is also part of
+the time of the phase around it.
+"""
+import json
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+import torch
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+A = TypeVar('A')
+
+# The profiler that ``record`` reports to, set while a ``Trainer`` with profiling turned on is training.
+_ACTIVE_PROFILER: Optional['Profiler'] = None
+
+
+class _NoOpContext:
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+_NO_OP_CONTEXT = _NoOpContext()
+
+
+class _PhaseContext:
+    def __init__(self, profiler: 'Profiler', name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._profiler.enter_phase(self._name)
+        self._start = self._profiler.now()
+
+    def __exit__(self, *args) -> None:
+        seconds = self._profiler.now() - self._start
+        self._profiler.exit_phase()
+        self._profiler.add_phase_time(self._name, seconds)
+
+
+def record(name: str):
+    """
+    Returns a context manager which adds the time spent inside it to the phase called ``name`` of
+    the active profiler, or which does nothing if there isn't one.
+    """
+    if _ACTIVE_PROFILER is None:
+        return _NO_OP_CONTEXT
+    return _ACTIVE_PROFILER.record(name)
+
+
+class Profiler:
+    """
+    Accumulates the time spent in named phases, and the number of times each phase happened.
+    A profiler which isn't ``enabled`` does nothing, cheaply, so the code being profiled doesn't
+    need to check.
+
+    Parameters
+    ----------
+    enabled : ``bool``, optional (default = True)
+        Whether to measure anything.
+    synchronize_cuda : ``bool``, optional (default = False)
+        Whether to wait for the GPU to finish its work before every measurement.  GPU operations
+        run asynchronously, so without this, the time of a phase is mostly the time it took to
+        queue up its work, and the time the GPU spent on it shows up in whichever later phase
+        first has to wait for a result.  Waiting slows training down, but is necessary for the
+        timings to mean anything when training on a GPU.
+    """
+    def __init__(self, enabled: bool = True, synchronize_cuda: bool = False) -> None:
+        self.enabled = enabled
+        self._synchronize_cuda = synchronize_cuda
+        self._phase_times: Dict[str, float] = defaultdict(float)
+        self._phase_counts: Dict[str, int] = defaultdict(int)
+        self._module_times: Dict[str, float] = defaultdict(float)
+        self._module_counts: Dict[str, int] = defaultdict(int)
+        # The start times of the forward passes of each module that are in progress.  There can be
+        # more than one, if a module is (indirectly) called from its own forward pass.
+        self._module_start_times: Dict[str, List[float]] = defaultdict(list)
+        self._hook_handles: List[Any] = []
+        # The phases that are in progress, innermost last, and the phase each phase happened in.
+        self._open_phases: List[str] = []
+        self._phase_parents: Dict[str, str] = {}
+        self._record_prefix = ""
+        self._last_epoch_phase_times: Dict[str, float] = {}
+        self._start_time = time.time()
+
+    def now(self) -> float:
+        if self._synchronize_cuda:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def enter_phase(self, name: str) -> None:
+        self._open_phases.append(name)
+
+    def exit_phase(self) -> None:
+        self._open_phases.pop()
+
+    def add_phase_time(self, name: str, seconds: float) -> None:
+        """
+        Adds ``seconds`` to the phase called ``name``, which happened inside whichever phase is
+        currently in progress, if any.
+        """
+        self._phase_times[name] += seconds
+        self._phase_counts[name] += 1
+        if self._open_phases:
+            self._phase_parents[name] = self._open_phases[-1]
+
+    def phase(self, name: str):
+        """
+        Returns a context manager which adds the time spent inside it to the phase called ``name``.
+        """
+        if not self.enabled:
+            return _NO_OP_CONTEXT
+        return _PhaseContext(self, name)
+
+    def record(self, name: str):
+        """
+        Like :func:`phase`, but for the phases that code outside of the trainer records with the
+        module-level :func:`record`, whose names get the prefix set with :func:`record_prefix`.
+        """
+        return self.phase(self._record_prefix + name)
+
+    @contextmanager
+    def record_prefix(self, prefix: str):
+        """
+        Returns a context manager inside which the phases given to :func:`record` are named with
+        ``prefix``, so that, for instance, the tensorization of validation batches is told apart
+        from that of training batches.
+        """
+        previous_prefix = self._record_prefix
+        self._record_prefix = prefix
+        try:
+            yield
+        finally:
+            self._record_prefix = previous_prefix
+
+    def time_iterator(self, iterable: Iterable[A], name: str) -> Iterable[A]:
+        """
+        Wraps ``iterable`` so that the time spent waiting for each of its items is added to the
+        phase called ``name``.
+        """
+        if not self.enabled:
+            return iterable
+        return self._timed_iterator(iter(iterable), name)
+
+    def _timed_iterator(self, iterator: Iterator[A], name: str) -> Iterator[A]:
+        while True:
+            self.enter_phase(name)
+            start = self.now()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds = self.now() - start
+                self.exit_phase()
+            self.add_phase_time(name, seconds)
+            yield item
+
+    def start(self, model: torch.nn.Module = None) -> None:
+        """
+        Makes this the profiler that :func:`record` reports to, and, if a ``model`` is given, adds
+        hooks to time the forward pass of each of its submodules.
+        """
+        global _ACTIVE_PROFILER  # pylint: disable=global-statement
+        if not self.enabled:
+            return
+        _ACTIVE_PROFILER = self
+        self._start_time = time.time()
+        if model is not None:
+            for name, module in model.named_modules():
+                if not name:
+                    # The model itself is the "forward" phase.
+                    continue
+                self._hook_handles.append(module.register_forward_pre_hook(self._make_pre_hook(name)))
+                self._hook_handles.append(module.register_forward_hook(self._make_hook(name)))
+
+    def stop(self) -> None:
+        """
+        Undoes :func:`start`.
+        """
+        global _ACTIVE_PROFILER  # pylint: disable=global-statement
+        if _ACTIVE_PROFILER is self:
+            _ACTIVE_PROFILER = None
+        for handle in self._hook_handles:
+            handle.remove()
+        self._hook_handles = []
+
+    def _make_pre_hook(self, name: str):
+        def pre_hook(module, inputs):  # pylint: disable=unused-argument
+            self._module_start_times[name].append(self.now())
+        return pre_hook
+
+    def _make_hook(self, name: str):
+        def hook(module, inputs, outputs):  # pylint: disable=unused-argument
+            start = self._module_start_times[name].pop()
+            self._module_times[name] += self.now() - start
+            self._module_counts[name] += 1
+        return hook
+
+    def epoch_phase_times(self) -> Dict[str, float]:
+        """
+        Returns the number of seconds spent in each phase since the last call.
+        """
+        phase_times = {name: seconds - self._last_epoch_phase_times.get(name, 0.0)
+                       for name, seconds in self._phase_times.items()}
+        self._last_epoch_phase_times = dict(self._phase_times)
+        return phase_times
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns the total and mean time of each phase, and of the forward pass of each module, if
+        we are timing them, along with the time since it was started (or created).  Phases which
+        happened inside another phase name it as ``"nested_in"``.
+        """
+        def summarize(times: Dict[str, float], counts: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+            return {name: {"total_seconds": times[name],
+                           "count": counts[name],
+                           "mean_milliseconds": 1000 * times[name] / counts[name] if counts[name] else 0.0}
+                    for name in sorted(times, key=times.get, reverse=True)}
+
+        phases = summarize(self._phase_times, self._phase_counts)
+        for name, parent in self._phase_parents.items():
+            phases[name]["nested_in"] = parent
+        summary: Dict[str, Any] = {"wall_clock_seconds": time.time() - self._start_time,
+                                   "phases": phases}
+        if self._module_times:
+            summary["modules"] = summarize(self._module_times, self._module_counts)
+        return summary
+
+    def log_summary(self) -> None:
+        """
+        Logs the total and mean time of each phase, and its percentage of the wall clock time.
+        Nested phases are indented under the phase they happened in, whose time (and percentage)
+        already includes theirs, so only the percentages of the phases that aren't indented add up.
+        """
+        summary = self.summary()
+        phases = summary["phases"]
+        if not phases:
+            return
+        children: Dict[Optional[str], List[str]] = defaultdict(list)
+        for name, times in phases.items():
+            nested_in = times.get("nested_in")
+            children[nested_in if nested_in in phases else None].append(name)
+
+        rows: List[Tuple[str, Dict[str, Any]]] = []
+
+        def add_rows(parent: Optional[str], depth: int) -> None:
+            for name in children[parent]:
+                rows.append(("  " * depth + name, phases[name]))
+                add_rows(name, depth + 1)
+        add_rows(None, 0)
+
+        name_length = max(len(label) for label, _ in rows)
+        logger.info("%s |  %10s  |  %10s  |  %6s", "Phase".ljust(name_length), "Total (s)", "Mean (ms)", "%")
+        for label, times in rows:
+            logger.info("%s |  %10.2f  |  %10.3f  |  %6.2f", label.ljust(name_length), times["total_seconds"],
+                        times["mean_milliseconds"], 100 * times["total_seconds"] / summary["wall_clock_seconds"])
+
+    def save(self, path: str) -> None:
+        """
+        Writes the :func:`summary` to ``path`` as JSON.
+        """
+        with open(path, "w") as summary_file:
+            json.dump(self.summary(), summary_file, indent=2)
@@ -133,22 +133,17 @@ class Batch(Iterable):
                 else:
                     lengths_to_use[field_name][padding_key] = instance_field_lengths[padding_key]
 
-        # Now we actually pad the instances to tensors.
-        field_tensors: Dict[str, list] = defaultdict(list)
+        # Now we actually pad the instances to tensors.  The `Field` classes themselves have the
+        # logic for padding and batching, so we grab a dictionary of field_name -> field class from
+        # the first instance in the batch and hand it all of the fields with that name at once.
+        # Simple fields use this to write the whole batch into one preallocated array.
         if verbose:
             logger.info("Now actually padding instances to length: %s", str(lengths_to_use))
-        for instance in self.instances:
-            for field, tensors in instance.as_tensor_dict(lengths_to_use, cuda_device).items():
-                field_tensors[field].append(tensors)
-
-        # Finally, we combine the tensors that we got for each instance into one big tensor (or set
-        # of tensors) per field.  The `Field` classes themselves have the logic for batching the
-        # tensors together, so we grab a dictionary of field_name -> field class from the first
-        # instance in the batch.
         field_classes = self.instances[0].fields
         final_fields = {}
-        for field_name, field_tensor_list in field_tensors.items():
-            final_fields[field_name] = field_classes[field_name].batch_tensors(field_tensor_list)
+        for field_name, field in field_classes.items():
+            fields = [instance.fields[field_name] for instance in self.instances]
+            final_fields[field_name] = field.batch_as_tensor(fields, lengths_to_use[field_name], cuda_device)
         return final_fields
 
     def __iter__(self) -> Iterator[Instance]:
@@ -1,26 +1,79 @@
-from typing import Iterable, Iterator, Callable
+from typing import Iterable, Iterator, Callable, List, Optional
+import glob
+import hashlib
+import json
 import logging
+import os
+import pickle
+import tempfile
 
 from allennlp.data.instance import Instance
 from allennlp.common import Tqdm
 from allennlp.common.checks import ConfigurationError
+from allennlp.common.file_utils import cached_path
+from allennlp.common.params import Params
 from allennlp.common.registrable import Registrable
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+
+def _instances_from_cache_file(cache_file: str) -> Iterator[Instance]:
+    """
+    Streams the pickled instances back out of a file written by :func:`_instances_to_cache_file`,
+    one at a time, so that lazy readers never need to hold the whole cache in memory.
+    """
+    with open(cache_file, 'rb') as cache:
+        while True:
+            try:
+                yield pickle.load(cache)
+            except EOFError:
+                return
+
+
+def _instances_to_cache_file(instances: Iterable[Instance], cache_file: str) -> Iterator[Instance]:
+    """
+    Yields the given instances back, pickling each one into ``cache_file`` as it goes by.  The
+    instances are written to a temporary file that is only moved into place once the iteration
+    has finished, so an interrupted read never leaves a truncated cache behind.
+    """
+    cache_directory = os.path.dirname(cache_file)
+    temp_fd, temp_path = tempfile.mkstemp(dir=cache_directory, suffix='.tmp')
+    completed = False
+    try:
+        with os.fdopen(temp_fd, 'wb') as cache:
+            for instance in instances:
+                pickle.dump(instance, cache, protocol=pickle.HIGHEST_PROTOCOL)
+                yield instance
+        os.replace(temp_path, cache_file)
+        completed = True
+        logger.info("Cached instances to %s", cache_file)
+    finally:
+        if not completed:
+            os.remove(temp_path)
+
+
 class _LazyInstances(Iterable):
     """
     An ``Iterable`` that just wraps a thunk for generating instances and calls it for
-    each call to ``__iter__``.
+    each call to ``__iter__``.  If a ``cache_file`` is given, the first complete pass
+    writes the instances to it, and every later pass reads them back from there instead
+    of calling the thunk.
     """
-    def __init__(self, instance_generator: Callable[[], Iterator[Instance]]) -> None:
+    def __init__(self,
+                 instance_generator: Callable[[], Iterator[Instance]],
+                 cache_file: str = None) -> None:
         super().__init__()
         self.instance_generator = instance_generator
+        self.cache_file = cache_file
 
     def __iter__(self) -> Iterator[Instance]:
+        if self.cache_file is not None and os.path.exists(self.cache_file):
+            return _instances_from_cache_file(self.cache_file)
         instances = self.instance_generator()
         if isinstance(instances, list):
             raise ConfigurationError("For a lazy dataset reader, _read() must return a generator")
+        if self.cache_file is not None:
+            return _instances_to_cache_file(instances, self.cache_file)
         return instances
 
 class DatasetReader(Registrable):
@@ -41,6 +94,44 @@ class DatasetReader(Registrable):
     """
     def __init__(self, lazy: bool = False) -> None:
         self.lazy = lazy
+        self._cache_directory: Optional[str] = None
+        self._cache_prefix = ''
+
+    def cache_data(self, cache_directory: str, cache_prefix: str = '') -> None:
+        """
+        Turns on caching of the instances this reader produces.  After the first time a file is
+        read, the instances are pickled into ``cache_directory``, and later calls to :func:`read`
+        for the same file stream them back from there instead of calling ``_read()`` again.
+
+        The cache file for a given input is keyed by ``cache_prefix`` and by the path, size and
+        modification time of the input file(s), so editing the data invalidates the cache.  The
+        reader can't see its own configuration, so whoever constructs it should pass something
+        that identifies that configuration as the ``cache_prefix`` (see
+        :func:`dataset_reader_from_params`); otherwise two differently
+        configured readers sharing a cache directory will see each other's instances.
+
+        Note that the instances must be picklable for this to work.
+        """
+        os.makedirs(cache_directory, exist_ok=True)
+        self._cache_directory = cache_directory
+        self._cache_prefix = cache_prefix
+
+    def _get_cache_location_for_file_path(self, file_path: str) -> str:
+        """
+        Returns the path of the cache file for the given input, which includes a fingerprint of
+        the input file (or of every file matching it, if it is a glob).
+        """
+        file_path = str(file_path)
+        if '://' in file_path:
+            local_paths: List[str] = [cached_path(file_path)]
+        else:
+            local_paths = sorted(glob.glob(file_path))
+        fingerprint = hashlib.sha256(self._cache_prefix.encode('utf-8'))
+        fingerprint.update(file_path.encode('utf-8'))
+        for local_path in local_paths:
+            stat = os.stat(local_path)
+            fingerprint.update(f"{os.path.abspath(local_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        return os.path.join(self._cache_directory, fingerprint.hexdigest() + '.instances')
 
     def read(self, file_path: str) -> Iterable[Instance]:
         """
@@ -59,18 +150,32 @@ class DatasetReader(Registrable):
         In either case, the returned ``Iterable`` can be iterated
         over multiple times. It's unlikely you want to override this function,
         but if you do your result should likewise be repeatedly iterable.
+
+        If :func:`cache_data` has been called, the instances are read from (or, the first
+        time, written to) the cache instead, without calling ``self._read()`` again.
         """
         lazy = getattr(self, 'lazy', None)
         if lazy is None:
             logger.warning("DatasetReader.lazy is not set, "
                            "did you forget to call the superclass constructor?")
 
+        if getattr(self, '_cache_directory', None) is not None:
+            cache_file = self._get_cache_location_for_file_path(file_path)
+        else:
+            cache_file = None
+
         if lazy:
-            return _LazyInstances(lambda: iter(self._read(file_path)))
+            return _LazyInstances(lambda: iter(self._read(file_path)), cache_file)
         else:
-            instances = self._read(file_path)
-            if not isinstance(instances, list):
-                instances = [instance for instance in Tqdm.tqdm(instances)]
+            if cache_file is not None and os.path.exists(cache_file):
+                logger.info("Reading instances from cache %s", cache_file)
+                instances = list(_instances_from_cache_file(cache_file))
+            else:
+                instances = self._read(file_path)
+                if cache_file is not None:
+                    instances = _instances_to_cache_file(instances, cache_file)
+                if not isinstance(instances, list):
+                    instances = [instance for instance in Tqdm.tqdm(instances)]
             if not instances:
                 raise ConfigurationError("No instances were read from the given filepath {}. "
                                          "Is the path correct?".format(file_path))
@@ -103,3 +208,17 @@ class DatasetReader(Registrable):
         to pass it the right information.
         """
         raise NotImplementedError
+
+
+def dataset_reader_from_params(params: Params, cache_directory: str = None) -> DatasetReader:
+    """
+    Constructs a ``DatasetReader`` from its config.  If a ``cache_directory`` is given, we turn on
+    instance caching for the reader, using a hash of its config as the cache prefix so that
+    readers configured differently never share cached instances.
+    """
+    cache_prefix = hashlib.sha256(json.dumps(params.as_dict(quiet=True),
+                                             sort_keys=True).encode('utf-8')).hexdigest()
+    dataset_reader = DatasetReader.from_params(params)
+    if cache_directory is not None:
+        dataset_reader.cache_data(cache_directory, cache_prefix)
+    return dataset_reader
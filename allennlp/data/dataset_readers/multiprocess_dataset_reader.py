@@ -0,0 +1,111 @@
+import glob
+import logging
+import multiprocessing
+import traceback
+from typing import Iterable, Iterator, List
+
+from overrides import overrides
+
+from allennlp.common.checks import ConfigurationError
+from allennlp.data.dataset_readers.dataset_reader import DatasetReader
+from allennlp.data.instance import Instance
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+def _read_shards(reader: DatasetReader,
+                 shards: List[str],
+                 output_queue: multiprocessing.Queue) -> None:
+    """
+    Worker loop.  Reads each of the given shards in turn with ``reader._read``, putting every
+    instance on the ``output_queue`` followed by a ``None`` to mark the end of the shard.  If
+    anything goes wrong, the formatted traceback is put on the queue instead, so that the parent
+    process can raise the error rather than waiting forever.
+    """
+    # pylint: disable=protected-access
+    try:
+        for shard in shards:
+            for instance in reader._read(shard):
+                output_queue.put(instance)
+            output_queue.put(None)
+    except Exception:  # pylint: disable=broad-except
+        output_queue.put(traceback.format_exc())
+
+
+@DatasetReader.register('multiprocess')
+class MultiprocessDatasetReader(DatasetReader):
+    """
+    Wraps another dataset reader and uses it to read a sharded dataset with several processes.
+    The ``file_path`` given to :func:`read` is interpreted as a glob, and every file that matches
+    it is one shard.  Shards are assigned round-robin to ``num_workers`` worker processes, each of
+    which runs the base reader's ``_read`` (and hence ``text_to_instance``) on its shards.
+
+    The instances always come back in the same order: all of the instances from the first shard
+    (in sorted filename order), then all of the instances from the second shard, and so on, so
+    the result does not depend on how the work was scheduled.  If the base reader is lazy, this
+    reader is too, and every iteration over the returned instances starts a fresh set of workers;
+    otherwise the instances are collected into a list once.
+
+    Note that the instances are pickled to be sent back from the workers, so everything in them
+    must be picklable.  (``TextFields`` pickle spacy tokens as our own ``Tokens``.)
+
+    Parameters
+    ----------
+    base_reader : ``DatasetReader``
+        The reader used to read each shard.
+    num_workers : ``int``
+        The number of worker processes to read with.
+    output_queue_size : ``int``, optional (default = 1000)
+        The maximum number of instances each worker is allowed to read ahead of the consumer.
+    """
+    def __init__(self,
+                 base_reader: DatasetReader,
+                 num_workers: int,
+                 output_queue_size: int = 1000) -> None:
+        if num_workers < 1:
+            raise ConfigurationError("MultiprocessDatasetReader requires num_workers >= 1")
+        super().__init__(lazy=base_reader.lazy)
+        self.reader = base_reader
+        self.num_workers = num_workers
+        self.output_queue_size = output_queue_size
+
+    @overrides
+    def text_to_instance(self, *inputs) -> Instance:
+        return self.reader.text_to_instance(*inputs)
+
+    @overrides
+    def _read(self, file_path: str) -> Iterable[Instance]:
+        shards = sorted(glob.glob(file_path))
+        if not shards:
+            raise ConfigurationError(f"No files match the shard pattern {file_path}")
+        return self._read_in_parallel(shards)
+
+    def _read_in_parallel(self, shards: List[str]) -> Iterator[Instance]:
+        num_workers = min(self.num_workers, len(shards))
+        logger.info(f"Reading {len(shards)} shards with {num_workers} worker processes")
+
+        # Worker ``i`` reads shards ``i``, ``i + num_workers``, ... in that order and has a queue of
+        # its own, so we can consume the shards in order without buffering any of them.
+        output_queues = [multiprocessing.Queue(self.output_queue_size) for _ in range(num_workers)]
+        workers = []
+        for i in range(num_workers):
+            worker = multiprocessing.Process(target=_read_shards,
+                                             args=(self.reader, shards[i::num_workers], output_queues[i]),
+                                             daemon=True)
+            worker.start()
+            workers.append(worker)
+
+        try:
+            for shard_index, shard in enumerate(shards):
+                output_queue = output_queues[shard_index % num_workers]
+                item = output_queue.get()
+                while item is not None:
+                    if isinstance(item, str):
+                        raise RuntimeError(f"MultiprocessDatasetReader worker failed on {shard}:\n{item}")
+                    yield item
+                    item = output_queue.get()
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
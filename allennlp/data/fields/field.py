@@ -64,7 +64,9 @@ class Field(Generic[DataArray]):
         everything to that length (or use a pre-specified maximum length).  The return value is a
         dictionary mapping keys to lengths, like {'num_tokens': 13}.
 
-        This is always called after :func:`index`.
+        This is always called after :func:`index`, and typically once per instance per epoch, so
+        fields for which it is expensive may compute it once and memoize the result, as long as
+        they clear it when :func:`index` is called again.
         """
         raise NotImplementedError
 
@@ -114,3 +116,28 @@ class Field(Generic[DataArray]):
         """
         # pylint: disable=no-self-use
         return torch.stack(tensor_list)
+
+    def batch_as_tensor(self,
+                        fields: List['Field'],
+                        padding_lengths: Dict[str, int],
+                        cuda_device: int = -1) -> DataArray:
+        """
+        Pads and tensorizes a whole batch of fields of this type at once, returning the same thing
+        as calling :func:`as_tensor` on each of the ``fields`` and merging the results with
+        :func:`batch_tensors`, which is exactly what the default implementation here does.
+        ``Batch.as_tensor_dict`` calls this on the field from the first instance in the batch.
+
+        Subclasses whose tensors are simple enough can override this to write all of the
+        ``fields`` straight into one preallocated array, which avoids creating a tensor per
+        instance and then copying them all again in ``torch.stack``.
+
+        Parameters
+        ----------
+        fields : ``List[Field]``
+            The fields to batch, one per instance.  These all have the same type as ``self``.
+        padding_lengths : ``Dict[str, int]``
+            The padding lengths to use for every field, as in :func:`as_tensor`.
+        cuda_device : ``int``
+            If cuda_device >= 0, the batched tensor is allocated on this device.
+        """
+        return self.batch_tensors([field.as_tensor(padding_lengths, cuda_device) for field in fields])
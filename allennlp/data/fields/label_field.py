@@ -1,4 +1,4 @@
-from typing import Dict, Union, Set
+from typing import Dict, List, Union, Set
 import logging
 
 from overrides import overrides
@@ -94,6 +94,15 @@ class LabelField(Field[torch.Tensor]):
         tensor = torch.tensor(self._label_id, dtype=torch.long)
         return tensor if cuda_device == -1 else tensor.cuda(cuda_device)
 
+    @overrides
+    def batch_as_tensor(self,
+                        fields: List['LabelField'],  # type: ignore
+                        padding_lengths: Dict[str, int],
+                        cuda_device: int = -1) -> torch.Tensor:
+        # pylint: disable=unused-argument,not-callable,protected-access
+        tensor = torch.tensor([field._label_id for field in fields], dtype=torch.long)
+        return tensor if cuda_device == -1 else tensor.cuda(cuda_device)
+
     @overrides
     def empty_field(self):
         return LabelField(-1, self._label_namespace, skip_indexing=True)
@@ -3,6 +3,7 @@ import logging
 import textwrap
 
 from overrides import overrides
+import numpy
 import torch
 
 from allennlp.common.checks import ConfigurationError
@@ -100,6 +101,20 @@ class SequenceLabelField(Field[torch.Tensor]):
         tensor = torch.LongTensor(padded_tags)
         return tensor if cuda_device == -1 else tensor.cuda(cuda_device)
 
+    @overrides
+    def batch_as_tensor(self,
+                        fields: List['SequenceLabelField'],  # type: ignore
+                        padding_lengths: Dict[str, int],
+                        cuda_device: int = -1) -> torch.Tensor:
+        # pylint: disable=protected-access
+        desired_num_tokens = padding_lengths['num_tokens']
+        padded_tags = numpy.zeros((len(fields), desired_num_tokens), dtype=numpy.int64)
+        for i, field in enumerate(fields):
+            labels = field._indexed_labels[:desired_num_tokens]
+            padded_tags[i, :len(labels)] = labels
+        tensor = torch.from_numpy(padded_tags)
+        return tensor if cuda_device == -1 else tensor.cuda(cuda_device)
+
     @overrides
     def empty_field(self) -> 'SequenceLabelField':  # pylint: disable=no-self-use
         # pylint: disable=protected-access
@@ -1,5 +1,5 @@
 # pylint: disable=access-member-before-definition
-from typing import Dict
+from typing import Dict, List
 
 from overrides import overrides
 import torch
@@ -54,6 +54,15 @@ class SpanField(Field[torch.Tensor]):
         tensor = torch.LongTensor([self.span_start, self.span_end])
         return tensor if cuda_device == -1 else tensor.cuda(cuda_device)
 
+    @overrides
+    def batch_as_tensor(self,
+                        fields: List['SpanField'],  # type: ignore
+                        padding_lengths: Dict[str, int],
+                        cuda_device: int = -1) -> torch.Tensor:
+        # pylint: disable=unused-argument
+        tensor = torch.LongTensor([[field.span_start, field.span_end] for field in fields])
+        return tensor if cuda_device == -1 else tensor.cuda(cuda_device)
+
     @overrides
     def empty_field(self):
         return SpanField(-1, -1, self.sequence_field.empty_field())
@@ -2,22 +2,35 @@
 A ``TextField`` represents a string of text, the kind that you might want to represent with
 standard word vectors, or pass through an LSTM.
 """
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 import textwrap
 
 from overrides import overrides
+import numpy
 from spacy.tokens import Token as SpacyToken
 import torch
 
 from allennlp.common.checks import ConfigurationError
 from allennlp.data.fields.sequence_field import SequenceField
 from allennlp.data.tokenizers.token import Token
+from allennlp.data.tokenizers.word_splitter import spacy_token_to_allennlp_token
+from allennlp.data.token_indexers.dep_label_indexer import DepLabelIndexer
+from allennlp.data.token_indexers.ner_tag_indexer import NerTagIndexer
+from allennlp.data.token_indexers.openai_transformer_byte_pair_indexer import OpenaiTransformerBytePairIndexer
+from allennlp.data.token_indexers.pos_tag_indexer import PosTagIndexer
+from allennlp.data.token_indexers.single_id_token_indexer import SingleIdTokenIndexer
 from allennlp.data.token_indexers.token_indexer import TokenIndexer, TokenType
 from allennlp.data.vocabulary import Vocabulary
 from allennlp.nn import util
 
 TokenList = List[TokenType]  # pylint: disable=invalid-name
 
+# Indexers whose ``pad_token_sequence`` just truncates or right-pads one id per token with their
+# padding token, so that ``TextField.batch_as_tensor`` can do the same for a whole batch at once.
+# This is checked against the exact type, because a subclass might pad differently.
+_RIGHT_PADDING_INDEXERS = (DepLabelIndexer, NerTagIndexer, OpenaiTransformerBytePairIndexer,
+                           PosTagIndexer, SingleIdTokenIndexer)
+
 
 class TextField(SequenceField[Dict[str, torch.Tensor]]):
     """
@@ -39,11 +52,24 @@ class TextField(SequenceField[Dict[str, torch.Tensor]]):
         self._token_indexers = token_indexers
         self._indexed_tokens: Optional[Dict[str, TokenList]] = None
         self._indexer_name_to_indexed_token: Optional[Dict[str, List[str]]] = None
+        # Computing padding lengths looks at every token, and they can't change until we're
+        # re-indexed, so we only do it once.
+        self._padding_lengths: Optional[Dict[str, int]] = None
 
         if not all([isinstance(x, (Token, SpacyToken)) for x in tokens]):
             raise ConfigurationError("TextFields must be passed Tokens. "
                                      "Found: {} with types {}.".format(tokens, [type(x) for x in tokens]))
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # Spacy tokens can't be pickled, so we pickle them as our own ``Token`` objects, which
+        # keeps instances picklable (for ``MultiprocessDatasetReader`` and the instance cache)
+        # without converting every token up front.
+        state = dict(self.__dict__)
+        if any(isinstance(token, SpacyToken) for token in self.tokens):
+            state['tokens'] = [spacy_token_to_allennlp_token(token) if isinstance(token, SpacyToken) else token
+                               for token in self.tokens]
+        return state
+
     @overrides
     def count_vocab_items(self, counter: Dict[str, Dict[str, int]]):
         for indexer in self._token_indexers.values():
@@ -60,6 +86,7 @@ class TextField(SequenceField[Dict[str, torch.Tensor]]):
             indexer_name_to_indexed_token[indexer_name] = list(token_indices.keys())
         self._indexed_tokens = token_arrays
         self._indexer_name_to_indexed_token = indexer_name_to_indexed_token
+        self._padding_lengths = None
 
     @overrides
     def get_padding_lengths(self) -> Dict[str, int]:
@@ -67,7 +94,16 @@ class TextField(SequenceField[Dict[str, torch.Tensor]]):
         The ``TextField`` has a list of ``Tokens``, and each ``Token`` gets converted into arrays by
         (potentially) several ``TokenIndexers``.  This method gets the max length (over tokens)
         associated with each of these arrays.
+
+        The result is computed once after each call to :func:`index` and memoized, so calling this
+        repeatedly (e.g., once per epoch when sorting instances into buckets) only costs as much
+        as copying a small dictionary.
         """
+        if self._padding_lengths is None:
+            self._padding_lengths = self._get_padding_lengths()
+        return dict(self._padding_lengths)
+
+    def _get_padding_lengths(self) -> Dict[str, int]:
         # Our basic outline: we will iterate over `TokenIndexers`, and aggregate lengths over tokens
         # for each indexer separately.  Then we will combine the results for each indexer into a single
         # dictionary, resolving any (unlikely) key conflicts by taking a max.
@@ -122,34 +158,72 @@ class TextField(SequenceField[Dict[str, torch.Tensor]]):
                   padding_lengths: Dict[str, int],
                   cuda_device: int = -1) -> Dict[str, torch.Tensor]:
         tensors = {}
+        for indexer_name, indexer in self._token_indexers.items():
+            tensors.update(self._indexer_as_tensors(indexer_name, indexer, padding_lengths, cuda_device))
+        return tensors
+
+    def _indexer_as_tensors(self,
+                            indexer_name: str,
+                            indexer: TokenIndexer,
+                            padding_lengths: Dict[str, int],
+                            cuda_device: int = -1) -> Dict[str, torch.Tensor]:
+        num_tokens = padding_lengths.get('num_tokens')
+        if num_tokens is None:
+            # The indexers return different lengths.
+            # Get the desired_num_tokens for this indexer.
+            desired_num_tokens = {
+                    indexed_tokens_key: padding_lengths[indexed_tokens_key]
+                    for indexed_tokens_key in self._indexer_name_to_indexed_token[indexer_name]
+            }
+        else:
+            desired_num_tokens = {indexer_name: num_tokens}
+
+        indices_to_pad = {indexed_tokens_key: self._indexed_tokens[indexed_tokens_key]
+                          for indexed_tokens_key in self._indexer_name_to_indexed_token[indexer_name]}
+        padded_array = indexer.pad_token_sequence(indices_to_pad,
+                                                  desired_num_tokens, padding_lengths)
+        # We use the key of the indexer to recognise what the tensor corresponds to within the
+        # field (i.e. the result of word indexing, or the result of character indexing, for
+        # example).
+        # TODO(mattg): we might someday have a TokenIndexer that needs to use something other
+        # than a LongTensor here, and it's not clear how to signal that.  Maybe we'll need to
+        # add a class method to TokenIndexer to tell us the type?  But we can worry about that
+        # when there's a compelling use case for it.
+        indexer_tensors = {key: torch.LongTensor(array) for key, array in padded_array.items()}
+        if cuda_device > -1:
+            for key in indexer_tensors.keys():
+                indexer_tensors[key] = indexer_tensors[key].cuda(cuda_device)
+        return indexer_tensors
+
+    @overrides
+    def batch_as_tensor(self,
+                        fields: List['TextField'],  # type: ignore
+                        padding_lengths: Dict[str, int],
+                        cuda_device: int = -1) -> Dict[str, torch.Tensor]:
+        # pylint: disable=protected-access
+        tensors: Dict[str, torch.Tensor] = {}
         num_tokens = padding_lengths.get('num_tokens')
         for indexer_name, indexer in self._token_indexers.items():
-            if num_tokens is None:
-                # The indexers return different lengths.
-                # Get the desired_num_tokens for this indexer.
-                desired_num_tokens = {
-                        indexed_tokens_key: padding_lengths[indexed_tokens_key]
-                        for indexed_tokens_key in self._indexer_name_to_indexed_token[indexer_name]
-                }
-            else:
-                desired_num_tokens = {indexer_name: num_tokens}
-
-            indices_to_pad = {indexed_tokens_key: self._indexed_tokens[indexed_tokens_key]
-                              for indexed_tokens_key in self._indexer_name_to_indexed_token[indexer_name]}
-            padded_array = indexer.pad_token_sequence(indices_to_pad,
-                                                      desired_num_tokens, padding_lengths)
-            # We use the key of the indexer to recognise what the tensor corresponds to within the
-            # field (i.e. the result of word indexing, or the result of character indexing, for
-            # example).
-            # TODO(mattg): we might someday have a TokenIndexer that needs to use something other
-            # than a LongTensor here, and it's not clear how to signal that.  Maybe we'll need to
-            # add a class method to TokenIndexer to tell us the type?  But we can worry about that
-            # when there's a compelling use case for it.
-            indexer_tensors = {key: torch.LongTensor(array) for key, array in padded_array.items()}
-            if cuda_device > -1:
-                for key in indexer_tensors.keys():
-                    indexer_tensors[key] = indexer_tensors[key].cuda(cuda_device)
-            tensors.update(indexer_tensors)
+            indexed_tokens_keys = self._indexer_name_to_indexed_token[indexer_name]
+            if type(indexer) not in _RIGHT_PADDING_INDEXERS:  # pylint: disable=unidiomatic-typecheck
+                # Other indexers (like those with nested ids, for characters, or ones we don't
+                # know about) have their own padding logic, so we pad those one field at a time
+                # and stack the results.
+                indexer_tensors = [field._indexer_as_tensors(indexer_name, indexer, padding_lengths, cuda_device)
+                                   for field in fields]
+                tensors.update(util.batch_tensor_dicts(indexer_tensors))
+                continue
+            # These indexers pad by truncating or right-padding with the padding token, so we can
+            # write the whole batch straight into one preallocated array.
+            padding_token = indexer.get_padding_token()
+            for key in indexed_tokens_keys:
+                desired_num_tokens = num_tokens if num_tokens is not None else padding_lengths[key]
+                padded_array = numpy.full((len(fields), desired_num_tokens), padding_token, dtype=numpy.int64)
+                for i, field in enumerate(fields):
+                    indices = field._indexed_tokens[key][:desired_num_tokens]
+                    padded_array[i, :len(indices)] = indices
+                tensor = torch.from_numpy(padded_array)
+                tensors[key] = tensor if cuda_device == -1 else tensor.cuda(cuda_device)
         return tensors
 
     @overrides
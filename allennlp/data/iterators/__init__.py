@@ -7,3 +7,5 @@ from allennlp.data.iterators.data_iterator import DataIterator
 from allennlp.data.iterators.basic_iterator import BasicIterator
 from allennlp.data.iterators.bucket_iterator import BucketIterator
 from allennlp.data.iterators.epoch_tracking_bucket_iterator import EpochTrackingBucketIterator
+from allennlp.data.iterators.multiprocess_iterator import MultiprocessIterator
+from allennlp.data.iterators.token_budget_iterator import TokenBudgetIterator
@@ -7,6 +7,7 @@ import random
 
 import torch
 
+from allennlp.common import profiler
 from allennlp.common.registrable import Registrable
 from allennlp.common.util import is_lazy, lazy_groups_of, ensure_list
 from allennlp.data.dataset import Batch
@@ -89,7 +90,9 @@ class DataIterator(Registrable):
                  instances: Iterable[Instance],
                  num_epochs: int = None,
                  shuffle: bool = True,
-                 cuda_device: int = -1) -> Iterator[TensorDict]:
+                 cuda_device: int = -1,
+                 shard_index: int = 0,
+                 num_shards: int = 1) -> Iterator[TensorDict]:
         """
         Returns a generator that yields batches over the given dataset
         for the given number of epochs. If ``num_epochs`` is not specified,
@@ -111,6 +114,14 @@ class DataIterator(Registrable):
         cuda_device : ``int``
             If cuda_device >= 0, GPUs are available and Pytorch was compiled with CUDA support, the
             tensor will be copied to the cuda_device specified.
+        shard_index : ``int``, optional (default=0)
+            Which of the ``num_shards`` shards of the batches to yield.
+        num_shards : ``int``, optional (default=1)
+            If greater than 1, the batches are dealt out in turn to ``num_shards`` shards, and we
+            only index, pad and yield the ones in shard ``shard_index``.  This is used for
+            distributed training, where every process iterates over the same (identically shuffled)
+            batches and takes its own share of them.  So that every shard gets the same number of
+            batches, the last ``len(batches) % num_shards`` batches of each epoch are dropped.
         """
         # Instances is likely to be a list, which cannot be used as a key,
         # so we take the object id instead.
@@ -140,28 +151,52 @@ class DataIterator(Registrable):
                     yield tensor_dict
             else:
                 batches = self._create_batches(instances, shuffle)
+                if num_shards > 1:
+                    batches = self._take_shard(batches, shard_index, num_shards)
 
                 # Should we add the instances to the cache this epoch?
                 add_to_cache = self._cache_instances and key not in self._cache
 
-                for batch in batches:
-                    if self._track_epoch:
-                        add_epoch_number(batch, epoch)
-
-                    if self.vocab is not None:
-                        batch.index_instances(self.vocab)
-
-                    padding_lengths = batch.get_padding_lengths()
-                    logger.debug("Batch padding lengths: %s", str(padding_lengths))
-                    logger.debug("Batch size: %d", len(batch.instances))
-                    tensor_dict = batch.as_tensor_dict(padding_lengths,
-                                                       cuda_device=cuda_device)
-
+                for tensor_dict in self._tensorize_batches(batches, epoch, cuda_device):
                     if add_to_cache:
                         self._cache[key].append(tensor_dict)
 
                     yield tensor_dict
 
+    @staticmethod
+    def _take_shard(batches: Iterable[Batch], shard_index: int, num_shards: int) -> Iterator[Batch]:
+        """
+        Yields every ``num_shards``-th batch, starting with batch ``shard_index``, stopping before
+        the first incomplete group of ``num_shards`` batches.
+        """
+        for group in lazy_groups_of(iter(batches), num_shards):
+            if len(group) == num_shards:
+                yield group[shard_index]
+
+    def _tensorize_batches(self,
+                           batches: Iterable[Batch],
+                           epoch: int,
+                           cuda_device: int = -1) -> Iterator[TensorDict]:
+        """
+        Indexes and pads each of the given batches, yielding one ``TensorDict`` per batch, in the
+        order the batches were given.  This is where almost all of the CPU-side work of the
+        iterator happens; subclasses can override it to do that work somewhere other than the
+        calling thread (see :class:`~allennlp.data.iterators.MultiprocessIterator`).
+        """
+        for batch in batches:
+            if self._track_epoch:
+                add_epoch_number(batch, epoch)
+
+            if self.vocab is not None:
+                batch.index_instances(self.vocab)
+
+            padding_lengths = batch.get_padding_lengths()
+            logger.debug("Batch padding lengths: %s", str(padding_lengths))
+            logger.debug("Batch size: %d", len(batch.instances))
+            with profiler.record("tensorization"):
+                tensor_dict = batch.as_tensor_dict(padding_lengths, cuda_device=cuda_device)
+            yield tensor_dict
+
     def _take_instances(self,
                         instances: Iterable[Instance],
                         max_instances: Optional[int] = None) -> Iterator[Instance]:
@@ -0,0 +1,242 @@
+import logging
+import queue
+import threading
+import traceback
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from overrides import overrides
+import torch.multiprocessing as multiprocessing
+
+from allennlp.common.checks import ConfigurationError
+from allennlp.data.dataset import Batch
+from allennlp.data.instance import Instance
+from allennlp.data.iterators.data_iterator import DataIterator, TensorDict, add_epoch_number
+from allennlp.data.vocabulary import Vocabulary
+from allennlp.nn.util import move_to_device
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# How long (in seconds) the feeder thread waits on a full queue before checking whether the
+# consumer has gone away.
+_QUEUE_POLL_INTERVAL = 0.1
+
+
+def _create_tensor_dicts(input_queue: multiprocessing.Queue,
+                         output_queue: multiprocessing.Queue,
+                         vocab: Optional[Vocabulary]) -> None:
+    """
+    Worker loop.  For each epoch, pulls ``(batch_index, Batch)`` pairs off of the ``input_queue``
+    until it sees a ``None``, indexes and pads each batch on the CPU, and puts
+    ``(batch_index, tensor_dict)`` on the ``output_queue``.  At the end of each epoch it puts
+    ``(None, None)`` on the ``output_queue`` and waits for the next one; the parent terminates
+    the worker when it is no longer needed.  If something goes wrong it puts
+    ``(None, formatted_traceback)`` on the ``output_queue`` instead, so that the parent process
+    can raise the error rather than waiting forever.
+    """
+    try:
+        while True:
+            item = input_queue.get()
+            while item is not None:
+                batch_index, batch = item
+                if vocab is not None:
+                    batch.index_instances(vocab)
+                padding_lengths = batch.get_padding_lengths()
+                output_queue.put((batch_index, batch.as_tensor_dict(padding_lengths)))
+                item = input_queue.get()
+            output_queue.put((None, None))
+    except Exception:  # pylint: disable=broad-except
+        output_queue.put((None, traceback.format_exc()))
+
+
+class _BatchFeeder(threading.Thread):
+    """
+    A background thread that runs a (lazy) ``_create_batches`` generator, optionally adds the epoch
+    number to each batch, and puts ``(batch_index, Batch)`` pairs on the workers' input queue,
+    followed by one ``None`` per worker.  Running this in the parent process (instead of in the
+    workers) keeps the base iterator's cursors, and hence ``instances_per_epoch``, working
+    across calls.
+    """
+    def __init__(self,
+                 batches: Iterable[Batch],
+                 input_queue: multiprocessing.Queue,
+                 output_queue: multiprocessing.Queue,
+                 num_workers: int,
+                 epoch: Optional[int]) -> None:
+        super().__init__(daemon=True)
+        self._batches = batches
+        self._input_queue = input_queue
+        self._output_queue = output_queue
+        self._num_workers = num_workers
+        self._epoch = epoch
+        self.stopped = threading.Event()
+
+    def _put(self, item, target_queue: multiprocessing.Queue) -> bool:
+        while not self.stopped.is_set():
+            try:
+                target_queue.put(item, timeout=_QUEUE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self) -> None:
+        try:
+            for batch_index, batch in enumerate(self._batches):
+                if self._epoch is not None:
+                    add_epoch_number(batch, self._epoch)
+                if not self._put((batch_index, batch), self._input_queue):
+                    return
+            for _ in range(self._num_workers):
+                if not self._put(None, self._input_queue):
+                    return
+        except Exception:  # pylint: disable=broad-except
+            self._put((None, traceback.format_exc()), self._output_queue)
+
+
+@DataIterator.register("multiprocess")
+class MultiprocessIterator(DataIterator):
+    """
+    Wraps another :class:`DataIterator` and moves the CPU-bound part of producing batches off of
+    the training thread.  Batches are created by the wrapped iterator's ``_create_batches`` on a
+    background thread, and the indexing, padding and tensorization of each batch happen in a pool
+    of ``num_workers`` worker processes, with at most ``output_queue_size`` batches prefetched.
+    The resulting tensors are moved to ``cuda_device`` (if any) in the parent and yielded in the
+    same order the wrapped iterator would have produced them.
+
+    ``instances_per_epoch``, ``track_epoch`` and ``cache_instances`` are taken from the wrapped
+    iterator and behave exactly as they do there; ``get_num_batches`` is also delegated to it.
+
+    The worker processes are started on the first epoch and reused for later epochs, as long as
+    the previous epoch was consumed completely and the vocabulary has not changed.  If the
+    consumer stops early (or something fails), the workers are shut down and new ones are
+    started on the next call.
+
+    Note that the instances must be picklable to be sent to the workers.
+
+    Parameters
+    ----------
+    base_iterator : ``DataIterator``
+        The iterator that decides how instances are grouped into batches.
+    num_workers : ``int``, optional (default = 1)
+        The number of worker processes used to tensorize batches.
+    output_queue_size : ``int``, optional (default = 100)
+        The maximum number of batches that are waiting to be tensorized or waiting to be consumed.
+        This bounds the memory used for prefetching.
+    """
+    def __init__(self,
+                 base_iterator: DataIterator,
+                 num_workers: int = 1,
+                 output_queue_size: int = 100) -> None:
+        # pylint: disable=protected-access
+        if num_workers < 1:
+            raise ConfigurationError("MultiprocessIterator requires num_workers >= 1")
+        super().__init__(batch_size=base_iterator._batch_size,
+                         instances_per_epoch=base_iterator._instances_per_epoch,
+                         max_instances_in_memory=base_iterator._max_instances_in_memory,
+                         cache_instances=base_iterator._cache_instances,
+                         track_epoch=base_iterator._track_epoch,
+                         maximum_samples_per_batch=base_iterator._maximum_samples_per_batch)
+        self._base_iterator = base_iterator
+        self._num_workers = num_workers
+        self._output_queue_size = output_queue_size
+
+        # The worker pool, kept alive across epochs; see ``_start_workers``.
+        self._workers: List[multiprocessing.Process] = []
+        self._input_queue: Optional[multiprocessing.Queue] = None
+        self._output_queue: Optional[multiprocessing.Queue] = None
+        self._workers_vocab: Optional[Vocabulary] = None
+
+    def _start_workers(self) -> None:
+        """
+        Makes sure there is a pool of live workers that index with the current vocabulary,
+        reusing the pool from the previous epoch if possible.
+        """
+        if (self._workers and self._workers_vocab is self.vocab and
+                    all(worker.is_alive() for worker in self._workers)):
+            return
+        self._shutdown_workers()
+        self._input_queue = multiprocessing.Queue(self._output_queue_size)
+        self._output_queue = multiprocessing.Queue(self._output_queue_size)
+        self._workers_vocab = self.vocab
+        for _ in range(self._num_workers):
+            worker = multiprocessing.Process(target=_create_tensor_dicts,
+                                             args=(self._input_queue, self._output_queue, self.vocab),
+                                             daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _shutdown_workers(self) -> None:
+        """
+        Terminates the workers and releases the queues.  Anything still buffered in the queues is
+        dropped, so that their feeder threads can't block interpreter exit.
+        """
+        for worker in self._workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        self._workers = []
+        for worker_queue in (self._input_queue, self._output_queue):
+            if worker_queue is not None:
+                worker_queue.cancel_join_thread()
+                worker_queue.close()
+        self._input_queue = None
+        self._output_queue = None
+        self._workers_vocab = None
+
+    def __del__(self) -> None:
+        # ``__init__`` may have failed before the worker attributes were set.
+        if getattr(self, "_workers", None) is not None:
+            self._shutdown_workers()
+
+    @overrides
+    def _create_batches(self, instances: Iterable[Instance], shuffle: bool) -> Iterable[Batch]:
+        # pylint: disable=protected-access
+        return self._base_iterator._create_batches(instances, shuffle)
+
+    @overrides
+    def _tensorize_batches(self,
+                           batches: Iterable[Batch],
+                           epoch: int,
+                           cuda_device: int = -1) -> Iterator[TensorDict]:
+        self._start_workers()
+        input_queue, output_queue = self._input_queue, self._output_queue
+
+        feeder = _BatchFeeder(batches,
+                              input_queue,
+                              output_queue,
+                              self._num_workers,
+                              epoch if self._track_epoch else None)
+        feeder.start()
+
+        # Workers finish batches out of order, so we hold on to the ones that arrive early.
+        finished: Dict[int, TensorDict] = {}
+        next_index = 0
+        num_workers_done = 0
+        try:
+            while num_workers_done < self._num_workers:
+                batch_index, result = output_queue.get()
+                if batch_index is None:
+                    if result is not None:
+                        raise RuntimeError(f"MultiprocessIterator worker failed:\n{result}")
+                    num_workers_done += 1
+                    continue
+                finished[batch_index] = result
+                while next_index in finished:
+                    yield move_to_device(finished.pop(next_index), cuda_device)
+                    next_index += 1
+        finally:
+            feeder.stopped.set()
+            feeder.join()
+            if num_workers_done < self._num_workers:
+                # The consumer stopped early or something failed, so the queues may still hold
+                # batches from this epoch and the workers can't be reused.
+                self._shutdown_workers()
+
+    @overrides
+    def get_num_batches(self, instances: Iterable[Instance]) -> int:
+        return self._base_iterator.get_num_batches(instances)
+
+    @overrides
+    def index_with(self, vocab: Vocabulary):
+        self.vocab = vocab
+        self._base_iterator.index_with(vocab)
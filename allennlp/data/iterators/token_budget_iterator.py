@@ -0,0 +1,200 @@
+import itertools
+import logging
+import math
+import random
+from typing import Dict, Iterable, List, Tuple
+
+from overrides import overrides
+
+from allennlp.common.checks import ConfigurationError
+from allennlp.common.util import ensure_list, is_lazy
+from allennlp.data.dataset import Batch
+from allennlp.data.instance import Instance
+from allennlp.data.iterators.bucket_iterator import sort_by_padding
+from allennlp.data.iterators.data_iterator import DataIterator
+from allennlp.data.vocabulary import Vocabulary
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+@DataIterator.register("token_budget")
+class TokenBudgetIterator(DataIterator):
+    """
+    An iterator that, like the :class:`~allennlp.data.iterators.bucket_iterator.BucketIterator`,
+    sorts instances by their padding lengths, but that decides how many instances go in each batch
+    from a budget of padded tokens instead of using a fixed ``batch_size``.  Batches of short
+    instances are therefore large and batches of long instances are small, so that every batch
+    costs about the same amount of memory and computation.
+
+    The size of a batch is its number of instances times the sum, over the ``sorting_keys``, of
+    the largest padding length for that key in the batch; that is, the number of padded tokens in
+    all of the sorted fields (if one of the keys is, e.g., ``"num_token_characters"``, that
+    key contributes padded characters instead).  The sorted instances are packed greedily: each
+    instance is added to the current batch unless that would take the batch over
+    ``max_tokens_per_batch`` (or over ``batch_size`` instances, or over
+    ``maximum_padding_fraction`` padding), in which case it starts a new batch.  An instance that
+    is larger than the budget on its own gets a batch to itself.
+
+    Parameters
+    ----------
+    sorting_keys : ``List[Tuple[str, str]]``
+        The ``(field_name, padding_key)`` pairs to sort by and to measure batches with.  See
+        :class:`~allennlp.data.iterators.bucket_iterator.BucketIterator`.
+    max_tokens_per_batch : ``int``
+        The maximum number of padded tokens in a batch, measured as described above.
+    padding_noise : ``float``, optional (default=.1)
+        See :class:`~allennlp.data.iterators.bucket_iterator.BucketIterator`.
+    maximum_padding_fraction : ``float``, optional (default=None)
+        If given, an instance also starts a new batch if adding it would make more than this
+        fraction of the padded tokens in the batch padding.
+    batch_size : ``int``, optional (default=None)
+        If given, the maximum number of instances in a batch, regardless of the budget.  This is
+        also how many instances are read at a time from a lazy dataset when
+        ``max_instances_in_memory`` is not given; if neither is given we read
+        ``max_tokens_per_batch`` instances at a time.
+    instances_per_epoch : ``int``, optional, (default = None)
+        See :class:`BasicIterator`.
+    max_instances_in_memory : ``int``, optional, (default = None)
+        See :class:`BasicIterator`.  Instances are only sorted and packed within each group of
+        this many instances.
+    """
+    def __init__(self,
+                 sorting_keys: List[Tuple[str, str]],
+                 max_tokens_per_batch: int,
+                 padding_noise: float = 0.1,
+                 maximum_padding_fraction: float = None,
+                 batch_size: int = None,
+                 instances_per_epoch: int = None,
+                 max_instances_in_memory: int = None,
+                 cache_instances: bool = False,
+                 track_epoch: bool = False) -> None:
+        if not sorting_keys:
+            raise ConfigurationError("TokenBudgetIterator requires sorting_keys to be specified")
+        if max_tokens_per_batch < 1:
+            raise ConfigurationError("TokenBudgetIterator requires max_tokens_per_batch >= 1")
+
+        super().__init__(cache_instances=cache_instances,
+                         track_epoch=track_epoch,
+                         batch_size=batch_size or max_tokens_per_batch,
+                         instances_per_epoch=instances_per_epoch,
+                         max_instances_in_memory=max_instances_in_memory)
+        self._sorting_keys = sorting_keys
+        self._max_tokens_per_batch = max_tokens_per_batch
+        self._padding_noise = padding_noise
+        self._maximum_padding_fraction = maximum_padding_fraction
+        self._maximum_batch_size = batch_size
+
+        # How many instances we have put in how many batches so far, used to estimate the number
+        # of batches in an epoch when we can't just count them.
+        self._num_instances_batched = 0
+        self._num_batches_created = 0
+        # The number of batches in each in-memory dataset we have been asked about, keyed by
+        # ``id(instances)`` like the base iterator's cache.
+        self._num_batches_cache: Dict[int, int] = {}
+
+    def _instance_lengths(self, instance: Instance) -> List[int]:
+        padding_lengths = instance.get_padding_lengths()
+        return [padding_lengths[field_name][padding_key] for field_name, padding_key in self._sorting_keys]
+
+    def _pack(self, instances: List[Instance]) -> List[List[Instance]]:
+        """
+        Greedily packs the (sorted) ``instances`` into batches that fit in the budget.
+        """
+        batches: List[List[Instance]] = []
+        batch: List[Instance] = []
+        max_lengths: List[int] = []
+        num_tokens = 0
+        for instance in instances:
+            lengths = self._instance_lengths(instance)
+            new_max_lengths = [max(pair) for pair in zip(max_lengths, lengths)] if batch else lengths
+            new_num_tokens = num_tokens + sum(lengths)
+            num_padded_tokens = (len(batch) + 1) * sum(new_max_lengths)
+
+            too_big = num_padded_tokens > self._max_tokens_per_batch
+            if self._maximum_batch_size is not None and len(batch) + 1 > self._maximum_batch_size:
+                too_big = True
+            too_much_padding = (self._maximum_padding_fraction is not None and
+                                num_padded_tokens > 0 and
+                                1 - new_num_tokens / num_padded_tokens > self._maximum_padding_fraction)
+            if batch and (too_big or too_much_padding):
+                batches.append(batch)
+                batch = [instance]
+                max_lengths = lengths
+                num_tokens = sum(lengths)
+            else:
+                batch.append(instance)
+                max_lengths = new_max_lengths
+                num_tokens = new_num_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @overrides
+    def _create_batches(self, instances: Iterable[Instance], shuffle: bool) -> Iterable[Batch]:
+        for instance_list in self._memory_sized_lists(instances):
+            instance_list = sort_by_padding(instance_list,
+                                            self._sorting_keys,
+                                            self.vocab,
+                                            self._padding_noise)
+            batches = [Batch(batch_instances) for batch_instances in self._pack(instance_list)]
+            self._num_instances_batched += len(instance_list)
+            self._num_batches_created += len(batches)
+            if shuffle:
+                random.shuffle(batches)
+            else:
+                logger.warning("shuffle parameter is set to False,"
+                               " while bucket iterators by definition change the order of your data.")
+            yield from batches
+
+    def _count_batches(self, instance_list: List[Instance]) -> int:
+        """
+        Packs the ``instance_list`` without any padding noise, in groups of
+        ``max_instances_in_memory`` like ``_create_batches`` does, and returns how many batches
+        that makes.
+        """
+        group_size = self._max_instances_in_memory or max(len(instance_list), 1)
+        num_batches = 0
+        for start in range(0, len(instance_list), group_size):
+            sorted_instances = sort_by_padding(instance_list[start:start + group_size],
+                                               self._sorting_keys,
+                                               self.vocab)
+            num_batches += len(self._pack(sorted_instances))
+        return num_batches
+
+    @overrides
+    def get_num_batches(self, instances: Iterable[Instance]) -> int:
+        """
+        For an in-memory dataset that is used in full every epoch, we count the batches by packing
+        the instances without any padding noise, which gives the number of batches in an epoch
+        (give or take a few, when there is noise).  The count is computed once per dataset.
+
+        With ``instances_per_epoch`` we estimate from the average number of instances per batch
+        in the batches we have created so far.  Before the first batch is created, we take that
+        average from packing a sample of the instances instead: the first group of
+        ``max_instances_in_memory`` (or ``batch_size``) instances, or at most
+        ``instances_per_epoch`` of them.
+        """
+        if not is_lazy(instances) and self._instances_per_epoch is None:
+            key = id(instances)
+            if key not in self._num_batches_cache:
+                self._num_batches_cache[key] = self._count_batches(ensure_list(instances))
+            return self._num_batches_cache[key]
+        elif self._instances_per_epoch is not None:
+            if self._num_batches_created > 0:
+                num_instances, num_batches = self._num_instances_batched, self._num_batches_created
+            else:
+                sample_size = min(self._instances_per_epoch,
+                                  self._max_instances_in_memory or self._batch_size)
+                sample = list(itertools.islice(instances, sample_size))
+                if not sample:
+                    return super().get_num_batches(instances)
+                num_instances, num_batches = len(sample), self._count_batches(sample)
+            return math.ceil(self._instances_per_epoch * num_batches / num_instances)
+        else:
+            return super().get_num_batches(instances)
+
+    @overrides
+    def index_with(self, vocab: Vocabulary):
+        super().index_with(vocab)
+        # Padding lengths can depend on the vocabulary, so the counts have to be redone.
+        self._num_batches_cache.clear()
@@ -129,25 +129,51 @@ class JustSpacesWordSplitter(WordSplitter):
 def _remove_spaces(tokens: List[spacy.tokens.Token]) -> List[spacy.tokens.Token]:
     return [token for token in tokens if not token.is_space]
 
+def spacy_token_to_allennlp_token(token: spacy.tokens.Token) -> Token:
+    return Token(token.text,
+                 token.idx,
+                 token.lemma_,
+                 token.pos_,
+                 token.tag_,
+                 token.dep_,
+                 token.ent_type_)
+
 @WordSplitter.register('spacy')
 class SpacyWordSplitter(WordSplitter):
     """
     A ``WordSplitter`` that uses spaCy's tokenizer.  It's fast and reasonable - this is the
     recommended ``WordSplitter``.
+
+    By default we return spacy's own tokens.  Set ``keep_spacy_tokens`` to ``False`` to convert
+    them into our own :class:`~allennlp.data.tokenizers.Token` objects instead, which costs a
+    little time per token, but uses less memory than keeping the spacy ``Doc`` of every sentence
+    alive.  (Either way, ``TextFields`` can be pickled, so instances can be sent between processes
+    or cached on disk; spacy tokens are converted when they are pickled.)
     """
     def __init__(self,
                  language: str = 'en_core_web_sm',
                  pos_tags: bool = False,
                  parse: bool = False,
-                 ner: bool = False) -> None:
+                 ner: bool = False,
+                 keep_spacy_tokens: bool = True) -> None:
         self.spacy = get_spacy_model(language, pos_tags, parse, ner)
+        self._keep_spacy_tokens = keep_spacy_tokens
+
+    def _sanitize(self, tokens: List[spacy.tokens.Token]) -> List[Token]:
+        """
+        Converts spacy tokens to allennlp tokens.  Is a no-op if ``keep_spacy_tokens`` is ``True``.
+        """
+        if self._keep_spacy_tokens:
+            return tokens
+        else:
+            return [spacy_token_to_allennlp_token(token) for token in tokens]
 
     @overrides
     def batch_split_words(self, sentences: List[str]) -> List[List[Token]]:
-        return [_remove_spaces(tokens)
+        return [self._sanitize(_remove_spaces(tokens))
                 for tokens in self.spacy.pipe(sentences, n_threads=-1)]
 
     @overrides
     def split_words(self, sentence: str) -> List[Token]:
         # This works because our Token class matches spacy's.
-        return _remove_spaces(self.spacy(sentence))
+        return self._sanitize(_remove_spaces(self.spacy(sentence)))
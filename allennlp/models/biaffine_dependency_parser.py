@@ -1,6 +1,9 @@
 from typing import Dict, Optional, Tuple
+import atexit
 import logging
 import copy
+import os
+from multiprocessing.pool import Pool
 
 from overrides import overrides
 import torch
@@ -17,13 +20,38 @@ from allennlp.models.model import Model
 from allennlp.nn import InitializerApplicator, RegularizerApplicator, Activation
 from allennlp.nn.util import get_text_field_mask, get_range_vector
 from allennlp.nn.util import get_device_of, last_dim_log_softmax, get_lengths_from_binary_sequence_mask
-from allennlp.nn.decoding.chu_liu_edmonds import decode_mst
+from allennlp.nn.decoding.chu_liu_edmonds import batch_decode_mst
 from allennlp.training.metrics import AttachmentScores
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 POS_TO_IGNORE = {'``', "''", ':', ',', '.', 'PU', 'PUNCT', 'SYM'}
 
+# The pools that decode minimum spanning trees, keyed by the process that created them (a pool
+# inherited by a forked process doesn't work there) and by their number of workers.  They live
+# here rather than on the models, so that models can still be pickled and copied, and so that
+# making many models doesn't make many pools.
+_MST_POOLS: Dict[Tuple[int, int], Pool] = {}
+
+
+def _get_mst_pool(num_workers: int) -> Optional[Pool]:
+    if num_workers <= 0:
+        return None
+    key = (os.getpid(), num_workers)
+    if key not in _MST_POOLS:
+        _MST_POOLS[key] = Pool(num_workers)
+    return _MST_POOLS[key]
+
+
+@atexit.register
+def _close_mst_pools() -> None:
+    for (pid, _), pool in list(_MST_POOLS.items()):
+        if pid == os.getpid():
+            pool.terminate()
+            pool.join()
+    _MST_POOLS.clear()
+
+
 @Model.register("biaffine_parser")
 class BiaffineDependencyParser(Model):
     """
@@ -68,6 +96,10 @@ class BiaffineDependencyParser(Model):
         The variational dropout applied to the output of the encoder and MLP layers.
     input_dropout : ``float``, optional, (default = 0.0)
         The dropout applied to the embedded text input.
+    mst_decoding_workers : ``int``, optional, (default = 0)
+        If positive, the minimum spanning trees of the sentences in a batch are decoded in
+        parallel by a pool of this many processes, which is created the first time it's needed and
+        shared by all the parsers in this process that use the same number of workers.
     initializer : ``InitializerApplicator``, optional (default=``InitializerApplicator()``)
         Used to initialize the model parameters.
     regularizer : ``RegularizerApplicator``, optional (default=``None``)
@@ -85,6 +117,7 @@ class BiaffineDependencyParser(Model):
                  use_mst_decoding_for_validation: bool = True,
                  dropout: float = 0.0,
                  input_dropout: float = 0.0,
+                 mst_decoding_workers: int = 0,
                  initializer: InitializerApplicator = InitializerApplicator(),
                  regularizer: Optional[RegularizerApplicator] = None) -> None:
         super(BiaffineDependencyParser, self).__init__(vocab, regularizer)
@@ -119,6 +152,7 @@ class BiaffineDependencyParser(Model):
         self._pos_tag_embedding = pos_tag_embedding or None
         self._dropout = InputVariationalDropout(dropout)
         self._input_dropout = Dropout(input_dropout)
+        self._mst_decoding_workers = mst_decoding_workers
         self._head_sentinel = torch.nn.Parameter(torch.randn([1, 1, encoder.get_output_dim()]))
 
         representation_dim = text_field_embedder.get_output_dim()
@@ -490,14 +524,20 @@ class BiaffineDependencyParser(Model):
         # Shape (batch_size, num_head_tags, sequence_length, sequence_length)
         batch_energy = torch.exp(normalized_arc_logits.unsqueeze(1) + normalized_pairwise_head_logits)
 
-        heads = []
-        head_tags = []
-        for energy, length in zip(batch_energy.detach().cpu().numpy(), lengths):
-            head, head_tag = decode_mst(energy, length)
-            heads.append(head)
-            head_tags.append(head_tag)
-        return torch.from_numpy(numpy.stack(heads)), torch.from_numpy(numpy.stack(head_tags))
-
+        # The best label for each arc doesn't depend on the tree, so we pick it before copying the
+        # energies to the CPU, which then only needs (batch_size, sequence_length, sequence_length).
+        energy, label_ids = batch_energy.max(dim=1)
+        heads, _ = batch_decode_mst(energy.detach().cpu().numpy(),
+                                    lengths,
+                                    has_labels=False,
+                                    pool=_get_mst_pool(self._mst_decoding_workers))
+        heads = torch.from_numpy(heads)
+        # Shape (batch_size, sequence_length)
+        head_tags = label_ids.detach().cpu().gather(1, heads.long().unsqueeze(1)).squeeze(1)
+        # The symbolic head gets a tag of 0 and padding gets a tag of 1, as in ``decode_mst``.
+        head_tags[:, 0] = 0
+        head_tags.masked_fill_(mask.detach().cpu().long() == 0, 1)
+        return heads, head_tags.int()
 
     def _get_head_tags(self,
                        head_tag_representation: torch.Tensor,
@@ -15,7 +15,7 @@ from allennlp.nn import InitializerApplicator, RegularizerApplicator
 from allennlp.nn.util import get_text_field_mask, sequence_cross_entropy_with_logits
 from allennlp.nn.util import last_dim_softmax, get_lengths_from_binary_sequence_mask
 from allennlp.training.metrics import CategoricalAccuracy
-from allennlp.training.metrics import EvalbBracketingScorer, DEFAULT_EVALB_DIR
+from allennlp.training.metrics import BracketingScorer, DEFAULT_EVALB_DIR
 from allennlp.common.checks import ConfigurationError
 
 class SpanInformation(NamedTuple):
@@ -70,10 +70,11 @@ class SpanConstituencyParser(Model):
     regularizer : ``RegularizerApplicator``, optional (default=``None``)
         If provided, will be used to calculate the regularization penalty during training.
     evalb_directory_path : ``str``, optional (default=``DEFAULT_EVALB_DIR``)
-        The path to the directory containing the EVALB executable used to score
-        bracketed parses. By default, will use the EVALB included with allennlp,
-        which is located at allennlp/tools/EVALB . If ``None``, EVALB scoring
-        is not used.
+        The path to the directory containing the EVALB parameter file (``COLLINS.prm``) used to
+        score bracketed parses with the :class:`~allennlp.training.metrics.BracketingScorer`,
+        which gives the same scores as the EVALB executable without running it. By default,
+        will use the EVALB included with allennlp, which is located at allennlp/tools/EVALB .
+        If ``None``, EVALB scoring is not used.
     """
     def __init__(self,
                  vocab: Vocabulary,
@@ -120,7 +121,7 @@ class SpanConstituencyParser(Model):
         self.tag_accuracy = CategoricalAccuracy()
 
         if evalb_directory_path is not None:
-            self._evalb_score = EvalbBracketingScorer(evalb_directory_path)
+            self._evalb_score = BracketingScorer(evalb_directory_path)
         else:
             self._evalb_score = None
         initializer(self)
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 import numpy
 from overrides import overrides
@@ -64,6 +64,11 @@ class SimpleSeq2Seq(Model):
         using target side ground truth labels.  See the following paper for more information:
         Scheduled Sampling for Sequence Prediction with Recurrent Neural Networks. Bengio et al.,
         2015.
+    beam_size : int, optional (default = None)
+        If given, we decode with a beam search of this width when we're not training, instead of
+        greedily.  The ``predictions`` are then those of the most likely hypothesis, and the
+        output also contains the ``beam_predictions`` and ``beam_log_probabilities`` of all of
+        them.  We don't compute ``class_probabilities`` in this case.
     """
     def __init__(self,
                  vocab: Vocabulary,
@@ -73,7 +78,8 @@ class SimpleSeq2Seq(Model):
                  target_namespace: str = "tokens",
                  target_embedding_dim: int = None,
                  attention_function: SimilarityFunction = None,
-                 scheduled_sampling_ratio: float = 0.0) -> None:
+                 scheduled_sampling_ratio: float = 0.0,
+                 beam_size: int = None) -> None:
         super(SimpleSeq2Seq, self).__init__(vocab)
         self._source_embedder = source_embedder
         self._encoder = encoder
@@ -81,6 +87,7 @@ class SimpleSeq2Seq(Model):
         self._target_namespace = target_namespace
         self._attention_function = attention_function
         self._scheduled_sampling_ratio = scheduled_sampling_ratio
+        self._beam_size = beam_size
         # We need the start symbol to provide as the input at the first timestep of decoding, and
         # end symbol as a way to indicate the end of the decoded sequence.
         self._start_index = self.vocab.get_token_index(START_SYMBOL, self._target_namespace)
@@ -122,9 +129,29 @@ class SimpleSeq2Seq(Model):
         """
         # (batch_size, input_sequence_length, encoder_output_dim)
         embedded_input = self._source_embedder(source_tokens)
-        batch_size, _, _ = embedded_input.size()
         source_mask = get_text_field_mask(source_tokens)
         encoder_outputs = self._encoder(embedded_input, source_mask)
+        use_beam_search = not self.training and self._beam_size is not None
+        output_dict: Dict[str, torch.Tensor] = {}
+        if target_tokens or not use_beam_search:
+            output_dict.update(self._greedy_decode(encoder_outputs, source_mask, target_tokens,
+                                                   output_class_probabilities=not use_beam_search))
+        if use_beam_search:
+            output_dict.update(self._beam_search(encoder_outputs, source_mask))
+        return output_dict
+
+    def _greedy_decode(self,
+                       encoder_outputs: torch.Tensor,
+                       source_mask: torch.Tensor,
+                       target_tokens: Dict[str, torch.LongTensor] = None,
+                       output_class_probabilities: bool = True) -> Dict[str, torch.Tensor]:
+        """
+        Decodes one step at a time, feeding the decoder either the targets (when training with
+        teacher forcing) or its own most likely prediction from the previous step, and computes
+        the loss if ``target_tokens`` are given.  If ``output_class_probabilities`` is ``False`` we
+        don't keep the softmax over the target vocabulary for every step.
+        """
+        batch_size = encoder_outputs.size(0)
         final_encoder_output = encoder_outputs[:, -1]  # (batch_size, encoder_output_dim)
         if target_tokens:
             targets = target_tokens["tokens"]
@@ -158,20 +185,22 @@ class SimpleSeq2Seq(Model):
             output_projections = self._output_projection_layer(decoder_hidden)
             # list of (batch_size, 1, num_classes)
             step_logits.append(output_projections.unsqueeze(1))
-            class_probabilities = F.softmax(output_projections, dim=-1)
-            _, predicted_classes = torch.max(class_probabilities, 1)
-            step_probabilities.append(class_probabilities.unsqueeze(1))
+            # The softmax doesn't change which class is the most likely one.
+            _, predicted_classes = torch.max(output_projections, 1)
+            if output_class_probabilities:
+                class_probabilities = F.softmax(output_projections, dim=-1)
+                step_probabilities.append(class_probabilities.unsqueeze(1))
             last_predictions = predicted_classes
             # (batch_size, 1)
             step_predictions.append(last_predictions.unsqueeze(1))
         # step_logits is a list containing tensors of shape (batch_size, 1, num_classes)
         # This is (batch_size, num_decoding_steps, num_classes)
         logits = torch.cat(step_logits, 1)
-        class_probabilities = torch.cat(step_probabilities, 1)
         all_predictions = torch.cat(step_predictions, 1)
         output_dict = {"logits": logits,
-                       "class_probabilities": class_probabilities,
                        "predictions": all_predictions}
+        if output_class_probabilities:
+            output_dict["class_probabilities"] = torch.cat(step_probabilities, 1)
         if target_tokens:
             target_mask = get_text_field_mask(target_tokens)
             loss = self._get_loss(logits, targets, target_mask)
@@ -179,6 +208,135 @@ class SimpleSeq2Seq(Model):
             # TODO: Define metrics
         return output_dict
 
+    def _beam_search(self,
+                     encoder_outputs: torch.Tensor,
+                     source_mask: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """
+        Finds the ``beam_size`` most likely target sequences for each instance with a beam search
+        that runs for all of the instances at once.  The beams are flattened into the batch
+        dimension, so that each step of the decoder is a single call on a (batch_size * beam_size)
+        batch of hypotheses.  A hypothesis that has produced the end symbol keeps its score and
+        only produces more end symbols, and once every hypothesis for an instance has ended we
+        stop decoding for that instance, so later steps only run the decoder on the instances
+        that are still going.
+
+        Returns
+        -------
+        A dictionary with the ``"predictions"`` of the best hypothesis for each instance, with
+        shape (batch_size, num_decoding_steps), the ``"beam_predictions"`` of all hypotheses, with
+        shape (batch_size, beam_size, num_decoding_steps), and their
+        ``"beam_log_probabilities"``, with shape (batch_size, beam_size), sorted from the most to
+        the least likely.  ``num_decoding_steps`` is at most ``max_decoding_steps``.
+        """
+        # pylint: disable=too-many-locals
+        beam_size = self._beam_size
+        batch_size, input_sequence_length, encoder_output_dim = encoder_outputs.size()
+        num_classes = self._output_projection_layer.out_features
+
+        # The decoder state is per hypothesis, with shape (num_active * beam_size, ...), where the
+        # hypotheses for the ``i``-th instance that is still being decoded are in rows
+        # ``i * beam_size`` to ``(i + 1) * beam_size - 1``.  ``active`` holds the index in the batch
+        # of each of these instances.
+        flat_shape = (batch_size * beam_size, input_sequence_length)
+        encoder_outputs = encoder_outputs.detach().unsqueeze(1).expand(batch_size, beam_size,
+                                                                       input_sequence_length,
+                                                                       encoder_output_dim)
+        encoder_outputs = encoder_outputs.contiguous().view(*flat_shape, encoder_output_dim)
+        source_mask = source_mask.unsqueeze(1).expand(batch_size, beam_size,
+                                                      input_sequence_length).contiguous().view(*flat_shape)
+        decoder_hidden = encoder_outputs[:, -1]
+        decoder_context = encoder_outputs.new_zeros(batch_size * beam_size, self._decoder_output_dim)
+        last_predictions = source_mask.new_full((batch_size * beam_size,), fill_value=self._start_index).long()
+        active = torch.arange(batch_size, dtype=torch.long, device=last_predictions.device)
+        beam_offsets = torch.arange(beam_size, dtype=torch.long, device=last_predictions.device)
+
+        # All of the hypotheses start out the same, so we only let the first one be extended at
+        # the first step, or we'd end up with ``beam_size`` copies of each prediction.
+        # (num_active, beam_size)
+        log_probabilities = encoder_outputs.new_full((batch_size, beam_size), fill_value=-numpy.inf)
+        log_probabilities[:, 0] = 0.0
+        finished = source_mask.new_zeros((batch_size, beam_size)).byte()
+        # (batch_size, beam_size)
+        final_log_probabilities = log_probabilities.clone()
+
+        # A finished hypothesis can only be followed by the end symbol, at no cost.
+        # (num_classes,)
+        end_only_log_probabilities = encoder_outputs.new_full((num_classes,), fill_value=-numpy.inf)
+        end_only_log_probabilities[self._end_index] = 0.0
+
+        # The prediction made by each hypothesis of each instance at every step, and the
+        # hypothesis from the previous step that it extends.  Instances that have finished just
+        # keep their hypotheses as they are.
+        step_predictions: List[torch.Tensor] = []
+        step_backpointers: List[torch.Tensor] = []
+        with torch.no_grad():
+            for _ in range(self._max_decoding_steps):
+                still_going = finished.long().sum(1) < beam_size
+                if not still_going.all():
+                    # Drop the instances that are done, so that we stop running the decoder on them.
+                    keep = still_going.nonzero().view(-1)
+                    if keep.size(0) == 0:
+                        break
+                    rows = (keep.unsqueeze(1) * beam_size + beam_offsets.unsqueeze(0)).view(-1)
+                    active = active[keep]
+                    encoder_outputs = encoder_outputs[rows]
+                    source_mask = source_mask[rows]
+                    decoder_hidden = decoder_hidden[rows]
+                    decoder_context = decoder_context[rows]
+                    last_predictions = last_predictions[rows]
+                    log_probabilities = log_probabilities[keep]
+                    finished = finished[keep]
+                num_active = active.size(0)
+
+                decoder_input = self._prepare_decode_step_input(last_predictions, decoder_hidden,
+                                                                encoder_outputs, source_mask)
+                decoder_hidden, decoder_context = self._decoder_cell(decoder_input,
+                                                                     (decoder_hidden, decoder_context))
+                # (num_active, beam_size, num_classes)
+                class_log_probabilities = F.log_softmax(self._output_projection_layer(decoder_hidden), dim=-1)
+                class_log_probabilities = class_log_probabilities.view(num_active, beam_size, num_classes)
+                class_log_probabilities = torch.where(finished.unsqueeze(2).expand_as(class_log_probabilities),
+                                                      end_only_log_probabilities.expand_as(
+                                                              class_log_probabilities),
+                                                      class_log_probabilities)
+
+                # (num_active, beam_size * num_classes)
+                candidate_log_probabilities = (log_probabilities.unsqueeze(2) +
+                                               class_log_probabilities).view(num_active, -1)
+                # (num_active, beam_size)
+                log_probabilities, candidates = candidate_log_probabilities.topk(beam_size, dim=1)
+                backpointers = candidates / num_classes
+                predictions = candidates - backpointers * num_classes
+
+                # Move the state of each hypothesis that was extended into the row of its extension.
+                instance_offsets = torch.arange(num_active, dtype=torch.long, device=backpointers.device)
+                source_rows = (instance_offsets.unsqueeze(1) * beam_size + backpointers).view(-1)
+                decoder_hidden = decoder_hidden[source_rows]
+                decoder_context = decoder_context[source_rows]
+                last_predictions = predictions.view(-1)
+                finished = finished.gather(1, backpointers) | (predictions == self._end_index)
+                final_log_probabilities[active] = log_probabilities
+
+                all_predictions = last_predictions.new_full((batch_size, beam_size), fill_value=self._end_index)
+                all_backpointers = beam_offsets.unsqueeze(0).repeat(batch_size, 1)
+                all_predictions[active] = predictions
+                all_backpointers[active] = backpointers
+                step_predictions.append(all_predictions)
+                step_backpointers.append(all_backpointers)
+
+        # Follow the backpointers from the last step to recover each hypothesis.
+        # (batch_size, beam_size)
+        current_beams = beam_offsets.unsqueeze(0).repeat(batch_size, 1)
+        reversed_predictions = []
+        for predictions, backpointers in zip(reversed(step_predictions), reversed(step_backpointers)):
+            reversed_predictions.append(predictions.gather(1, current_beams))
+            current_beams = backpointers.gather(1, current_beams)
+        # (batch_size, beam_size, num_decoding_steps)
+        beam_predictions = torch.stack(list(reversed(reversed_predictions)), 2)
+        return {"predictions": beam_predictions[:, 0],
+                "beam_predictions": beam_predictions,
+                "beam_log_probabilities": final_log_probabilities}
+
     def _prepare_decode_step_input(self,
                                    input_indices: torch.LongTensor,
                                    decoder_hidden_state: torch.LongTensor = None,
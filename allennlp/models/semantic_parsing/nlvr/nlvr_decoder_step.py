@@ -1,5 +1,4 @@
-from typing import List, Dict, Tuple, Set
-from collections import defaultdict
+from typing import List, Tuple, Set
 
 from overrides import overrides
 
@@ -11,7 +10,8 @@ from torch.nn.modules.linear import Linear
 from allennlp.common import util as common_util
 from allennlp.models.semantic_parsing.nlvr.nlvr_decoder_state import NlvrDecoderState
 from allennlp.modules import Attention
-from allennlp.nn.decoding import DecoderStep, RnnState, ChecklistState
+from allennlp.nn.decoding import DecoderStep, RnnState
+from allennlp.nn.decoding import util as decoding_util
 from allennlp.nn import util as nn_util
 
 
@@ -149,18 +149,9 @@ class NlvrDecoderStep(DecoderStep[NlvrDecoderState]):
 
         action_mask = embedded_action_mask.float()
         if state.checklist_state[0] is not None:
-            # We will compute the logprobs and the checklists of potential next states together for
-            # efficiency.
-            logprobs, new_checklist_states = self._get_next_state_info_with_agenda(state,
-                                                                                   considered_actions,
-                                                                                   action_logits,
-                                                                                   action_mask)
+            logprobs = self._get_next_state_info_with_agenda(state, action_logits, action_mask)
         else:
-            logprobs = self._get_next_state_info_without_agenda(state,
-                                                                considered_actions,
-                                                                action_logits,
-                                                                action_mask)
-            new_checklist_states = None
+            logprobs = self._get_next_state_info_without_agenda(state, action_logits, action_mask)
         return self._compute_new_states(state,
                                         logprobs,
                                         hidden_state,
@@ -169,7 +160,6 @@ class NlvrDecoderStep(DecoderStep[NlvrDecoderState]):
                                         attended_sentence,
                                         considered_actions,
                                         allowed_actions,
-                                        new_checklist_states,
                                         max_actions)
 
     @staticmethod
@@ -198,8 +188,8 @@ class NlvrDecoderStep(DecoderStep[NlvrDecoderState]):
         # computation, to global indices here.
         for batch_index, checklist_state in zip(state.batch_indices, state.checklist_state):
             global_terminal_indices.append([])
-            for terminal_index in checklist_state.terminal_actions.detach().cpu():
-                global_terminal_index = state.action_indices[(batch_index, int(terminal_index[0]))]
+            for terminal_index in checklist_state.terminal_action_list:
+                global_terminal_index = state.action_indices[(batch_index, terminal_index)]
                 global_terminal_indices[-1].append(global_terminal_index)
         # We don't need to pad this tensor because the terminal indices from all groups will be the
         # same size.
@@ -216,71 +206,31 @@ class NlvrDecoderStep(DecoderStep[NlvrDecoderState]):
         return checklist_balance_embeddings.sum(1)
 
     @staticmethod
-    def _get_next_state_info_with_agenda(
-            state: NlvrDecoderState,
-            considered_actions: List[List[int]],
-            action_logits: torch.Tensor,
-            action_mask: torch.Tensor) -> Tuple[List[List[Tuple[int, torch.LongTensor]]],
-                                                List[List[ChecklistState]]]:
+    def _get_next_state_info_with_agenda(state: NlvrDecoderState,
+                                         action_logits: torch.Tensor,
+                                         action_mask: torch.Tensor) -> torch.Tensor:
         """
-        We return a list of log probabilities and checklist states corresponding to next actions that are
-        not padding. This method is applicable to the case where we do not have target action
-        sequences and are relying on agendas for training.
+        We return the log probabilities of the next states for each considered action, with shape
+        ``(group_size, num_actions)``.  This method is applicable to the case where we do not have
+        target action sequences and are relying on agendas for training.  The checklists of the
+        next states are only computed for the states we keep, in ``_compute_new_states``.
         """
         considered_action_probs = nn_util.masked_softmax(action_logits, action_mask)
         # Mixing model scores and agenda selection probabilities to compute the probabilities of all
-        # actions for the next step and the corresponding new checklists.
-        # All action logprobs will keep track of logprob corresponding to each local action index
-        # for each instance.
-        all_action_logprobs: List[List[Tuple[int, torch.LongTensor]]] = []
-        all_new_checklist_states: List[List[ChecklistState]] = []
-        for group_index, instance_info in enumerate(zip(state.score,
-                                                        considered_action_probs,
-                                                        state.checklist_state)):
-            (instance_score, instance_probs, instance_checklist_state) = instance_info
-            # We will mix the model scores with agenda selection probabilities and compute their
-            # logs to fill the following list with action indices and corresponding logprobs.
-            instance_action_logprobs: List[Tuple[int, torch.Tensor]] = []
-            instance_new_checklist_states: List[ChecklistState] = []
-            for action_index, action_prob in enumerate(instance_probs):
-                # This is the actual index of the action from the original list of actions.
-                action = considered_actions[group_index][action_index]
-                if action == -1:
-                    # Ignoring padding.
-                    continue
-                new_checklist_state = instance_checklist_state.update(action)  # (terminal_actions, 1)
-                instance_new_checklist_states.append(new_checklist_state)
-                logprob = instance_score + torch.log(action_prob + 1e-13)
-                instance_action_logprobs.append((action_index, logprob))
-            all_action_logprobs.append(instance_action_logprobs)
-            all_new_checklist_states.append(instance_new_checklist_states)
-        return all_action_logprobs, all_new_checklist_states
+        # actions for the next step.
+        return torch.stack(state.score).view(-1, 1) + torch.log(considered_action_probs + 1e-13)
 
     @staticmethod
     def _get_next_state_info_without_agenda(state: NlvrDecoderState,
-                                            considered_actions: List[List[int]],
                                             action_logits: torch.Tensor,
-                                            action_mask: torch.Tensor) -> List[List[Tuple[int,
-                                                                                          torch.LongTensor]]]:
+                                            action_mask: torch.Tensor) -> torch.Tensor:
         """
-        We return a list of log probabilities corresponding to actions that are not padding. This
-        method is related to the training scenario where we have target action sequences for
-        training.
+        We return the log probabilities of the next states for each considered action, with shape
+        ``(group_size, num_actions)``. This method is related to the training scenario where we have
+        target action sequences for training.
         """
         considered_action_logprobs = nn_util.masked_log_softmax(action_logits, action_mask)
-        all_action_logprobs: List[List[Tuple[int, torch.LongTensor]]] = []
-        for group_index, (score, considered_logprobs) in enumerate(zip(state.score,
-                                                                       considered_action_logprobs)):
-            instance_action_logprobs: List[Tuple[int, torch.Tensor]] = []
-            for action_index, logprob in enumerate(considered_logprobs):
-                # This is the actual index of the action from the original list of actions.
-                action = considered_actions[group_index][action_index]
-                if action == -1:
-                    # Ignoring padding.
-                    continue
-                instance_action_logprobs.append((action_index, score + logprob))
-            all_action_logprobs.append(instance_action_logprobs)
-        return all_action_logprobs
+        return torch.stack(state.score).view(-1, 1) + considered_action_logprobs
 
     def attend_on_sentence(self,
                            query: torch.Tensor,
@@ -354,54 +304,40 @@ class NlvrDecoderStep(DecoderStep[NlvrDecoderState]):
     @classmethod
     def _compute_new_states(cls,
                             state: NlvrDecoderState,
-                            action_logprobs: List[List[Tuple[int, torch.Tensor]]],
+                            action_logprobs: torch.Tensor,
                             hidden_state: torch.Tensor,
                             memory_cell: torch.Tensor,
                             action_embeddings: torch.Tensor,
                             attended_sentence: torch.Tensor,
                             considered_actions: List[List[int]],
                             allowed_actions: List[Set[int]] = None,
-                            new_checklist_states: List[List[ChecklistState]] = None,
                             max_actions: int = None) -> List[NlvrDecoderState]:
         """
         This method is very similar to ``WikiTabledDecoderStep._compute_new_states``.
-        The difference here is that we also keep track of checklists if they are passed to this
-        method.
+        The difference here is that we also keep track of checklists if the state has them.
         """
-        # batch_index -> group_index, action_index, checklist, score
-        states_info: Dict[int, List[Tuple[int, int, torch.Tensor, torch.Tensor]]] = defaultdict(list)
-        if new_checklist_states is None:
-            # We do not have checklist states. Making a list of lists of Nones of the appropriate size for
-            # the zips below.
-            new_checklist_states = [[None for logprob in instance_logprobs]
-                                    for instance_logprobs in action_logprobs]
-        for group_index, instance_info in enumerate(zip(state.batch_indices,
-                                                        action_logprobs,
-                                                        new_checklist_states)):
-            batch_index, instance_logprobs, instance_new_checklist_states = instance_info
-            for (action_index, score), checklist_state in zip(instance_logprobs,
-                                                              instance_new_checklist_states):
-                states_info[batch_index].append((group_index, action_index, checklist_state, score))
-
+        # We rank the next states of each batch instance (across group index) by score on the device,
+        # and only bring back the indices of the best ones, because we need to know which actions
+        # they take to update their grammar states.
+        valid_actions = [[action != -1 and (allowed_actions is None or action in allowed_actions[group_index])
+                          for action in group_actions]
+                         for group_index, group_actions in enumerate(considered_actions)]
+        best_actions = decoding_util.top_actions_per_instance(action_logprobs,
+                                                              state.batch_indices,
+                                                              valid_actions,
+                                                              max_actions)
         new_states = []
-        for batch_index, instance_states_info in states_info.items():
-            batch_scores = torch.cat([info[-1] for info in instance_states_info])
-            _, sorted_indices = batch_scores.sort(-1, descending=True)
-            sorted_states_info = [instance_states_info[i] for i in sorted_indices.detach().cpu().numpy()]
-            allowed_states_info = []
-            for i, (group_index, action_index, _, _) in enumerate(sorted_states_info):
-                action = considered_actions[group_index][action_index]
-                if allowed_actions is not None and action not in allowed_actions[group_index]:
-                    continue
-                allowed_states_info.append(sorted_states_info[i])
-            sorted_states_info = allowed_states_info
-            if max_actions is not None:
-                sorted_states_info = sorted_states_info[:max_actions]
-            for group_index, action_index, new_checklist_state, new_score in sorted_states_info:
-                # This is the actual index of the action from the original list of actions.
-                # We do not have to check whether it is the padding index because ``take_step``
-                # already took care of that.
+        for batch_index, instance_actions in best_actions.items():
+            for group_index, action_index in instance_actions:
+                # The scores of NLVR states have shape (1,).
+                new_score = action_logprobs[group_index, action_index].view(1)
+                # This is the actual index of the action from the original list of actions.  It is
+                # not the padding index, because padding actions are not valid.
                 action = considered_actions[group_index][action_index]
+                if state.checklist_state[group_index] is not None:
+                    new_checklist_state = state.checklist_state[group_index].update(action)
+                else:
+                    new_checklist_state = None
                 action_embedding = action_embeddings[group_index, action_index, :]
                 new_action_history = state.action_history[group_index] + [action]
                 production_rule = state.possible_actions[batch_index][action][0]
@@ -1,5 +1,4 @@
-from collections import defaultdict
-from typing import Dict, List, Set, Tuple
+from typing import List, Set, Tuple
 
 from overrides import overrides
 
@@ -15,6 +14,7 @@ from allennlp.modules import Attention, FeedForward
 from allennlp.modules.token_embedders import Embedding
 from allennlp.nn import util
 from allennlp.nn.decoding import DecoderStep, RnnState
+from allennlp.nn.decoding import util as decoding_util
 
 
 class WikiTablesDecoderStep(DecoderStep[WikiTablesDecoderState]):
@@ -320,9 +320,7 @@ class WikiTablesDecoderStep(DecoderStep[WikiTablesDecoderState]):
         # (group_size, num_start_type)
         start_action_logits = self._start_type_predictor(hidden_state)
         log_probs = util.masked_log_softmax(start_action_logits, None)
-        sorted_log_probs, sorted_actions = log_probs.sort(dim=-1, descending=True)
 
-        sorted_actions = sorted_actions.detach().cpu().numpy().tolist()
         if state.debug_info is not None:
             probs_cpu = log_probs.exp().detach().cpu().numpy().tolist()
 
@@ -334,29 +332,25 @@ class WikiTablesDecoderStep(DecoderStep[WikiTablesDecoderState]):
             raise RuntimeError("Calculated wrong number of initial actions.  Expected "
                                f"{self._num_start_types}, found {len(considered_actions[0])}.")
 
-        best_next_states: Dict[int, List[Tuple[int, int, int]]] = defaultdict(list)
-        for group_index, (batch_index, group_actions) in enumerate(zip(state.batch_indices, sorted_actions)):
-            for action_index, action in enumerate(group_actions):
-                # `action` is currently the index in `log_probs`, not the actual action ID.  To get
-                # the action ID, we need to go through `considered_actions`.
-                action = considered_actions[group_index][action]
-                if allowed_actions is not None and action not in allowed_actions[group_index]:
-                    # This happens when our _decoder trainer_ wants us to only evaluate certain
-                    # actions, likely because they are the gold actions in this state.  We just skip
-                    # emitting any state that isn't allowed by the trainer, because constructing the
-                    # new state can be expensive.
-                    continue
-                best_next_states[batch_index].append((group_index, action_index, action))
+        # When our _decoder trainer_ wants us to only evaluate certain actions, likely because they
+        # are the gold actions in this state, we don't emit any state that isn't allowed by the
+        # trainer, because constructing the new state can be expensive.
+        valid_actions = [[allowed_actions is None or action in allowed_actions[group_index]
+                          for action in group_actions]
+                         for group_index, group_actions in enumerate(considered_actions)]
+        best_actions = decoding_util.top_actions_per_instance(log_probs, state.batch_indices, valid_actions)
 
         new_states = []
-        for batch_index, best_states in sorted(best_next_states.items()):
-            for group_index, action_index, action in best_states:
+        for batch_index, instance_actions in best_actions.items():
+            for group_index, action_index in instance_actions:
                 # We'll yield a bunch of states here that all have a `group_size` of 1, so that the
                 # learning algorithm can decide how many of these it wants to keep, and it can just
-                # regroup them later, as that's a really easy operation.
-                batch_index = state.batch_indices[group_index]
+                # regroup them later, as that's a really easy operation.  `action_index` is the
+                # index in `log_probs`, not the actual action ID.  To get the action ID, we need to
+                # go through `considered_actions`.
+                action = considered_actions[group_index][action_index]
                 new_action_history = state.action_history[group_index] + [action]
-                new_score = state.score[group_index] + sorted_log_probs[group_index, action_index]
+                new_score = state.score[group_index] + log_probs[group_index, action_index]
 
                 production_rule = state.possible_actions[batch_index][action][0]
                 new_grammar_state = state.grammar_state[group_index].take_action(production_rule)
@@ -690,54 +684,32 @@ class WikiTablesDecoderStep(DecoderStep[WikiTablesDecoderState]):
         memory_cell = [x.squeeze(0) for x in memory_cell.split(1, 0)]
         attended_question = [x.squeeze(0) for x in attended_question.split(1, 0)]
 
-        sorted_log_probs, sorted_actions = log_probs.sort(dim=-1, descending=True)
-        if max_actions is not None:
-            # We might need a version of `sorted_log_probs` on the CPU later, but only if we need
-            # to truncate the best states to `max_actions`.
-            sorted_log_probs_cpu = sorted_log_probs.detach().cpu().numpy()
         if state.debug_info is not None:
             probs_cpu = log_probs.exp().detach().cpu().numpy().tolist()
-        sorted_actions = sorted_actions.detach().cpu().numpy().tolist()
-        best_next_states: Dict[int, List[Tuple[int, int, int]]] = defaultdict(list)
-        for group_index, (batch_index, group_actions) in enumerate(zip(state.batch_indices,
-                                                                       sorted_actions)):
-            for action_index, action in enumerate(group_actions):
-                # `action` is currently the index in `log_probs`, not the actual action ID.  To get
-                # the action ID, we need to go through `considered_actions`.
-                action = considered_actions[group_index][action]
-                if action == -1:
-                    # This was padding.
-                    continue
-                if allowed_actions is not None and action not in allowed_actions[group_index]:
-                    # This happens when our _decoder trainer_ wants us to only evaluate certain
-                    # actions, likely because they are the gold actions in this state.  We just skip
-                    # emitting any state that isn't allowed by the trainer, because constructing the
-                    # new state can be expensive.
-                    continue
-                best_next_states[batch_index].append((group_index, action_index, action))
+        # We rank the next states of each _batch_ instance (across group index) by score on the
+        # device, and only bring back the indices of the best ones, because we need to know which
+        # actions they take to update their grammar states.  Padding actions, and actions that our
+        # _decoder trainer_ doesn't allow (likely because they aren't gold actions in this state),
+        # are skipped, because constructing the new state can be expensive.
+        valid_actions = [[action != -1 and (allowed_actions is None or action in allowed_actions[group_index])
+                          for action in group_actions]
+                         for group_index, group_actions in enumerate(considered_actions)]
+        best_actions = decoding_util.top_actions_per_instance(log_probs,
+                                                              state.batch_indices,
+                                                              valid_actions,
+                                                              max_actions)
         new_states = []
-        for batch_index, best_states in sorted(best_next_states.items()):
-            if max_actions is not None:
-                # We sorted previously by _group_index_, but we then combined by _batch_index_.  We
-                # need to get the top next states for each _batch_ instance, so we sort all of the
-                # instance's states again (across group index) by score.  We don't need to do this
-                # if `max_actions` is None, because we'll be keeping all of the next states,
-                # anyway.
-                best_states.sort(key=lambda x: sorted_log_probs_cpu[x[:2]], reverse=True)
-                best_states = best_states[:max_actions]
-            for group_index, action_index, action in best_states:
+        for batch_index, instance_actions in best_actions.items():
+            for group_index, action_index in instance_actions:
                 # We'll yield a bunch of states here that all have a `group_size` of 1, so that the
                 # learning algorithm can decide how many of these it wants to keep, and it can just
-                # regroup them later, as that's a really easy operation.
-                batch_index = state.batch_indices[group_index]
+                # regroup them later, as that's a really easy operation.  `action_index` is the
+                # index in `log_probs`, not the actual action ID.  To get the action ID, we need to
+                # go through `considered_actions`.
+                action = considered_actions[group_index][action_index]
                 new_action_history = state.action_history[group_index] + [action]
-                new_score = sorted_log_probs[group_index, action_index]
-
-                # `action_index` is the index in the _sorted_ tensors, but the action embedding
-                # matrix is _not_ sorted, so we need to get back the original, non-sorted action
-                # index before we get the action embedding.
-                action_embedding_index = sorted_actions[group_index][action_index]
-                action_embedding = action_embeddings[group_index, action_embedding_index, :]
+                new_score = log_probs[group_index, action_index]
+                action_embedding = action_embeddings[group_index, action_index, :]
                 production_rule = state.possible_actions[batch_index][action][0]
                 new_grammar_state = state.grammar_state[group_index].take_action(production_rule)
                 if state.checklist_state[0] is not None:
@@ -12,7 +12,7 @@ from allennlp.modules.token_embedders import Embedding
 from allennlp.models.model import Model
 from allennlp.nn import InitializerApplicator, RegularizerApplicator
 from allennlp.nn.util import get_text_field_mask, sequence_cross_entropy_with_logits
-from allennlp.nn.util import get_lengths_from_binary_sequence_mask, viterbi_decode
+from allennlp.nn.util import batched_viterbi_decode
 from allennlp.training.metrics import SpanBasedF1Measure
 
 
@@ -162,17 +162,16 @@ class SemanticRoleLabeler(Model):
         constraint simply specifies that the output tags must be a valid BIO sequence.  We add a
         ``"tags"`` key to the dictionary with the result.
         """
-        all_predictions = output_dict['class_probabilities']
-        sequence_lengths = get_lengths_from_binary_sequence_mask(output_dict["mask"]).data.tolist()
+        all_predictions = output_dict['class_probabilities'].detach().cpu()
+        mask = output_dict["mask"].detach().cpu()
 
-        if all_predictions.dim() == 3:
-            predictions_list = [all_predictions[i].detach().cpu() for i in range(all_predictions.size(0))]
-        else:
-            predictions_list = [all_predictions]
-        all_tags = []
+        if all_predictions.dim() == 2:
+            all_predictions = all_predictions.unsqueeze(0)
+            mask = mask.view(1, -1)
         transition_matrix = self.get_viterbi_pairwise_potentials()
-        for predictions, length in zip(predictions_list, sequence_lengths):
-            max_likelihood_sequence, _ = viterbi_decode(predictions[:length], transition_matrix)
+        max_likelihood_sequences, _ = batched_viterbi_decode(all_predictions, transition_matrix, mask)
+        all_tags = []
+        for max_likelihood_sequence in max_likelihood_sequences:
             tags = [self.vocab.get_token_from_index(x, namespace="labels")
                     for x in max_likelihood_sequence]
             all_tags.append(tags)
@@ -285,7 +285,7 @@ class ConditionalRandomField(torch.nn.Module):
         Uses viterbi algorithm to find most likely tags for the given inputs.
         If constraints are applied, disallows all other transitions.
         """
-        _, max_seq_length, num_tags = logits.size()
+        batch_size, max_seq_length, num_tags = logits.size()
 
         # Get the tensors out of the variables
         logits, mask = logits.data, mask.data
@@ -293,7 +293,7 @@ class ConditionalRandomField(torch.nn.Module):
         # Augment transitions matrix with start and end transitions
         start_tag = num_tags
         end_tag = num_tags + 1
-        transitions = torch.Tensor(num_tags + 2, num_tags + 2).fill_(-10000.)
+        transitions = logits.new_full((num_tags + 2, num_tags + 2), -10000.)
 
         # Apply transition constraints
         constrained_transitions = (
@@ -316,26 +316,27 @@ class ConditionalRandomField(torch.nn.Module):
                                                  (1 - self._constraint_mask[start_tag, :num_tags].detach()))
             transitions[:num_tags, end_tag] = -10000.0 * (1 - self._constraint_mask[:num_tags, end_tag].detach())
 
-        best_paths = []
-        # Pad the max sequence length by 2 to account for start_tag + end_tag.
-        tag_sequence = torch.Tensor(max_seq_length + 2, num_tags + 2)
-
-        for prediction, prediction_mask in zip(logits, mask):
-            sequence_length = torch.sum(prediction_mask)
-
-            # Start with everything totally unlikely
-            tag_sequence.fill_(-10000.)
-            # At timestep 0 we must have the START_TAG
-            tag_sequence[0, start_tag] = 0.
-            # At steps 1, ..., sequence_length we just use the incoming prediction
-            tag_sequence[1:(sequence_length + 1), :num_tags] = prediction[:sequence_length]
-            # And at the last timestep we must have the END_TAG
-            tag_sequence[sequence_length + 1, end_tag] = 0.
-
-            # We pass the tags and the transitions to ``viterbi_decode``.
-            viterbi_path, viterbi_score = util.viterbi_decode(tag_sequence[:(sequence_length + 2)], transitions)
-            # Get rid of START and END sentinels and append.
-            viterbi_path = viterbi_path[1:-1]
-            best_paths.append((viterbi_path, viterbi_score.item()))
-
-        return best_paths
+        sequence_lengths = mask.long().sum(-1)
+
+        # Pad the max sequence length by 2 to account for start_tag + end_tag, and start with
+        # everything totally unlikely.
+        tag_sequences = logits.new_full((batch_size, max_seq_length + 2, num_tags + 2), -10000.)
+        # At timestep 0 we must have the START_TAG
+        tag_sequences[:, 0, start_tag] = 0.
+        # At steps 1, ..., sequence_length we just use the incoming prediction
+        tag_sequences[:, 1:(max_seq_length + 1), :num_tags] = logits
+        # And at the last timestep we must have the END_TAG.  This overwrites the first padding
+        # timestep of each sequence, and the timesteps after it are masked out below.
+        end_scores = logits.new_full((num_tags + 2,), -10000.)
+        end_scores[end_tag] = 0.
+        batch_indices = torch.arange(batch_size, dtype=torch.long, device=logits.device)
+        tag_sequences[batch_indices, sequence_lengths + 1] = end_scores
+
+        timesteps = torch.arange(max_seq_length + 2, dtype=torch.long, device=logits.device)
+        tag_mask = timesteps.unsqueeze(0) < (sequence_lengths + 2).unsqueeze(-1)
+
+        # We pass the tags and the transitions to ``batched_viterbi_decode``.
+        viterbi_paths, viterbi_scores = util.batched_viterbi_decode(tag_sequences, transitions, tag_mask)
+        # Get rid of START and END sentinels.
+        return [(viterbi_path[1:-1], viterbi_score)
+                for viterbi_path, viterbi_score in zip(viterbi_paths, viterbi_scores.tolist())]
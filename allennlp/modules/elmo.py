@@ -1,6 +1,14 @@
+import atexit
+import glob
 import json
 import logging
-from typing import Union, List, Dict, Any
+import os
+import tempfile
+import threading
+import time
+import weakref
+from hashlib import sha256
+from typing import Union, List, Dict, Any, Callable, Tuple
 import warnings
 
 import torch
@@ -12,7 +20,7 @@ with warnings.catch_warnings():
     import h5py
 from overrides import overrides
 
-from allennlp.common.file_utils import cached_path
+from allennlp.common.file_utils import cached_path, CACHE_ROOT
 from allennlp.common.checks import ConfigurationError
 from allennlp.common import Params
 from allennlp.common.util import lazy_groups_of
@@ -30,6 +38,10 @@ logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 # pylint: disable=attribute-defined-outside-init
 
+# Where ``ElmoTokenEmbedder`` and ``ElmoEmbedder`` keep the character CNN outputs of the tokens
+# they have seen, by default.
+DEFAULT_TOKEN_CACHE_DIRECTORY = str(CACHE_ROOT / "elmo_token_cache")
+
 
 class Elmo(torch.nn.Module):
     """
@@ -74,6 +86,9 @@ class Elmo(torch.nn.Module):
         method must return a ``dict`` with ``activations`` and ``mask`` keys
         (see `_ElmoBilm`` for an example).  Note that ``requires_grad`` is also
         ignored with this option.
+    token_cache_directory : ``str``, optional, (default = None).
+        If given, the character CNN outputs for tokens are cached in this directory and reused
+        across runs (see ``_ElmoTokenCache``).  This is ignored if ``requires_grad`` is True.
     """
     def __init__(self,
                  options_file: str,
@@ -83,7 +98,8 @@ class Elmo(torch.nn.Module):
                  do_layer_norm: bool = False,
                  dropout: float = 0.5,
                  vocab_to_cache: List[str] = None,
-                 module: torch.nn.Module = None) -> None:
+                 module: torch.nn.Module = None,
+                 token_cache_directory: str = None) -> None:
         super(Elmo, self).__init__()
 
         logging.info("Initializing ELMo")
@@ -96,7 +112,8 @@ class Elmo(torch.nn.Module):
             self._elmo_lstm = _ElmoBiLm(options_file,
                                         weight_file,
                                         requires_grad=requires_grad,
-                                        vocab_to_cache=vocab_to_cache)
+                                        vocab_to_cache=vocab_to_cache,
+                                        token_cache_directory=token_cache_directory)
         self._has_cached_vocab = vocab_to_cache is not None
         self._dropout = Dropout(p=dropout)
         self._scalar_mixes: Any = []
@@ -192,6 +209,7 @@ class Elmo(torch.nn.Module):
         num_output_representations = params.pop('num_output_representations')
         do_layer_norm = params.pop_bool('do_layer_norm', False)
         dropout = params.pop_float('dropout', 0.5)
+        token_cache_directory = params.pop('token_cache_directory', None)
         params.assert_empty(cls.__name__)
 
         return cls(options_file=options_file,
@@ -199,7 +217,8 @@ class Elmo(torch.nn.Module):
                    num_output_representations=num_output_representations,
                    requires_grad=requires_grad,
                    do_layer_norm=do_layer_norm,
-                   dropout=dropout)
+                   dropout=dropout,
+                   token_cache_directory=token_cache_directory)
 
 
 def batch_to_ids(batch: List[List[str]]) -> torch.Tensor:
@@ -231,6 +250,202 @@ def batch_to_ids(batch: List[List[str]]) -> torch.Tensor:
     return dataset.as_tensor_dict()['elmo']['character_ids']
 
 
+class _ElmoTokenCache:
+    """
+    A cache of the context insensitive token representations computed by the character CNN of
+    an ELMo biLM, which persists across runs.  Tokens are identified by their character ids, so
+    the cache works for any input to the biLM, and tokens that aren't in the cache yet are run
+    through the CNN once and then added to it.
+
+    The cache is stored in a subdirectory of ``cache_directory`` named after the SHA-256 hash of
+    the weight file, so that it is only ever used with the weights that it was computed with.
+    Every ``save_every`` new tokens, and when the process exits, the new tokens are written to a
+    new shard file there, so writing the cache only ever costs as much as the new tokens, and
+    several processes can add to the same cache.  The representations are kept on the CPU, and
+    only the rows a batch needs are copied to its device.
+
+    The cache is safe to use from several threads at once, which happens when the module that
+    owns it is replicated across GPUs with ``DataParallel`` (the replicas share the cache), or in
+    a threaded server.
+
+    Parameters
+    ----------
+    weight_file : ``str``
+        The ELMo hdf5 weight file that the character CNN was loaded from.
+    cache_directory : ``str``
+        The directory to keep the cache in.
+    save_every : ``int``, optional, (default = 10000).
+        How many new tokens to cache before writing them to disk.
+    max_tokens : ``int``, optional, (default = 200000).
+        The largest number of tokens to keep in memory (including those loaded from disk).  Once
+        the cache is full, the representations of new tokens are still computed, just not cached.
+    """
+    def __init__(self,
+                 weight_file: str,
+                 cache_directory: str,
+                 save_every: int = 10000,
+                 max_tokens: int = 200000) -> None:
+        self._shard_directory = os.path.join(cache_directory, _get_file_hash(cached_path(weight_file)))
+        os.makedirs(self._shard_directory, exist_ok=True)
+        self._save_every = save_every
+        self._max_tokens = max_tokens
+
+        # Maps the character ids of each cached token to its row in ``self._token_embeddings``,
+        # which has spare rows at the end, so that we don't copy it every time we add tokens.
+        self._token_rows: Dict[bytes, int] = {}
+        self._token_embeddings: torch.Tensor = None
+        # The character ids of the tokens after the first ``self._num_saved_tokens`` rows, which
+        # haven't been written to disk yet.
+        self._unsaved_character_ids: List[numpy.ndarray] = []
+        self._num_saved_tokens = 0
+        # Guards the rows, the store and the unsaved tokens.  We don't hold it while running the
+        # character CNN, so that replicas on different GPUs can still do that at the same time.
+        self._lock = threading.RLock()
+
+        for shard_path in sorted(glob.glob(os.path.join(self._shard_directory, '*.npz'))):
+            if len(self._token_rows) >= self._max_tokens:
+                break
+            with numpy.load(shard_path) as shard:
+                self._add(shard['character_ids'], torch.from_numpy(shard['token_embeddings']))
+        self._unsaved_character_ids = []
+        self._num_saved_tokens = len(self._token_rows)
+        if self._num_saved_tokens > 0:
+            logger.info("Loaded %d cached ELMo token representations from %s",
+                        self._num_saved_tokens, self._shard_directory)
+        # We only hold a weak reference, so that the exit hook doesn't keep every cache alive.
+        atexit.register(_save_token_cache, weakref.ref(self))
+
+    def __len__(self) -> int:
+        return len(self._token_rows)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks can't be copied or pickled.
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def get_token_embeddings(self,
+                             character_ids: torch.Tensor,
+                             compute_token_embeddings: Callable[[torch.Tensor], torch.Tensor]) -> torch.Tensor:
+        """
+        Returns the ``(num_tokens, embedding_dim)`` token representations for the character ids
+        of shape ``(num_tokens, max_characters_per_token)``, running ``compute_token_embeddings``
+        on the tokens which aren't in the cache yet (once for each distinct token).
+        """
+        device = character_ids.device
+        unique_character_ids, inverse = numpy.unique(character_ids.cpu().numpy().astype(numpy.int16),
+                                                     axis=0, return_inverse=True)
+        with self._lock:
+            rows = numpy.array([self._token_rows.get(token_character_ids.tobytes(), -1)
+                                for token_character_ids in unique_character_ids], dtype=numpy.int64)
+            missing = rows < 0
+            cached = numpy.flatnonzero(~missing)
+            # Rows never move, but another thread can replace the store when it adds tokens, so
+            # we copy the cached rows out while we hold the lock.
+            cached_embeddings = None
+            if cached.size > 0:
+                cached_embeddings = self._token_embeddings.index_select(0, torch.from_numpy(rows[cached]))
+        if not missing.any():
+            unique_embeddings = cached_embeddings.to(device)
+        else:
+            new_character_ids = unique_character_ids[missing]
+            with torch.no_grad():
+                new_embeddings = compute_token_embeddings(
+                        torch.from_numpy(new_character_ids.astype(numpy.int64)).to(device))
+            unique_embeddings = new_embeddings.new_empty(len(rows), new_embeddings.size(-1))
+            unique_embeddings[torch.from_numpy(numpy.flatnonzero(missing)).to(device)] = new_embeddings
+            if cached_embeddings is not None:
+                unique_embeddings[torch.from_numpy(cached).to(device)] = cached_embeddings.to(device)
+            with self._lock:
+                # Another thread may have added some of these tokens in the meantime, which
+                # ``_add`` skips.
+                self._add(new_character_ids, new_embeddings.cpu())
+                if len(self._token_rows) - self._num_saved_tokens >= self._save_every:
+                    self.save()
+
+        return unique_embeddings.index_select(0, torch.from_numpy(inverse.reshape(-1)).to(device))
+
+    def _add(self, character_ids: numpy.ndarray, token_embeddings: torch.Tensor) -> None:
+        """
+        Adds the tokens which aren't in the cache yet, as long as there is room for them.
+        """
+        num_tokens = len(self._token_rows)
+        new_indices = [index for index, token_character_ids in enumerate(character_ids)
+                       if token_character_ids.tobytes() not in self._token_rows]
+        new_indices = new_indices[:max(self._max_tokens - num_tokens, 0)]
+        if not new_indices:
+            return
+        character_ids = character_ids[new_indices]
+        token_embeddings = token_embeddings[torch.LongTensor(new_indices)]
+        num_new_tokens = len(new_indices)
+
+        if self._token_embeddings is None:
+            self._token_embeddings = token_embeddings.new_zeros(max(num_new_tokens, 1024),
+                                                                token_embeddings.size(-1))
+        elif num_tokens + num_new_tokens > self._token_embeddings.size(0):
+            capacity = max(2 * self._token_embeddings.size(0), num_tokens + num_new_tokens)
+            new_store = self._token_embeddings.new_zeros(capacity, self._token_embeddings.size(-1))
+            new_store[:num_tokens] = self._token_embeddings[:num_tokens]
+            self._token_embeddings = new_store
+        self._token_embeddings[num_tokens:num_tokens + num_new_tokens] = token_embeddings
+        for row, token_character_ids in enumerate(character_ids, num_tokens):
+            self._token_rows[token_character_ids.tobytes()] = row
+        self._unsaved_character_ids.append(character_ids)
+
+    def save(self) -> None:
+        """
+        Writes the tokens that were added since the last save to a new shard file, if there are
+        any.  The shard is written to a temporary file which is then moved into place, so other
+        processes never see a partial shard.
+        """
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        num_tokens = len(self._token_rows)
+        if num_tokens == self._num_saved_tokens:
+            return
+        character_ids = numpy.concatenate(self._unsaved_character_ids)
+        token_embeddings = self._token_embeddings[self._num_saved_tokens:num_tokens].numpy()
+        temp_fd, temp_path = tempfile.mkstemp(dir=self._shard_directory, suffix='.tmp')
+        with os.fdopen(temp_fd, 'wb') as shard_file:
+            numpy.savez(shard_file, character_ids=character_ids, token_embeddings=token_embeddings)
+        # Shards are named so that they sort in the order they were written, and so that shards
+        # written by different processes at the same time don't collide.
+        temp_name = os.path.splitext(os.path.basename(temp_path))[0]
+        shard_path = os.path.join(self._shard_directory, f"{int(time.time() * 1000000):020d}-{temp_name}.npz")
+        os.replace(temp_path, shard_path)
+        logger.info("Saved %d new ELMo token representations to %s",
+                    num_tokens - self._num_saved_tokens, shard_path)
+        self._unsaved_character_ids = []
+        self._num_saved_tokens = num_tokens
+
+
+def _save_token_cache(cache_reference: 'weakref.ReferenceType[_ElmoTokenCache]') -> None:
+    cache = cache_reference()
+    if cache is not None:
+        cache.save()
+
+
+# The hashes of the weight files we have seen, keyed by path, size and modification time.
+_FILE_HASHES: Dict[Tuple[str, int, float], str] = {}
+
+
+def _get_file_hash(file_path: str) -> str:
+    key = (os.path.abspath(file_path), os.path.getsize(file_path), os.path.getmtime(file_path))
+    if key not in _FILE_HASHES:
+        file_hash = sha256()
+        with open(file_path, 'rb') as weight_file:
+            for block in iter(lambda: weight_file.read(1024 * 1024), b''):
+                file_hash.update(block)
+        _FILE_HASHES[key] = file_hash.hexdigest()
+    return _FILE_HASHES[key]
+
+
 class _ElmoCharacterEncoder(torch.nn.Module):
     """
     Compute context insensitive token representation using pretrained biLM.
@@ -253,6 +468,9 @@ class _ElmoCharacterEncoder(torch.nn.Module):
         ELMo hdf5 weight file
     requires_grad: ``bool``, optional
         If True, compute gradient of ELMo parameters for fine tuning.
+    token_cache_directory : ``str``, optional, (default = None).
+        If given (and ``requires_grad`` is False), we keep the outputs for the tokens we see in an
+        ``_ElmoTokenCache`` in this directory, and only run the CNN on tokens which aren't in it.
 
     The relevant section of the options file is something like:
     .. example-code::
@@ -272,7 +490,8 @@ class _ElmoCharacterEncoder(torch.nn.Module):
     def __init__(self,
                  options_file: str,
                  weight_file: str,
-                 requires_grad: bool = False) -> None:
+                 requires_grad: bool = False,
+                 token_cache_directory: str = None) -> None:
         super(_ElmoCharacterEncoder, self).__init__()
 
         with open(cached_path(options_file), 'r') as fin:
@@ -292,6 +511,12 @@ class _ElmoCharacterEncoder(torch.nn.Module):
                 numpy.array(ELMoCharacterMapper.end_of_sentence_characters) + 1
         )
 
+        # The cached outputs would be out of date as soon as we fine tune the CNN.
+        if token_cache_directory is not None and not requires_grad:
+            self._token_cache = _ElmoTokenCache(weight_file, token_cache_directory)
+        else:
+            self._token_cache = None
+
     def get_output_dim(self):
         return self.output_dim
 
@@ -324,11 +549,32 @@ class _ElmoCharacterEncoder(torch.nn.Module):
                 self._end_of_sentence_characters
         )
 
-        # the character id embedding
         max_chars_per_token = self._options['char_cnn']['max_characters_per_token']
-        # (batch_size * sequence_length, max_chars_per_token, embed_dim)
+        # (batch_size * sequence_length, max_chars_per_token)
+        character_ids = character_ids_with_bos_eos.view(-1, max_chars_per_token)
+        if self._token_cache is not None:
+            token_embedding = self._token_cache.get_token_embeddings(character_ids, self._compute_token_embedding)
+        else:
+            token_embedding = self._compute_token_embedding(character_ids)
+
+        # reshape to (batch_size, sequence_length, embedding_dim)
+        batch_size, sequence_length, _ = character_ids_with_bos_eos.size()
+
+        return {
+                'mask': mask_with_bos_eos,
+                'token_embedding': token_embedding.view(batch_size, sequence_length, -1)
+        }
+
+    def _compute_token_embedding(self, character_ids: torch.Tensor) -> torch.Tensor:
+        """
+        Runs the character CNN, highway layers and projection on character ids of shape
+        ``(num_tokens, max_chars_per_token)``, returning the ``(num_tokens, embedding_dim)``
+        token representations.
+        """
+        # the character id embedding
+        # (num_tokens, max_chars_per_token, embed_dim)
         character_embedding = torch.nn.functional.embedding(
-                character_ids_with_bos_eos.view(-1, max_chars_per_token),
+                character_ids,
                 self._char_embedding_weights
         )
 
@@ -341,33 +587,25 @@ class _ElmoCharacterEncoder(torch.nn.Module):
         else:
             raise ConfigurationError("Unknown activation")
 
-        # (batch_size * sequence_length, embed_dim, max_chars_per_token)
+        # (num_tokens, embed_dim, max_chars_per_token)
         character_embedding = torch.transpose(character_embedding, 1, 2)
         convs = []
         for i in range(len(self._convolutions)):
             conv = getattr(self, 'char_conv_{}'.format(i))
             convolved = conv(character_embedding)
-            # (batch_size * sequence_length, n_filters for this width)
+            # (num_tokens, n_filters for this width)
             convolved, _ = torch.max(convolved, dim=-1)
             convolved = activation(convolved)
             convs.append(convolved)
 
-        # (batch_size * sequence_length, n_filters)
+        # (num_tokens, n_filters)
         token_embedding = torch.cat(convs, dim=-1)
 
-        # apply the highway layers (batch_size * sequence_length, n_filters)
+        # apply the highway layers (num_tokens, n_filters)
         token_embedding = self._highways(token_embedding)
 
-        # final projection  (batch_size * sequence_length, embedding_dim)
-        token_embedding = self._projection(token_embedding)
-
-        # reshape to (batch_size, sequence_length, embedding_dim)
-        batch_size, sequence_length, _ = character_ids_with_bos_eos.size()
-
-        return {
-                'mask': mask_with_bos_eos,
-                'token_embedding': token_embedding.view(batch_size, sequence_length, -1)
-        }
+        # final projection  (num_tokens, embedding_dim)
+        return self._projection(token_embedding)
 
     def _load_weights(self):
         self._load_char_embedding()
@@ -488,15 +726,23 @@ class _ElmoBiLm(torch.nn.Module):
         indices of shape (batch_size, timesteps) to forward, instead
         of character indices. If you use this option and pass a word which
         wasn't pre-cached, this will break.
+    token_cache_directory : ``str``, optional, (default = None).
+        If given, we keep the character CNN outputs for the tokens we see in this directory, and
+        reuse them across runs, only running the CNN for tokens we haven't seen before (see
+        ``_ElmoTokenCache``).  This is ignored if ``requires_grad`` is True.
     """
     def __init__(self,
                  options_file: str,
                  weight_file: str,
                  requires_grad: bool = False,
-                 vocab_to_cache: List[str] = None) -> None:
+                 vocab_to_cache: List[str] = None,
+                 token_cache_directory: str = None) -> None:
         super(_ElmoBiLm, self).__init__()
 
-        self._token_embedder = _ElmoCharacterEncoder(options_file, weight_file, requires_grad=requires_grad)
+        self._token_embedder = _ElmoCharacterEncoder(options_file,
+                                                     weight_file,
+                                                     requires_grad=requires_grad,
+                                                     token_cache_directory=token_cache_directory)
 
         self._requires_grad = requires_grad
         if requires_grad and vocab_to_cache:
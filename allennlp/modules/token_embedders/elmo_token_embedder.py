@@ -3,7 +3,7 @@ import torch
 
 from allennlp.common import Params
 from allennlp.modules.token_embedders.token_embedder import TokenEmbedder
-from allennlp.modules.elmo import Elmo
+from allennlp.modules.elmo import Elmo, DEFAULT_TOKEN_CACHE_DIRECTORY
 from allennlp.modules.time_distributed import TimeDistributed
 from allennlp.data import Vocabulary
 
@@ -39,6 +39,10 @@ class ElmoTokenEmbedder(TokenEmbedder):
         indices of shape (batch_size, timesteps) to forward, instead
         of character indices. If you use this option and pass a word which
         wasn't pre-cached, this will break.
+    token_cache_directory : ``str``, optional, (default = ``DEFAULT_TOKEN_CACHE_DIRECTORY``).
+        A directory in which to keep the character CNN outputs for the tokens we see, so that
+        they are only computed once, even across runs.  Pass ``None`` to always run the CNN.  The
+        cache isn't used if ``requires_grad`` is True.
     """
     def __init__(self,
                  options_file: str,
@@ -47,7 +51,8 @@ class ElmoTokenEmbedder(TokenEmbedder):
                  dropout: float = 0.5,
                  requires_grad: bool = False,
                  projection_dim: int = None,
-                 vocab_to_cache: List[str] = None) -> None:
+                 vocab_to_cache: List[str] = None,
+                 token_cache_directory: str = DEFAULT_TOKEN_CACHE_DIRECTORY) -> None:
         super(ElmoTokenEmbedder, self).__init__()
 
         self._elmo = Elmo(options_file,
@@ -56,7 +61,8 @@ class ElmoTokenEmbedder(TokenEmbedder):
                           do_layer_norm=do_layer_norm,
                           dropout=dropout,
                           requires_grad=requires_grad,
-                          vocab_to_cache=vocab_to_cache)
+                          vocab_to_cache=vocab_to_cache,
+                          token_cache_directory=token_cache_directory)
         if projection_dim:
             self._projection = torch.nn.Linear(self._elmo.get_output_dim(), projection_dim)
         else:
@@ -108,6 +114,7 @@ class ElmoTokenEmbedder(TokenEmbedder):
         else:
             vocab_to_cache = None
         projection_dim = params.pop_int("projection_dim", None)
+        token_cache_directory = params.pop("token_cache_directory", DEFAULT_TOKEN_CACHE_DIRECTORY)
         params.assert_empty(cls.__name__)
         return cls(options_file=options_file,
                    weight_file=weight_file,
@@ -115,4 +122,5 @@ class ElmoTokenEmbedder(TokenEmbedder):
                    dropout=dropout,
                    requires_grad=requires_grad,
                    projection_dim=projection_dim,
-                   vocab_to_cache=vocab_to_cache)
+                   vocab_to_cache=vocab_to_cache,
+                   token_cache_directory=token_cache_directory)
@@ -1,14 +1,20 @@
 import io
+import os
+import shutil
 import tarfile
+import tempfile
 import zipfile
 import bz2
 import lzma
 import gzip
 import re
 import logging
+import math
+import multiprocessing
 import warnings
 import itertools
-from typing import Optional, Tuple, Sequence, cast, IO, Iterator, Any, NamedTuple
+from typing import (Optional, Tuple, Sequence, cast, IO, Iterator, Any, List, NamedTuple, Dict, Iterable,
+                    Callable)
 
 from overrides import overrides
 import numpy
@@ -167,6 +173,15 @@ class Embedding(TokenEmbedder):
               where ``archive_uri`` can be a file system path or a URL. For example::
 
                     "(http://nlp.stanford.edu/data/glove.twitter.27B.zip)#glove.twitter.27B.200d.txt"
+
+            * binary file - a ``.npy`` file, created from a text file by
+              :func:`convert_embeddings_text_file`, which we memory-map so that we only read the
+              vectors of the tokens in the vocabulary.
+
+        Parsing a large text file takes minutes, so if you use a text file more than once, it's
+        worth converting it with ``scripts/convert_embeddings.py``.  By default, the converted
+        file is written next to the text file (or next to its cached copy, for a URL), and we read
+        that instead of the text file whenever it exists and is newer than the text file.
         """
         # pylint: disable=arguments-differ
         num_embeddings = params.pop_int('num_embeddings', None)
@@ -226,8 +241,12 @@ def _read_pretrained_embeddings_file(file_uri: str,
 
         * hdf5 format - hdf5 file containing an embedding matrix in the form of a torch.Tensor.
 
-    If the filename ends with '.hdf5' or '.h5' then we load from hdf5, otherwise we assume
-    text format.
+        * binary format - a ``.npy`` file written by :func:`convert_embeddings_text_file`.
+
+    If the filename ends with '.hdf5' or '.h5' then we load from hdf5, if it ends with '.npy' we
+    load from the binary format, otherwise we assume text format.  If a text file has been
+    converted to the binary format with :func:`convert_embeddings_text_file`, and the converted
+    file is up to date, we read the converted file instead.
 
     Parameters
     ----------
@@ -258,6 +277,17 @@ def _read_pretrained_embeddings_file(file_uri: str,
         return _read_embeddings_from_hdf5(file_uri,
                                           embedding_dim,
                                           vocab, namespace)
+    if file_ext == '.npy':
+        return _read_embeddings_from_binary_file(file_uri,
+                                                 embedding_dim,
+                                                 vocab, namespace)
+
+    converted_path = _get_converted_embeddings_path(file_uri)
+    if _is_up_to_date(converted_path, file_uri):
+        logger.info("Using the converted embeddings file %s", converted_path)
+        return _read_embeddings_from_binary_file(converted_path,
+                                                 embedding_dim,
+                                                 vocab, namespace)
 
     return _read_embeddings_from_text_file(file_uri,
                                            embedding_dim,
@@ -267,7 +297,8 @@ def _read_pretrained_embeddings_file(file_uri: str,
 def _read_embeddings_from_text_file(file_uri: str,
                                     embedding_dim: int,
                                     vocab: Vocabulary,
-                                    namespace: str = "tokens") -> torch.FloatTensor:
+                                    namespace: str = "tokens",
+                                    num_workers: int = None) -> torch.FloatTensor:
     """
     Read pre-trained word vectors from an eventually compressed text file, possibly contained
     inside an archive with multiple files. The text file is assumed to be utf-8 encoded with
@@ -275,67 +306,215 @@ def _read_embeddings_from_text_file(file_uri: str,
 
     Lines that contain more numerical tokens than ``embedding_dim`` raise a warning and are skipped.
 
+    The file is parsed in chunks by a pool of ``num_workers`` processes (by default, one per CPU,
+    up to ``_MAX_TEXT_FILE_WORKERS``).  If it is an uncompressed file, each worker reads its own
+    byte range of the file; otherwise we decompress the file here and send chunks of lines to the
+    workers.  Since the workers can't go faster than we decompress, compressed files smaller than
+    ``_MIN_COMPRESSED_BYTES_FOR_POOL`` are parsed in this process.
+
     The remainder of the docstring is identical to ``_read_pretrained_embeddings_file``.
     """
-    tokens_to_keep = set(vocab.get_index_to_token_vocabulary(namespace).values())
+    token_to_index = vocab.get_token_to_index_vocabulary(namespace)
     vocab_size = vocab.get_vocab_size(namespace)
-    embeddings = {}
-
-    # First we read the embeddings from the file, only keeping vectors for the words we need.
-    logger.info("Reading pretrained embeddings from file")
 
-    with EmbeddingsTextFile(file_uri) as embeddings_file:
-        for line in Tqdm.tqdm(embeddings_file):
-            token = line.split(' ', 1)[0]
-            if token in tokens_to_keep:
-                fields = line.rstrip().split(' ')
-                if len(fields) - 1 != embedding_dim:
-                    # Sometimes there are funny unicode parsing problems that lead to different
-                    # fields lengths (e.g., a word with a unicode space character that splits
-                    # into more than one column).  We skip those lines.  Note that if you have
-                    # some kind of long header, this could result in all of your lines getting
-                    # skipped.  It's hard to check for that here; you just have to look in the
-                    # embedding_misses_file and at the model summary to make sure things look
-                    # like they are supposed to.
-                    logger.warning("Found line with wrong number of dimensions (expected: %d; actual: %d): %s",
-                                   embedding_dim, len(fields) - 1, line)
-                    continue
+    uncompressed_file_path = _get_uncompressed_file_path(file_uri)
+    if uncompressed_file_path is not None:
+        file_size = os.path.getsize(uncompressed_file_path)
+        chunks: Iterable[Any] = [(uncompressed_file_path, start, min(start + _TEXT_FILE_CHUNK_BYTES, file_size))
+                                 for start in range(0, file_size, _TEXT_FILE_CHUNK_BYTES)]
+        parse_chunk: Callable[[Any], _ParsedEmbeddings] = _parse_embeddings_byte_range
+        num_chunks: Optional[int] = len(chunks)
+        large_enough_for_pool = True
+    else:
+        embeddings_file = EmbeddingsTextFile(file_uri)
+        chunks = _chunk_lines(embeddings_file, _TEXT_FILE_CHUNK_LINES)
+        parse_chunk = _parse_embeddings_lines
+        num_chunks = None
+        main_file_uri, _ = parse_embeddings_file_uri(file_uri)
+        compressed_size = os.path.getsize(cached_path(main_file_uri))
+        large_enough_for_pool = compressed_size >= _MIN_COMPRESSED_BYTES_FOR_POOL
+
+    if num_workers is None:
+        num_workers = min(os.cpu_count() or 1, _MAX_TEXT_FILE_WORKERS)
+    if num_chunks is not None:
+        num_workers = min(num_workers, num_chunks)
+    # Daemonic processes (e.g. the workers of a ``MultiprocessIterator``) can't have children.
+    use_pool = (num_workers > 1 and large_enough_for_pool and
+                not multiprocessing.current_process().daemon)
+
+    # We write the vectors we need straight into the embedding matrix, and keep running sums
+    # for their mean and standard deviation, which we use to initialize the missing rows.
+    embedding_matrix = torch.FloatTensor(vocab_size, embedding_dim)
+    found = numpy.zeros(vocab_size, dtype=numpy.bool_)
+    embeddings_sum = 0.0
+    embeddings_squared_sum = 0.0
+    num_values = 0
 
-                vector = numpy.asarray(fields[1:], dtype='float32')
-                embeddings[token] = vector
+    logger.info("Reading pretrained embeddings from file")
+    pool = None
+    try:
+        if use_pool:
+            pool = multiprocessing.Pool(num_workers,
+                                        initializer=_set_embeddings_parser_state,
+                                        initargs=(token_to_index, embedding_dim))
+            parsed_chunks = pool.imap(parse_chunk, chunks)
+        else:
+            _set_embeddings_parser_state(token_to_index, embedding_dim)
+            parsed_chunks = map(parse_chunk, chunks)
+
+        for indices, vectors, wrong_lines in Tqdm.tqdm(parsed_chunks, total=num_chunks):
+            for line in wrong_lines:
+                # Sometimes there are funny unicode parsing problems that lead to different
+                # fields lengths (e.g., a word with a unicode space character that splits
+                # into more than one column).  We skip those lines.  Note that if you have
+                # some kind of long header, this could result in all of your lines getting
+                # skipped.  It's hard to check for that here; you just have to look in the
+                # embedding_misses_file and at the model summary to make sure things look
+                # like they are supposed to.
+                logger.warning("Found line with wrong number of dimensions (expected: %d; actual: %d): %s",
+                               embedding_dim, len(line.rstrip().split(' ')) - 1, line)
+            if not indices.size:
+                continue
+            # If a token appears more than once in the file, its last vector wins.
+            overwritten = indices[found[indices]]
+            if overwritten.size:
+                old_vectors = embedding_matrix[torch.from_numpy(overwritten)].numpy().astype(numpy.float64)
+                embeddings_sum -= old_vectors.sum()
+                embeddings_squared_sum -= numpy.square(old_vectors).sum()
+                num_values -= old_vectors.size
+            embedding_matrix[torch.from_numpy(indices)] = torch.from_numpy(vectors)
+            found[indices] = True
+            vectors = vectors.astype(numpy.float64)
+            embeddings_sum += vectors.sum()
+            embeddings_squared_sum += numpy.square(vectors).sum()
+            num_values += vectors.size
+    finally:
+        if pool is not None:
+            pool.terminate()
+        else:
+            _set_embeddings_parser_state(None, None)
+        if uncompressed_file_path is None:
+            embeddings_file.close()
 
-    if not embeddings:
+    if not found.any():
         raise ConfigurationError("No embeddings of correct dimension found; you probably "
                                  "misspecified your embedding_dim parameter, or didn't "
                                  "pre-populate your Vocabulary")
 
-    all_embeddings = numpy.asarray(list(embeddings.values()))
-    embeddings_mean = float(numpy.mean(all_embeddings))
-    embeddings_std = float(numpy.std(all_embeddings))
-    # Now we initialize the weight matrix for an embedding layer, starting with random vectors,
-    # then filling in the word vectors we just read.
+    embeddings_mean = float(embeddings_sum / num_values)
+    embeddings_std = math.sqrt(max(float(embeddings_squared_sum / num_values) - embeddings_mean ** 2, 0.0))
+    # Now we initialize the rows for words we don't have a pre-trained vector for with random
+    # vectors.
     logger.info("Initializing pre-trained embedding layer")
-    embedding_matrix = torch.FloatTensor(vocab_size, embedding_dim).normal_(embeddings_mean,
-                                                                            embeddings_std)
-    num_tokens_found = 0
-    index_to_token = vocab.get_index_to_token_vocabulary(namespace)
-    for i in range(vocab_size):
-        token = index_to_token[i]
-
-        # If we don't have a pre-trained vector for this word, we'll just leave this row alone,
-        # so the word has a random initialization.
-        if token in embeddings:
-            embedding_matrix[i] = torch.FloatTensor(embeddings[token])
-            num_tokens_found += 1
-        else:
-            logger.debug("Token %s was not found in the embedding file. Initialising randomly.", token)
+    missing_indices = numpy.nonzero(~found)[0]
+    if missing_indices.size:
+        embedding_matrix[torch.from_numpy(missing_indices)] = \
+                torch.FloatTensor(missing_indices.size, embedding_dim).normal_(embeddings_mean, embeddings_std)
+    if logger.isEnabledFor(logging.DEBUG):
+        index_to_token = vocab.get_index_to_token_vocabulary(namespace)
+        for i in missing_indices.tolist():
+            logger.debug("Token %s was not found in the embedding file. Initialising randomly.", index_to_token[i])
 
     logger.info("Pretrained embeddings were found for %d out of %d tokens",
-                num_tokens_found, vocab_size)
+                int(found.sum()), vocab_size)
 
     return embedding_matrix
 
 
+# The chunks that we parse text embedding files in, for uncompressed and other files.
+_TEXT_FILE_CHUNK_BYTES = 32 * 1024 * 1024
+_TEXT_FILE_CHUNK_LINES = 10000
+# The default cap on the number of processes that parse a text embedding file.
+_MAX_TEXT_FILE_WORKERS = 8
+# Compressed files (or archives) smaller than this are parsed without a pool of processes.
+_MIN_COMPRESSED_BYTES_FOR_POOL = 16 * 1024 * 1024
+
+# The vocabulary indices, vectors and lines with the wrong number of dimensions of a chunk.
+_ParsedEmbeddings = Tuple[numpy.ndarray, numpy.ndarray, List[str]]  # pylint: disable=invalid-name
+
+# What the workers need to parse a chunk, set by ``_set_embeddings_parser_state``, so that we
+# only send the vocabulary to each worker once.
+_PARSER_TOKEN_TO_INDEX: Optional[Dict[str, int]] = None
+_PARSER_EMBEDDING_DIM: Optional[int] = None
+
+
+def _set_embeddings_parser_state(token_to_index: Optional[Dict[str, int]],
+                                 embedding_dim: Optional[int]) -> None:
+    global _PARSER_TOKEN_TO_INDEX, _PARSER_EMBEDDING_DIM  # pylint: disable=global-statement
+    _PARSER_TOKEN_TO_INDEX = token_to_index
+    _PARSER_EMBEDDING_DIM = embedding_dim
+
+
+def _parse_embeddings_lines(lines: Iterable[str]) -> _ParsedEmbeddings:
+    """
+    Parses the vectors of the tokens in the vocabulary from some lines of an embeddings file.
+    """
+    token_to_index = cast(Dict[str, int], _PARSER_TOKEN_TO_INDEX)
+    embedding_dim = cast(int, _PARSER_EMBEDDING_DIM)
+    vectors: Dict[int, numpy.ndarray] = {}
+    wrong_lines: List[str] = []
+    for line in lines:
+        index = token_to_index.get(line.split(' ', 1)[0])
+        if index is None:
+            continue
+        fields = line.rstrip().split(' ')
+        if len(fields) - 1 != embedding_dim:
+            wrong_lines.append(line)
+            continue
+        vectors[index] = numpy.asarray(fields[1:], dtype='float32')
+    if not vectors:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros((0, embedding_dim), dtype=numpy.float32), wrong_lines
+    return numpy.array(list(vectors.keys()), dtype=numpy.int64), numpy.stack(list(vectors.values())), wrong_lines
+
+
+def _parse_embeddings_byte_range(byte_range: Tuple[str, int, int]) -> _ParsedEmbeddings:
+    return _parse_embeddings_lines(_read_lines_in_byte_range(*byte_range))
+
+
+def _read_lines_in_byte_range(file_path: str, start: int, end: int) -> Iterator[str]:
+    """
+    Yields the lines of a text file which start in the byte range ``[start, end)``, skipping
+    the header line that some embedding files have, like ``EmbeddingsTextFile`` does.
+    """
+    with open(file_path, 'rb') as text_file:
+        if start > 0:
+            # Move to the start of the first line that starts in the range.
+            text_file.seek(start - 1)
+            text_file.readline()
+        elif EmbeddingsTextFile._get_num_tokens_from_first_line(  # pylint: disable=protected-access
+                text_file.readline().decode(EmbeddingsTextFile.DEFAULT_ENCODING)) is None:
+            text_file.seek(0)
+        while text_file.tell() < end:
+            line = text_file.readline()
+            if not line:
+                break
+            yield line.decode(EmbeddingsTextFile.DEFAULT_ENCODING)
+
+
+def _chunk_lines(lines: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    iterator = iter(lines)
+    chunk = list(itertools.islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, chunk_size))
+
+
+def _get_uncompressed_file_path(file_uri: str) -> Optional[str]:
+    """
+    Returns the local path of the embeddings text file if it is an uncompressed file that we can
+    read byte ranges from, and ``None`` if ``EmbeddingsTextFile`` needs to decompress it.
+    """
+    main_file_uri, path_inside_archive = parse_embeddings_file_uri(file_uri)
+    if path_inside_archive:
+        return None
+    main_file_local_path = cached_path(main_file_uri)
+    if zipfile.is_zipfile(main_file_local_path) or tarfile.is_tarfile(main_file_local_path):
+        return None
+    if get_file_extension(main_file_uri) in ['.gz', '.bz2', '.lzma']:
+        return None
+    return main_file_local_path
+
+
 def _read_embeddings_from_hdf5(embeddings_filename: str,
                                embedding_dim: int,
                                vocab: Vocabulary,
@@ -355,6 +534,172 @@ def _read_embeddings_from_hdf5(embeddings_filename: str,
     return torch.FloatTensor(embeddings)
 
 
+def _read_embeddings_from_binary_file(file_uri: str,
+                                      embedding_dim: int,
+                                      vocab: Vocabulary,
+                                      namespace: str = "tokens") -> torch.FloatTensor:
+    """
+    Reads embeddings in the binary format written by :func:`convert_embeddings_text_file`.  The
+    ``.npy`` matrix is memory-mapped, so we only read the rows for tokens in the vocabulary.
+    Like with a text file, embeddings for tokens that aren't in the file are randomly initialized
+    using the mean and standard deviation of the embeddings we found.
+    """
+    vectors = numpy.load(cached_path(file_uri), mmap_mode='r')
+    if vectors.ndim != 2 or vectors.shape[1] != embedding_dim:
+        raise ConfigurationError("Read embeddings of shape {0} from {1}, but expected embeddings of "
+                                 "dimension {2}".format(list(vectors.shape), file_uri, embedding_dim))
+    tokens = _read_tokens_file(cached_path(_get_tokens_path(file_uri)))
+    if len(tokens) != vectors.shape[0]:
+        raise ConfigurationError("The tokens file for {0} has {1} tokens, but there are {2} "
+                                 "embeddings".format(file_uri, len(tokens), vectors.shape[0]))
+
+    index_to_token = vocab.get_index_to_token_vocabulary(namespace)
+    vocab_size = vocab.get_vocab_size(namespace)
+    tokens_to_keep = set(index_to_token.values())
+    # If a token appears more than once, we use its last vector, like we do for a text file.
+    token_rows = {token: row for row, token in enumerate(tokens) if token in tokens_to_keep}
+
+    vocab_indices = []
+    rows = []
+    for i in range(vocab_size):
+        token = index_to_token[i]
+        if token in token_rows:
+            vocab_indices.append(i)
+            rows.append(token_rows[token])
+        else:
+            logger.debug("Token %s was not found in the embedding file. Initialising randomly.", token)
+
+    if not rows:
+        raise ConfigurationError("No embeddings found for the vocabulary in {0}; you probably "
+                                 "didn't pre-populate your Vocabulary".format(file_uri))
+
+    # Reading the rows in the order they are stored in makes the reads from disk sequential.
+    row_order = numpy.argsort(rows)
+    found_rows = numpy.array(rows)[row_order]
+    found_vocab_indices = numpy.array(vocab_indices)[row_order]
+    found_embeddings = numpy.array(vectors[found_rows], dtype=numpy.float32)
+    embeddings_mean = float(numpy.mean(found_embeddings))
+    embeddings_std = float(numpy.std(found_embeddings))
+
+    logger.info("Initializing pre-trained embedding layer")
+    embedding_matrix = torch.FloatTensor(vocab_size, embedding_dim).normal_(embeddings_mean,
+                                                                            embeddings_std)
+    embedding_matrix[torch.from_numpy(found_vocab_indices)] = torch.from_numpy(found_embeddings)
+
+    logger.info("Pretrained embeddings were found for %d out of %d tokens",
+                len(rows), vocab_size)
+
+    return embedding_matrix
+
+
+def convert_embeddings_text_file(file_uri: str,
+                                 output_path: str = None,
+                                 embedding_dim: int = None) -> str:
+    """
+    Converts a pretrained embeddings text file, which can be compressed or inside an archive (see
+    ``Embedding.from_params``), into a binary format that is much faster to load: a ``.npy`` file
+    with a float32 matrix holding the vectors, and a ``.tokens`` file next to it with the token of
+    each row, one per line.
+
+    Parameters
+    ----------
+    file_uri : ``str``
+        The path, URL or archive URI of the text file.
+    output_path : ``str``, optional (default = None)
+        Where to write the ``.npy`` file (the ``.tokens`` file goes next to it).  By default we
+        write it next to the text file (or next to its cached copy, for a URL), where
+        :func:`_read_pretrained_embeddings_file` finds it, so you can keep using the text file's
+        URI as the ``pretrained_file``.
+    embedding_dim : ``int``, optional (default = None)
+        The dimension of the embeddings.  Lines with a different number of dimensions are skipped.
+        By default, we use the dimension of the first line.
+
+    Returns
+    -------
+    The path of the ``.npy`` file.
+    """
+    output_path = output_path or _get_converted_embeddings_path(file_uri)
+    if get_file_extension(output_path) != '.npy':
+        raise ConfigurationError("The converted embeddings file must be a .npy file, got {}".format(output_path))
+    tokens_path = _get_tokens_path(output_path)
+    output_directory = os.path.dirname(os.path.abspath(output_path))
+
+    # We don't know how many vectors there are until we have read them all, so we first write
+    # the raw vectors to a temporary file, and then add the ``.npy`` header in front of them.
+    vectors_file = tempfile.NamedTemporaryFile(dir=output_directory, delete=False)
+    tokens_file = tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n',
+                                              dir=output_directory, delete=False)
+    npy_file = tempfile.NamedTemporaryFile(dir=output_directory, delete=False)
+    num_embeddings = 0
+    try:
+        with vectors_file, tokens_file, EmbeddingsTextFile(file_uri) as embeddings_file:
+            for line in Tqdm.tqdm(embeddings_file):
+                fields = line.rstrip().split(' ')
+                if embedding_dim is None:
+                    embedding_dim = len(fields) - 1
+                if len(fields) - 1 != embedding_dim:
+                    logger.warning("Found line with wrong number of dimensions (expected: %d; actual: %d): %s",
+                                   embedding_dim, len(fields) - 1, line)
+                    continue
+                vectors_file.write(numpy.asarray(fields[1:], dtype='<f4').tobytes())
+                tokens_file.write(fields[0] + '\n')
+                num_embeddings += 1
+        if not num_embeddings:
+            raise ConfigurationError("No embeddings found in {}".format(file_uri))
+
+        with npy_file, open(vectors_file.name, 'rb') as raw_vectors_file:
+            header = {'descr': '<f4', 'fortran_order': False, 'shape': (num_embeddings, embedding_dim)}
+            numpy.lib.format.write_array_header_1_0(npy_file, header)
+            shutil.copyfileobj(raw_vectors_file, npy_file)
+
+        # The ``.npy`` file goes in place last, so that we never read it with a stale tokens file.
+        os.replace(tokens_file.name, tokens_path)
+        os.replace(npy_file.name, output_path)
+    finally:
+        for temporary_file in [vectors_file, tokens_file, npy_file]:
+            temporary_file.close()
+            if os.path.exists(temporary_file.name):
+                os.remove(temporary_file.name)
+
+    logger.info("Wrote %d embeddings of dimension %d to %s", num_embeddings, embedding_dim, output_path)
+    return output_path
+
+
+def _get_converted_embeddings_path(file_uri: str) -> str:
+    """
+    Where :func:`convert_embeddings_text_file` writes the binary version of a text file by
+    default: next to the (cached) file, with the path inside the archive (if any) and ``.npy``
+    appended to its name.
+    """
+    main_file_uri, path_inside_archive = parse_embeddings_file_uri(file_uri)
+    converted_path = cached_path(main_file_uri)
+    if path_inside_archive:
+        converted_path += '_' + path_inside_archive.replace('/', '_')
+    return converted_path + '.npy'
+
+
+def _get_tokens_path(npy_file_uri: str) -> str:
+    return npy_file_uri[:-len('.npy')] + '.tokens'
+
+
+def _is_up_to_date(converted_path: str, file_uri: str) -> bool:
+    if not os.path.exists(converted_path) or not os.path.exists(_get_tokens_path(converted_path)):
+        return False
+    main_file_path = cached_path(parse_embeddings_file_uri(file_uri).main_file_uri)
+    if os.path.getmtime(converted_path) < os.path.getmtime(main_file_path):
+        logger.warning("Ignoring the converted embeddings file %s, because %s is newer",
+                       converted_path, main_file_path)
+        return False
+    return True
+
+
+def _read_tokens_file(tokens_path: str) -> List[str]:
+    # Tokens can contain characters that ``str.splitlines`` would split on, so we only split on
+    # the newlines we wrote.
+    with open(tokens_path, encoding='utf-8', newline='\n') as tokens_file:
+        return tokens_file.read().split('\n')[:-1]
+
+
 def format_embeddings_file_uri(main_file_path_or_url: str,
                                path_inside_archive: Optional[str] = None) -> str:
     if path_inside_archive:
@@ -1,6 +1,8 @@
 from collections import defaultdict
 from typing import Dict, List
 
+import torch
+
 from allennlp.common.registrable import FromParams
 from allennlp.nn.decoding.decoder_step import DecoderStep
 from allennlp.nn.decoding.decoder_state import DecoderState
@@ -73,11 +75,35 @@ class BeamSearch(FromParams):
                 # ones here, without an additional sort.
                 states.extend(batch_states[:self._beam_size])
             step_num += 1
+        return self._rank_finished_states(finished_states)
+
+    def _rank_finished_states(self,
+                              finished_states: Dict[int, List[DecoderState]]) -> Dict[int, List[DecoderState]]:
+        """
+        Returns the ``beam_size`` best finished states for each instance.  Rather than getting the
+        score of every state separately, which would synchronize with the device once per state,
+        we pack all of the scores into a (num_instances, max_num_finished_states) tensor, padded
+        with ``-inf``, and rank them with a single ``topk`` call, so we only need to move one
+        tensor of indices back to the CPU.
+        """
         best_states: Dict[int, List[DecoderState]] = {}
-        for batch_index, batch_states in finished_states.items():
-            # The time this sort takes is pretty negligible, no particular need to optimize this
-            # yet.  Maybe with a larger beam size...
-            finished_to_sort = [(-state.score[0].item(), state) for state in batch_states]
-            finished_to_sort.sort(key=lambda x: x[0])
-            best_states[batch_index] = [state[1] for state in finished_to_sort[:self._beam_size]]
+        if not finished_states:
+            return best_states
+        batch_indices = sorted(finished_states)
+        num_finished = [len(finished_states[batch_index]) for batch_index in batch_indices]
+        max_num_finished = max(num_finished)
+        # (total_num_finished,)
+        scores = torch.cat([state.score[0].detach().view(-1)
+                            for batch_index in batch_indices
+                            for state in finished_states[batch_index]])
+        rows = [row for row, count in enumerate(num_finished) for _ in range(count)]
+        columns = [column for count in num_finished for column in range(count)]
+        # (num_instances, max_num_finished_states)
+        packed_scores = scores.new_full((len(batch_indices), max_num_finished), -float('inf'))
+        packed_scores[torch.tensor(rows, dtype=torch.long, device=scores.device),
+                      torch.tensor(columns, dtype=torch.long, device=scores.device)] = scores
+        _, top_indices = packed_scores.topk(min(self._beam_size, max_num_finished), dim=1)
+        for batch_index, count, indices in zip(batch_indices, num_finished, top_indices.cpu().tolist()):
+            batch_states = finished_states[batch_index]
+            best_states[batch_index] = [batch_states[index] for index in indices if index < count]
         return best_states
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 import torch
 
@@ -30,23 +30,29 @@ class ChecklistState:
     terminal_indices_dict: ``Dict[int, int]``, optional
         Mapping from batch action indices to indices in any of the four vectors above. If not
         provided, this mapping will be computed here.
+    terminal_action_list : ``List[int]``, optional
+        The contents of ``terminal_actions`` as a list on the CPU, so that decoders can use them
+        without copying them from the device at every step.  If not provided (or if
+        ``terminal_indices_dict`` isn't), this will be computed here.
     """
     def __init__(self,
                  terminal_actions: torch.Tensor,
                  checklist_target: torch.Tensor,
                  checklist_mask: torch.Tensor,
                  checklist: torch.Tensor,
-                 terminal_indices_dict: Dict[int, int] = None) -> None:
+                 terminal_indices_dict: Dict[int, int] = None,
+                 terminal_action_list: List[int] = None) -> None:
         self.terminal_actions = terminal_actions
         self.checklist_target = checklist_target
         self.checklist_mask = checklist_mask
         self.checklist = checklist
-        if terminal_indices_dict is not None:
+        if terminal_indices_dict is not None and terminal_action_list is not None:
             self.terminal_indices_dict = terminal_indices_dict
+            self.terminal_action_list = terminal_action_list
         else:
             self.terminal_indices_dict: Dict[int, int] = {}
-            for checklist_index, batch_action_index in enumerate(terminal_actions.detach().cpu()):
-                action_index = int(batch_action_index[0])
+            self.terminal_action_list: List[int] = terminal_actions.detach().view(-1).cpu().tolist()
+            for checklist_index, action_index in enumerate(self.terminal_action_list):
                 if action_index == -1:
                     continue
                 self.terminal_indices_dict[action_index] = checklist_index
@@ -61,7 +67,8 @@ class ChecklistState:
                                              checklist_target=self.checklist_target,
                                              checklist_mask=self.checklist_mask,
                                              checklist=new_checklist,
-                                             terminal_indices_dict=self.terminal_indices_dict)
+                                             terminal_indices_dict=self.terminal_indices_dict,
+                                             terminal_action_list=self.terminal_action_list)
         return new_checklist_state
 
     def get_balance(self) -> torch.Tensor:
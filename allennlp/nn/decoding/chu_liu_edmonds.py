@@ -1,5 +1,6 @@
+from typing import Iterable, List, Optional, Set, Tuple, Dict
+from multiprocessing.pool import Pool
 
-from typing import List, Set, Tuple, Dict
 import numpy
 
 from allennlp.common.checks import ConfigurationError
@@ -40,51 +41,182 @@ def decode_mst(energy: numpy.ndarray,
     else:
         energy = energy[:length, :length]
         label_id_matrix = None
-    # get original score matrix
-    original_score_matrix = energy
-    # initialize score matrix to original score matrix
-    score_matrix = numpy.array(original_score_matrix, copy=True)
 
+    heads = numpy.zeros([max_length], numpy.int32)
+    if length > 0:
+        heads[:length] = maximum_spanning_tree(energy)
+    if has_labels:
+        head_type = numpy.ones([max_length], numpy.int32)
+        # Set the head type of the symbolic head to be zero, arbitrarily.
+        head_type[0] = 0
+        children = numpy.arange(1, length)
+        head_type[children] = label_id_matrix[heads[children], children]
+    else:
+        head_type = None
+
+    return heads, head_type
+
+
+def batch_decode_mst(energy: numpy.ndarray,
+                     lengths: Iterable[int],
+                     has_labels: bool = True,
+                     pool: Pool = None) -> Tuple[numpy.ndarray, Optional[numpy.ndarray]]:
+    """
+    Runs :func:`decode_mst` on every sentence in a padded batch, returning the stacked heads (and
+    head types, if ``has_labels``).  If a ``multiprocessing`` ``pool`` is given, the sentences are
+    decoded in parallel by its processes.
+
+    Parameters
+    ----------
+    energy : ``numpy.ndarray``, required.
+        A tensor with shape (batch_size, num_labels, timesteps, timesteps), or (batch_size,
+        timesteps, timesteps) if has_labels is ``False``.
+    lengths : ``Iterable[int]``, required.
+        The length of each sentence in the batch.
+    has_labels : ``bool``, optional, (default = True)
+        Whether the graph has labels or not.
+    pool : ``multiprocessing.pool.Pool``, optional, (default = None)
+        A pool of processes to decode the sentences with.
+    """
+    arguments = [(sentence_energy, int(length), has_labels) for sentence_energy, length in zip(energy, lengths)]
+    if pool is not None and len(arguments) > 1:
+        results = pool.starmap(decode_mst, arguments)
+    else:
+        results = [decode_mst(*sentence_arguments) for sentence_arguments in arguments]
+    heads = numpy.stack([head for head, _ in results])
+    head_types = numpy.stack([head_type for _, head_type in results]) if has_labels else None
+    return heads, head_types
+
+
+def maximum_spanning_tree(score_matrix: numpy.ndarray) -> numpy.ndarray:
+    """
+    Finds the maximum spanning arborescence rooted at node 0 of the complete directed graph with
+    edge weights ``score_matrix[head, child]``, using the Chu-Liu-Edmonds algorithm.  This finds
+    the same trees as :func:`chu_liu_edmonds`, but the greedy head selection and the cycle
+    contraction are done with vectorized NumPy operations on the whole score matrix, so only
+    finding cycles is done one node at a time.
+
+    Parameters
+    ----------
+    score_matrix : ``numpy.ndarray``, required.
+        A (length, length) array of edge scores.  The diagonal and the scores of edges into the
+        root are ignored.
+
+    Returns
+    -------
+    heads : ``numpy.ndarray``
+        A (length,) array containing the head of each node.  The head of the root is set to 0.
+    """
+    scores = numpy.array(score_matrix, dtype=numpy.float64, copy=True)
+    # Nodes can't be their own heads, and nothing can be the head of the root.
+    numpy.fill_diagonal(scores, -numpy.inf)
+    scores[:, 0] = -numpy.inf
+    heads = _maximum_spanning_arborescence(scores)
+    heads[0] = 0
+    return heads
+
+
+def _maximum_spanning_arborescence(scores: numpy.ndarray) -> numpy.ndarray:
+    """
+    Recursive step of :func:`maximum_spanning_tree`.  ``scores`` must already have ``-inf`` on its
+    diagonal and in its first column.
+    """
+    # Greedily pick the best head for every node.
+    heads = scores.argmax(axis=0)
+    cycle = _find_cycle_in_heads(heads)
+    if cycle is None:
+        return heads
+
+    # Contract the cycle into a single new node, which comes after all of the other nodes.
+    in_cycle = numpy.zeros(len(heads), dtype=bool)
+    in_cycle[cycle] = True
+    # The root is never in a cycle, so it stays at index 0.
+    rest = numpy.flatnonzero(~in_cycle)
+    num_rest = len(rest)
+    rest_indices = numpy.arange(num_rest)
+
+    # Entering the cycle at a node means replacing that node's edge in the cycle.
+    cycle_edge_scores = scores[heads[cycle], cycle]
+    # Shape: (num_rest, cycle_length)
+    entering_scores = scores[numpy.ix_(rest, cycle)] - cycle_edge_scores
+    best_entering = entering_scores.argmax(axis=1)
+    # Shape: (cycle_length, num_rest)
+    leaving_scores = scores[numpy.ix_(cycle, rest)]
+    best_leaving = leaving_scores.argmax(axis=0)
+
+    contracted_scores = numpy.full((num_rest + 1, num_rest + 1), -numpy.inf)
+    contracted_scores[:num_rest, :num_rest] = scores[numpy.ix_(rest, rest)]
+    contracted_scores[:num_rest, num_rest] = entering_scores[rest_indices, best_entering]
+    contracted_scores[num_rest, :num_rest] = leaving_scores[best_leaving, rest_indices]
+    contracted_heads = _maximum_spanning_arborescence(contracted_scores)
+
+    # Expand the cycle again.  Nodes in the cycle keep their heads from the cycle, except for the
+    # one that the best edge into the cycle enters.  Nodes whose head is the cycle get the
+    # node in the cycle with the best edge to them.
+    new_heads = heads.copy()
+    contracted_rest_heads = contracted_heads[1:num_rest]
+    from_cycle = contracted_rest_heads == num_rest
+    new_heads[rest[1:]] = numpy.where(from_cycle,
+                                      cycle[best_leaving[1:]],
+                                      rest[numpy.minimum(contracted_rest_heads, num_rest - 1)])
+    entering_head = contracted_heads[num_rest]
+    new_heads[cycle[best_entering[entering_head]]] = rest[entering_head]
+    return new_heads
+
+
+def _find_cycle_in_heads(heads: numpy.ndarray) -> Optional[numpy.ndarray]:
+    """
+    Returns the nodes of a cycle in the graph given by ``heads`` (ignoring the head of the root,
+    node 0), or ``None`` if there isn't one.
+    """
+    # The node we started from when we first visited each node; 0 means not visited yet.
+    visited_from = [0] * len(heads)
+    for start in range(1, len(heads)):
+        if visited_from[start]:
+            continue
+        node = start
+        while node != 0 and not visited_from[node]:
+            visited_from[node] = start
+            node = heads[node]
+        if node != 0 and visited_from[node] == start:
+            # We came back to a node we saw on this walk, so it's on a cycle.
+            cycle = [node]
+            next_node = heads[node]
+            while next_node != node:
+                cycle.append(next_node)
+                next_node = heads[next_node]
+            return numpy.array(cycle)
+    return None
+
+
+def recursive_maximum_spanning_tree(score_matrix: numpy.ndarray) -> List[int]:
+    """
+    Returns the heads of the maximum spanning tree of a single ``(length, length)`` score matrix,
+    like :func:`maximum_spanning_tree`, but using the original, recursive implementation
+    (:func:`chu_liu_edmonds`).  This is much slower, and is only kept as a reference to test and
+    benchmark the vectorized implementation against.
+    """
+    length = score_matrix.shape[0]
+    score_matrix = numpy.array(score_matrix, copy=True)
     old_input = numpy.zeros([length, length], dtype=numpy.int32)
     old_output = numpy.zeros([length, length], dtype=numpy.int32)
-    current_nodes = [True for _ in range(length)]
     representatives: List[Set[int]] = []
-
     for node1 in range(length):
-        original_score_matrix[node1, node1] = 0.0
         score_matrix[node1, node1] = 0.0
         representatives.append({node1})
-
         for node2 in range(node1 + 1, length):
             old_input[node1, node2] = node1
             old_output[node1, node2] = node2
-
             old_input[node2, node1] = node2
             old_output[node2, node1] = node1
-
     final_edges: Dict[int, int] = {}
-
-    # The main algorithm operates inplace.
-    chu_liu_edmonds(length, score_matrix, current_nodes,
-                    final_edges, old_input, old_output, representatives)
-
-    heads = numpy.zeros([max_length], numpy.int32)
-    if has_labels:
-        head_type = numpy.ones([max_length], numpy.int32)
-        # Set the head type of the symbolic head to be zero, arbitrarily.
-        head_type[0] = 0
-    else:
-        head_type = None
-
+    chu_liu_edmonds(length, score_matrix, [True] * length, final_edges,
+                    old_input, old_output, representatives)
+    heads = [0] * length
     for child, parent in final_edges.items():
         heads[child] = parent
-        if has_labels and child != 0:
-            head_type[child] = label_id_matrix[parent, child]
+    return heads
 
-    # Set the head of the symbolic head to be zero, arbitrarily.
-    heads[0] = 0
-
-    return heads, head_type
 
 def chu_liu_edmonds(length: int,
                     score_matrix: numpy.ndarray,
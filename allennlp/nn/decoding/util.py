@@ -45,3 +45,81 @@ def construct_prefix_tree(targets: Union[torch.Tensor, List[List[List[int]]]],
                 history = history + (action,)
         batched_allowed_transitions.append(allowed_transitions)
     return batched_allowed_transitions
+
+
+def top_actions_per_instance(log_probs: torch.Tensor,
+                             batch_indices: List[int],
+                             valid_actions: List[List[bool]],
+                             max_actions: Optional[int] = None) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Ranks the actions that a group of decoder states can take next, separately for each batch
+    instance in the group, keeping the scores on the device.  We pack the scores into a
+    ``(num_instances, max_states_per_instance * num_actions)`` tensor, padded with ``-inf``, and
+    rank every instance with a single ``topk`` call, so the only thing that has to come back to the
+    CPU is one tensor of indices, which the caller needs anyway to know which actions were taken.
+
+    Parameters
+    ----------
+    log_probs : ``torch.Tensor``
+        The score of each group element taking each action, with shape ``(group_size,
+        num_actions)``.
+    batch_indices : ``List[int]``
+        The batch instance that each group element belongs to.
+    valid_actions : ``List[List[bool]]``
+        Whether each group element can take each action, with the same shape as ``log_probs``.
+        Padding actions, and actions that a ``DecoderTrainer`` does not allow, should be
+        ``False``.
+    max_actions : ``int``, optional (default = None)
+        If given, we return at most this many actions for each instance; otherwise we return all
+        of the valid ones.
+
+    Returns
+    -------
+    A dictionary from batch index to the ``(group_index, action_index)`` pairs of that instance's
+    best actions, best first, in order of batch index.  Instances without any valid actions are
+    left out.
+    """
+    num_actions = log_probs.size(-1)
+    instance_rows: Dict[int, int] = {}
+    # The group indices of the elements of each instance, and each group element's position there.
+    instance_members: List[List[int]] = []
+    positions: List[int] = []
+    for group_index, batch_index in enumerate(batch_indices):
+        if batch_index not in instance_rows:
+            instance_rows[batch_index] = len(instance_members)
+            instance_members.append([])
+        members = instance_members[instance_rows[batch_index]]
+        positions.append(len(members))
+        members.append(group_index)
+    num_valid = [sum(sum(valid_actions[group_index]) for group_index in members)
+                 for members in instance_members]
+    num_to_keep = max(num_valid)
+    if max_actions is not None:
+        num_to_keep = min(num_to_keep, max_actions)
+    if num_to_keep == 0:
+        return {}
+
+    valid_mask = log_probs.new_tensor(valid_actions, dtype=torch.uint8)
+    scores = log_probs.detach().masked_fill(valid_mask == 0, -float('inf'))
+    max_members = max(len(members) for members in instance_members)
+    # (num_instances, max_members, num_actions)
+    packed_scores = scores.new_full((len(instance_members), max_members, num_actions), -float('inf'))
+    rows = log_probs.new_tensor([instance_rows[batch_index] for batch_index in batch_indices],
+                                dtype=torch.long)
+    packed_scores[rows, log_probs.new_tensor(positions, dtype=torch.long)] = scores
+    _, top_indices = packed_scores.view(len(instance_members), -1).topk(num_to_keep, dim=1)
+
+    best_actions: Dict[int, List[Tuple[int, int]]] = {}
+    top_indices_cpu = top_indices.cpu().tolist()
+    for batch_index in sorted(instance_rows):
+        row = instance_rows[batch_index]
+        members = instance_members[row]
+        instance_actions = []
+        # Instances with fewer valid actions than ``num_to_keep`` get some padding back, which we skip.
+        for packed_index in top_indices_cpu[row][:num_valid[row]]:
+            position, action_index = divmod(packed_index, num_actions)
+            if position < len(members) and valid_actions[members[position]][action_index]:
+                instance_actions.append((members[position], action_index))
+        if instance_actions:
+            best_actions[batch_index] = instance_actions
+    return best_actions
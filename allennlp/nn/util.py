@@ -41,6 +41,26 @@ def batch_tensor_dicts(tensor_dicts: List[Dict[str, torch.Tensor]],
     return batched_tensors
 
 
+def move_to_device(obj, cuda_device: int):
+    """
+    Given a structure (possibly) containing Tensors on the CPU, move all the Tensors to the
+    specified GPU (or do nothing, if they should be on the CPU).  Dictionaries, lists and tuples
+    are traversed recursively; anything else is returned as is.
+    """
+    if cuda_device < 0:
+        return obj
+    elif isinstance(obj, torch.Tensor):
+        return obj.cuda(cuda_device)
+    elif isinstance(obj, dict):
+        return {key: move_to_device(value, cuda_device) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [move_to_device(item, cuda_device) for item in obj]
+    elif isinstance(obj, tuple):
+        return tuple([move_to_device(item, cuda_device) for item in obj])
+    else:
+        return obj
+
+
 def get_lengths_from_binary_sequence_mask(mask: torch.Tensor):
     """
     Compute sequence lengths for each batch element in a tensor using a
@@ -312,6 +332,102 @@ def viterbi_decode(tag_sequence: torch.Tensor,
     return viterbi_path, viterbi_score
 
 
+def batched_viterbi_decode(tag_sequences: torch.Tensor,
+                           transition_matrix: torch.Tensor,
+                           mask: torch.Tensor = None,
+                           tag_observations: torch.LongTensor = None) -> Tuple[List[List[int]], torch.Tensor]:
+    """
+    Performs the same Viterbi decoding as :func:`viterbi_decode`, but for a whole batch of
+    (padded) sequences at once.  We still step through the timesteps one at a time, but every
+    step is a handful of tensor operations over the whole batch, instead of a Python loop over
+    the sequences in the batch.
+
+    Parameters
+    ----------
+    tag_sequences : torch.Tensor, required.
+        A tensor of shape (batch_size, sequence_length, num_tags) representing scores for
+        a set of tags over each sequence in the batch.
+    transition_matrix : torch.Tensor, required.
+        A tensor of shape (num_tags, num_tags) representing the binary potentials
+        for transitioning between a given pair of tags.
+    mask : torch.Tensor, optional, (default = None)
+        A tensor of shape (batch_size, sequence_length) which is 1 for the elements of each
+        sequence and 0 for padding.  The padding must come after the elements.  If not given, all
+        of the sequences are assumed to be ``sequence_length`` long.
+    tag_observations : torch.LongTensor, optional, (default = None)
+        A tensor of shape (batch_size, sequence_length) containing the class ids of observed
+        elements in each sequence, with unobserved elements being set to -1.  See
+        :func:`viterbi_decode`.
+
+    Returns
+    -------
+    viterbi_paths : List[List[int]]
+        The tag indices of the maximum likelihood tag sequence for each sequence in the batch,
+        without any padding.
+    viterbi_scores : torch.Tensor
+        A tensor of shape (batch_size,) containing the score of each viterbi path.
+    """
+    batch_size, sequence_length, num_tags = list(tag_sequences.size())
+    if mask is None:
+        mask = tag_sequences.new_ones(batch_size, sequence_length)
+    mask = mask.byte()
+    if tag_observations is None:
+        tag_observations = tag_sequences.new_full((batch_size, sequence_length), -1).long()
+    elif list(tag_observations.size()) != [batch_size, sequence_length]:
+        raise ConfigurationError("Observations were provided, but they were not the same shape "
+                                 "as the sequences. Found sequences of shape: {} and evidence of shape: {}"
+                                 .format(list(tag_sequences.size()), list(tag_observations.size())))
+    tag_observations = tag_observations.long()
+    observed = tag_observations != -1
+    observed_tags = tag_observations.clamp(min=0)
+
+    if observed.any():
+        # Warn the user if they have passed invalid/extremely unlikely evidence.
+        consecutive_observations = observed[:, :-1] & observed[:, 1:]
+        pairwise_potentials = transition_matrix[observed_tags[:, :-1], observed_tags[:, 1:]]
+        if ((pairwise_potentials < -10000) & consecutive_observations).any():
+            logger.warning("The pairwise potential between tags you have passed as "
+                           "observations is extremely unlikely. Double check your evidence "
+                           "or transition potentials!")
+
+    # Observed timesteps get a score of 100000 for the observed tag and 0 for everything else,
+    # regardless of the path so far, just like in ``viterbi_decode``.
+    observation_scores = tag_sequences.new_zeros(batch_size, sequence_length, num_tags)
+    observation_scores.scatter_(2, observed_tags.unsqueeze(-1), 100000.)
+    observed = observed.unsqueeze(-1).expand_as(observation_scores)
+    expanded_mask = mask.unsqueeze(-1).expand_as(observation_scores)
+
+    # Padding timesteps keep the scores from the previous timestep and point back to the same
+    # tag, so that the path for each sequence ends with its real last element.
+    staying_put = torch.arange(num_tags, dtype=torch.long, device=tag_sequences.device)
+    staying_put = staying_put.unsqueeze(0).expand(batch_size, num_tags)
+
+    path_scores = torch.where(observed[:, 0], observation_scores[:, 0], tag_sequences[:, 0])
+    path_indices = []
+    for timestep in range(1, sequence_length):
+        # Add pairwise potentials to current scores.
+        # Shape: (batch_size, num_tags, num_tags)
+        summed_potentials = path_scores.unsqueeze(-1) + transition_matrix
+        scores, paths = torch.max(summed_potentials, 1)
+        new_path_scores = torch.where(observed[:, timestep],
+                                      observation_scores[:, timestep],
+                                      tag_sequences[:, timestep] + scores)
+        path_scores = torch.where(expanded_mask[:, timestep], new_path_scores, path_scores)
+        path_indices.append(torch.where(expanded_mask[:, timestep], paths, staying_put))
+
+    # Construct the most likely sequences backwards.
+    viterbi_scores, best_tags = torch.max(path_scores, -1)
+    viterbi_paths = [best_tags]
+    for backward_timestep in reversed(path_indices):
+        best_tags = backward_timestep.gather(1, best_tags.unsqueeze(-1)).squeeze(-1)
+        viterbi_paths.append(best_tags)
+    # Reverse the backward paths.
+    viterbi_paths.reverse()
+    all_paths = torch.stack(viterbi_paths, dim=1).tolist()
+    lengths = mask.long().sum(-1).tolist()
+    return [path[:length] for path, length in zip(all_paths, lengths)], viterbi_scores
+
+
 def get_text_field_mask(text_field_tensors: Dict[str, torch.Tensor],
                         num_wrapping_dims: int = 0) -> torch.LongTensor:
     """
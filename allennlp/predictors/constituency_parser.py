@@ -101,7 +101,7 @@ class ConstituencyParserPredictor(Predictor):
 
     @overrides
     def predict_batch_instance(self, instances: List[Instance]) -> List[JsonDict]:
-        outputs = self._model.forward_on_instances(instances)
+        outputs = self._forward_on_instances(instances)
         for output in outputs:
             # format the NLTK tree as a string on a single line.
             tree = output.pop("trees")
@@ -1,10 +1,14 @@
-from typing import List
+from collections import defaultdict
+from typing import Dict, List, Tuple
 import json
 
+import numpy
+
 from allennlp.common import Registrable
 from allennlp.common.checks import ConfigurationError
 from allennlp.common.util import JsonDict, sanitize
 from allennlp.data import DatasetReader, Instance
+from allennlp.data.iterators.bucket_iterator import sort_by_padding
 from allennlp.models import Model
 from allennlp.models.archival import Archive, load_archive
 
@@ -28,6 +32,59 @@ class Predictor(Registrable):
     def __init__(self, model: Model, dataset_reader: DatasetReader) -> None:
         self._model = model
         self._dataset_reader = dataset_reader
+        self._sub_batch_size: int = None
+        self._sorting_keys: List[Tuple[str, str]] = None
+
+    def sort_batches_by_length(self,
+                               sub_batch_size: int,
+                               sorting_keys: List[Tuple[str, str]] = None) -> None:
+        """
+        Makes batch predictions (:func:`predict_batch_json` and :func:`predict_batch_instance`)
+        sort their instances by padding length, the same way the
+        :class:`~allennlp.data.iterators.bucket_iterator.BucketIterator` does, and run the model
+        on sub-batches of at most ``sub_batch_size`` instances of similar length.  This wastes
+        much less computation on padding when the inputs have very different lengths.  The
+        results are returned in the original order, so callers can't tell the difference.
+
+        Parameters
+        ----------
+        sub_batch_size : ``int``
+            The largest number of instances to run through the model at once.
+        sorting_keys : ``List[Tuple[str, str]]``, optional (default = None)
+            The ``(field_name, padding_key)`` pairs to sort by.  By default, we sort by the
+            ``"num_tokens"`` of every field that has one, in order of field name.
+        """
+        self._sub_batch_size = sub_batch_size
+        self._sorting_keys = sorting_keys
+
+    def _forward_on_instances(self, instances: List[Instance]) -> List[Dict[str, numpy.ndarray]]:
+        """
+        Runs the model on the ``instances``, in length-sorted sub-batches if
+        :func:`sort_batches_by_length` has been called.
+        """
+        if self._sub_batch_size is None or len(instances) <= 1:
+            return self._model.forward_on_instances(instances)
+
+        sorting_keys = self._sorting_keys
+        if sorting_keys is None:
+            # Make sure the first instance is indexed before calling .get_padding_lengths.
+            instances[0].index_fields(self._model.vocab)
+            sorting_keys = [(field_name, padding_key)
+                            for field_name, lengths in sorted(instances[0].get_padding_lengths().items())
+                            for padding_key in lengths
+                            if padding_key == "num_tokens"]
+        # We remember where each instance was, so that we can put the outputs back in the
+        # original order.
+        positions: Dict[int, List[int]] = defaultdict(list)
+        for position, instance in enumerate(instances):
+            positions[id(instance)].append(position)
+        sorted_instances = sort_by_padding(instances, sorting_keys, self._model.vocab)
+        outputs: List[Dict[str, numpy.ndarray]] = [None] * len(instances)
+        for start in range(0, len(sorted_instances), self._sub_batch_size):
+            sub_batch = sorted_instances[start:start + self._sub_batch_size]
+            for instance, output in zip(sub_batch, self._model.forward_on_instances(sub_batch)):
+                outputs[positions[id(instance)].pop()] = output
+        return outputs
 
     def load_line(self, line: str) -> JsonDict:  # pylint: disable=no-self-use
         """
@@ -64,7 +121,7 @@ class Predictor(Registrable):
         return self.predict_batch_instance(instances)
 
     def predict_batch_instance(self, instances: List[Instance]) -> List[JsonDict]:
-        outputs = self._model.forward_on_instances(instances)
+        outputs = self._forward_on_instances(instances)
         return sanitize(outputs)
 
     def _batch_json_to_instances(self, json_dicts: List[JsonDict]) -> List[Instance]:
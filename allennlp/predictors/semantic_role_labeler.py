@@ -148,7 +148,7 @@ class SemanticRoleLabelerPredictor(Predictor):
         # Run the model on the batches.
         outputs = []
         for batch in batched_instances:
-            outputs.extend(self._model.forward_on_instances(batch))
+            outputs.extend(self._forward_on_instances(batch))
 
         verbs_per_sentence = [len(sent) for sent in instances_per_sentence]
         return_dicts: List[JsonDict] = [{"verbs": []} for x in inputs]
@@ -198,7 +198,7 @@ class SemanticRoleLabelerPredictor(Predictor):
         if not instances:
             return sanitize({"verbs": [], "words": self._tokenizer.split_words(inputs["sentence"])})
 
-        outputs = self._model.forward_on_instances(instances)
+        outputs = self._forward_on_instances(instances)
 
         results = {"verbs": [], "words": outputs[0]["words"]}
         for output in outputs:
@@ -71,7 +71,7 @@ class WikiTablesParserPredictor(Predictor):
 
 
     def predict_batch_instance(self, instances: List[Instance]) -> List[JsonDict]:
-        outputs = self._model.forward_on_instances(instances)
+        outputs = self._forward_on_instances(instances)
         for output in outputs:
             output['answer'] = self._execute_logical_form_on_table(output['logical_form'],
                                                                    output['original_table'])
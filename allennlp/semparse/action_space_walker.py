@@ -1,10 +1,92 @@
+from array import array
 from collections import defaultdict
-from typing import List, Dict, Set
+from multiprocessing import Pool
+from typing import List, Dict, Optional, Set, Tuple
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy
 
 from allennlp.common.util import START_SYMBOL
 from allennlp.semparse.worlds.world import World
 from allennlp.semparse.type_declarations import type_declaration as types
 
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# For each non-terminal, the ids of the actions that expand it, each with the non-terminals on its
+# right side in the order they need to be pushed onto the buffer of non-terminals to expand.
+Expansions = Dict[str, List[Tuple[int, Tuple[str, ...]]]]  # pylint: disable=invalid-name
+
+
+def _walk_from_starting_type(expansions: Expansions,
+                             start_action_id: int,
+                             starting_type: str,
+                             indexed_action_ids: Set[int],
+                             max_path_length: int) -> Tuple[array, array, List[int], List[int],
+                                                            Dict[int, List[int]]]:
+    """
+    Collects all of the completed paths of at most ``max_path_length`` steps that start with the
+    action ``start_action_id``, which produces ``starting_type``.
+
+    The paths are stored in a trie, so that paths share their common prefixes instead of each
+    having a copy of them: node ``i`` is the path made of the path at node ``parents[i]`` followed
+    by the action ``node_actions[i]``, and node 0 is the path made of just the start action.  The
+    buffer of non-terminals that still need to be expanded for each incomplete path is a linked
+    list of ``(non_terminal, rest_of_buffer)`` tuples, so expanding a non-terminal doesn't copy the
+    rest of the buffer either.
+
+    Returns the trie, the nodes and lengths of the completed paths (in the order we completed
+    them, which is sorted by length), and, for each action in ``indexed_action_ids``, the
+    positions in that list of the completed paths that contain the action.
+    """
+    # pylint: disable=too-many-locals
+    parents = array('l', [-1])
+    node_actions = array('l', [start_action_id])
+    completed_nodes: List[int] = []
+    completed_lengths: List[int] = []
+    terminal_paths: Dict[int, List[int]] = defaultdict(list)
+    # Each incomplete path is (buffer of non-terminals to expand, trie node, path length).
+    incomplete_paths = [((starting_type, None), 0, 1)]
+    # Overview: At every iteration in the while loop below, we iterate over all incomplete paths,
+    # expand one non-terminal from the buffer in a depth-first fashion, get all possible next
+    # actions triggered by that non-terminal and add to the paths.  The extended paths are either
+    # 1) complete, in which case we record them, 2) longer than max_path_length, in which case they
+    # are discarded, or 3) neither, in which case they are expanded in the next iteration.  While
+    # the non-terminal expansion is done in a depth-first fashion, note that the search over the
+    # action space itself is breadth-first, so paths are completed in order of their length.
+    while incomplete_paths:
+        next_paths = []
+        for (nonterminal, rest_of_buffer), node, length in incomplete_paths:
+            for action_id, right_side_nonterminals in expansions[nonterminal]:
+                buffer = rest_of_buffer
+                for right_side_nonterminal in right_side_nonterminals:
+                    buffer = (right_side_nonterminal, buffer)
+                # An empty buffer means that we've completed this path.  Otherwise we only keep
+                # paths that are shorter than max_path_length.
+                if buffer is not None and length + 1 > max_path_length:
+                    continue
+                parents.append(node)
+                node_actions.append(action_id)
+                new_node = len(parents) - 1
+                if buffer is None:
+                    completed_nodes.append(new_node)
+                    completed_lengths.append(length + 1)
+                else:
+                    next_paths.append((buffer, new_node, length + 1))
+        incomplete_paths = next_paths
+
+    # Indexing completed paths by the terminal-producing actions they contain.
+    for path_index, node in enumerate(completed_nodes):
+        while node >= 0:
+            action_id = node_actions[node]
+            if action_id in indexed_action_ids:
+                terminal_paths[action_id].append(path_index)
+            node = parents[node]
+    return parents, node_actions, completed_nodes, completed_lengths, dict(terminal_paths)
+
 
 class ActionSpaceWalker:
     """
@@ -13,6 +95,10 @@ class ActionSpaceWalker:
     class also has some utilities for indexing logical forms to efficiently retrieve required
     subsets.
 
+    The completed paths are kept in a trie of action ids, and the index from terminal-producing
+    actions to the paths that contain them is a bitset over paths for each action, so even a large
+    action space takes a modest amount of memory.
+
     Parameters
     ----------
     world : ``World``
@@ -20,64 +106,155 @@ class ActionSpaceWalker:
     max_path_length : ``int``
         The maximum path length till which the action space will be explored. Paths longer than this
         length will be discarded.
+    num_processes : ``int``, optional (default = 1)
+        The paths from different starting types are independent, so if this is more than one, we
+        walk from the starting types in parallel, with this many processes.
+    cache_directory : ``str``, optional (default = None)
+        If given, the completed paths and their index are saved to a file in this directory after
+        we walk the action space, and a walker with the same grammar and ``max_path_length`` loads
+        them from there instead of walking again.
     """
-    def __init__(self, world: World, max_path_length: int) -> None:
+    def __init__(self,
+                 world: World,
+                 max_path_length: int,
+                 num_processes: int = 1,
+                 cache_directory: str = None) -> None:
         self._world = world
         self._max_path_length = max_path_length
-        self._completed_paths: List[List[str]] = None
-        self._terminal_path_index: Dict[str, Set[int]] = defaultdict(set)
-        self._length_sorted_paths: List[List[str]] = None
+        self._num_processes = num_processes
+        self._cache_directory = cache_directory
+        # The trie of paths, the trie nodes of the completed paths (sorted by length), and the
+        # strings for the action ids in the trie.
+        self._parents: numpy.ndarray = None
+        self._node_actions: numpy.ndarray = None
+        self._completed_path_nodes: numpy.ndarray = None
+        self._actions: List[str] = None
+        # Packed bitsets (see ``numpy.packbits``) of the completed paths containing each action.
+        self._terminal_path_index: Dict[str, numpy.ndarray] = None
 
     def _walk(self) -> None:
         """
-        Walk over action space to collect completed paths of at most ``self._max_path_length`` steps.
+        Walk over action space to collect completed paths of at most ``self._max_path_length`` steps,
+        or load them from the cache, if we've done this before.
         """
-        # Buffer of NTs to expand, previous actions
-        incomplete_paths = [([str(type_)], [f"{START_SYMBOL} -> {type_}"]) for type_ in
-                            self._world.get_valid_starting_types()]
-
-        self._completed_paths = []
-        actions = self._world.get_valid_actions()
-        # Overview: We keep track of the buffer of non-terminals to expand, and the action history
-        # for each incomplete path. At every iteration in the while loop below, we iterate over all
-        # incomplete paths, expand one non-terminal from the buffer in a depth-first fashion, get
-        # all possible next actions triggered by that non-terminal and add to the paths. Then, we
-        # check the expanded paths, to see if they are 1) complete, in which case they are
-        # added to completed_paths, 2) longer than max_path_length, in which case they are
-        # discarded, or 3) neither, in which case they are used to form the incomplete_paths for the
-        # next iteration of this while loop.
-        # While the non-terminal expansion is done in a depth-first fashion, note that the search over
-        # the action space itself is breadth-first.
-        while incomplete_paths:
-            next_paths = []
-            for nonterminal_buffer, history in incomplete_paths:
-                # Taking the last non-terminal added to the buffer. We're going depth-first.
-                nonterminal = nonterminal_buffer.pop()
-                # Iterating over all possible next actions.
-                for action in actions[nonterminal]:
-                    new_history = history + [action]
-                    new_nonterminal_buffer = nonterminal_buffer[:]
-                    # Since we expand the last action added to the buffer, the left child should be
-                    # added after the right child.
-                    for right_side_part in reversed(self._get_right_side_parts(action)):
-                        if types.is_nonterminal(right_side_part):
-                            new_nonterminal_buffer.append(right_side_part)
-                    next_paths.append((new_nonterminal_buffer, new_history))
-            incomplete_paths = []
-            for nonterminal_buffer, path in next_paths:
-                # An empty buffer means that we've completed this path.
-                if not nonterminal_buffer:
-                    # Indexing completed paths by the nonterminals they contain.
-                    next_path_index = len(self._completed_paths)
-                    for action in path:
-                        for value in self._get_right_side_parts(action):
-                            if not types.is_nonterminal(value):
-                                self._terminal_path_index[action].add(next_path_index)
-                    self._completed_paths.append(path)
-                # We're adding to incomplete_paths for the next iteration, only those paths that are
-                # shorter than the max_path_length. The remaining paths will be discarded.
-                elif len(path) <= self._max_path_length:
-                    incomplete_paths.append((nonterminal_buffer, path))
+        valid_actions = self._world.get_valid_actions()
+        starting_types = sorted(str(type_) for type_ in self._world.get_valid_starting_types())
+        cache_file = self._get_cache_file(valid_actions, starting_types)
+        if cache_file is not None and os.path.exists(cache_file):
+            logger.info(f"Loading completed paths from {cache_file}")
+            self._load(cache_file)
+            return
+
+        self._actions = sorted({action for nonterminal_actions in valid_actions.values()
+                                for action in nonterminal_actions} |
+                               {f"{START_SYMBOL} -> {type_}" for type_ in starting_types})
+        action_ids = {action: action_id for action_id, action in enumerate(self._actions)}
+        expansions: Expansions = {}
+        for nonterminal, nonterminal_actions in valid_actions.items():
+            # Since we expand the last non-terminal added to the buffer, the left child should be
+            # added after the right child.
+            expansions[nonterminal] = [(action_ids[action],
+                                        tuple(part for part in reversed(self._get_right_side_parts(action))
+                                              if types.is_nonterminal(part)))
+                                       for action in nonterminal_actions]
+        indexed_action_ids = {action_id for action, action_id in action_ids.items()
+                              if any(not types.is_nonterminal(part)
+                                     for part in self._get_right_side_parts(action))}
+
+        arguments = [(expansions, action_ids[f"{START_SYMBOL} -> {type_}"], type_, indexed_action_ids,
+                      self._max_path_length) for type_ in starting_types]
+        if self._num_processes > 1 and len(arguments) > 1:
+            with Pool(min(self._num_processes, len(arguments))) as pool:
+                results = pool.starmap(_walk_from_starting_type, arguments)
+        else:
+            results = [_walk_from_starting_type(*walk_arguments) for walk_arguments in arguments]
+        self._merge(results, indexed_action_ids)
+
+        if cache_file is not None:
+            self._save(cache_file)
+
+    def _merge(self,
+               results: List[Tuple[array, array, List[int], List[int], Dict[int, List[int]]]],
+               indexed_action_ids: Set[int]) -> None:
+        """
+        Combines the tries from each starting type into one, with the completed paths ordered by
+        length, and then by starting type, which is the order a single breadth-first walk over
+        all of the starting types would complete them in.
+        """
+        all_parents = [numpy.zeros(0, dtype=numpy.int64)]
+        all_node_actions = [numpy.zeros(0, dtype=numpy.int64)]
+        all_completed_nodes = [numpy.zeros(0, dtype=numpy.int64)]
+        all_lengths = [numpy.zeros(0, dtype=numpy.int64)]
+        node_offset = 0
+        for parents, node_actions, completed_nodes, lengths, _ in results:
+            parents = numpy.array(parents, dtype=numpy.int64)
+            all_parents.append(numpy.where(parents >= 0, parents + node_offset, -1))
+            all_node_actions.append(numpy.array(node_actions, dtype=numpy.int64))
+            all_completed_nodes.append(numpy.array(completed_nodes, dtype=numpy.int64) + node_offset)
+            all_lengths.append(numpy.array(lengths, dtype=numpy.int64))
+            node_offset += len(parents)
+        self._parents = numpy.concatenate(all_parents)
+        self._node_actions = numpy.concatenate(all_node_actions)
+        # A stable sort keeps the paths of each length in order of starting type.
+        order = numpy.argsort(numpy.concatenate(all_lengths), kind='mergesort')
+        self._completed_path_nodes = numpy.concatenate(all_completed_nodes)[order]
+        # The final position of each path, in the order the paths are in ``results``.
+        positions = numpy.empty_like(order)
+        positions[order] = numpy.arange(len(order))
+
+        path_offsets = numpy.cumsum([0] + [len(result[2]) for result in results])
+        self._terminal_path_index = {}
+        for action_id in sorted(indexed_action_ids):
+            is_member = numpy.zeros(len(order), dtype=numpy.bool_)
+            for path_offset, (_, _, _, _, terminal_paths) in zip(path_offsets, results):
+                local_indices = numpy.array(terminal_paths.get(action_id, []), dtype=numpy.int64)
+                is_member[positions[local_indices + path_offset]] = True
+            self._terminal_path_index[self._actions[action_id]] = numpy.packbits(is_member)
+
+    def _get_cache_file(self, valid_actions: Dict[str, List[str]], starting_types: List[str]) -> Optional[str]:
+        if self._cache_directory is None:
+            return None
+        grammar = json.dumps({"actions": {nonterminal: sorted(actions)
+                                          for nonterminal, actions in valid_actions.items()},
+                              "starting_types": starting_types,
+                              "max_path_length": self._max_path_length},
+                             sort_keys=True)
+        grammar_hash = hashlib.sha256(grammar.encode()).hexdigest()
+        return os.path.join(self._cache_directory, f"action_space_walker_{grammar_hash}.npz")
+
+    def _save(self, cache_file: str) -> None:
+        os.makedirs(self._cache_directory, exist_ok=True)
+        indexed_actions = sorted(self._terminal_path_index)
+        bitsets = numpy.stack([self._terminal_path_index[action] for action in indexed_actions]) \
+                if indexed_actions else numpy.zeros((0, 0), dtype=numpy.uint8)
+        # Write to a temporary file and move it into place, so that a walker running at the same
+        # time never sees a partially written cache.
+        with tempfile.NamedTemporaryFile(dir=self._cache_directory, suffix=".npz", delete=False) as temp_file:
+            numpy.savez(temp_file,
+                        parents=self._parents,
+                        node_actions=self._node_actions,
+                        completed_path_nodes=self._completed_path_nodes,
+                        actions=numpy.array(self._actions, dtype=str),
+                        indexed_actions=numpy.array(indexed_actions, dtype=str),
+                        bitsets=bitsets)
+        os.replace(temp_file.name, cache_file)
+
+    def _load(self, cache_file: str) -> None:
+        with numpy.load(cache_file) as cached:
+            self._parents = cached["parents"]
+            self._node_actions = cached["node_actions"]
+            self._completed_path_nodes = cached["completed_path_nodes"]
+            self._actions = cached["actions"].tolist()
+            self._terminal_path_index = dict(zip(cached["indexed_actions"].tolist(), cached["bitsets"]))
+
+    def _get_path(self, path_index: int) -> List[str]:
+        node = self._completed_path_nodes[path_index]
+        path = []
+        while node >= 0:
+            path.append(self._actions[self._node_actions[node]])
+            node = self._parents[node]
+        path.reverse()
+        return path
 
     @staticmethod
     def _get_right_side_parts(action: str) -> List[str]:
@@ -91,28 +268,29 @@ class ActionSpaceWalker:
     def get_logical_forms_with_agenda(self,
                                       agenda: List[str],
                                       max_num_logical_forms: int = None) -> List[str]:
-        if self._completed_paths is None:
+        if self._completed_path_nodes is None:
             self._walk()
-        agenda_path_indices = [self._terminal_path_index[action] for action in agenda]
+        num_paths = len(self._completed_path_nodes)
+        empty_bitset = numpy.zeros((num_paths + 7) // 8, dtype=numpy.uint8)
+        agenda_bitsets = [self._terminal_path_index.get(action, empty_bitset) for action in agenda]
         # TODO (pradeep): Sort the indices and do intersections in order, so that we can return the
         # set with maximal coverage if the full intersection is null.
-        return_set = agenda_path_indices[0]
-        for next_set in agenda_path_indices[1:]:
-            return_set = return_set.intersection(next_set)
-        paths = [self._completed_paths[index] for index in return_set]
+        return_bitset = agenda_bitsets[0]
+        for next_bitset in agenda_bitsets[1:]:
+            return_bitset = numpy.bitwise_and(return_bitset, next_bitset)
+        # The paths are sorted by length, so the first ones are the shortest.
+        path_indices = numpy.flatnonzero(numpy.unpackbits(return_bitset)[:num_paths])
         if max_num_logical_forms is not None:
-            paths = sorted(paths, key=len)[:max_num_logical_forms]
-        logical_forms = [self._world.get_logical_form(path) for path in paths]
+            path_indices = path_indices[:max_num_logical_forms]
+        logical_forms = [self._world.get_logical_form(self._get_path(index)) for index in path_indices]
         return logical_forms
 
     def get_all_logical_forms(self,
                               max_num_logical_forms: int = None) -> List[str]:
-        if self._completed_paths is None:
+        if self._completed_path_nodes is None:
             self._walk()
-        paths = self._completed_paths
+        num_paths = len(self._completed_path_nodes)
         if max_num_logical_forms is not None:
-            if self._length_sorted_paths is None:
-                self._length_sorted_paths = sorted(self._completed_paths, key=len)
-            paths = self._length_sorted_paths[:max_num_logical_forms]
-        logical_forms = [self._world.get_logical_form(path) for path in paths]
+            num_paths = min(num_paths, max_num_logical_forms)
+        logical_forms = [self._world.get_logical_form(self._get_path(index)) for index in range(num_paths)]
         return logical_forms
@@ -13,18 +13,25 @@ python -m allennlp.service.server_simple \
     --title "Demo of the Machine Comprehension Text Fixture" \
     --field-name question --field-name passage
 ```
+
+Passing ``--max-batch-size`` (and optionally ``--batch-window``) makes the server group
+concurrent requests together and run them through the model as one batch.
 """
-from typing import List, Callable
+from concurrent.futures import Future
+from typing import List, Callable, Tuple
 import argparse
 import json
 import logging
 import os
 from string import Template
 import sys
+import threading
+import time
 
 from flask import Flask, request, Response, jsonify, send_file, send_from_directory
 from flask_cors import CORS
 from gevent.pywsgi import WSGIServer
+from werkzeug.serving import make_server
 
 from allennlp.common import JsonDict
 from allennlp.common.util import import_submodules
@@ -49,11 +56,101 @@ class ServerError(Exception):
         return error_dict
 
 
+class PredictionBatcher:
+    """
+    Sits between the request handlers and a ``Predictor`` and groups together the inputs of
+    requests that arrive at around the same time, so that the model runs one batched forward pass
+    (via ``predictor.predict_batch_json``) instead of one forward pass per request.
+
+    A background thread waits for a request, then keeps collecting requests until either
+    ``batch_window`` seconds have passed or ``max_batch_size`` requests are waiting, and predicts
+    them all at once.  Each caller of :func:`predict_json` blocks until its own result is ready, so
+    every request waits at most ``batch_window`` seconds longer than it otherwise would (plus the
+    time to run the rest of its batch).  If the batched prediction fails, the requests in the
+    batch are retried one at a time, so that one bad input doesn't cause errors for the others.
+
+    Parameters
+    ----------
+    predictor : ``Predictor``
+        The predictor to run the batches through.
+    max_batch_size : ``int``, optional (default = 32)
+        The largest number of requests to predict together.
+    batch_window : ``float``, optional (default = 0.01)
+        How long (in seconds) to wait for more requests after the first one arrives.
+    """
+    def __init__(self,
+                 predictor: Predictor,
+                 max_batch_size: int = 32,
+                 batch_window: float = 0.01) -> None:
+        self._predictor = predictor
+        self._max_batch_size = max_batch_size
+        self._batch_window = batch_window
+        self._pending: List[Tuple[JsonDict, Future]] = []
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def predict_json(self, inputs: JsonDict) -> JsonDict:
+        future: Future = Future()
+        with self._condition:
+            self._pending.append((inputs, future))
+            self._condition.notify()
+        return future.result()
+
+    def _next_batch(self) -> List[Tuple[JsonDict, Future]]:
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            deadline = time.monotonic() + self._batch_window
+            while len(self._pending) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self._max_batch_size]
+            self._pending = self._pending[self._max_batch_size:]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Tuple[JsonDict, Future]] = []
+            try:
+                # Requests that were cancelled while they waited don't need a prediction.
+                batch = [(inputs, future) for inputs, future in self._next_batch()
+                         if future.set_running_or_notify_cancel()]
+                if batch:
+                    self._predict_batch(batch)
+            except Exception as error:  # pylint: disable=broad-except
+                # If this thread died, every later request would wait forever, so we log the error,
+                # fail the requests it happened to, and carry on.
+                logger.exception("Unexpected error while predicting a batch of %d requests", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _predict_batch(self, batch: List[Tuple[JsonDict, Future]]) -> None:
+        try:
+            results = self._predictor.predict_batch_json([inputs for inputs, _ in batch])
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Batched prediction failed, predicting %d requests one at a time", len(batch))
+            for inputs, future in batch:
+                try:
+                    future.set_result(self._predictor.predict_json(inputs))
+                except Exception as error:  # pylint: disable=broad-except
+                    future.set_exception(error)
+        else:
+            logger.info("Predicted a batch of %d requests", len(batch))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
 def make_app(predictor: Predictor,
              field_names: List[str] = None,
              static_dir: str = None,
              sanitizer: Callable[[JsonDict], JsonDict] = None,
-             title: str = "AllenNLP Demo") -> Flask:
+             title: str = "AllenNLP Demo",
+             max_batch_size: int = 1,
+             batch_window: float = 0.01) -> Flask:
     """
     Creates a Flask app that serves up the provided ``Predictor``
     along with a front-end for interacting with it.
@@ -71,6 +168,11 @@ def make_app(predictor: Predictor,
     In addition, if you want somehow transform the JSON prediction
     (e.g. by removing probabilities or logits)
     you can do that by passing in a ``sanitizer`` function.
+
+    If ``max_batch_size`` is greater than 1, concurrent requests are predicted together in
+    batches of up to that size, waiting up to ``batch_window`` seconds for a batch to fill up
+    (see :class:`PredictionBatcher`).  This only helps if the server handles requests
+    concurrently.
     """
     if static_dir is not None:
         static_dir = os.path.abspath(static_dir)
@@ -83,6 +185,11 @@ def make_app(predictor: Predictor,
 
     app = Flask(__name__)  # pylint: disable=invalid-name
 
+    if max_batch_size > 1:
+        predict_json = PredictionBatcher(predictor, max_batch_size, batch_window).predict_json
+    else:
+        predict_json = predictor.predict_json
+
     @app.errorhandler(ServerError)
     def handle_invalid_usage(error: ServerError) -> Response:  # pylint: disable=unused-variable
         response = jsonify(error.to_dict())
@@ -105,7 +212,7 @@ def make_app(predictor: Predictor,
 
         data = request.get_json()
 
-        prediction = predictor.predict_json(data)
+        prediction = predict_json(data)
         if sanitizer is not None:
             prediction = sanitizer(prediction)
 
@@ -138,6 +245,10 @@ def main(args):
     parser.add_argument('--field-name', type=str, action='append',
                         help='field names to include in the demo')
     parser.add_argument('--port', type=int, default=8000, help='port to serve the demo on')
+    parser.add_argument('--max-batch-size', type=int, default=1,
+                        help='predict up to this many concurrent requests together in one batch')
+    parser.add_argument('--batch-window', type=float, default=0.01,
+                        help='how long (in seconds) to wait for a batch of requests to fill up')
 
     parser.add_argument('--include-package',
                         type=str,
@@ -158,10 +269,17 @@ def main(args):
     app = make_app(predictor=predictor,
                    field_names=field_names,
                    static_dir=args.static_dir,
-                   title=args.title)
+                   title=args.title,
+                   max_batch_size=args.max_batch_size,
+                   batch_window=args.batch_window)
     CORS(app)
 
-    http_server = WSGIServer(('0.0.0.0', args.port), app)
+    if args.max_batch_size > 1:
+        # Each request blocks its handler until its batch has been predicted, so for requests to be
+        # batched together, each one needs its own thread.
+        http_server = make_server('0.0.0.0', args.port, app, threaded=True)
+    else:
+        http_server = WSGIServer(('0.0.0.0', args.port), app)
     print(f"Model loaded, serving demo on port {args.port}")
     http_server.serve_forever()
 
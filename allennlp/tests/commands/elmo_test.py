@@ -39,13 +39,15 @@ class TestElmoCommand(ElmoTestCase):
                     "--options-file",
                     self.options_file,
                     "--weight-file",
-                    self.weight_file]
+                    self.weight_file,
+                    "--no-token-cache"]
 
         main()
 
         assert os.path.exists(self.output_path)
 
-        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file)
+        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                token_cache_directory=None)
         expected_embedding = embedder.embed_sentence(sentence.split())
 
         with h5py.File(self.output_path, 'r') as h5py_file:
@@ -69,13 +71,15 @@ class TestElmoCommand(ElmoTestCase):
                     "--options-file",
                     self.options_file,
                     "--weight-file",
-                    self.weight_file]
+                    self.weight_file,
+                    "--no-token-cache"]
 
         main()
 
         assert os.path.exists(self.output_path)
 
-        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file)
+        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                token_cache_directory=None)
         expected_embedding = embedder.embed_sentence(sentence.split())[2]
 
         with h5py.File(self.output_path, 'r') as h5py_file:
@@ -99,13 +103,15 @@ class TestElmoCommand(ElmoTestCase):
                     "--options-file",
                     self.options_file,
                     "--weight-file",
-                    self.weight_file]
+                    self.weight_file,
+                    "--no-token-cache"]
 
         main()
 
         assert os.path.exists(self.output_path)
 
-        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file)
+        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                token_cache_directory=None)
         expected_embedding = embedder.embed_sentence(sentence.split())
         expected_embedding = (expected_embedding[0] + expected_embedding[1] + expected_embedding[2]) / 3
 
@@ -137,7 +143,8 @@ class TestElmoCommand(ElmoTestCase):
                     "--options-file",
                     self.options_file,
                     "--weight-file",
-                    self.weight_file]
+                    self.weight_file,
+                    "--no-token-cache"]
 
         main()
 
@@ -170,6 +177,7 @@ class TestElmoCommand(ElmoTestCase):
                     self.options_file,
                     "--weight-file",
                     self.weight_file,
+                    "--no-token-cache",
                     "--use-sentence-keys"]
         main()
 
@@ -202,6 +210,7 @@ class TestElmoCommand(ElmoTestCase):
                     self.options_file,
                     "--weight-file",
                     self.weight_file,
+                    "--no-token-cache",
                     "--forget-sentences"]
 
         main()
@@ -232,7 +241,8 @@ class TestElmoCommand(ElmoTestCase):
                     "--options-file",
                     self.options_file,
                     "--weight-file",
-                    self.weight_file]
+                    self.weight_file,
+                    "--no-token-cache"]
 
         main()
 
@@ -245,6 +255,52 @@ class TestElmoCommand(ElmoTestCase):
             for sentence_id, sentence in zip(["0", "1"], sentences):
                 assert h5py_file.get(sentence_id).shape == (3, len(sentence.split()), 32)
 
+    def test_embed_file_in_chunks_sorted_by_length(self):
+        sentences = [
+                "Michael went to the store to buy some eggs .",
+                "Joel rolled down the street on his skateboard .",
+                "test / this is a first sentence",
+                "Take a look , then , at Tuesday 's elections in New York City , New Jersey and Virginia :",
+                "Short ."
+        ]
+
+        for max_sentences_in_memory in [1, 2, 100]:
+            with open(self.sentences_path, 'w') as f:
+                for line in sentences:
+                    f.write(line + '\n')
+
+            embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                    token_cache_directory=None)
+            with open(self.sentences_path) as input_file:
+                embedder.embed_file(input_file,
+                                    self.output_path,
+                                    output_format="top",
+                                    batch_size=2,
+                                    max_sentences_in_memory=max_sentences_in_memory)
+
+            with h5py.File(self.output_path, 'r') as h5py_file:
+                assert set(h5py_file.keys()) == {"0", "1", "2", "3", "4", "sentence_to_index"}
+                for sentence_id, sentence in enumerate(sentences):
+                    assert h5py_file.get(str(sentence_id)).shape == (len(sentence.split()), 32)
+                assert (json.loads(h5py_file.get("sentence_to_index")[0]) ==
+                        {sentences[i]: str(i) for i in range(len(sentences))})
+
+    def test_duplicate_sentence_keys_raise_errors(self):
+        with open(self.sentences_path, 'w') as f:
+            for _ in range(10):
+                f.write("Michael went to the store to buy some eggs .\n")
+
+        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                token_cache_directory=None)
+        with open(self.sentences_path) as input_file:
+            with pytest.raises(ConfigurationError):
+                embedder.embed_file(input_file,
+                                    self.output_path,
+                                    batch_size=1,
+                                    use_sentence_keys=True,
+                                    max_sentences_in_memory=2)
+        assert not os.path.exists(self.output_path)
+
     def test_empty_sentences_raise_errors(self):
         sentences = [
                 "A",
@@ -265,10 +321,22 @@ class TestElmoCommand(ElmoTestCase):
                     "--options-file",
                     self.options_file,
                     "--weight-file",
-                    self.weight_file]
+                    self.weight_file,
+                    "--no-token-cache"]
         with pytest.raises(ConfigurationError):
             main()
 
+    def test_empty_sentence_in_a_later_chunk_deletes_the_output_file(self):
+        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                token_cache_directory=None)
+        with open(self.sentences_path, 'w') as f:
+            f.write("A\nB\n\nC\n")
+
+        with open(self.sentences_path) as input_file:
+            with pytest.raises(ConfigurationError):
+                embedder.embed_file(input_file, self.output_path, max_sentences_in_memory=2)
+        assert not os.path.exists(self.output_path)
+
 
 class TestElmoEmbedder(ElmoTestCase):
     def test_embeddings_are_as_expected(self):
@@ -288,7 +356,8 @@ class TestElmoEmbedder(ElmoTestCase):
 
         assert len(expected_embeddings) == len(sentences)
 
-        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file)
+        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                token_cache_directory=None)
         embeddings = list(embedder.embed_sentences(sentences, batch_size))
 
         assert len(embeddings) == len(sentences)
@@ -297,13 +366,15 @@ class TestElmoEmbedder(ElmoTestCase):
             numpy.testing.assert_array_almost_equal(tensor[2], expected)
 
     def test_embed_batch_is_empty_sentence(self):
-        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file)
+        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                token_cache_directory=None)
         embeddings = embedder.embed_sentence([])
 
         assert embeddings.shape == (3, 0, 1024)
 
     def test_embed_batch_contains_empty_sentence(self):
-        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file)
+        embedder = ElmoEmbedder(options_file=self.options_file, weight_file=self.weight_file,
+                                token_cache_directory=None)
         embeddings = list(embedder.embed_sentences(["This is a test".split(), []]))
 
         assert len(embeddings) == 2
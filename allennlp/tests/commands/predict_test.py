@@ -39,6 +39,8 @@ class TestPredict(AllenNlpTestCase):
                       "/dev/null",        # input_file
                       "--output-file", "/dev/null",
                       "--batch-size", "10",
+                      "--num-workers", "2",
+                      "--sort-by-length", "4",
                       "--cuda-device", "0",
                       "--silent"]
 
@@ -48,6 +50,8 @@ class TestPredict(AllenNlpTestCase):
         assert args.archive_file == "/path/to/archive"
         assert args.output_file == "/dev/null"
         assert args.batch_size == 10
+        assert args.num_workers == 2
+        assert args.sort_by_length == 4
         assert args.cuda_device == 0
         assert args.silent
 
@@ -137,6 +141,94 @@ class TestPredict(AllenNlpTestCase):
 
         shutil.rmtree(self.tempdir)
 
+    def test_pipelined_prediction_keeps_the_input_order(self):
+        passages = [f"the seahawks won the super bowl in {year}" for year in range(2010, 2017)]
+        with open(self.infile, 'w') as f:
+            for passage in passages:
+                f.write(json.dumps({"passage": passage,
+                                    "question": "when did the seahawks win the super bowl?"}) + "\n")
+
+        for batch_size in ["1", "2"]:
+            sys.argv = ["run.py",  # executable
+                        "predict",  # command
+                        str(self.bidaf_model_path),
+                        str(self.infile),  # input_file
+                        "--output-file", str(self.outfile),
+                        "--silent",
+                        "--batch-size", batch_size,
+                        "--num-workers", "3"]
+
+            main()
+
+            with open(self.outfile, 'r') as f:
+                results = [json.loads(line) for line in f]
+
+            assert len(results) == len(passages)
+            for passage, result in zip(passages, results):
+                assert result["passage_tokens"] == passage.split()
+
+        shutil.rmtree(self.tempdir)
+
+    def test_sorted_batch_prediction_keeps_the_input_order(self):
+        passages = [" ".join(["the seahawks won the super bowl"] * length) for length in [3, 1, 4, 2, 1]]
+        with open(self.infile, 'w') as f:
+            for passage in passages:
+                f.write(json.dumps({"passage": passage,
+                                    "question": "when did the seahawks win the super bowl?"}) + "\n")
+
+        sys.argv = ["run.py",  # executable
+                    "predict",  # command
+                    str(self.bidaf_model_path),
+                    str(self.infile),  # input_file
+                    "--output-file", str(self.outfile),
+                    "--silent",
+                    "--batch-size", "5",
+                    "--sort-by-length", "2"]
+
+        main()
+
+        with open(self.outfile, 'r') as f:
+            results = [json.loads(line) for line in f]
+
+        assert len(results) == len(passages)
+        for passage, result in zip(passages, results):
+            assert result["passage_tokens"] == passage.split()
+
+        shutil.rmtree(self.tempdir)
+
+    def test_pipelined_prediction_raises_when_the_input_cannot_be_read(self):
+        sys.argv = ["run.py",      # executable
+                    "predict",     # command
+                    str(self.bidaf_model_path),
+                    str(self.tempdir),     # a directory, which we can't read lines from
+                    "--output-file", str(self.outfile),
+                    "--silent",
+                    "--num-workers", "2"]
+
+        with pytest.raises(RuntimeError, match="Preparing the input failed"):
+            main()
+
+        shutil.rmtree(self.tempdir)
+
+    def test_pipelined_prediction_works_with_dataset_reader(self):
+        sys.argv = ["run.py",      # executable
+                    "predict",     # command
+                    str(self.bidaf_model_path),
+                    str(self.bidaf_data_path),     # input_file
+                    "--output-file", str(self.outfile),
+                    "--silent",
+                    "--use-dataset-reader",
+                    "--num-workers", "1"]
+
+        main()
+
+        with open(self.outfile, 'r') as f:
+            results = [json.loads(line) for line in f]
+
+        assert len(results) == 5
+
+        shutil.rmtree(self.tempdir)
+
     def test_fails_without_required_args(self):
         sys.argv = ["run.py",            # executable
                     "predict",           # command
@@ -1,6 +1,7 @@
 # pylint: disable=invalid-name,no-self-use
 import argparse
 from typing import Iterable
+import json
 import os
 import shutil
 import re
@@ -132,6 +133,43 @@ class TestTrain(AllenNlpTestCase):
 
         train_model(params, serialization_dir=os.path.join(self.TEST_DIR, 'train_with_test_set'))
 
+    def test_train_model_with_multiple_processes(self):
+        params = Params({
+                "model": {
+                        "type": "simple_tagger",
+                        "text_field_embedder": {
+                                "tokens": {
+                                        "type": "embedding",
+                                        "embedding_dim": 5,
+                                        "sparse": True
+                                }
+                        },
+                        "encoder": {
+                                "type": "lstm",
+                                "input_size": 5,
+                                "hidden_size": 7,
+                                "num_layers": 2
+                        }
+                },
+                "dataset_reader": {"type": "sequence_tagging"},
+                "train_data_path": SEQUENCE_TAGGING_DATA_PATH,
+                "validation_data_path": SEQUENCE_TAGGING_DATA_PATH,
+                "iterator": {"type": "basic", "batch_size": 1},
+                "trainer": {
+                        "num_epochs": 2,
+                        "optimizer": "dense_sparse_adam",
+                        "num_processes": 2,
+                        "master_port": 29517
+                }
+        })
+
+        serialization_dir = os.path.join(self.TEST_DIR, 'train_with_multiple_processes')
+        train_model(params, serialization_dir=serialization_dir)
+        with open(os.path.join(serialization_dir, "metrics.json")) as metrics_file:
+            assert json.load(metrics_file)["training_epochs"] == 2
+        assert os.path.exists(os.path.join(serialization_dir, "best.th"))
+        assert os.path.exists(os.path.join(serialization_dir, "model_state_epoch_1.th"))
+
     def test_train_args(self):
         parser = argparse.ArgumentParser(description="Testing")
         subparsers = parser.add_subparsers(title='Commands', metavar='')
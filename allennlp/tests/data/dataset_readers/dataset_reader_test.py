@@ -0,0 +1,76 @@
+# pylint: disable=no-self-use,invalid-name,protected-access
+import os
+import time
+
+from allennlp.common.testing import AllenNlpTestCase
+from allennlp.common.util import ensure_list
+from allennlp.data.dataset_readers import SequenceTaggingDatasetReader
+
+
+class CountingReader(SequenceTaggingDatasetReader):
+    def __init__(self, lazy: bool = False) -> None:
+        super().__init__(lazy=lazy)
+        self.num_reads = 0
+
+    def _read(self, file_path):
+        self.num_reads += 1
+        yield from super()._read(file_path)
+
+
+def _sentences(instances):
+    return [[token.text for token in instance.fields["tokens"].tokens] for instance in instances]
+
+
+class TestDatasetReaderCache(AllenNlpTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data_path = str(self.FIXTURES_ROOT / 'data' / 'sequence_tagging.tsv')
+        self.cache_directory = str(self.TEST_DIR / 'cache')
+        self.expected = _sentences(SequenceTaggingDatasetReader().read(self.data_path))
+
+    def test_eager_read_uses_cache(self):
+        reader = CountingReader()
+        reader.cache_data(self.cache_directory)
+        assert _sentences(reader.read(self.data_path)) == self.expected
+        assert reader.num_reads == 1
+        assert len(os.listdir(self.cache_directory)) == 1
+
+        # A fresh reader with the same cache doesn't need to read the file.
+        reader = CountingReader()
+        reader.cache_data(self.cache_directory)
+        assert _sentences(reader.read(self.data_path)) == self.expected
+        assert reader.num_reads == 0
+
+    def test_lazy_read_uses_cache_after_first_full_pass(self):
+        reader = CountingReader(lazy=True)
+        reader.cache_data(self.cache_directory)
+        instances = reader.read(self.data_path)
+
+        # Stopping part way through must not leave a cache file behind.
+        next(iter(instances))
+        assert os.listdir(self.cache_directory) == []
+
+        for _ in range(3):
+            assert _sentences(ensure_list(instances)) == self.expected
+        assert reader.num_reads == 2
+
+    def test_cache_is_keyed_by_prefix_and_file(self):
+        data_path = str(self.TEST_DIR / 'data.tsv')
+        with open(self.data_path) as source, open(data_path, 'w') as target:
+            target.write(source.read())
+
+        reader = CountingReader()
+        reader.cache_data(self.cache_directory, cache_prefix='one')
+        reader.read(data_path)
+        other_reader = CountingReader()
+        other_reader.cache_data(self.cache_directory, cache_prefix='two')
+        other_reader.read(data_path)
+        assert other_reader.num_reads == 1
+
+        # Changing the file invalidates the cache.
+        time.sleep(0.01)
+        with open(data_path, 'a') as target:
+            target.write("fish###N\tswim###V\n")
+        instances = reader.read(data_path)
+        assert reader.num_reads == 2
+        assert _sentences(instances) == self.expected + [["fish", "swim"]]
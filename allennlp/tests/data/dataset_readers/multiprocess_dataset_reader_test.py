@@ -0,0 +1,56 @@
+# pylint: disable=no-self-use,invalid-name
+import pytest
+
+from allennlp.common import Params
+from allennlp.common.checks import ConfigurationError
+from allennlp.common.testing import AllenNlpTestCase
+from allennlp.common.util import ensure_list
+from allennlp.data.dataset_readers import DatasetReader, MultiprocessDatasetReader, SequenceTaggingDatasetReader
+
+
+class TestMultiprocessDatasetReader(AllenNlpTestCase):
+    def setUp(self):
+        super().setUp()
+        # Write a handful of shards whose sentences say which shard they came from.
+        self.expected_sentences = []
+        for shard in range(5):
+            with open(self.TEST_DIR / f"shard_{shard}.tsv", "w") as shard_file:
+                for line in range(3):
+                    sentence = [f"shard{shard}", f"line{line}", "."]
+                    shard_file.write("\t".join(f"{word}###N" for word in sentence) + "\n")
+                    self.expected_sentences.append(sentence)
+        self.glob = str(self.TEST_DIR / "shard_*.tsv")
+
+    def test_multiprocess_read_is_in_shard_order(self):
+        for num_workers in (1, 2, 3, 8):
+            reader = MultiprocessDatasetReader(base_reader=SequenceTaggingDatasetReader(),
+                                               num_workers=num_workers)
+            instances = reader.read(self.glob)
+            assert isinstance(instances, list)
+            sentences = [[token.text for token in instance.fields["tokens"].tokens]
+                         for instance in instances]
+            assert sentences == self.expected_sentences
+
+    def test_multiprocess_lazy_read_can_be_iterated_repeatedly(self):
+        reader = MultiprocessDatasetReader(base_reader=SequenceTaggingDatasetReader(lazy=True),
+                                           num_workers=2)
+        instances = reader.read(self.glob)
+        assert not isinstance(instances, list)
+        for _ in range(2):
+            sentences = [[token.text for token in instance.fields["tokens"].tokens]
+                         for instance in ensure_list(instances)]
+            assert sentences == self.expected_sentences
+
+    def test_missing_shards_raise(self):
+        reader = MultiprocessDatasetReader(base_reader=SequenceTaggingDatasetReader(), num_workers=2)
+        with pytest.raises(ConfigurationError):
+            reader.read(str(self.TEST_DIR / "does_not_exist_*.tsv"))
+
+    def test_from_params(self):
+        params = Params({"type": "multiprocess",
+                         "base_reader": {"type": "sequence_tagging", "lazy": True},
+                         "num_workers": 2})
+        reader = DatasetReader.from_params(params)
+        assert isinstance(reader, MultiprocessDatasetReader)
+        assert isinstance(reader.reader, SequenceTaggingDatasetReader)
+        assert reader.lazy
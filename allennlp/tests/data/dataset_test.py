@@ -6,8 +6,8 @@ from allennlp.common.checks import ConfigurationError
 from allennlp.common.testing import AllenNlpTestCase
 from allennlp.data import Instance, Token, Vocabulary
 from allennlp.data.dataset import Batch
-from allennlp.data.fields import TextField, LabelField
-from allennlp.data.token_indexers import SingleIdTokenIndexer
+from allennlp.data.fields import TextField, LabelField, SequenceLabelField, SpanField
+from allennlp.data.token_indexers import SingleIdTokenIndexer, TokenCharactersIndexer
 
 
 class TestDataset(AllenNlpTestCase):
@@ -47,6 +47,38 @@ class TestDataset(AllenNlpTestCase):
         numpy.testing.assert_array_almost_equal(text2, numpy.array([[2, 3, 4, 1, 5, 6],
                                                                     [2, 3, 1, 0, 0, 0]]))
 
+    def test_as_tensor_dict_matches_padding_each_instance(self):
+        token_indexers = {"tokens": SingleIdTokenIndexer(),
+                          "characters": TokenCharactersIndexer()}
+        instances = []
+        for words, tags, label in [(["this", "is", "a", "sentence", "."], ["A", "B", "C", "D", "E"], "x"),
+                                   (["here", "is"], ["B", "A"], "y"),
+                                   (["this", "is", "short"], ["C", "C", "A"], "x")]:
+            text = TextField([Token(t) for t in words], token_indexers)
+            instances.append(Instance({"text": text,
+                                       "tags": SequenceLabelField(tags, text),
+                                       "span": SpanField(0, len(words) - 1, text),
+                                       "label": LabelField(label)}))
+        dataset = Batch(instances)
+        vocab = Vocabulary.from_instances(dataset)
+        dataset.index_instances(vocab)
+
+        # Both with the lengths from the data, and with a smaller maximum that truncates.
+        for padding_lengths in [None, {"text": {"num_tokens": 3}, "tags": {"num_tokens": 3}}]:
+            lengths_to_use = dataset.get_padding_lengths()
+            for field_name, lengths in (padding_lengths or {}).items():
+                lengths_to_use[field_name].update(lengths)
+            tensors = dataset.as_tensor_dict(padding_lengths)
+            for field_name, field in instances[0].fields.items():
+                expected = field.batch_tensors([instance.fields[field_name].as_tensor(lengths_to_use[field_name])
+                                                for instance in instances])
+                if isinstance(expected, dict):
+                    assert expected.keys() == tensors[field_name].keys()
+                    for key in expected:
+                        assert tensors[field_name][key].tolist() == expected[key].tolist()
+                else:
+                    assert tensors[field_name].tolist() == expected.tolist()
+
     def get_instances(self):
         field1 = TextField([Token(t) for t in ["this", "is", "a", "sentence", "."]],
                            self.token_indexer)
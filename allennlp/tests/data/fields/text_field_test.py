@@ -1,6 +1,7 @@
 # pylint: disable=no-self-use,invalid-name
 from collections import defaultdict
 from typing import Dict, List
+import pickle
 
 import pytest
 import numpy
@@ -8,6 +9,7 @@ import numpy
 from allennlp.data import Token, Vocabulary
 from allennlp.data.fields import TextField
 from allennlp.data.token_indexers import SingleIdTokenIndexer, TokenCharactersIndexer, TokenIndexer
+from allennlp.data.tokenizers.word_splitter import SpacyWordSplitter
 
 from allennlp.common.testing import AllenNlpTestCase
 from allennlp.common.checks import ConfigurationError
@@ -173,6 +175,38 @@ class TestTextField(AllenNlpTestCase):
         padding_lengths = field.get_padding_lengths()
         assert padding_lengths == {"num_tokens": 5, "num_token_characters": 8}
 
+    def test_padding_lengths_are_cached_until_reindexing(self):
+        class CountingTokenIndexer(SingleIdTokenIndexer):
+            num_calls = 0
+
+            def get_padding_lengths(self, token: int) -> Dict[str, int]:
+                CountingTokenIndexer.num_calls += 1
+                return super().get_padding_lengths(token)
+
+        field = TextField([Token(t) for t in ["This", "is", "a", "sentence", "."]],
+                          token_indexers={"words": CountingTokenIndexer("words")})
+        field.index(self.vocab)
+        for _ in range(3):
+            padding_lengths = field.get_padding_lengths()
+            assert padding_lengths == {"num_tokens": 5}
+            # Callers are free to modify what they get back.
+            padding_lengths["num_tokens"] = 100
+        assert CountingTokenIndexer.num_calls == 5
+
+        field.tokens.append(Token("."))
+        field.index(self.vocab)
+        assert field.get_padding_lengths() == {"num_tokens": 6}
+        assert CountingTokenIndexer.num_calls == 11
+
+    def test_spacy_tokens_are_pickled_as_allennlp_tokens(self):
+        spacy_tokens = SpacyWordSplitter().split_words("This is a sentence.")
+        field = TextField(spacy_tokens, token_indexers={"words": SingleIdTokenIndexer("words")})
+        unpickled_field = pickle.loads(pickle.dumps(field))
+        assert all(isinstance(token, Token) for token in unpickled_field.tokens)
+        assert [token.text for token in unpickled_field.tokens] == ["This", "is", "a", "sentence", "."]
+        # The field itself still has the spacy tokens.
+        assert field.tokens == spacy_tokens
+
     def test_as_tensor_handles_words(self):
         field = TextField([Token(t) for t in ["This", "is", "a", "sentence", "."]],
                           token_indexers={"words": SingleIdTokenIndexer("words")})
@@ -225,6 +259,23 @@ class TestTextField(AllenNlpTestCase):
                                                              [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
                                                              [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]]))
 
+    def test_batch_as_tensor_uses_custom_padding(self):
+        class LeftPaddingIndexer(SingleIdTokenIndexer):
+            # pylint: disable=unused-argument
+            def pad_token_sequence(self, tokens, desired_num_tokens, padding_lengths):
+                return {key: [0] * (desired_num_tokens[key] - len(val)) + val[:desired_num_tokens[key]]
+                        for key, val in tokens.items()}
+
+        fields = [TextField([Token(t) for t in sentence.split()],
+                            token_indexers={"words": LeftPaddingIndexer("words")})
+                  for sentence in ["This is a sentence .", "a sentence"]]
+        for field in fields:
+            field.index(self.vocab)
+        padding_lengths = {"num_tokens": 5}
+        tensor_dict = fields[0].batch_as_tensor(fields, padding_lengths)
+        numpy.testing.assert_array_almost_equal(tensor_dict["words"].detach().cpu().numpy(),
+                                                numpy.array([[1, 1, 1, 2, 1], [0, 0, 0, 1, 2]]))
+
     def test_printing_doesnt_crash(self):
         field = TextField([Token(t) for t in ["A", "sentence"]],
                           {"words": SingleIdTokenIndexer(namespace="words")})
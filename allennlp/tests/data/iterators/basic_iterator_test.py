@@ -202,6 +202,19 @@ class TestBasicIterator(IteratorTest):
             grouped_instances = [batch.instances for batch in batches]
             assert grouped_instances == [[self.instances[2]], [self.instances[3]]]
 
+    def test_shards_split_the_batches_evenly(self):
+        for test_instances in (self.instances, self.lazy_instances):
+            iterator = BasicIterator(batch_size=1)
+            iterator.index_with(self.vocab)
+            shards = [list(iterator(test_instances, num_epochs=1, shuffle=False, shard_index=shard_index,
+                                    num_shards=2))
+                      for shard_index in range(2)]
+            # Five batches, so the last one is dropped.
+            assert [len(shard) for shard in shards] == [2, 2]
+            all_batches = list(iterator(test_instances, num_epochs=1, shuffle=False))
+            for index, batch in enumerate(all_batches[:4]):
+                assert batch["text"]["tokens"].equal(shards[index % 2][index // 2]["text"]["tokens"])
+
     def test_from_params(self):
         # pylint: disable=protected-access
         params = Params({})
@@ -0,0 +1,94 @@
+# pylint: disable=no-self-use,invalid-name,protected-access
+from allennlp.common import Params
+from allennlp.data.iterators import BasicIterator, BucketIterator, DataIterator, MultiprocessIterator
+from allennlp.tests.data.iterators.basic_iterator_test import IteratorTest
+
+
+class TestMultiprocessIterator(IteratorTest):
+    def test_yield_one_epoch_iterates_over_the_data_once(self):
+        for test_instances in (self.instances, self.lazy_instances):
+            iterator = MultiprocessIterator(BasicIterator(batch_size=2), num_workers=2)
+            iterator.index_with(self.vocab)
+            batches = list(iterator(test_instances, num_epochs=1))
+            instances = [tuple(instance.detach().cpu().numpy())
+                         for batch in batches
+                         for instance in batch['text']["tokens"]]
+            assert len(instances) == 5
+            self.assert_instances_are_correct(instances)
+
+    def test_batches_come_back_in_the_base_iterator_order(self):
+        base_iterator = BucketIterator(batch_size=1, padding_noise=0, sorting_keys=[('text', 'num_tokens')])
+        base_iterator.index_with(self.vocab)
+        expected = [batch['text']['tokens'].tolist()
+                    for batch in base_iterator(self.instances, num_epochs=1, shuffle=False)]
+
+        iterator = MultiprocessIterator(BucketIterator(batch_size=1,
+                                                       padding_noise=0,
+                                                       sorting_keys=[('text', 'num_tokens')]),
+                                        num_workers=3,
+                                        output_queue_size=2)
+        iterator.index_with(self.vocab)
+        actual = [batch['text']['tokens'].tolist()
+                  for batch in iterator(self.instances, num_epochs=1, shuffle=False)]
+        assert actual == expected
+
+    def test_instances_per_epoch_resumes_across_calls(self):
+        iterator = MultiprocessIterator(BasicIterator(batch_size=1, instances_per_epoch=2))
+        iterator.index_with(self.vocab)
+        expected = [tuple(instance.fields["text"]._indexed_tokens["tokens"]) for instance in self.instances]
+
+        first_epoch = [tuple(batch['text']['tokens'][0].tolist())
+                       for batch in iterator(self.lazy_instances, num_epochs=1, shuffle=False)]
+        second_epoch = [tuple(batch['text']['tokens'][0].tolist())
+                        for batch in iterator(self.lazy_instances, num_epochs=1, shuffle=False)]
+        assert [tuple(w for w in tokens if w != 0) for tokens in first_epoch] == expected[:2]
+        assert [tuple(w for w in tokens if w != 0) for tokens in second_epoch] == expected[2:4]
+        assert iterator.get_num_batches(self.lazy_instances) == 2
+
+    def test_track_epoch(self):
+        iterator = MultiprocessIterator(BasicIterator(batch_size=2, track_epoch=True), num_workers=2)
+        iterator.index_with(self.vocab)
+        epochs = [batch['epoch_num'] for batch in iterator(self.instances, num_epochs=2, shuffle=False)]
+        assert epochs == [[0, 0], [0, 0], [0], [1, 1], [1, 1], [1]]
+
+    def test_workers_are_reused_across_epochs_and_shut_down_on_early_stop(self):
+        iterator = MultiprocessIterator(BasicIterator(batch_size=1), num_workers=2)
+        iterator.index_with(self.vocab)
+        list(iterator(self.instances, num_epochs=1))
+        workers = list(iterator._workers)
+        assert len(workers) == 2
+        assert all(worker.is_alive() for worker in workers)
+
+        list(iterator(self.instances, num_epochs=1))
+        assert iterator._workers == workers
+
+        generator = iterator(self.instances, num_epochs=1)
+        next(generator)
+        generator.close()
+        assert iterator._workers == []
+        assert iterator._input_queue is None and iterator._output_queue is None
+        assert not any(worker.is_alive() for worker in workers)
+
+        # The next epoch starts a fresh pool and still sees all of the data.
+        assert len(list(iterator(self.instances, num_epochs=1))) == 5
+        assert len(iterator._workers) == 2
+
+    def test_cache_instances(self):
+        iterator = MultiprocessIterator(BasicIterator(batch_size=2, cache_instances=True))
+        iterator.index_with(self.vocab)
+        first_epoch = list(iterator(self.instances, num_epochs=1, shuffle=False))
+        second_epoch = list(iterator(self.instances, num_epochs=1, shuffle=False))
+        assert len(iterator._cache[id(self.instances)]) == 3
+        # The second epoch is served straight from the cache.
+        for first, second in zip(first_epoch, second_epoch):
+            assert first['text']['tokens'] is second['text']['tokens']
+
+    def test_from_params(self):
+        params = Params({"type": "multiprocess",
+                         "base_iterator": {"type": "basic", "batch_size": 10},
+                         "num_workers": 3})
+        iterator = DataIterator.from_params(params)
+        assert isinstance(iterator, MultiprocessIterator)
+        assert iterator._num_workers == 3
+        assert iterator._batch_size == 10
+        assert isinstance(iterator._base_iterator, BasicIterator)
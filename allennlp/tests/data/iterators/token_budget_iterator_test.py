@@ -0,0 +1,83 @@
+# pylint: disable=no-self-use,invalid-name
+from allennlp.common import Params
+from allennlp.data.iterators import DataIterator, TokenBudgetIterator
+from allennlp.tests.data.iterators.basic_iterator_test import IteratorTest
+
+
+class TestTokenBudgetIterator(IteratorTest):
+    def get_batch_lengths(self, iterator, instances):
+        batches = iterator._create_batches(instances, shuffle=False)  # pylint: disable=protected-access
+        return sorted([len(instance.fields['text'].tokens) for instance in batch.instances]
+                      for batch in batches)
+
+    def test_create_batches_packs_sorted_instances_into_the_budget(self):
+        iterator = TokenBudgetIterator(sorting_keys=[('text', 'num_tokens')],
+                                       max_tokens_per_batch=8,
+                                       padding_noise=0)
+        iterator.index_with(self.vocab)
+        # The sentence with 9 tokens doesn't fit in the budget at all, so it gets its own batch.
+        assert self.get_batch_lengths(iterator, self.instances) == [[1, 3], [4, 4], [9]]
+        assert iterator.get_num_batches(self.instances) == 3
+
+        batches = list(iterator(self.instances, num_epochs=1))
+        instances = [tuple(instance.detach().cpu().numpy())
+                     for batch in batches
+                     for instance in batch['text']["tokens"]]
+        assert len(batches) == 3
+        self.assert_instances_are_correct(instances)
+
+    def test_create_batches_respects_batch_size_and_padding_fraction(self):
+        iterator = TokenBudgetIterator(sorting_keys=[('text', 'num_tokens')],
+                                       max_tokens_per_batch=100,
+                                       padding_noise=0,
+                                       batch_size=2)
+        iterator.index_with(self.vocab)
+        assert self.get_batch_lengths(iterator, self.instances) == [[1, 3], [4, 4], [9]]
+
+        iterator = TokenBudgetIterator(sorting_keys=[('text', 'num_tokens')],
+                                       max_tokens_per_batch=100,
+                                       padding_noise=0,
+                                       maximum_padding_fraction=0.3)
+        iterator.index_with(self.vocab)
+        assert self.get_batch_lengths(iterator, self.instances) == [[1], [3, 4, 4], [9]]
+        assert iterator.get_num_batches(self.instances) == 3
+
+    def test_get_num_batches_estimates_from_batches_so_far(self):
+        iterator = TokenBudgetIterator(sorting_keys=[('text', 'num_tokens')],
+                                       max_tokens_per_batch=8,
+                                       padding_noise=0,
+                                       instances_per_epoch=10,
+                                       max_instances_in_memory=5)
+        iterator.index_with(self.vocab)
+        list(iterator(self.lazy_instances, num_epochs=1))
+        # Each pass over the five instances makes three batches.
+        assert iterator.get_num_batches(self.lazy_instances) == 6
+
+    def test_get_num_batches_estimates_from_a_sample_before_the_first_epoch(self):
+        iterator = TokenBudgetIterator(sorting_keys=[('text', 'num_tokens')],
+                                       max_tokens_per_batch=8,
+                                       padding_noise=0,
+                                       instances_per_epoch=10,
+                                       max_instances_in_memory=5)
+        iterator.index_with(self.vocab)
+        # The first five instances pack into three batches, so ten instances make about six.
+        assert iterator.get_num_batches(self.lazy_instances) == 6
+        assert iterator.get_num_batches(self.instances) == 6
+
+    def test_get_num_batches_is_cached_for_in_memory_datasets(self):
+        iterator = TokenBudgetIterator(sorting_keys=[('text', 'num_tokens')],
+                                       max_tokens_per_batch=8,
+                                       padding_noise=0)
+        iterator.index_with(self.vocab)
+        assert iterator.get_num_batches(self.instances) == 3
+        iterator._pack = None  # pylint: disable=protected-access
+        assert iterator.get_num_batches(self.instances) == 3
+
+    def test_from_params(self):
+        params = Params({"type": "token_budget",
+                         "sorting_keys": [["text", "num_tokens"]],
+                         "max_tokens_per_batch": 500})
+        iterator = DataIterator.from_params(params)
+        assert isinstance(iterator, TokenBudgetIterator)
+        assert iterator._max_tokens_per_batch == 500  # pylint: disable=protected-access
+        assert iterator._sorting_keys == [("text", "num_tokens")]  # pylint: disable=protected-access
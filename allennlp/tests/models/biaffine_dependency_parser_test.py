@@ -1,4 +1,7 @@
-# pylint: disable=no-self-use,invalid-name,no-value-for-parameter
+# pylint: disable=no-self-use,invalid-name,no-value-for-parameter,protected-access
+import copy
+
+import numpy
 
 from allennlp.common.testing.model_test_case import ModelTestCase
 
@@ -30,3 +33,15 @@ class BiaffineDependencyParserTest(ModelTestCase):
         assert set(decode_output_dict.keys()) == set(['heads', 'head_tags', 'arc_loss',
                                                       'tag_loss', 'loss', 'mask',
                                                       'predicted_dependencies', 'predicted_heads'])
+
+    def test_mst_decoding_workers_give_the_same_heads_and_keep_the_model_copyable(self):
+        self.model.eval()
+        self.model.use_mst_decoding_for_validation = True
+        training_tensors = self.dataset.as_tensor_dict()
+        expected_heads = self.model(**training_tensors)["heads"].numpy()
+
+        self.model._mst_decoding_workers = 2
+        heads = self.model(**training_tensors)["heads"].numpy()
+        numpy.testing.assert_array_equal(heads, expected_heads)
+        # The pool isn't part of the model.
+        copy.deepcopy(self.model)
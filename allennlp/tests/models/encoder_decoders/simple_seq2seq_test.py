@@ -1,4 +1,4 @@
-# pylint: disable=invalid-name
+# pylint: disable=invalid-name,protected-access
 import numpy
 import torch
 
@@ -38,6 +38,33 @@ class SimpleSeq2SeqWithoutAttentionTest(ModelTestCase):
         # ``decode`` should have added a ``predicted_tokens`` field to ``output_dict``. Checking if it's there.
         assert "predicted_tokens" in decode_output_dict
 
+    def test_beam_search_of_width_one_matches_greedy_decoding(self):
+        self.model.eval()
+        source_tokens = self.dataset.as_tensor_dict()["source_tokens"]
+        greedy_tokens = self.model.decode(self.model(source_tokens))["predicted_tokens"]
+
+        self.model._beam_size = 1
+        output_dict = self.model(source_tokens)
+        assert "class_probabilities" not in output_dict
+        assert self.model.decode(output_dict)["predicted_tokens"] == greedy_tokens
+
+    def test_beam_search_returns_sorted_hypotheses(self):
+        self.model.eval()
+        self.model._beam_size = 3
+        training_tensors = self.dataset.as_tensor_dict()
+        output_dict = self.model(**training_tensors)
+        batch_size = len(self.instances)
+        assert "loss" in output_dict
+        beam_predictions = output_dict["beam_predictions"]
+        assert beam_predictions.size(0) == batch_size
+        assert beam_predictions.size(1) == 3
+        assert beam_predictions.size(2) <= self.model._max_decoding_steps
+        numpy.testing.assert_array_equal(output_dict["predictions"].numpy(), beam_predictions[:, 0].numpy())
+        log_probabilities = output_dict["beam_log_probabilities"].numpy()
+        assert log_probabilities.shape == (batch_size, 3)
+        assert (log_probabilities[:, :-1] >= log_probabilities[:, 1:]).all()
+        assert (log_probabilities <= 0).all()
+
 class SimpleSeq2SeqWithAttentionTest(ModelTestCase):
     def setUp(self):
         super(SimpleSeq2SeqWithAttentionTest, self).setUp()
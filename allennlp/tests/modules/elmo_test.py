@@ -1,8 +1,14 @@
 # pylint: disable=no-self-use,invalid-name,protected-access
+import gc
+import glob
 import os
 import json
+import threading
+import time
 import warnings
+import weakref
 from typing import List
+from unittest import mock
 
 with warnings.catch_warnings():
     warnings.filterwarnings("ignore", category=FutureWarning)
@@ -16,7 +22,7 @@ from allennlp.data.token_indexers.single_id_token_indexer import SingleIdTokenIn
 from allennlp.data import Token, Vocabulary, Instance
 from allennlp.data.dataset import Batch
 from allennlp.data.iterators import BasicIterator
-from allennlp.modules.elmo import _ElmoBiLm, Elmo, _ElmoCharacterEncoder
+from allennlp.modules.elmo import _ElmoBiLm, Elmo, _ElmoCharacterEncoder, _ElmoTokenCache, batch_to_ids
 from allennlp.modules.token_embedders import ElmoTokenEmbedder
 from allennlp.data.fields import TextField
 from allennlp.nn.util import remove_sentence_boundaries
@@ -166,6 +172,112 @@ class TestElmoBiLm(ElmoTestCase):
             numpy.testing.assert_array_almost_equal(activation_cached.data.cpu().numpy(),
                                                     activation.data.cpu().numpy(), decimal=6)
 
+    def test_elmo_bilm_token_cache_persists_across_runs(self):
+        cache_directory = str(self.TEST_DIR / 'elmo_token_cache')
+        character_ids = batch_to_ids([["This", "is", "a", "sentence"], ["Here", "'s", "one"]])
+
+        # ELMo is stateful, so we use a new biLM for each comparison.
+        elmo_bilm = _ElmoBiLm(self.options_file, self.weight_file)
+        elmo_bilm.eval()
+        expected = elmo_bilm(character_ids)
+
+        for _ in range(2):
+            elmo_bilm = _ElmoBiLm(self.options_file, self.weight_file, token_cache_directory=cache_directory)
+            elmo_bilm.eval()
+            token_embedder = elmo_bilm._token_embedder
+            with mock.patch.object(token_embedder, '_compute_token_embedding',
+                                   wraps=token_embedder._compute_token_embedding) as compute_token_embedding:
+                output = elmo_bilm(character_ids)
+            numpy.testing.assert_array_equal(output["mask"].data.numpy(), expected["mask"].data.numpy())
+            for activation, expected_activation in zip(output["activations"], expected["activations"]):
+                numpy.testing.assert_array_almost_equal(activation.data.numpy(),
+                                                        expected_activation.data.numpy(), decimal=6)
+            token_embedder._token_cache.save()
+        # The second biLM found all of the tokens in the cache the first one saved.
+        assert not compute_token_embedding.called
+        # BOS, EOS, padding and the 7 words.
+        assert len(token_embedder._token_cache) == 10
+
+        # We only run the CNN for new tokens.
+        with mock.patch.object(token_embedder, '_compute_token_embedding',
+                               wraps=token_embedder._compute_token_embedding) as compute_token_embedding:
+            elmo_bilm(batch_to_ids([["This", "is", "new"]]))
+        assert compute_token_embedding.call_count == 1
+        assert list(compute_token_embedding.call_args[0][0].size()) == [1, 50]
+
+        # Fine tuning the CNN makes the cache useless.
+        elmo_bilm = _ElmoBiLm(self.options_file, self.weight_file,
+                              requires_grad=True, token_cache_directory=cache_directory)
+        assert elmo_bilm._token_embedder._token_cache is None
+
+    def test_elmo_token_cache_appends_new_tokens_in_shards(self):
+        cache_directory = str(self.TEST_DIR / 'elmo_token_cache')
+        elmo_bilm = _ElmoBiLm(self.options_file, self.weight_file, token_cache_directory=cache_directory)
+        elmo_bilm.eval()
+        token_cache = elmo_bilm._token_embedder._token_cache
+        elmo_bilm(batch_to_ids([["This", "is"]]))
+        token_cache.save()
+        elmo_bilm(batch_to_ids([["This", "one"]]))
+        token_cache.save()
+        # Saving again without new tokens doesn't write anything.
+        token_cache.save()
+
+        # Each save only wrote the tokens that were new since the last one.
+        num_tokens_per_shard = []
+        for shard_path in sorted(glob.glob(os.path.join(cache_directory, '*', '*.npz'))):
+            with numpy.load(shard_path) as shard:
+                num_tokens_per_shard.append(len(shard['character_ids']))
+        # BOS, EOS, "This" and "is", then "one".
+        assert num_tokens_per_shard == [4, 1]
+        # The cache stays on the CPU.
+        assert not token_cache._token_embeddings.is_cuda
+
+        # A cache that can't hold all of the tokens only loads as many as it can.
+        assert len(_ElmoTokenCache(self.weight_file, cache_directory, max_tokens=3)) == 3
+
+        # The hook that saves the cache at exit doesn't keep it alive.
+        cache_reference = weakref.ref(token_cache)
+        del elmo_bilm, token_cache
+        gc.collect()
+        assert cache_reference() is None
+
+    def test_elmo_token_cache_is_thread_safe(self):
+        # DataParallel replicas share their cache and use it from several threads at once.
+        token_cache = _ElmoTokenCache(self.weight_file, str(self.TEST_DIR / 'elmo_token_cache'))
+
+        def compute_token_embeddings(character_ids):
+            time.sleep(0.001)
+            return character_ids.float()
+
+        def all_character_ids(thread_index):
+            return torch.LongTensor([[thread_index, batch_index, token_index]
+                                     for batch_index in range(10) for token_index in range(5)])
+
+        errors = []
+
+        def look_up_tokens(thread_index):
+            try:
+                for character_ids in all_character_ids(thread_index).split(5):
+                    embeddings = token_cache.get_token_embeddings(character_ids, compute_token_embeddings)
+                    assert torch.equal(embeddings, character_ids.float())
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        threads = [threading.Thread(target=look_up_tokens, args=(thread_index,)) for thread_index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+
+        # Every token got a row of its own.
+        def fail(character_ids):
+            raise AssertionError(f"{len(character_ids)} tokens weren't cached")
+        character_ids = torch.cat([all_character_ids(thread_index) for thread_index in range(4)])
+        assert len(token_cache) == 200
+        assert torch.equal(token_cache.get_token_embeddings(character_ids, fail), character_ids.float())
+
+
 class TestElmo(ElmoTestCase):
     def setUp(self):
         super(TestElmo, self).setUp()
@@ -269,7 +381,8 @@ class TestElmo(ElmoTestCase):
 
 class TestElmoRequiresGrad(ElmoTestCase):
     def _run_test(self, requires_grad):
-        embedder = ElmoTokenEmbedder(self.options_file, self.weight_file, requires_grad=requires_grad)
+        embedder = ElmoTokenEmbedder(self.options_file, self.weight_file, requires_grad=requires_grad,
+                                     token_cache_directory=None)
         batch_size = 3
         seq_len = 4
         char_ids = torch.from_numpy(numpy.random.randint(0, 262, (batch_size, seq_len, 50)))
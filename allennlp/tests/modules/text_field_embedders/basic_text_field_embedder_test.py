@@ -93,7 +93,8 @@ class TestBasicTextFieldEmbedder(AllenNlpTestCase):
                 "elmo": {
                         "type": "elmo_token_embedder",
                         "options_file": options_file,
-                        "weight_file": weight_file
+                        "weight_file": weight_file,
+                        "token_cache_directory": None
                         },
                 "embedder_to_indexer_map": {"words": ["words"], "elmo": ["elmo", "words"]}
                 })
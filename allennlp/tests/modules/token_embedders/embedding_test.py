@@ -1,6 +1,8 @@
 # pylint: disable=no-self-use,invalid-name
 import gzip
+import os
 import warnings
+from unittest import mock
 
 import numpy
 import pytest
@@ -15,6 +17,8 @@ from allennlp.common.testing import AllenNlpTestCase
 from allennlp.data import Vocabulary
 from allennlp.modules.token_embedders.embedding import (Embedding,
                                                         _read_pretrained_embeddings_file,
+                                                        _read_embeddings_from_text_file,
+                                                        convert_embeddings_text_file,
                                                         EmbeddingsTextFile,
                                                         format_embeddings_file_uri,
                                                         parse_embeddings_file_uri)
@@ -90,6 +94,51 @@ class TestEmbedding(AllenNlpTestCase):
         word_vector = embedding_layer.weight.data[vocab.get_token_index("word2")]
         assert not numpy.allclose(word_vector.numpy(), numpy.array([0.0, 0.0, 0.0]))
 
+    def test_text_file_is_read_the_same_in_parallel_chunks(self):
+        vocab = Vocabulary()
+        lines = ["2002 3\n"]
+        expected = {}
+        for i in range(2000):
+            vector = numpy.random.rand(3).round(4)
+            lines.append(f"word{i} " + " ".join(str(value) for value in vector) + "\n")
+            if i % 2:
+                vocab.add_token_to_namespace(f"word{i}")
+                expected[f"word{i}"] = vector
+        # A line with the wrong number of dimensions, and a token that appears twice.
+        lines.append("word1 0.1 0.2\n")
+        lines.append("word3 0.5 0.5 0.5\n")
+        expected["word3"] = numpy.array([0.5, 0.5, 0.5])
+        vocab.add_token_to_namespace("missing")
+
+        text_filename = str(self.TEST_DIR / "embeddings.txt")
+        gzip_filename = str(self.TEST_DIR / "embeddings.txt.gz")
+        with open(text_filename, 'w') as embeddings_file:
+            embeddings_file.write("".join(lines))
+        with gzip.open(gzip_filename, 'wt') as embeddings_file:
+            embeddings_file.write("".join(lines))
+
+        with mock.patch('allennlp.modules.token_embedders.embedding._TEXT_FILE_CHUNK_BYTES', 1000), \
+                mock.patch('allennlp.modules.token_embedders.embedding._TEXT_FILE_CHUNK_LINES', 100), \
+                mock.patch('allennlp.modules.token_embedders.embedding._MIN_COMPRESSED_BYTES_FOR_POOL', 0):
+            for filename in [text_filename, gzip_filename]:
+                for num_workers in [1, 3]:
+                    weights = _read_embeddings_from_text_file(filename, 3, vocab, num_workers=num_workers)
+                    for token, vector in expected.items():
+                        assert numpy.allclose(weights[vocab.get_token_index(token)].numpy(), vector)
+                    assert not numpy.allclose(weights[vocab.get_token_index("missing")].numpy(),
+                                              numpy.zeros(3))
+
+    def test_small_compressed_embeddings_file_is_read_without_a_pool(self):
+        vocab = Vocabulary()
+        vocab.add_token_to_namespace("word")
+        gzip_filename = str(self.TEST_DIR / "embeddings.txt.gz")
+        with gzip.open(gzip_filename, 'wt') as embeddings_file:
+            embeddings_file.write("word 1.0 2.0 3.0\n")
+        with mock.patch('allennlp.modules.token_embedders.embedding.multiprocessing.Pool') as pool:
+            weights = _read_embeddings_from_text_file(gzip_filename, 3, vocab, num_workers=3)
+        assert not pool.called
+        assert numpy.allclose(weights[vocab.get_token_index("word")].numpy(), [1.0, 2.0, 3.0])
+
     def test_read_hdf5_format_file(self):
         vocab = Vocabulary()
         vocab.add_token_to_namespace("word")
@@ -155,6 +204,46 @@ class TestEmbedding(AllenNlpTestCase):
                 i = vocab.get_token_index(tok)
                 assert torch.equal(embeddings[i], vec), 'Problem with format ' + archive_path
 
+    def test_converted_embeddings_file_is_used_instead_of_text_file(self):
+        vocab = Vocabulary()
+        vocab.add_token_to_namespace("word")
+        vocab.add_token_to_namespace("word2")
+        unicode_space = "\xa0\xa0\xa0\xa0"
+        vocab.add_token_to_namespace(unicode_space)
+        embeddings_filename = str(self.TEST_DIR / "embeddings.gz")
+        with gzip.open(embeddings_filename, 'wb') as embeddings_file:
+            embeddings_file.write("word 1.0 2.3 -1.0\n".encode('utf-8'))
+            embeddings_file.write("other 0.0 0.0 0.0\n".encode('utf-8'))
+            embeddings_file.write("bad 0.0 0.0\n".encode('utf-8'))
+            embeddings_file.write(f"{unicode_space} 3.4 3.3 5.0\n".encode('utf-8'))
+        text_weights = _read_pretrained_embeddings_file(embeddings_filename, 3, vocab)
+
+        converted_path = convert_embeddings_text_file(embeddings_filename)
+        assert converted_path == embeddings_filename + ".npy"
+        assert numpy.load(converted_path).shape == (3, 3)
+
+        with mock.patch('allennlp.modules.token_embedders.embedding._read_embeddings_from_text_file') as read_text:
+            embedding_layer = Embedding.from_params(vocab, Params({'pretrained_file': embeddings_filename,
+                                                                   'embedding_dim': 3}))
+            assert not read_text.called
+        weights = embedding_layer.weight.data
+        for token in ["word", unicode_space]:
+            index = vocab.get_token_index(token)
+            assert torch.equal(weights[index], text_weights[index])
+        assert not numpy.allclose(weights[vocab.get_token_index("word2")].numpy(), numpy.array([0.0, 0.0, 0.0]))
+
+        # The converted file can also be used directly, but must have the right dimension.
+        weights = _read_pretrained_embeddings_file(converted_path, 3, vocab)
+        assert torch.equal(weights[vocab.get_token_index("word")], torch.FloatTensor([1.0, 2.3, -1.0]))
+        with pytest.raises(ConfigurationError):
+            _read_pretrained_embeddings_file(converted_path, 4, vocab)
+
+        # If the text file changes, we stop using the converted file.
+        os.utime(converted_path, (0, 0))
+        with mock.patch('allennlp.modules.token_embedders.embedding._read_embeddings_from_text_file') as read_text:
+            _read_pretrained_embeddings_file(embeddings_filename, 3, vocab)
+            assert read_text.called
+
     def test_embeddings_text_file(self):
         txt_path = str(self.FIXTURES_ROOT / 'utf-8_sample/utf-8_sample.txt')
 
@@ -44,3 +44,18 @@ class TestBeamSearch(AllenNlpTestCase):
         assert best_states[1][0].action_history[0] == [3, 4]
         assert best_states[2][0].action_history[0] == [-18, -16, -14, -12, -10]
         assert best_states[3][0].action_history[0] == [7, 9, 11, 13, 15]
+
+    def test_rank_finished_states_matches_sorting(self):
+        beam_search = BeamSearch(beam_size=3)
+        finished_states = {}
+        for batch_index, num_states in [(0, 5), (2, 1), (7, 3)]:
+            scores = torch.randn(num_states)
+            finished_states[batch_index] = [SimpleDecoderState([batch_index], [[i]], [scores[i]])
+                                            for i in range(num_states)]
+        best_states = beam_search._rank_finished_states(finished_states)
+        assert sorted(best_states) == [0, 2, 7]
+        for batch_index, batch_states in finished_states.items():
+            expected = sorted(batch_states, key=lambda state: -state.score[0].item())[:3]
+            assert [state.action_history for state in best_states[batch_index]] == \
+                    [state.action_history for state in expected]
+        assert beam_search._rank_finished_states({}) == {}
@@ -1,11 +1,32 @@
 # pylint: disable=invalid-name,no-self-use,protected-access
+import itertools
+from multiprocessing import Pool
 
 import numpy
 import pytest
 
 from allennlp.common.testing import AllenNlpTestCase
 from allennlp.common.checks import ConfigurationError
-from allennlp.nn.decoding.chu_liu_edmonds import _find_cycle, decode_mst
+from allennlp.nn.decoding.chu_liu_edmonds import (_find_cycle, batch_decode_mst, decode_mst,
+                                                   maximum_spanning_tree, recursive_maximum_spanning_tree)
+
+
+def _tree_score(score_matrix, heads):
+    return sum(score_matrix[head, child] for child, head in enumerate(heads) if child > 0)
+
+
+def _brute_force_tree_score(score_matrix):
+    length = score_matrix.shape[0]
+    best = -numpy.inf
+    for heads in itertools.product(range(length), repeat=length - 1):
+        heads = (0,) + heads
+        if any(head == child for child, head in enumerate(heads) if child > 0):
+            continue
+        if _find_cycle(list(heads), length, [True] * length)[0]:
+            continue
+        best = max(best, _tree_score(score_matrix, heads))
+    return best
+
 
 class ChuLiuEdmondsTest(AllenNlpTestCase):
     def test_find_cycle(self):
@@ -72,3 +93,44 @@ class ChuLiuEdmondsTest(AllenNlpTestCase):
         with pytest.raises(ConfigurationError):
             energy = numpy.random.rand(3, 5, 5)
             decode_mst(energy, 5, has_labels=False)
+
+    def test_maximum_spanning_tree_is_optimal(self):
+        numpy.random.seed(13)
+        for _ in range(20):
+            score_matrix = numpy.random.rand(5, 5)
+            heads = maximum_spanning_tree(score_matrix)
+            assert heads[0] == 0
+            assert not _find_cycle(list(heads), 5, [True] * 5)[0]
+            numpy.testing.assert_almost_equal(_tree_score(score_matrix, heads),
+                                              _brute_force_tree_score(score_matrix))
+
+    def test_maximum_spanning_tree_matches_recursive_implementation(self):
+        numpy.random.seed(13)
+        for length in (2, 10, 30, 60):
+            for _ in range(5):
+                score_matrix = numpy.random.rand(length, length)
+                heads = maximum_spanning_tree(score_matrix)
+                assert not _find_cycle(list(heads), length, [True] * length)[0]
+                expected_heads = recursive_maximum_spanning_tree(score_matrix)
+                numpy.testing.assert_almost_equal(_tree_score(score_matrix, heads),
+                                                  _tree_score(score_matrix, expected_heads))
+
+    def test_batch_decode_mst_matches_decode_mst(self):
+        energy = numpy.random.rand(4, 3, 7, 7)
+        lengths = [7, 3, 5, 1]
+        expected = [decode_mst(sentence_energy, length) for sentence_energy, length in zip(energy, lengths)]
+
+        heads, head_types = batch_decode_mst(energy, lengths)
+        assert heads.shape == head_types.shape == (4, 7)
+        for (expected_heads, expected_types), sentence_heads, sentence_types in zip(expected, heads, head_types):
+            numpy.testing.assert_array_equal(sentence_heads, expected_heads)
+            numpy.testing.assert_array_equal(sentence_types, expected_types)
+
+        with Pool(2) as pool:
+            pool_heads, pool_head_types = batch_decode_mst(energy, lengths, pool=pool)
+        numpy.testing.assert_array_equal(pool_heads, heads)
+        numpy.testing.assert_array_equal(pool_head_types, head_types)
+
+        unlabeled_heads, unlabeled_types = batch_decode_mst(energy.max(axis=1), lengths, has_labels=False)
+        assert unlabeled_types is None
+        numpy.testing.assert_array_equal(unlabeled_heads, heads)
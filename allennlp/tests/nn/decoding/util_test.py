@@ -31,3 +31,23 @@ class TestNnDecodingUtil(AllenNlpTestCase):
         assert prefix_tree[1][(2,)] == {3}
         assert prefix_tree[1][(2, 3)] == {4}
         assert prefix_tree[1][(3,)] == {4}
+
+    def test_top_actions_per_instance(self):
+        log_probs = torch.FloatTensor([[.1, .9, -.1, .2],
+                                       [.3, 1.1, .1, .8],
+                                       [.05, .25, .3, .4]])
+        batch_indices = [0, 1, 0]
+        valid_actions = [[True, True, False, True],
+                         [True, False, True, False],
+                         [True, True, True, False]]
+        best_actions = util.top_actions_per_instance(log_probs, batch_indices, valid_actions, max_actions=3)
+        # Instance 0 ranks the actions of group elements 0 and 2 together, skipping invalid ones.
+        assert best_actions == {0: [(0, 1), (2, 2), (2, 1)], 1: [(1, 0), (1, 2)]}
+
+        best_actions = util.top_actions_per_instance(log_probs, batch_indices, valid_actions)
+        assert best_actions[0] == [(0, 1), (2, 2), (2, 1), (0, 3), (0, 0), (2, 0)]
+        assert best_actions[1] == [(1, 0), (1, 2)]
+
+        # Instances without valid actions are left out.
+        no_valid_actions = [[False] * 4, [True, False, False, False], [False] * 4]
+        assert util.top_actions_per_instance(log_probs, batch_indices, no_valid_actions) == {1: [(1, 0)]}
@@ -432,6 +432,36 @@ class TestNnUtil(AllenNlpTestCase):
                                          observations)
         assert indices == [2, 3, 3, 0, 4, 3]
 
+    def test_batched_viterbi_decode_matches_viterbi_decode(self):
+        sequence_logits = torch.randn([4, 7, 5])
+        transition_matrix = torch.randn([5, 5])
+        transition_matrix[2, 3] = float("-inf")
+        lengths = [7, 3, 1, 5]
+        mask = torch.zeros([4, 7]).long()
+        for i, length in enumerate(lengths):
+            mask[i, :length] = 1
+        observations = torch.LongTensor([[-1, -1, 2, -1, -1, -1, 0],
+                                         [1, -1, -1, -1, -1, -1, -1],
+                                         [-1, -1, -1, -1, -1, -1, -1],
+                                         [-1, 4, -1, -1, 3, -1, -1]])
+
+        for tag_observations in [None, observations]:
+            paths, scores = util.batched_viterbi_decode(sequence_logits, transition_matrix, mask, tag_observations)
+            for i, length in enumerate(lengths):
+                observation_list = None if tag_observations is None else tag_observations[i, :length].tolist()
+                expected_path, expected_score = util.viterbi_decode(sequence_logits[i, :length],
+                                                                    transition_matrix,
+                                                                    observation_list)
+                assert paths[i] == expected_path
+                numpy.testing.assert_almost_equal(scores[i].item(), expected_score.item(), decimal=4)
+
+        # Without a mask, every sequence is decoded in full.
+        paths, _ = util.batched_viterbi_decode(sequence_logits, transition_matrix)
+        assert [len(path) for path in paths] == [7, 7, 7, 7]
+
+        with pytest.raises(ConfigurationError):
+            util.batched_viterbi_decode(sequence_logits, transition_matrix, mask, observations[:, :3])
+
     def test_sequence_cross_entropy_with_logits_masks_loss_correctly(self):
 
         # test weight masking by checking that a tensor with non-zero values in
@@ -10,3 +10,29 @@ class TestPredictor(AllenNlpTestCase):
 
         # If it consumes the params, this will raise an exception
         Predictor.from_archive(archive, 'machine-comprehension')
+
+    def test_sorted_batch_prediction_keeps_the_input_order(self):
+        archive = load_archive(self.FIXTURES_ROOT / 'bidaf' / 'serialization' / 'model.tar.gz')
+        predictor = Predictor.from_archive(archive, 'machine-comprehension')
+        passages = ["One time I was writing a unit test, and it succeeded on the first attempt.",
+                    "It failed.",
+                    "One time I was writing a unit test, and it always failed, no matter what I did to it!",
+                    "The unit test succeeded."]
+        inputs = [{"question": "What happened to the test?", "passage": passage} for passage in passages]
+        expected = [predictor.predict_json(json_dict) for json_dict in inputs]
+
+        sub_batches = []
+        forward_on_instances = archive.model.forward_on_instances
+        def recording_forward_on_instances(instances):
+            sub_batches.append([len(instance.fields["passage"].tokens) for instance in instances])
+            return forward_on_instances(instances)
+        archive.model.forward_on_instances = recording_forward_on_instances
+
+        predictor.sort_batches_by_length(sub_batch_size=2)
+        results = predictor.predict_batch_json(inputs)
+
+        # The two short passages and the two long passages were run together.
+        assert sub_batches == [[3, 5], [17, 22]]
+        assert ([result["passage_tokens"] for result in results] ==
+                [result["passage_tokens"] for result in expected])
+        assert [result["best_span_str"] for result in results] == [result["best_span_str"] for result in expected]
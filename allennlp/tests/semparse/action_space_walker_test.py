@@ -1,3 +1,6 @@
+import os
+from unittest import mock
+
 from overrides import overrides
 
 from nltk.sem.logic import TRUTH_TYPE
@@ -69,3 +72,23 @@ class ActionSpaceWalkerTest(AllenNlpTestCase):
         assert set(length_three_logical_forms) == {'(object_exists (black all_objects))',
                                                    '(object_exists (touch_wall all_objects))',
                                                    '(object_exists (triangle all_objects))'}
+
+    def test_cached_and_parallel_walks_find_the_same_logical_forms(self):
+        expected = self.walker.get_all_logical_forms()
+        cache_directory = str(self.TEST_DIR / 'walker_cache')
+        walker = ActionSpaceWalker(self.world, max_path_length=10, num_processes=2,
+                                   cache_directory=cache_directory)
+        assert walker.get_all_logical_forms() == expected
+        assert len(os.listdir(cache_directory)) == 1
+
+        # A second walker over the same grammar reads the paths from the cache instead of walking.
+        with mock.patch('allennlp.semparse.action_space_walker._walk_from_starting_type',
+                        side_effect=AssertionError("should have used the cache")):
+            cached_walker = ActionSpaceWalker(self.world, max_path_length=10, cache_directory=cache_directory)
+            assert cached_walker.get_all_logical_forms() == expected
+            assert cached_walker.get_logical_forms_with_agenda(['<o,o> -> black']) == \
+                    self.walker.get_logical_forms_with_agenda(['<o,o> -> black'])
+
+        # A different maximum path length is a different cache entry.
+        ActionSpaceWalker(self.world, max_path_length=8, cache_directory=cache_directory).get_all_logical_forms()
+        assert len(os.listdir(cache_directory)) == 2
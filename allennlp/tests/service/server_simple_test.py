@@ -1,15 +1,17 @@
 # pylint: disable=no-self-use,invalid-name,line-too-long
 import json
 import os
+import threading
 
 import flask
 import flask.testing
+import pytest
 
 from allennlp.common.util import JsonDict
 from allennlp.common.testing import AllenNlpTestCase
 from allennlp.models.archival import load_archive
 from allennlp.predictors import Predictor
-from allennlp.service.server_simple import make_app
+from allennlp.service.server_simple import make_app, PredictionBatcher
 
 
 def post_json(client: flask.testing.FlaskClient, endpoint: str, data: JsonDict) -> flask.Response:
@@ -93,3 +95,52 @@ class TestSimpleServer(AllenNlpTestCase):
         response = client.get('jpg.txt')
         data = response.get_data().decode('utf-8')
         assert data == jpg
+
+    def test_concurrent_requests_are_batched(self):
+        batch_sizes = []
+        predict_batch_json = self.bidaf_predictor.predict_batch_json
+
+        def recording_predict_batch_json(inputs):
+            batch_sizes.append(len(inputs))
+            return predict_batch_json(inputs)
+        self.bidaf_predictor.predict_batch_json = recording_predict_batch_json
+
+        app = make_app(predictor=self.bidaf_predictor,
+                       field_names=['passage', 'question'],
+                       max_batch_size=3,
+                       batch_window=10)
+        app.testing = True
+
+        questions = ["Who stars in the matrix?", "When was the matrix made?", "Who directed the matrix?"]
+        responses = {}
+        def request(question):
+            payload = {'passage': PAYLOAD['passage'], 'question': question}
+            responses[question] = json.loads(post_json(app.test_client(), '/predict', payload).get_data())
+        threads = [threading.Thread(target=request, args=(question,)) for question in questions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # The batch filled up long before the window closed, and everyone got their own answer.
+        assert batch_sizes == [3]
+        for question in questions:
+            expected = self.bidaf_predictor.predict_json({'passage': PAYLOAD['passage'], 'question': question})
+            assert responses[question]['best_span_str'] == expected['best_span_str']
+
+    def test_batcher_survives_unexpected_errors(self):
+        class FailingOnceBatcher(PredictionBatcher):
+            failed = False
+
+            def _predict_batch(self, batch):
+                if not self.failed:
+                    self.failed = True
+                    raise RuntimeError("unexpected")
+                super()._predict_batch(batch)
+
+        batcher = FailingOnceBatcher(self.bidaf_predictor, max_batch_size=1, batch_window=0)
+        with pytest.raises(RuntimeError):
+            batcher.predict_json(PAYLOAD)
+        # The batcher thread is still there to predict later requests.
+        result = batcher.predict_json(PAYLOAD)
+        assert result['best_span_str'] == self.bidaf_predictor.predict_json(PAYLOAD)['best_span_str']
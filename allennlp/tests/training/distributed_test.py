@@ -0,0 +1,89 @@
+# pylint: disable=invalid-name
+import socket
+import traceback
+
+import numpy
+import torch
+import torch.multiprocessing as multiprocessing
+
+from allennlp.common.testing import AllenNlpTestCase
+from allennlp.training import distributed
+
+
+class _Model(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.embedding = torch.nn.Embedding(10, 4, sparse=True)
+        self.extra_embedding = torch.nn.Embedding(10, 4, sparse=True)
+        self.projection = torch.nn.Linear(4, 1)
+        self.extra_projection = torch.nn.Linear(4, 1)
+        self.unused_projection = torch.nn.Linear(4, 1)
+
+    def forward(self, indices, use_extra):  # pylint: disable=arguments-differ
+        output = self.projection(self.embedding(indices))
+        if use_extra:
+            output = output + self.extra_projection(self.extra_embedding(indices))
+        return output.pow(2).mean()
+
+
+# The batch of each process, and whether it uses the extra embedding and projection, which the
+# other process then has no (sparse and dense) gradients for.
+_BATCHES = [(torch.LongTensor([[1, 2], [3, 3]]), True),
+            (torch.LongTensor([[3, 4], [5, 6]]), False)]
+
+
+def _make_model_and_optimizer():
+    torch.manual_seed(0)
+    model = _Model()
+    return model, torch.optim.SGD(model.parameters(), lr=0.1)
+
+
+def _parameters(model):
+    return {name: parameter.detach().numpy().copy() for name, parameter in model.named_parameters()}
+
+
+def _train_worker(rank, world_size, master_port, output_queue):
+    try:
+        distributed.init_process_group(rank, world_size, master_port)
+        model, optimizer = _make_model_and_optimizer()
+        indices, use_extra = _BATCHES[rank]
+        model(indices, use_extra).backward()
+        distributed.all_reduce_gradients(model.parameters(), rank, world_size)
+        optimizer.step()
+        output_queue.put((rank, _parameters(model), model.unused_projection.weight.grad is None, None))
+    except Exception:  # pylint: disable=broad-except
+        output_queue.put((rank, None, None, traceback.format_exc()))
+
+
+class TestDistributed(AllenNlpTestCase):
+    def test_all_reduce_gradients_matches_single_process_training(self):
+        with socket.socket() as free_socket:
+            free_socket.bind(('127.0.0.1', 0))
+            master_port = free_socket.getsockname()[1]
+        output_queue = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_train_worker, args=(rank, 2, master_port, output_queue))
+                   for rank in range(2)]
+        for worker in workers:
+            worker.start()
+        results = {}
+        try:
+            for _ in workers:
+                rank, parameters, unused_grad_is_none, error = output_queue.get(timeout=60)
+                assert error is None, error
+                # A parameter without a gradient in any process still doesn't have one.
+                assert unused_grad_is_none
+                results[rank] = parameters
+        finally:
+            for worker in workers:
+                worker.join()
+
+        # A single process training on both batches, whose combined loss is the average of theirs.
+        model, optimizer = _make_model_and_optimizer()
+        loss = sum(model(indices, use_extra) for indices, use_extra in _BATCHES) / len(_BATCHES)
+        loss.backward()
+        optimizer.step()
+        expected = _parameters(model)
+
+        for name, expected_parameter in expected.items():
+            numpy.testing.assert_array_equal(results[0][name], results[1][name])
+            numpy.testing.assert_array_almost_equal(results[0][name], expected_parameter)
@@ -0,0 +1,97 @@
+# pylint: disable=no-self-use,invalid-name,protected-access
+import random
+
+from nltk import Tree
+
+from allennlp.common.testing import AllenNlpTestCase
+from allennlp.training.metrics import BracketingScorer, EvalbBracketingScorer
+
+
+class BracketingScorerTest(AllenNlpTestCase):
+    def test_correctly_scores_identical_trees(self):
+        tree1 = Tree.fromstring("(S (NP (D the) (N dog)) (VP (V chased) (NP (D the) (N cat))))")
+        tree2 = Tree.fromstring("(S (NP (D the) (N dog)) (VP (V chased) (NP (D the) (N cat))))")
+        scorer = BracketingScorer()
+        scorer([tree1], [tree2])
+        metrics = scorer.get_metric()
+        assert metrics["evalb_recall"] == 1.0
+        assert metrics["evalb_precision"] == 1.0
+        assert metrics["evalb_f1_measure"] == 1.0
+
+    def test_correctly_scores_imperfect_trees(self):
+        # Change to constiutency label (VP ... )should effect scores, but change to POS
+        # tag (NP dog) should have no effect.
+        tree1 = Tree.fromstring("(S (VP (D the) (NP dog)) (VP (V chased) (NP (D the) (N cat))))")
+        tree2 = Tree.fromstring("(S (NP (D the) (N dog)) (VP (V chased) (NP (D the) (N cat))))")
+        scorer = BracketingScorer()
+        scorer([tree1, tree2], [tree2, tree2])
+        metrics = scorer.get_metric(reset=True)
+        assert metrics["evalb_recall"] == 0.875
+        assert metrics["evalb_precision"] == 0.875
+        assert metrics["evalb_f1_measure"] == 0.875
+        assert scorer.get_metric()["evalb_f1_measure"] == 0.0
+
+    def test_follows_the_collins_parameter_file(self):
+        # Punctuation is removed, functional tags are ignored, ADVP and PRT are equivalent, and
+        # the (TOP ...) bracket doesn't count.
+        gold = Tree.fromstring("(TOP (S (NP-SBJ (D the) (N dog)) (VP (V ran) (ADVP (R away))) (. .)))")
+        predicted = Tree.fromstring("(TOP (S (NP (D the) (N dog)) (VP (V ran) (PRT (R away)) (. .))))")
+        scorer = BracketingScorer()
+        scorer([predicted], [gold])
+        metrics = scorer.get_metric()
+        assert metrics["evalb_recall"] == 1.0
+        assert metrics["evalb_precision"] == 1.0
+
+    def test_skips_sentences_with_different_words(self):
+        tree1 = Tree.fromstring("(S (NP (D the) (N dog)) (VP (V barked)))")
+        tree2 = Tree.fromstring("(S (NP (D the) (N cat)) (VP (V barked)))")
+        scorer = BracketingScorer()
+        scorer([tree1], [tree2])
+        assert scorer._gold_brackets == 0
+        assert scorer.get_metric()["evalb_f1_measure"] == 0.0
+
+
+class BracketingScorerEvalbParityTest(AllenNlpTestCase):
+    def setUp(self):
+        super().setUp()
+        EvalbBracketingScorer.compile_evalb()
+
+    def tearDown(self):
+        EvalbBracketingScorer.clean_evalb()
+        super().tearDown()
+
+    @staticmethod
+    def perturb(tree: Tree, rng: random.Random) -> Tree:
+        # Relabels, removes and adds some constituents, keeping the words the same.
+        tree = tree.copy(deep=True)
+        labels = ['NP', 'VP', 'S', 'PP', 'ADVP', 'PRT', 'SBAR-PRP', 'NP-SBJ', 'TOP', '.']
+        positions = [position for position in tree.treepositions()
+                     if position and isinstance(tree[position], Tree) and isinstance(tree[position][0], Tree)]
+        # Changing a constituent only moves its descendants and its later siblings, so we go
+        # through the positions backwards.
+        for position in sorted(rng.sample(positions, min(len(positions), 6)), reverse=True):
+            node = tree[position]
+            choice = rng.random()
+            if choice < 0.4:
+                node.set_label(rng.choice(labels))
+            elif choice < 0.7:
+                tree[position[:-1]][position[-1]:position[-1] + 1] = list(node)
+            elif len(node) >= 2:
+                split = rng.randint(1, len(node) - 1)
+                node[:split] = [Tree(rng.choice(labels), list(node[:split]))]
+        return tree
+
+    def test_matches_evalb_on_ptb_trees(self):
+        with open(self.FIXTURES_ROOT / "data" / "example_ptb.trees") as tree_file:
+            gold_trees = [Tree.fromstring(line) for line in tree_file if line.strip()]
+        rng = random.Random(13)
+        for _ in range(10):
+            predicted_trees = [self.perturb(tree, rng) for tree in gold_trees] + gold_trees
+            evalb_scorer = EvalbBracketingScorer()
+            evalb_scorer(predicted_trees, gold_trees + gold_trees)
+            scorer = BracketingScorer()
+            scorer(predicted_trees, gold_trees + gold_trees)
+            assert scorer._correct_predicted_brackets == evalb_scorer._correct_predicted_brackets
+            assert scorer._gold_brackets == evalb_scorer._gold_brackets
+            assert scorer._predicted_brackets == evalb_scorer._predicted_brackets
+            assert scorer.get_metric() == evalb_scorer.get_metric()
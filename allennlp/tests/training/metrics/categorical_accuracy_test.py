@@ -79,6 +79,20 @@ class CategoricalAccuracyTest(AllenNlpTestCase):
         with pytest.raises(ConfigurationError):
             accuracy(predictions, out_of_range_labels)
 
+    @pytest.mark.skipif(not torch.cuda.is_available(), reason="No CUDA device registered.")
+    def test_categorical_accuracy_keeps_counts_on_the_gpu(self):
+        accuracy = CategoricalAccuracy()
+        predictions = torch.Tensor([[0.35, 0.25, 0.1, 0.1, 0.2],
+                                    [0.1, 0.6, 0.1, 0.2, 0.0]]).cuda()
+        accuracy(predictions, torch.Tensor([0, 3]).cuda())
+        assert accuracy.correct_count.is_cuda
+        assert accuracy.get_metric(reset=True) == 0.5
+
+        # Invalid labels are only noticed when we get the metric.
+        accuracy(torch.rand([5, 7]).cuda(), torch.Tensor([10, 3, 4, 0, 1]).cuda())
+        with pytest.raises(ConfigurationError):
+            accuracy.get_metric()
+
     def test_tie_break_categorical_accuracy(self):
         accuracy = CategoricalAccuracy(tie_break=True)
         predictions = torch.Tensor([[0.35, 0.25, 0.35, 0.35, 0.35],
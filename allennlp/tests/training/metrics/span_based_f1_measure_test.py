@@ -1,6 +1,8 @@
 # pylint: disable=no-self-use,invalid-name,protected-access
 import os
+import random
 import subprocess
+from collections import defaultdict
 
 import torch
 import numpy
@@ -10,6 +12,28 @@ from allennlp.data import Vocabulary
 from allennlp.training.metrics import SpanBasedF1Measure, Metric
 from allennlp.models.semantic_role_labeler import write_to_conll_eval_file
 from allennlp.common.params import Params
+from allennlp.data.dataset_readers.dataset_utils.span_utils import bio_tags_to_spans, bioul_tags_to_spans
+
+
+def _count_spans_with_strings(predicted_tags, gold_tags, tags_to_spans, ignore_classes):
+    """
+    The per label counts that the metric should give, computed one sequence at a time with the
+    string-based span extraction.
+    """
+    counts = {"tp": defaultdict(int), "fp": defaultdict(int), "fn": defaultdict(int)}
+    for predicted_sequence, gold_sequence in zip(predicted_tags, gold_tags):
+        predicted_spans = SpanBasedF1Measure._handle_continued_spans(tags_to_spans(predicted_sequence,
+                                                                                   ignore_classes))
+        gold_spans = SpanBasedF1Measure._handle_continued_spans(tags_to_spans(gold_sequence, ignore_classes))
+        for span in predicted_spans:
+            if span in gold_spans:
+                counts["tp"][span[0]] += 1
+                gold_spans.remove(span)
+            else:
+                counts["fp"][span[0]] += 1
+        for span in gold_spans:
+            counts["fn"][span[0]] += 1
+    return {key: dict(value) for key, value in counts.items()}
 
 
 class SpanBasedF1Test(AllenNlpTestCase):
@@ -167,6 +191,61 @@ class SpanBasedF1Test(AllenNlpTestCase):
         numpy.testing.assert_almost_equal(metric_dict["precision-overall"], 0.5)
         numpy.testing.assert_almost_equal(metric_dict["f1-measure-overall"], 0.5)
 
+    def test_span_metrics_match_string_based_span_extraction(self):
+        random.seed(0)
+        tags = self.vocab.get_index_to_token_vocabulary("tags")
+        bio_tag_ids = [index for index, tag in tags.items() if tag[0] in "BIO"]
+        for ignore_classes in [None, ["V"]]:
+            metric = SpanBasedF1Measure(self.vocab, "tags", ignore_classes=ignore_classes)
+            expected = {"tp": defaultdict(int), "fp": defaultdict(int), "fn": defaultdict(int)}
+            for _ in range(20):
+                # Random tag sequences have lots of ill-formed and continued spans.
+                gold_indices = [[random.choice(bio_tag_ids) for _ in range(8)] for _ in range(4)]
+                predicted_indices = [[random.choice(bio_tag_ids) for _ in range(8)] for _ in range(4)]
+                lengths = [random.randint(0, 8) for _ in range(4)]
+                mask = torch.LongTensor([[1] * length + [0] * (8 - length) for length in lengths])
+                prediction_tensor = torch.rand([4, 8, self.vocab.get_vocab_size("tags")])
+                for i, sequence in enumerate(predicted_indices):
+                    for j, tag_index in enumerate(sequence):
+                        prediction_tensor[i, j, tag_index] = 1
+                metric(prediction_tensor, torch.LongTensor(gold_indices), mask)
+
+                counts = _count_spans_with_strings(
+                        [[tags[index] for index in sequence[:length]]
+                         for sequence, length in zip(predicted_indices, lengths)],
+                        [[tags[index] for index in sequence[:length]]
+                         for sequence, length in zip(gold_indices, lengths)],
+                        bio_tags_to_spans, ignore_classes)
+                for key, label_counts in counts.items():
+                    for label, count in label_counts.items():
+                        expected[key][label] += count
+
+            assert metric._true_positives == expected["tp"]
+            assert metric._false_positives == expected["fp"]
+            assert metric._false_negatives == expected["fn"]
+
+    def test_bioul_span_metrics_match_string_based_span_extraction(self):
+        vocab = Vocabulary()
+        for tag in ["O", "B-ARG1", "I-ARG1", "L-ARG1", "U-ARG1", "U-V", "B-V", "L-V"]:
+            vocab.add_token_to_namespace(tag, "tags")
+        gold_tags = [["B-ARG1", "I-ARG1", "L-ARG1", "O", "U-V", "U-ARG1"],
+                     ["U-ARG1", "B-V", "L-V", "B-ARG1", "L-ARG1", "O"]]
+        predicted_tags = [["B-ARG1", "L-ARG1", "U-ARG1", "O", "U-V", "U-ARG1"],
+                          ["U-ARG1", "B-V", "L-V", "B-ARG1", "I-ARG1", "L-ARG1"]]
+        gold_tensor = torch.LongTensor([[vocab.get_token_index(tag, "tags") for tag in sequence]
+                                        for sequence in gold_tags])
+        prediction_tensor = torch.rand([2, 6, vocab.get_vocab_size("tags")])
+        for i, sequence in enumerate(predicted_tags):
+            for j, tag in enumerate(sequence):
+                prediction_tensor[i, j, vocab.get_token_index(tag, "tags")] = 1
+
+        metric = SpanBasedF1Measure(vocab, "tags", ignore_classes=["V"], label_encoding="BIOUL")
+        metric(prediction_tensor, gold_tensor)
+        expected = _count_spans_with_strings(predicted_tags, gold_tags, bioul_tags_to_spans, ["V"])
+        assert metric._true_positives == expected["tp"] == {"ARG1": 2}
+        assert metric._false_positives == expected["fp"]
+        assert metric._false_negatives == expected["fn"]
+
     def test_span_f1_can_build_from_params(self):
         params = Params({"type": "span_f1", "tag_namespace": "tags", "ignore_classes": ["V"]})
         metric = Metric.from_params(params=params, vocabulary=self.vocab)
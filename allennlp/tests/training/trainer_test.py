@@ -1,5 +1,6 @@
 # pylint: disable=invalid-name
 import glob
+import json
 import os
 import re
 import time
@@ -217,6 +218,139 @@ class TestTrainer(AllenNlpTestCase):
                           num_epochs=2)
         trainer.train()
 
+    def test_trainer_accumulates_gradients_over_batches(self):
+        # One step over two batches of one instance should match one step over a batch of two.
+        accumulating_model = SimpleTagger.from_params(vocab=self.vocab, params=self.model_params)
+        accumulating_model.load_state_dict(self.model.state_dict())
+        iterator = BasicIterator(batch_size=1)
+        iterator.index_with(self.vocab)
+        accumulating_trainer = Trainer(model=accumulating_model,
+                                       optimizer=torch.optim.SGD(accumulating_model.parameters(), 0.1),
+                                       iterator=iterator,
+                                       train_dataset=self.instances,
+                                       shuffle=False,
+                                       num_epochs=1,
+                                       num_gradient_accumulation_steps=2)
+        accumulating_trainer.train()
+        assert accumulating_trainer._batch_num_total == 2  # pylint: disable=protected-access
+
+        trainer = Trainer(model=self.model,
+                          optimizer=torch.optim.SGD(self.model.parameters(), 0.1),
+                          iterator=self.iterator,
+                          train_dataset=self.instances,
+                          shuffle=False,
+                          num_epochs=1)
+        trainer.train()
+
+        for (name, parameter), accumulated_parameter in zip(self.model.named_parameters(),
+                                                            accumulating_model.parameters()):
+            assert torch.allclose(parameter, accumulated_parameter, atol=1e-6), name
+
+    def test_trainer_rescales_a_smaller_last_gradient_accumulation_group(self):
+        # With four instances, groups of three batches of one instance leave a last group of one,
+        # which should match batches of three and one instances.
+        accumulating_model = SimpleTagger.from_params(vocab=self.vocab, params=self.model_params)
+        accumulating_model.load_state_dict(self.model.state_dict())
+        iterator = BasicIterator(batch_size=1)
+        iterator.index_with(self.vocab)
+        accumulating_trainer = Trainer(model=accumulating_model,
+                                       optimizer=torch.optim.SGD(accumulating_model.parameters(), 0.1),
+                                       iterator=iterator,
+                                       train_dataset=self.instances,
+                                       shuffle=False,
+                                       num_epochs=1,
+                                       num_gradient_accumulation_steps=3)
+        accumulating_trainer.train()
+        assert accumulating_trainer._batch_num_total == 2  # pylint: disable=protected-access
+
+        iterator = BasicIterator(batch_size=3)
+        iterator.index_with(self.vocab)
+        trainer = Trainer(model=self.model,
+                          optimizer=torch.optim.SGD(self.model.parameters(), 0.1),
+                          iterator=iterator,
+                          train_dataset=self.instances,
+                          shuffle=False,
+                          num_epochs=1)
+        trainer.train()
+
+        for (name, parameter), accumulated_parameter in zip(self.model.named_parameters(),
+                                                            accumulating_model.parameters()):
+            assert torch.allclose(parameter, accumulated_parameter, atol=1e-6), name
+
+    def test_trainer_loss_with_gradient_accumulation_is_the_average_per_iterator_batch(self):
+        # Without any updates, the loss is the same however the batches are grouped, even when the
+        # last group is smaller.
+        iterator = BasicIterator(batch_size=1)
+        iterator.index_with(self.vocab)
+        metrics = []
+        for num_gradient_accumulation_steps in [1, 3]:
+            trainer = Trainer(model=self.model,
+                              optimizer=torch.optim.SGD(self.model.parameters(), 0.0),
+                              iterator=iterator,
+                              train_dataset=self.instances,
+                              shuffle=False,
+                              num_epochs=1,
+                              num_gradient_accumulation_steps=num_gradient_accumulation_steps)
+            metrics.append(trainer.train())
+        assert metrics[1]["training_loss"] == pytest.approx(metrics[0]["training_loss"], abs=1e-6)
+
+    def test_trainer_raises_on_invalid_num_gradient_accumulation_steps(self):
+        with pytest.raises(ConfigurationError):
+            Trainer(self.model, self.optimizer, self.iterator, self.instances, num_gradient_accumulation_steps=0)
+
+    def test_trainer_can_run_with_metrics_interval(self):
+        iterator = BasicIterator(batch_size=1)
+        iterator.index_with(self.vocab)
+        trainer = Trainer(model=self.model,
+                          optimizer=self.optimizer,
+                          iterator=iterator,
+                          train_dataset=self.instances,
+                          validation_dataset=self.instances,
+                          num_epochs=2,
+                          grad_norm=1.0,
+                          metrics_interval=3)
+        metrics = trainer.train()
+        assert isinstance(metrics['training_loss'], float)
+        assert isinstance(metrics['validation_loss'], float)
+        assert isinstance(metrics['validation_accuracy'], float)
+
+    def test_trainer_can_profile(self):
+        iterator = BasicIterator(batch_size=2)
+        iterator.index_with(self.vocab)
+        trainer = Trainer(model=self.model,
+                          optimizer=self.optimizer,
+                          iterator=iterator,
+                          train_dataset=self.instances,
+                          validation_dataset=self.instances,
+                          num_epochs=2,
+                          serialization_dir=self.TEST_DIR,
+                          profile=True,
+                          profile_modules=True)
+        trainer.train()
+        with open(os.path.join(self.TEST_DIR, "profile.json")) as profile_file:
+            profile = json.load(profile_file)
+        phases = profile["phases"]
+        for phase in ["iterator_wait", "tensorization", "forward", "backward", "rescale_gradients",
+                      "optimizer_step", "checkpoint", "validation_iterator_wait", "validation_tensorization",
+                      "validation_forward"]:
+            assert phases[phase]["total_seconds"] >= 0
+        assert phases["tensorization"]["nested_in"] == "iterator_wait"
+        assert phases["validation_tensorization"]["nested_in"] == "validation_iterator_wait"
+        assert "nested_in" not in phases["forward"]
+        # 2 epochs of 2 batches each, for training and for validation.
+        assert phases["tensorization"]["count"] == 4
+        assert phases["validation_tensorization"]["count"] == 4
+        assert phases["forward"]["count"] == 4
+        assert phases["optimizer_step"]["count"] == 4
+        assert profile["modules"]["encoder"]["count"] == 8
+        # The hooks are removed after training.
+        assert not trainer._profiler._hook_handles  # pylint: disable=protected-access
+
+    def test_trainer_raises_on_profile_modules_without_profile(self):
+        iterator = BasicIterator(batch_size=2)
+        with pytest.raises(ConfigurationError):
+            Trainer(self.model, self.optimizer, iterator, self.instances, profile_modules=True)
+
     def test_trainer_raises_on_model_with_no_loss_key(self):
         class FakeModel(torch.nn.Module):
             def forward(self, **kwargs):  # pylint: disable=arguments-differ,unused-argument
@@ -283,6 +417,28 @@ class TestTrainer(AllenNlpTestCase):
             # epoch N has N-1 in file name
             assert sorted(epochs) == [1, 3, 4, 5]
 
+    def test_trainer_writes_checkpoints_in_the_background(self):
+        trainer = Trainer(self.model, self.optimizer,
+                          self.iterator, self.instances, num_epochs=2,
+                          serialization_dir=self.TEST_DIR,
+                          max_pending_checkpoints=2)
+        trainer.train()
+        assert sorted(os.listdir(self.TEST_DIR)) == ['best.th', 'log',
+                                                     'model_state_epoch_0.th', 'model_state_epoch_1.th',
+                                                     'training_state_epoch_0.th', 'training_state_epoch_1.th']
+
+        # The checkpoint holds the parameters as they were when it was saved, even if they
+        # change before it is written.
+        expected_state = {name: parameter.detach().clone()
+                          for name, parameter in self.model.state_dict().items()}
+        trainer._save_checkpoint("saved", [])  # pylint: disable=protected-access
+        for parameter in self.model.parameters():
+            parameter.data.fill_(0.0)
+        trainer._checkpoint_writer.wait()  # pylint: disable=protected-access
+        saved_state = torch.load(os.path.join(self.TEST_DIR, "model_state_epoch_saved.th"))
+        for name, parameter in expected_state.items():
+            assert parameter.equal(saved_state[name])
+
     def test_trainer_saves_models_at_specified_interval(self):
         iterator = BasicIterator(batch_size=4)
         iterator.index_with(self.vocab)
@@ -0,0 +1,155 @@
+"""
+Helpers for data-parallel training with ``torch.distributed``, where each of several processes
+trains a replica of the model on its own share of the batches, and the gradients are averaged
+across the processes after every backward pass.  We only rely on ``all_reduce``, which every
+backend (in particular ``gloo``, for training on CPUs) supports.
+"""
+import logging
+from typing import Iterable, List
+
+import torch
+import torch.distributed as dist
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# The maximum size (in bytes) of the dense gradients we flatten into one buffer for a single
+# ``all_reduce``.  Fewer, larger messages are much faster than one message per parameter.
+_BUCKET_SIZE_BYTES = 16 * 1024 * 1024
+
+
+def init_process_group(rank: int, world_size: int, master_port: int, backend: str = "gloo") -> None:
+    """
+    Joins the process group for distributed training with ``world_size`` processes, all on this
+    machine, which rendezvous over TCP on ``master_port``.
+    """
+    dist.init_process_group(backend=backend,
+                            init_method=f"tcp://127.0.0.1:{master_port}",
+                            world_size=world_size,
+                            rank=rank)
+
+
+def all_gather(tensor: torch.Tensor, rank: int, world_size: int) -> torch.Tensor:
+    """
+    Returns a tensor with a leading dimension of size ``world_size``, containing the given
+    ``tensor`` from each process.  The tensors must have the same shape in all processes.  This is
+    done with an ``all_reduce`` of a buffer which is zero except in this process's slot, because
+    not every backend supports ``all_gather``.
+    """
+    gathered = tensor.new_zeros((world_size,) + tuple(tensor.size()))
+    gathered[rank] = tensor
+    dist.all_reduce(gathered)
+    return gathered
+
+
+def _all_reduce_dense_gradients(gradients: List[torch.Tensor], world_size: int) -> None:
+    buckets: List[List[torch.Tensor]] = []
+    bucket_size = 0
+    for gradient in gradients:
+        gradient_size = gradient.numel() * gradient.element_size()
+        if (not buckets or bucket_size + gradient_size > _BUCKET_SIZE_BYTES or
+                    gradient.type() != buckets[-1][0].type()):
+            buckets.append([])
+            bucket_size = 0
+        buckets[-1].append(gradient)
+        bucket_size += gradient_size
+
+    for bucket in buckets:
+        flat_gradients = _flatten_dense_tensors(bucket)
+        dist.all_reduce(flat_gradients)
+        flat_gradients.div_(world_size)
+        for gradient, reduced in zip(bucket, _unflatten_dense_tensors(flat_gradients, bucket)):
+            gradient.copy_(reduced)
+
+
+def _all_reduce_sparse_gradient(gradient: torch.Tensor, rank: int, world_size: int) -> torch.Tensor:
+    """
+    Averages a sparse gradient (e.g. from an ``Embedding`` with ``sparse=True``) across processes
+    without making it dense: we gather the (padded) indices and values from every process, and
+    add them up as a single sparse tensor.
+    """
+    # pylint: disable=protected-access
+    gradient = gradient.coalesce()
+    indices = gradient._indices()
+    values = gradient._values()
+    num_values = all_gather(torch.DoubleTensor([values.size(0)]), rank, world_size).long().view(-1)
+    max_num_values = int(num_values.max())
+
+    # Indices are sent as doubles, which every backend can reduce, and which hold them exactly.
+    padded_indices = indices.new_zeros((indices.size(0), max_num_values)).double()
+    padded_indices[:, :values.size(0)] = indices.double()
+    padded_values = values.new_zeros((max_num_values,) + tuple(values.size()[1:]))
+    padded_values[:values.size(0)] = values
+
+    all_indices = all_gather(padded_indices, rank, world_size).long()
+    all_values = all_gather(padded_values, rank, world_size)
+    keep = [slice(0, int(size)) for size in num_values]
+    all_indices = torch.cat([process_indices[:, keep_values]
+                             for process_indices, keep_values in zip(all_indices, keep)], dim=1)
+    all_values = torch.cat([process_values[keep_values]
+                            for process_values, keep_values in zip(all_values, keep)], dim=0)
+    reduced = torch.sparse_coo_tensor(all_indices, all_values, gradient.size()).coalesce()
+    return reduced.div_(world_size)
+
+
+def _empty_sparse_gradient(parameter: torch.nn.Parameter) -> torch.Tensor:
+    """
+    Returns a sparse gradient for ``parameter`` with no values, shaped like those of a sparse
+    ``Embedding``, for a process that didn't use a parameter which others have sparse gradients for.
+    """
+    indices = torch.zeros(1, 0).long()
+    values = parameter.data.new_zeros((0,) + tuple(parameter.size()[1:]))
+    return torch.sparse_coo_tensor(indices, values, parameter.size())
+
+
+def all_reduce_gradients(parameters: Iterable[torch.nn.Parameter], rank: int, world_size: int) -> None:
+    """
+    Replaces the gradient of each of the given parameters with its average across all of the
+    processes.  Dense gradients are reduced in a few large buckets, and sparse gradients are
+    gathered as sparse tensors.  Every process must pass the same parameters, in the same order.
+
+    A process may not have a gradient for a parameter that others do (e.g., for an embedding of
+    words which weren't in its batch), so we first find out which parameters have gradients, and
+    which of those are sparse, in any process.  Then every process takes the same path for each
+    parameter, standing in an empty gradient of the right kind where it has none, and ends up
+    with the same averaged gradient.  Parameters which have no gradient in any process keep
+    ``None``, just like they would when training with a single process.
+    """
+    parameters = [parameter for parameter in parameters if parameter.requires_grad]
+    if not parameters:
+        return
+    # For each parameter, the number of processes with a gradient for it, and with a sparse one.
+    gradient_counts = torch.DoubleTensor([[float(parameter.grad is not None) for parameter in parameters],
+                                          [float(parameter.grad is not None and parameter.grad.is_sparse)
+                                           for parameter in parameters]])
+    dist.all_reduce(gradient_counts)
+
+    dense_gradients: List[torch.Tensor] = []
+    for parameter, num_gradients, num_sparse_gradients in zip(parameters,
+                                                              gradient_counts[0].tolist(),
+                                                              gradient_counts[1].tolist()):
+        if num_gradients == 0:
+            continue
+        if 0 < num_sparse_gradients < num_gradients:
+            # Every process sees the same counts, so they all raise this together.
+            raise RuntimeError("A parameter has a sparse gradient in some processes and a dense "
+                               "gradient in others, so it can't be reduced.")
+        if num_sparse_gradients > 0:
+            if parameter.grad is None:
+                parameter.grad = _empty_sparse_gradient(parameter)
+            parameter.grad = _all_reduce_sparse_gradient(parameter.grad, rank, world_size)
+        else:
+            if parameter.grad is None:
+                parameter.grad = torch.zeros_like(parameter)
+            dense_gradients.append(parameter.grad.data)
+    if dense_gradients:
+        _all_reduce_dense_gradients(dense_gradients, world_size)
+
+
+def all_reduce_sum(value: float) -> float:
+    """
+    Returns the sum of ``value`` across all of the processes.
+    """
+    tensor = torch.DoubleTensor([value])
+    dist.all_reduce(tensor)
+    return tensor.item()
@@ -34,7 +34,7 @@ class BooleanAccuracy(Metric):
         mask: ``torch.Tensor``, optional (default = None).
             A tensor of the same shape as ``predictions``.
         """
-        predictions, gold_labels, mask = self.unwrap_to_tensors(predictions, gold_labels, mask)
+        predictions, gold_labels, mask = self.detach_tensors(predictions, gold_labels, mask)
 
         if mask is not None:
             # We can multiply by the mask up front, because we're just checking equality below, and
@@ -48,9 +48,8 @@ class BooleanAccuracy(Metric):
 
         # The .prod() here is functioning as a logical and.
         correct = predictions.eq(gold_labels).prod(dim=1).float()
-        count = torch.ones(gold_labels.size(0))
         self._correct_count += correct.sum()
-        self._total_count += count.sum()
+        self._total_count += gold_labels.size(0)
 
     def get_metric(self, reset: bool = False):
         """
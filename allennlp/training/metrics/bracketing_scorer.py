@@ -0,0 +1,171 @@
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+import os
+
+from overrides import overrides
+from nltk import Tree
+
+from allennlp.common.checks import ConfigurationError
+from allennlp.training.metrics.metric import Metric
+from allennlp.training.metrics.evalb_bracketing_scorer import DEFAULT_EVALB_DIR
+
+
+@Metric.register("bracketing")
+class BracketingScorer(Metric):
+    """
+    Computes the labelled bracketing precision, recall and F1 of predicted parse trees, giving
+    the same numbers as the :class:`~allennlp.training.metrics.EvalbBracketingScorer`, but
+    without writing the trees to disk and running the EVALB executable.  The brackets of each tree
+    are collected straight from the NLTK ``Tree``, so this is cheap enough to run on every
+    validation batch.
+
+    We read the same parameter files as EVALB, and follow its rules for the settings that affect
+    these metrics:
+
+    - Pre-terminals with a label in ``DELETE_LABEL`` are removed, along with their words, and
+      constituents with a label in ``DELETE_LABEL`` are ignored (but their children are not).
+    - Constituent labels are cut at the first ``-`` or ``=``, to remove functional tags.
+    - Constituents which don't cover any (remaining) words are ignored.
+    - Labels in an ``EQ_LABEL`` pair, and words in an ``EQ_WORD`` pair, are equivalent.
+    - If ``LABELED`` is 0, brackets only need to have the same span to match.
+
+    Like EVALB, we skip sentences whose predicted tree has no words, and sentences whose predicted
+    words don't match the gold words, which EVALB reports as errors.  These don't count towards
+    the totals.  Unlike EVALB, we don't stop after ``MAX_ERROR`` errors.
+
+    Parameters
+    ----------
+    evalb_directory_path : ``str``, optional (default = ``DEFAULT_EVALB_DIR``)
+        The directory containing the EVALB parameter file.
+    evalb_param_filename: ``str``, optional (default = "COLLINS.prm")
+        The name of the EVALB parameter file to read the settings from.  By default, this uses the
+        COLLINS.prm configuration file which comes with EVALB.  This configuration ignores POS tags
+        and some punctuation labels.
+    """
+    def __init__(self,
+                 evalb_directory_path: str = DEFAULT_EVALB_DIR,
+                 evalb_param_filename: str = "COLLINS.prm") -> None:
+        param_path = os.path.join(evalb_directory_path, evalb_param_filename)
+        if not os.path.exists(param_path):
+            raise ConfigurationError(f"EVALB parameter file {param_path} does not exist.")
+        self._labeled = True
+        self._delete_labels: Set[str] = set()
+        # Maps each label (or word) to a representative of its equivalence class.
+        self._equivalent_labels: Dict[str, str] = {}
+        self._equivalent_words: Dict[str, str] = {}
+        self._read_parameter_file(param_path)
+
+        self._correct_predicted_brackets = 0.0
+        self._gold_brackets = 0.0
+        self._predicted_brackets = 0.0
+
+    def _read_parameter_file(self, param_path: str) -> None:
+        with open(param_path) as param_file:
+            for line in param_file:
+                line = line.rstrip()
+                # EVALB ignores comments and lines that are too short to hold a setting.
+                if line.startswith("#") or len(line) < 3:
+                    continue
+                parts = line.split()
+                if len(parts) < 2:
+                    continue
+                name, values = parts[0], parts[1:]
+                if name == "LABELED":
+                    self._labeled = int(values[0]) != 0
+                elif name == "DELETE_LABEL":
+                    self._delete_labels.add(values[0])
+                elif name == "EQ_LABEL" and len(values) == 2:
+                    self._add_equivalence(self._equivalent_labels, *values)
+                elif name == "EQ_WORD" and len(values) == 2:
+                    self._add_equivalence(self._equivalent_words, *values)
+
+    @staticmethod
+    def _add_equivalence(equivalences: Dict[str, str], first: str, second: str) -> None:
+        first_class = equivalences.get(first, first)
+        second_class = equivalences.get(second, second)
+        for item, item_class in list(equivalences.items()):
+            if item_class == second_class:
+                equivalences[item] = first_class
+        equivalences[first] = first_class
+        equivalences[second] = first_class
+
+    def _get_words_and_brackets(self, tree: Tree) -> Tuple[List[str], List[Tuple[int, int, Optional[str]]]]:
+        """
+        Returns the (non-deleted) words in the tree, and a ``(start, end, label)`` bracket for each
+        constituent we score, where ``end`` is exclusive and ``label`` is ``None`` if we're doing
+        unlabeled scoring.
+        """
+        words: List[str] = []
+        brackets: List[Tuple[int, int, Optional[str]]] = []
+
+        def collect(subtree: Tree) -> None:
+            if len(subtree) == 0:
+                # An empty constituent, which EVALB ignores.
+                return
+            if not isinstance(subtree[0], Tree):
+                # A pre-terminal.
+                if subtree.label() not in self._delete_labels:
+                    words.append(subtree[0])
+                return
+            start = len(words)
+            for child in subtree:
+                collect(child)
+            end = len(words)
+            label = subtree.label()
+            for separator_index, character in enumerate(label):
+                if character in "-=":
+                    label = label[:separator_index]
+                    break
+            label = self._equivalent_labels.get(label, label)
+            if start == end or any(self._equivalent_labels.get(delete_label, delete_label) == label
+                                   for delete_label in self._delete_labels):
+                return
+            brackets.append((start, end, label if self._labeled else None))
+
+        collect(tree)
+        return words, brackets
+
+    @overrides
+    def __call__(self, predicted_trees: List[Tree], gold_trees: List[Tree]) -> None: # type: ignore
+        """
+        Parameters
+        ----------
+        predicted_trees : ``List[Tree]``
+            A list of predicted NLTK Trees to compute score for.
+        gold_trees : ``List[Tree]``
+            A list of gold NLTK Trees to use as a reference.
+        """
+        for predicted_tree, gold_tree in zip(predicted_trees, gold_trees):
+            gold_words, gold_brackets = self._get_words_and_brackets(gold_tree)
+            predicted_words, predicted_brackets = self._get_words_and_brackets(predicted_tree)
+            if not predicted_words or len(gold_words) != len(predicted_words):
+                continue
+            if any(self._equivalent_words.get(gold, gold) != self._equivalent_words.get(predicted, predicted)
+                   for gold, predicted in zip(gold_words, predicted_words)):
+                continue
+            matched = Counter(gold_brackets) & Counter(predicted_brackets)
+            self._correct_predicted_brackets += sum(matched.values())
+            self._gold_brackets += len(gold_brackets)
+            self._predicted_brackets += len(predicted_brackets)
+
+    @overrides
+    def get_metric(self, reset: bool = False):
+        """
+        Returns
+        -------
+        The average precision, recall and f1.
+        """
+        correct = self._correct_predicted_brackets
+        recall = correct / self._gold_brackets if self._gold_brackets > 0 else 0.0
+        precision = correct / self._predicted_brackets if self._predicted_brackets > 0 else 0.0
+        f1_measure = 2 * (precision * recall) / (precision + recall) if precision + recall > 0 else 0
+
+        if reset:
+            self.reset()
+        return {"evalb_recall": recall, "evalb_precision": precision, "evalb_f1_measure": f1_measure}
+
+    @overrides
+    def reset(self):
+        self._correct_predicted_brackets = 0.0
+        self._gold_brackets = 0.0
+        self._predicted_brackets = 0.0
@@ -25,6 +25,7 @@ class CategoricalAccuracy(Metric):
         self._tie_break = tie_break
         self.correct_count = 0.
         self.total_count = 0.
+        self._num_invalid_labels = 0
 
     def __call__(self,
                  predictions: torch.Tensor,
@@ -41,14 +42,18 @@ class CategoricalAccuracy(Metric):
         mask: ``torch.Tensor``, optional (default = None).
             A masking tensor the same size as ``gold_labels``.
         """
-        predictions, gold_labels, mask = self.unwrap_to_tensors(predictions, gold_labels, mask)
+        predictions, gold_labels, mask = self.detach_tensors(predictions, gold_labels, mask)
 
         # Some sanity checks.
         num_classes = predictions.size(-1)
         if gold_labels.dim() != predictions.dim() - 1:
             raise ConfigurationError("gold_labels must have dimension == predictions.size() - 1 but "
                                      "found tensor of shape: {}".format(predictions.size()))
-        if (gold_labels >= num_classes).any():
+        if gold_labels.is_cuda:
+            # Checking the labels now would mean waiting for the GPU, so we count the invalid ones,
+            # and complain about them in ``get_metric``.
+            self._num_invalid_labels += (gold_labels >= num_classes).sum()
+        elif (gold_labels >= num_classes).any():
             raise ConfigurationError("A gold label passed to Categorical Accuracy contains an id >= {}, "
                                      "the number of classes.".format(num_classes))
 
@@ -71,7 +76,8 @@ class CategoricalAccuracy(Metric):
             # max_predictions_mask is (rows X num_classes) and gold_labels is (batch_size)
             # ith entry in gold_labels points to index (0-num_classes) for ith row in max_predictions
             # For each row check if index pointed by gold_label is was 1 or not (among max scored classes)
-            correct = max_predictions_mask[torch.arange(gold_labels.numel()).long(), gold_labels].float()
+            correct = max_predictions_mask[torch.arange(gold_labels.numel(), device=gold_labels.device).long(),
+                                           gold_labels].float()
             tie_counts = max_predictions_mask.sum(-1)
             correct /= tie_counts.float()
             correct.unsqueeze_(-1)
@@ -89,6 +95,9 @@ class CategoricalAccuracy(Metric):
         -------
         The accumulated accuracy.
         """
+        if float(self._num_invalid_labels) > 0:
+            raise ConfigurationError("A gold label passed to Categorical Accuracy contains an id >= the "
+                                     "number of classes.")
         accuracy = float(self.correct_count) / float(self.total_count)
         if reset:
             self.reset()
@@ -98,3 +107,4 @@ class CategoricalAccuracy(Metric):
     def reset(self):
         self.correct_count = 0.0
         self.total_count = 0.0
+        self._num_invalid_labels = 0
@@ -25,10 +25,10 @@ class Entropy(Metric):
         mask: ``torch.Tensor``, optional (default = None).
             A masking tensor of shape (batch_size, ...).
         """
-        logits, mask = self.unwrap_to_tensors(logits, mask)
+        logits, mask = self.detach_tensors(logits, mask)
 
         if mask is None:
-            mask = torch.ones(logits.size()[:-1])
+            mask = logits.new_ones(logits.size()[:-1])
 
         log_probs = torch.nn.functional.log_softmax(logits, dim=-1)
         probabilities = torch.exp(log_probs) * mask.unsqueeze(-1)
@@ -45,7 +45,7 @@ class Entropy(Metric):
         -------
         The scalar average entropy.
         """
-        average_value = self._entropy / self._count if self._count > 0 else 0
+        average_value = float(self._entropy) / self._count if self._count > 0 else 0
         if reset:
             self.reset()
         return average_value
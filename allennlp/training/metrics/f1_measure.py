@@ -20,6 +20,7 @@ class F1Measure(Metric):
         self._true_negatives = 0.0
         self._false_positives = 0.0
         self._false_negatives = 0.0
+        self._num_invalid_labels = 0
 
     def __call__(self,
                  predictions: torch.Tensor,
@@ -36,10 +37,14 @@ class F1Measure(Metric):
         mask: ``torch.Tensor``, optional (default = None).
             A masking tensor the same size as ``gold_labels``.
         """
-        predictions, gold_labels, mask = self.unwrap_to_tensors(predictions, gold_labels, mask)
+        predictions, gold_labels, mask = self.detach_tensors(predictions, gold_labels, mask)
 
         num_classes = predictions.size(-1)
-        if (gold_labels >= num_classes).any():
+        if gold_labels.is_cuda:
+            # Checking the labels now would mean waiting for the GPU, so we count the invalid ones,
+            # and complain about them in ``get_metric``.
+            self._num_invalid_labels += (gold_labels >= num_classes).sum()
+        elif (gold_labels >= num_classes).any():
             raise ConfigurationError("A gold label passed to F1Measure contains an id >= {}, "
                                      "the number of classes.".format(num_classes))
         if mask is None:
@@ -80,6 +85,8 @@ class F1Measure(Metric):
         recall : float
         f1-measure : float
         """
+        if float(self._num_invalid_labels) > 0:
+            raise ConfigurationError("A gold label passed to F1Measure contains an id >= the number of classes.")
         precision = float(self._true_positives) / float(self._true_positives + self._false_positives + 1e-13)
         recall = float(self._true_positives) / float(self._true_positives + self._false_negatives + 1e-13)
         f1_measure = 2. * ((precision * recall) / (precision + recall + 1e-13))
@@ -92,3 +99,4 @@ class F1Measure(Metric):
         self._true_negatives = 0.0
         self._false_positives = 0.0
         self._false_negatives = 0.0
+        self._num_invalid_labels = 0
@@ -47,3 +47,13 @@ class Metric(Registrable):
         the CPU.
         """
         return (x.detach().cpu() if isinstance(x, torch.Tensor) else x for x in tensors)
+
+    @staticmethod
+    def detach_tensors(*tensors: torch.Tensor):
+        """
+        Like :func:`unwrap_to_tensors`, but leaves the tensors on their device.  Metrics which only
+        accumulate a few counts can use this to keep their counts on the device as well, so that
+        calling the metric never has to wait for the device to catch up.  The counts are only
+        copied to the host in ``get_metric``.
+        """
+        return (x.detach() if isinstance(x, torch.Tensor) else x for x in tensors)
@@ -1,6 +1,7 @@
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from collections import defaultdict
 
+import numpy
 import torch
 
 from allennlp.common.checks import ConfigurationError
@@ -14,6 +15,17 @@ from allennlp.data.dataset_readers.dataset_utils.span_utils import (
         TypedStringSpan
 )
 
+# The types of tag that we find spans with, in the order of ``_TAG_TYPES``.
+_TAG_TYPES = "OBIUL"
+_OUTSIDE, _BEGIN, _INSIDE, _UNIT, _LAST = range(len(_TAG_TYPES))
+_INVALID = -1
+
+_TAGS_TO_SPANS = {
+        "BIO": bio_tags_to_spans,
+        "IOB1": iob1_tags_to_spans,
+        "BIOUL": bioul_tags_to_spans,
+}
+
 
 @Metric.register("span_f1")
 class SpanBasedF1Measure(Metric):
@@ -67,10 +79,47 @@ class SpanBasedF1Measure(Metric):
         self._label_vocabulary = vocabulary.get_index_to_token_vocabulary(tag_namespace)
         self._ignore_classes: List[str] = ignore_classes or []
 
-        # These will hold per label span counts.
-        self._true_positives: Dict[str, int] = defaultdict(int)
-        self._false_positives: Dict[str, int] = defaultdict(int)
-        self._false_negatives: Dict[str, int] = defaultdict(int)
+        # Rather than converting every predicted and gold label id to a string and extracting
+        # spans in python, we look up the span tag (e.g. "B") and the span label (e.g. "ARG1")
+        # of each label id in these arrays, and extract the spans for a whole batch at once.
+        self._span_labels: List[str] = []
+        self._span_label_indices: Dict[str, int] = {}
+        num_tags = max(self._label_vocabulary.keys()) + 1 if self._label_vocabulary else 0
+        self._tag_types = numpy.full(num_tags, _INVALID, dtype=numpy.int64)
+        self._tag_span_labels = numpy.zeros(num_tags, dtype=numpy.int64)
+        for label_id, tag in self._label_vocabulary.items():
+            if label_encoding == "BIOUL":
+                allowed_tag_types = "BIOUL"
+                span_label = tag.partition('-')[2]
+                if tag[:1] == "O" and tag != "O":
+                    continue
+            else:
+                allowed_tag_types = "BIO"
+                span_label = tag[2:]
+            if tag[:1] and tag[0] in allowed_tag_types:
+                self._tag_types[label_id] = _TAG_TYPES.index(tag[0])
+            self._tag_span_labels[label_id] = self._get_span_label_index(span_label)
+        # Continued spans are merged into the span they continue, so we need an index for that
+        # label even if it never starts a span of its own.
+        for span_label in list(self._span_labels):
+            if span_label.startswith("C-"):
+                self._get_span_label_index(span_label[2:])
+        self._ignored_span_labels = numpy.array([span_label in self._ignore_classes
+                                                 for span_label in self._span_labels], dtype=numpy.bool_)
+        self._continued_span_labels = numpy.array([span_label.startswith("C-")
+                                                   for span_label in self._span_labels], dtype=numpy.bool_)
+
+        # These will hold per label span counts, indexed by the position of the label in
+        # ``self._span_labels``.
+        self._true_positive_counts = numpy.zeros(len(self._span_labels), dtype=numpy.int64)
+        self._false_positive_counts = numpy.zeros(len(self._span_labels), dtype=numpy.int64)
+        self._false_negative_counts = numpy.zeros(len(self._span_labels), dtype=numpy.int64)
+
+    def _get_span_label_index(self, span_label: str) -> int:
+        if span_label not in self._span_label_indices:
+            self._span_label_indices[span_label] = len(self._span_labels)
+            self._span_labels.append(span_label)
+        return self._span_label_indices[span_label]
 
     def __call__(self,
                  predictions: torch.Tensor,
@@ -115,47 +164,123 @@ class SpanBasedF1Measure(Metric):
             argmax_predictions = torch.gather(prediction_map, 1, argmax_predictions)
             gold_labels = torch.gather(prediction_map, 1, gold_labels.long())
 
-        argmax_predictions = argmax_predictions.float()
-
-        # Iterate over timesteps in batch.
         batch_size = gold_labels.size(0)
-        for i in range(batch_size):
-            sequence_prediction = argmax_predictions[i, :]
-            sequence_gold_label = gold_labels[i, :]
-            length = sequence_lengths[i]
-
-            if length == 0:
-                # It is possible to call this metric with sequences which are
-                # completely padded. These contribute nothing, so we skip these rows.
-                continue
-
-            predicted_string_labels = [self._label_vocabulary[label_id]
-                                       for label_id in sequence_prediction[:length].tolist()]
-            gold_string_labels = [self._label_vocabulary[label_id]
-                                  for label_id in sequence_gold_label[:length].tolist()]
-
-            if self._label_encoding == "BIO":
-                predicted_spans = bio_tags_to_spans(predicted_string_labels, self._ignore_classes)
-                gold_spans = bio_tags_to_spans(gold_string_labels, self._ignore_classes)
-            elif self._label_encoding == "IOB1":
-                predicted_spans = iob1_tags_to_spans(predicted_string_labels, self._ignore_classes)
-                gold_spans = iob1_tags_to_spans(gold_string_labels, self._ignore_classes)
-            elif self._label_encoding == "BIOUL":
-                predicted_spans = bioul_tags_to_spans(predicted_string_labels, self._ignore_classes)
-                gold_spans = bioul_tags_to_spans(gold_string_labels, self._ignore_classes)
-
-            predicted_spans = self._handle_continued_spans(predicted_spans)
-            gold_spans = self._handle_continued_spans(gold_spans)
-
-            for span in predicted_spans:
-                if span in gold_spans:
-                    self._true_positives[span[0]] += 1
-                    gold_spans.remove(span)
-                else:
-                    self._false_positives[span[0]] += 1
-            # These spans weren't predicted.
-            for span in gold_spans:
-                self._false_negatives[span[0]] += 1
+        argmax_predictions = argmax_predictions[:batch_size].long().numpy()
+        gold_labels = gold_labels.long().numpy()
+        sequence_lengths = sequence_lengths[:batch_size].long().numpy()
+
+        predicted_spans = self._extract_spans(argmax_predictions, sequence_lengths)
+        gold_spans = self._extract_spans(gold_labels, sequence_lengths)
+
+        # Each span is identified by a single integer, so that we can match the predicted and gold
+        # spans of the whole batch with two set membership tests.
+        sequence_length = gold_labels.shape[1]
+        predicted_keys = self._get_span_keys(predicted_spans, sequence_length)
+        gold_keys = self._get_span_keys(gold_spans, sequence_length)
+        correct_predictions = numpy.isin(predicted_keys, gold_keys)
+        missed_gold_spans = ~numpy.isin(gold_keys, predicted_keys)
+
+        num_span_labels = len(self._span_labels)
+        predicted_labels = predicted_spans[3]
+        self._true_positive_counts += numpy.bincount(predicted_labels[correct_predictions],
+                                                     minlength=num_span_labels)
+        self._false_positive_counts += numpy.bincount(predicted_labels[~correct_predictions],
+                                                      minlength=num_span_labels)
+        self._false_negative_counts += numpy.bincount(gold_spans[3][missed_gold_spans],
+                                                      minlength=num_span_labels)
+
+    def _extract_spans(self, tags: numpy.ndarray, sequence_lengths: numpy.ndarray) -> Tuple[numpy.ndarray, ...]:
+        """
+        Extracts the spans from a batch of tag ids, giving exactly the spans that the
+        ``*_tags_to_spans`` functions give for each sequence, after ``_handle_continued_spans``.
+
+        Returns
+        -------
+        A tuple of four arrays, holding the batch index, inclusive start and end indices, and the
+        label index of each span.
+        """
+        tag_types = self._tag_types[tags]
+        span_labels = self._tag_span_labels[tags]
+        # Positions past the end of a sequence are outside of any span.
+        padding = numpy.arange(tags.shape[1])[None, :] >= sequence_lengths[:, None]
+        tag_types[padding] = _OUTSIDE
+
+        if self._label_encoding == "BIOUL":
+            begin = tag_types == _BEGIN
+            last = tag_types == _LAST
+            # The number of spans which are open before each position.
+            open_spans = numpy.cumsum(begin, axis=1) - numpy.cumsum(last, axis=1) - begin + last
+            invalid = ((tag_types == _INVALID) |
+                       (((tag_types == _INSIDE) | last) & (open_spans != 1)) |
+                       (((tag_types == _OUTSIDE) | (tag_types == _UNIT) | begin) & (open_spans != 0)))
+            invalid_sequences = invalid.any(axis=1) | (open_spans[:, -1] + begin[:, -1] - last[:, -1] != 0)
+            unit = tag_types == _UNIT
+            starts = begin | unit
+            ends = last | unit
+        else:
+            invalid_sequences = (tag_types == _INVALID).any(axis=1)
+            # In the BIO and IOB1 encodings, a span starts at every tag which is in a span (i.e.
+            # isn't "O" or an ignored class), unless it is an "I" tag continuing a span with the
+            # same label.  These two encodings only differ in how they name a well-formed span
+            # start, and both of them include ill-formed spans, so they give the same spans.
+            in_span = (((tag_types == _BEGIN) | (tag_types == _INSIDE)) &
+                       ~self._ignored_span_labels[span_labels])
+            continues = numpy.zeros_like(in_span)
+            continues[:, 1:] = ((tag_types[:, 1:] == _INSIDE) &
+                                in_span[:, :-1] &
+                                (span_labels[:, 1:] == span_labels[:, :-1]))
+            starts = in_span & ~continues
+            ends = in_span.copy()
+            ends[:, :-1] &= ~continues[:, 1:]
+
+        if invalid_sequences.any():
+            # Let the string-based span extraction raise the appropriate error.
+            sequence_index = int(numpy.nonzero(invalid_sequences)[0][0])
+            tag_sequence = [self._label_vocabulary.get(label_id)
+                            for label_id in tags[sequence_index, :sequence_lengths[sequence_index]].tolist()]
+            _TAGS_TO_SPANS[self._label_encoding](tag_sequence, self._ignore_classes)
+
+        # ``numpy.nonzero`` returns indices in row-major order, so the i-th start and the i-th end
+        # belong to the same span.
+        batch_indices, start_indices = numpy.nonzero(starts)
+        _, end_indices = numpy.nonzero(ends)
+        if self._label_encoding == "BIOUL":
+            labels = span_labels[batch_indices, end_indices]
+            kept_spans = ~self._ignored_span_labels[labels]
+            batch_indices, start_indices, end_indices, labels = (batch_indices[kept_spans],
+                                                                 start_indices[kept_spans],
+                                                                 end_indices[kept_spans],
+                                                                 labels[kept_spans])
+        else:
+            labels = span_labels[batch_indices, start_indices]
+
+        continued = self._continued_span_labels[labels]
+        if continued.any():
+            # Only the sequences with continued spans need to go through
+            # ``_handle_continued_spans``, so we do those in python.
+            continued_sequences = numpy.unique(batch_indices[continued])
+            kept_spans = ~numpy.isin(batch_indices, continued_sequences)
+            spans = [batch_indices[kept_spans], start_indices[kept_spans],
+                     end_indices[kept_spans], labels[kept_spans]]
+            merged_spans: List[Tuple[int, int, int, int]] = []
+            for sequence_index in continued_sequences.tolist():
+                in_sequence = batch_indices == sequence_index
+                string_spans = [(self._span_labels[label], (start, end))
+                                for start, end, label in zip(start_indices[in_sequence].tolist(),
+                                                             end_indices[in_sequence].tolist(),
+                                                             labels[in_sequence].tolist())]
+                merged_spans.extend((sequence_index, start, end, self._span_label_indices[label])
+                                    for label, (start, end) in self._handle_continued_spans(string_spans))
+            merged = numpy.array(merged_spans, dtype=numpy.int64).reshape(-1, 4)
+            batch_indices, start_indices, end_indices, labels = (numpy.concatenate([span_part, merged_part])
+                                                                 for span_part, merged_part in zip(spans,
+                                                                                                   merged.T))
+        return batch_indices, start_indices, end_indices, labels
+
+    def _get_span_keys(self, spans: Tuple[numpy.ndarray, ...], sequence_length: int) -> numpy.ndarray:
+        batch_indices, start_indices, end_indices, labels = spans
+        keys = (batch_indices * sequence_length + start_indices) * sequence_length + end_indices
+        return keys * len(self._span_labels) + labels
 
     @staticmethod
     def _handle_continued_spans(spans: List[TypedStringSpan]) -> List[TypedStringSpan]:
@@ -205,15 +330,18 @@ class SpanBasedF1Measure(Metric):
         Additionally, an ``overall`` key is included, which provides the precision,
         recall and f1-measure for all spans.
         """
+        true_positives = self._true_positives
+        false_positives = self._false_positives
+        false_negatives = self._false_negatives
         all_tags: Set[str] = set()
-        all_tags.update(self._true_positives.keys())
-        all_tags.update(self._false_positives.keys())
-        all_tags.update(self._false_negatives.keys())
+        all_tags.update(true_positives.keys())
+        all_tags.update(false_positives.keys())
+        all_tags.update(false_negatives.keys())
         all_metrics = {}
         for tag in all_tags:
-            precision, recall, f1_measure = self._compute_metrics(self._true_positives[tag],
-                                                                  self._false_positives[tag],
-                                                                  self._false_negatives[tag])
+            precision, recall, f1_measure = self._compute_metrics(true_positives[tag],
+                                                                  false_positives[tag],
+                                                                  false_negatives[tag])
             precision_key = "precision" + "-" + tag
             recall_key = "recall" + "-" + tag
             f1_key = "f1-measure" + "-" + tag
@@ -222,9 +350,9 @@ class SpanBasedF1Measure(Metric):
             all_metrics[f1_key] = f1_measure
 
         # Compute the precision, recall and f1 for all spans jointly.
-        precision, recall, f1_measure = self._compute_metrics(sum(self._true_positives.values()),
-                                                              sum(self._false_positives.values()),
-                                                              sum(self._false_negatives.values()))
+        precision, recall, f1_measure = self._compute_metrics(int(self._true_positive_counts.sum()),
+                                                              int(self._false_positive_counts.sum()),
+                                                              int(self._false_negative_counts.sum()))
         all_metrics["precision-overall"] = precision
         all_metrics["recall-overall"] = recall
         all_metrics["f1-measure-overall"] = f1_measure
@@ -240,6 +368,24 @@ class SpanBasedF1Measure(Metric):
         return precision, recall, f1_measure
 
     def reset(self):
-        self._true_positives = defaultdict(int)
-        self._false_positives = defaultdict(int)
-        self._false_negatives = defaultdict(int)
+        self._true_positive_counts[:] = 0
+        self._false_positive_counts[:] = 0
+        self._false_negative_counts[:] = 0
+
+    def _get_counts_by_label(self, counts: numpy.ndarray) -> Dict[str, int]:
+        counts_by_label: Dict[str, int] = defaultdict(int)
+        for label_index in numpy.nonzero(counts)[0].tolist():
+            counts_by_label[self._span_labels[label_index]] = int(counts[label_index])
+        return counts_by_label
+
+    @property
+    def _true_positives(self) -> Dict[str, int]:
+        return self._get_counts_by_label(self._true_positive_counts)
+
+    @property
+    def _false_positives(self) -> Dict[str, int]:
+        return self._get_counts_by_label(self._false_positive_counts)
+
+    @property
+    def _false_negatives(self) -> Dict[str, int]:
+        return self._get_counts_by_label(self._false_negative_counts)
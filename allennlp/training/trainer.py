@@ -9,12 +9,17 @@ rather than instantiating a ``Trainer`` yourself.
 # pylint: disable=too-many-lines
 
 import logging
+import math
 import os
+import queue
 import shutil
+import tempfile
+import threading
 import time
 import re
 import datetime
 import traceback
+from collections import OrderedDict
 from typing import Dict, Optional, List, Tuple, Union, Iterable, Any, Set
 
 import torch
@@ -26,12 +31,14 @@ from tensorboardX import SummaryWriter
 
 from allennlp.common import Params
 from allennlp.common.checks import ConfigurationError
+from allennlp.common.profiler import Profiler
 from allennlp.common.util import peak_memory_mb, gpu_memory_mb
 from allennlp.common.tqdm import Tqdm
 from allennlp.data.instance import Instance
 from allennlp.data.iterators.data_iterator import DataIterator
 from allennlp.models.model import Model
 from allennlp.nn import util
+from allennlp.training import distributed
 from allennlp.training.learning_rate_schedulers import LearningRateScheduler
 from allennlp.training.optimizers import Optimizer
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -79,7 +86,10 @@ def sparse_clip_norm(parameters, max_norm, norm_type=2) -> float:
             total_norm += param_norm ** norm_type
         total_norm = total_norm ** (1. / norm_type)
     clip_coef = max_norm / (total_norm + 1e-6)
-    if clip_coef < 1:
+    if isinstance(clip_coef, torch.Tensor):
+        # Always scaling, by at most 1, saves waiting for the device to tell us whether to clip.
+        clip_coef = clip_coef.clamp(max=1.0)
+    if isinstance(clip_coef, torch.Tensor) or clip_coef < 1:
         for p in parameters:
             if is_sparse(p.grad):
                 p.grad.data._values().mul_(clip_coef)
@@ -137,6 +147,123 @@ class TensorboardWriter:
             self._validation_log.add_scalar(name, self._item(value), global_step)
 
 
+def _copy_to_cpu(obj: Any) -> Any:
+    """
+    Returns a copy of ``obj`` (a state dict, or any nesting of dicts, lists and tuples) in which
+    every tensor has been copied to the CPU, so that it no longer changes as training goes on.
+    """
+    if isinstance(obj, torch.Tensor):
+        if obj.is_cuda:
+            # Moving a tensor off the GPU already copies it.
+            return obj.detach().cpu()
+        return obj.detach().clone()
+    elif isinstance(obj, dict):
+        copy = OrderedDict() if isinstance(obj, OrderedDict) else {}
+        for key, value in obj.items():
+            copy[key] = _copy_to_cpu(value)
+        # Module state dicts carry version information for loading them.
+        if hasattr(obj, '_metadata'):
+            copy._metadata = obj._metadata  # type: ignore # pylint: disable=protected-access
+        return copy
+    elif isinstance(obj, list):
+        return [_copy_to_cpu(item) for item in obj]
+    elif isinstance(obj, tuple):
+        return tuple(_copy_to_cpu(item) for item in obj)
+    else:
+        return obj
+
+
+def _atomic_write(directory: str, path: str, write_fn) -> None:
+    """
+    Calls ``write_fn`` with the path of a temporary file in ``directory``, and then renames that
+    file to ``path``, so that ``path`` never holds a partially written file.  The temporary file's
+    name doesn't look like a checkpoint's, so that it is never mistaken for one.
+    """
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_checkpoint_")
+    os.close(file_descriptor)
+    try:
+        write_fn(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class CheckpointWriter:
+    """
+    Writes the checkpoints snapshotted by the :class:`Trainer` to disk on a background thread,
+    so that training can go on while they are serialized and written.  At most
+    ``max_pending_checkpoints`` checkpoints wait to be written at once (and hold on to their
+    copies of the model and optimizer state); beyond that, :func:`write` blocks until one has
+    been written.  If ``background`` is ``False``, checkpoints are written straight away on the
+    calling thread instead.
+
+    Each file is written atomically (see :func:`_atomic_write`), and files are written, copied and
+    removed in the order they are requested.  If writing fails, the error is raised by the next
+    call to :func:`write` or :func:`wait`.
+    """
+    def __init__(self, directory: str, max_pending_checkpoints: int = 1, background: bool = True) -> None:
+        self._directory = directory
+        self._background = background
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending_checkpoints)
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[Exception] = None
+
+    def write(self,
+              states_and_paths: List[Tuple[Any, str]],
+              copies: List[Tuple[str, str]] = None,
+              paths_to_remove: List[str] = None) -> None:
+        """
+        Saves each state with ``torch.save`` to its path, in order, then copies each of the
+        ``copies`` ``(source, destination)`` pairs and removes the ``paths_to_remove``.
+        """
+        self._raise_error()
+        task = (states_and_paths, copies or [], paths_to_remove or [])
+        if not self._background:
+            self._write(*task)
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._queue.put(task)
+
+    def wait(self, raise_errors: bool = True) -> None:
+        """
+        Blocks until every checkpoint requested so far has been written.
+        """
+        self._queue.join()
+        if raise_errors:
+            self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                if self._error is None:
+                    self._write(*task)
+            except Exception as error:  # pylint: disable=broad-except
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _write(self,
+               states_and_paths: List[Tuple[Any, str]],
+               copies: List[Tuple[str, str]],
+               paths_to_remove: List[str]) -> None:
+        for state, path in states_and_paths:
+            _atomic_write(self._directory, path, lambda temp_path, state=state: torch.save(state, temp_path))
+        for source, destination in copies:
+            _atomic_write(self._directory, destination,
+                          lambda temp_path, source=source: shutil.copyfile(source, temp_path))
+        for path in paths_to_remove:
+            os.remove(path)
+
+
 def time_to_str(timestamp: int) -> str:
     """
     Convert seconds past Epoch to human readable string.
@@ -177,7 +304,15 @@ class Trainer:
                  grad_clipping: Optional[float] = None,
                  learning_rate_scheduler: Optional[LearningRateScheduler] = None,
                  summary_interval: int = 100,
-                 histogram_interval: int = None) -> None:
+                 histogram_interval: int = None,
+                 num_gradient_accumulation_steps: int = 1,
+                 metrics_interval: int = 1,
+                 profile: bool = False,
+                 profile_modules: bool = False,
+                 distributed_rank: int = None,
+                 distributed_world_size: int = 1,
+                 background_checkpointing: bool = True,
+                 max_pending_checkpoints: int = 1) -> None:
         """
         Parameters
         ----------
@@ -257,6 +392,61 @@ class Trainer:
             slow, so we recommend logging histograms relatively infrequently.
             Note: only Modules that return tensors, tuples of tensors or dicts
             with tensors as values currently support activation logging.
+        num_gradient_accumulation_steps : ``int``, optional, (default = 1)
+            The number of batches from the iterator whose gradients are accumulated before each
+            optimizer step.  The loss of each of these batches is divided by their number, so the
+            step is the same as one for a single batch with all of their instances, but the memory
+            needed is only that of one of them.  Everything that happens "per batch" (the
+            learning rate scheduler's ``step_batch``, the tensorboard intervals, and the
+            ``batch_num_total`` counter) happens per optimizer step, but the ``"loss"`` metric is
+            still the average loss per iterator batch (so a smaller last group of an epoch doesn't
+            weigh its batches more).
+        metrics_interval : ``int``, optional, (default = 1)
+            The number of batches between updates of the metrics shown in the progress bar.  The
+            loss is summed up on the device, and models' metrics can keep their counts there too
+            (see :func:`~allennlp.training.metrics.Metric.detach_tensors`), so the host only has to
+            wait for the device when the metrics are computed.  On a GPU, setting this to more than
+            1 avoids doing that on every batch.  The metrics are also computed whenever they are
+            logged to tensorboard, and at the end of each epoch.
+        profile : ``bool``, optional, (default = False)
+            If ``True``, we time each phase of training and validation (waiting for the iterator,
+            tensorizing batches, the forward and backward passes, rescaling the gradients, the
+            optimizer step, computing metrics, tensorboard logging and checkpointing; see
+            :class:`~allennlp.common.profiler.Profiler`).  Batches are tensorized while we wait
+            for the iterator, so the ``tensorization`` and ``validation_tensorization`` times are
+            also part of the ``iterator_wait`` and ``validation_iterator_wait`` times.  The time
+            spent in each phase is logged at the end of every epoch, written to tensorboard as
+            ``profile/<phase>``, and a summary of the whole run is written to ``profile.json`` in
+            the serialization directory.  When training on a GPU, we wait for it to finish its work
+            at the start and end of every phase, so that the timings are correct, which slows
+            training down.
+        profile_modules : ``bool``, optional, (default = False)
+            If ``True`` (which requires ``profile``), we also time the forward pass of each
+            submodule of the model, using hooks.  These times are only written to ``profile.json``.
+            A module's time includes those of the modules it calls.
+        distributed_rank : ``int``, optional, (default = ``None``)
+            If given, this trainer is one of ``distributed_world_size`` processes doing
+            data-parallel training on the CPU, and this is its rank.  The process group must already
+            have been initialized (see :func:`allennlp.training.distributed.init_process_group`),
+            and every process must start with the same model parameters and the same random seed for
+            the iterator.  Each process trains on its own share of the batches (see the ``num_shards``
+            argument of :class:`~allennlp.data.iterators.DataIterator`), the gradients are averaged
+            across processes after each backward pass, and only the process with rank 0 writes
+            checkpoints and tensorboard logs.  The training metrics are those of the rank 0
+            process's batches, apart from the loss, which is averaged over all of the processes at
+            the end of each epoch.  Every process computes the validation metrics on the whole
+            validation set, so that they all make the same early stopping decisions.
+        distributed_world_size : ``int``, optional, (default = 1)
+            The number of processes doing distributed training.
+        background_checkpointing : ``bool``, optional (default=True)
+            If ``True``, checkpoints are copied to CPU memory on the training thread, and then
+            serialized and written to disk by a background thread while training goes on.  Either
+            way, checkpoint files are written atomically, and :func:`train` only returns once they
+            have all been written.
+        max_pending_checkpoints : ``int``, optional (default=1)
+            With ``background_checkpointing``, the number of checkpoints that can be waiting to be
+            written (and holding a copy of the model and optimizer state in memory) before saving
+            another one blocks training.
         """
         self._model = model
         self._iterator = iterator
@@ -282,6 +472,24 @@ class Trainer:
         self._serialized_paths: List[Any] = []
         self._last_permanent_saved_checkpoint_time = time.time()
         self._model_save_interval = model_save_interval
+        if max_pending_checkpoints < 1:
+            raise ConfigurationError("max_pending_checkpoints must be at least 1, "
+                                     "got {}".format(max_pending_checkpoints))
+        self._checkpoint_writer = CheckpointWriter(serialization_dir,
+                                                   max_pending_checkpoints=max_pending_checkpoints,
+                                                   background=background_checkpointing)
+
+        if num_gradient_accumulation_steps < 1:
+            raise ConfigurationError("num_gradient_accumulation_steps must be at least 1, "
+                                     "got {}".format(num_gradient_accumulation_steps))
+        self._num_gradient_accumulation_steps = num_gradient_accumulation_steps
+        if metrics_interval < 1:
+            raise ConfigurationError("metrics_interval must be at least 1, got {}".format(metrics_interval))
+        self._metrics_interval = metrics_interval
+
+        if profile_modules and not profile:
+            raise ConfigurationError("profile_modules requires profile to be set.")
+        self._profile_modules = profile_modules
 
         self._grad_norm = grad_norm
         self._grad_clipping = grad_clipping
@@ -313,6 +521,16 @@ class Trainer:
         if self._cuda_devices[0] != -1:
             self._model = self._model.cuda(self._cuda_devices[0])
 
+        self._distributed_rank = distributed_rank or 0
+        self._distributed_world_size = distributed_world_size if distributed_rank is not None else 1
+        if self._distributed_world_size > 1 and (self._multiple_gpu or self._cuda_devices[0] != -1):
+            raise ConfigurationError("Distributed training is only supported on the CPU, "
+                                     "so cuda_device must be -1.")
+        # Only one process writes checkpoints and logs.
+        self._is_master = self._distributed_rank == 0
+
+        self._profiler = Profiler(enabled=profile, synchronize_cuda=self._cuda_devices[0] != -1)
+
         self._log_interval = 10  # seconds
         self._summary_interval = summary_interval
         self._histogram_interval = histogram_interval
@@ -324,7 +542,7 @@ class Trainer:
 
         self._last_log = 0.0  # time of last logging
 
-        if serialization_dir is not None:
+        if serialization_dir is not None and self._is_master:
             train_log = SummaryWriter(os.path.join(serialization_dir, "log", "train"))
             validation_log = SummaryWriter(os.path.join(serialization_dir, "log", "validation"))
             self._tensorboard = TensorboardWriter(train_log, validation_log)
@@ -458,12 +676,22 @@ class Trainer:
         train_generator = self._iterator(self._train_data,
                                          num_epochs=1,
                                          shuffle=self._shuffle,
-                                         cuda_device=self._iterator_device)
-        num_training_batches = self._iterator.get_num_batches(self._train_data)
+                                         cuda_device=self._iterator_device,
+                                         shard_index=self._distributed_rank,
+                                         num_shards=self._distributed_world_size)
+        num_training_batches = math.ceil(
+                self._iterator.get_num_batches(self._train_data) // self._distributed_world_size /
+                self._num_gradient_accumulation_steps)
+        # We pull the micro-batches of each gradient accumulation group from the iterator one at a time,
+        # so that only one of them has to be on the device at once.
+        train_generator = iter(self._profiler.time_iterator(train_generator, "iterator_wait"))
         self._last_log = time.time()
         last_save_time = time.time()
 
         batches_this_epoch = 0
+        # With gradient accumulation, this counts the batches from the iterator, which the loss is
+        # averaged over, while ``batches_this_epoch`` counts optimizer steps.
+        iterator_batches_this_epoch = 0
         if self._batch_num_total is None:
             self._batch_num_total = 0
 
@@ -471,24 +699,55 @@ class Trainer:
             histogram_parameters = set(self._model.get_parameters_for_histogram_tensorboard_logging())
 
         logger.info("Training")
-        train_generator_tqdm = Tqdm.tqdm(train_generator,
-                                         total=num_training_batches)
-        for batch in train_generator_tqdm:
-            batches_this_epoch += 1
-            self._batch_num_total += 1
-            batch_num_total = self._batch_num_total
+        train_generator_tqdm = Tqdm.tqdm(total=num_training_batches,
+                                         disable=not self._is_master)
+        num_steps = self._num_gradient_accumulation_steps
+        while True:
+            batch_num_total = self._batch_num_total + 1
 
             self._log_histograms_this_batch = self._histogram_interval is not None and (
                     batch_num_total % self._histogram_interval == 0)
 
             self._optimizer.zero_grad()
 
-            loss = self._batch_loss(batch, for_training=True)
-            loss.backward()
+            batches_in_group = 0
+            for batch in train_generator:
+                with self._profiler.phase("forward"):
+                    loss = self._batch_loss(batch, for_training=True)
+                with self._profiler.phase("backward"):
+                    # Dividing by the number of batches in the group makes the accumulated gradient the
+                    # gradient of their average loss.
+                    (loss / num_steps).backward()
+
+                # We keep the loss on the device, so that we don't have to wait for it.
+                train_loss += loss.detach()
+                batches_in_group += 1
+                if batches_in_group == num_steps:
+                    break
+
+            if batches_in_group == 0:
+                break
+            if batches_in_group < num_steps:
+                # The last group of an epoch may be smaller, in which case we only find out once the
+                # iterator runs dry, so we rescale the gradient to the average over the group.
+                scale = num_steps / batches_in_group
+                for parameter in self._model.parameters():
+                    if parameter.grad is not None:
+                        parameter.grad.mul_(scale)
 
-            train_loss += loss.item()
+            batches_this_epoch += 1
+            iterator_batches_this_epoch += batches_in_group
+            self._batch_num_total = batch_num_total
+            train_generator_tqdm.update(1)
 
-            batch_grad_norm = self._rescale_gradients()
+            if self._distributed_world_size > 1:
+                with self._profiler.phase("gradient_all_reduce"):
+                    distributed.all_reduce_gradients(self._model.parameters(),
+                                                     self._distributed_rank,
+                                                     self._distributed_world_size)
+
+            with self._profiler.phase("rescale_gradients"):
+                batch_grad_norm = self._rescale_gradients()
 
             # This does nothing if batch_num_total is None or you are using an
             # LRScheduler which doesn't update per batch.
@@ -501,7 +760,8 @@ class Trainer:
                 # and copy them to CPU so large models won't go OOM on the GPU.
                 param_updates = {name: param.detach().cpu().clone()
                                  for name, param in self._model.named_parameters()}
-                self._optimizer.step()
+                with self._profiler.phase("optimizer_step"):
+                    self._optimizer.step()
                 for name, param in self._model.named_parameters():
                     param_updates[name].sub_(param.detach().cpu())
                     update_norm = torch.norm(param_updates[name].view(-1, ))
@@ -510,34 +770,46 @@ class Trainer:
                                                        update_norm / (param_norm + 1e-7),
                                                        batch_num_total)
             else:
-                self._optimizer.step()
+                with self._profiler.phase("optimizer_step"):
+                    self._optimizer.step()
 
-            # Update the description with the latest metrics
-            metrics = self._get_metrics(train_loss, batches_this_epoch)
-            description = self._description_from_metrics(metrics)
+            # Update the description with the latest metrics, which means copying them from the device.
+            log_summary = batch_num_total % self._summary_interval == 0
+            if log_summary or batches_this_epoch % self._metrics_interval == 0:
+                with self._profiler.phase("metrics"):
+                    metrics = self._get_metrics(train_loss, iterator_batches_this_epoch)
+                    description = self._description_from_metrics(metrics)
 
-            train_generator_tqdm.set_description(description, refresh=False)
+                    train_generator_tqdm.set_description(description, refresh=False)
 
             # Log parameter values to Tensorboard
-            if batch_num_total % self._summary_interval == 0:
-                self._parameter_and_gradient_statistics_to_tensorboard(batch_num_total, batch_grad_norm)
-                self._tensorboard.add_train_scalar("loss/loss_train", metrics["loss"], batch_num_total)
-                self._metrics_to_tensorboard(batch_num_total,
-                                             {"epoch_metrics/" + k: v for k, v in metrics.items()})
+            if log_summary:
+                with self._profiler.phase("tensorboard"):
+                    self._parameter_and_gradient_statistics_to_tensorboard(batch_num_total, batch_grad_norm)
+                    self._tensorboard.add_train_scalar("loss/loss_train", metrics["loss"], batch_num_total)
+                    self._metrics_to_tensorboard(batch_num_total,
+                                                 {"epoch_metrics/" + k: v for k, v in metrics.items()})
 
             if self._log_histograms_this_batch:
-                self._histograms_to_tensorboard(batch_num_total, histogram_parameters)
+                with self._profiler.phase("tensorboard"):
+                    self._histograms_to_tensorboard(batch_num_total, histogram_parameters)
 
             # Save model if needed.
             if self._model_save_interval is not None and (
                     time.time() - last_save_time > self._model_save_interval
             ):
                 last_save_time = time.time()
-                self._save_checkpoint(
-                        '{0}.{1}'.format(epoch, time_to_str(int(last_save_time))), [], is_best=False
-                )
-
-        return self._get_metrics(train_loss, batches_this_epoch, reset=True)
+                with self._profiler.phase("checkpoint"):
+                    self._save_checkpoint(
+                            '{0}.{1}'.format(epoch, time_to_str(int(last_save_time))), [], is_best=False
+                    )
+        train_generator_tqdm.close()
+
+        train_loss = float(train_loss)
+        if self._distributed_world_size > 1:
+            # Every process has trained on the same number of batches.
+            train_loss = distributed.all_reduce_sum(train_loss) / self._distributed_world_size
+        return self._get_metrics(train_loss, iterator_batches_this_epoch, reset=True)
 
     def _should_stop_early(self, metric_history: List[float]) -> bool:
         """
@@ -652,6 +924,19 @@ class Trainer:
             elif train_metric is not None:
                 logger.info(no_val_message_template, name.ljust(name_length), train_metric, "N/A")
 
+    def _profile_to_tensorboard_and_file(self, epoch: int) -> None:
+        """
+        Logs the time spent in each phase of this epoch to tensorboard, logs the totals so far, and
+        (re)writes the summary of the run in the serialization directory.
+        """
+        if not self._profiler.enabled:
+            return
+        for name, seconds in self._profiler.epoch_phase_times().items():
+            self._tensorboard.add_train_scalar("profile/" + name, seconds, epoch)
+        self._profiler.log_summary()
+        if self._serialization_dir is not None and self._is_master:
+            self._profiler.save(os.path.join(self._serialization_dir, "profile.json"))
+
     def _validation_loss(self) -> Tuple[float, int]:
         """
         Computes the validation loss. Returns it and the number of batches.
@@ -669,14 +954,17 @@ class Trainer:
                                      num_epochs=1,
                                      shuffle=self._shuffle,
                                      cuda_device=self._iterator_device)
+        val_generator = self._profiler.time_iterator(val_generator, "validation_iterator_wait")
         num_validation_batches = val_iterator.get_num_batches(self._validation_data)
         val_generator_tqdm = Tqdm.tqdm(val_generator,
-                                       total=num_validation_batches)
+                                       total=num_validation_batches,
+                                       disable=not self._is_master)
         batches_this_epoch = 0
         val_loss = 0
-        for batch in val_generator_tqdm:
+        for batch_number, batch in enumerate(val_generator_tqdm, 1):
 
-            loss = self._batch_loss(batch, for_training=False)
+            with self._profiler.phase("validation_forward"):
+                loss = self._batch_loss(batch, for_training=False)
             if loss is not None:
                 # You shouldn't necessarily have to compute a loss for validation, so we allow for
                 # `loss` to be None.  We need to be careful, though - `batches_this_epoch` is
@@ -684,19 +972,34 @@ class Trainer:
                 # count those batches for which we actually have a loss.  If this variable ever
                 # gets used for something else, we might need to change things around a bit.
                 batches_this_epoch += 1
-                val_loss += loss.detach().cpu().numpy()
+                val_loss += loss.detach()
 
-            # Update the description with the latest metrics
-            val_metrics = self._get_metrics(val_loss, batches_this_epoch)
-            description = self._description_from_metrics(val_metrics)
-            val_generator_tqdm.set_description(description, refresh=False)
+            # Update the description with the latest metrics, which means copying them from the device.
+            if batch_number % self._metrics_interval == 0:
+                with self._profiler.phase("validation_metrics"):
+                    val_metrics = self._get_metrics(val_loss, batches_this_epoch)
+                    description = self._description_from_metrics(val_metrics)
+                    val_generator_tqdm.set_description(description, refresh=False)
 
-        return val_loss, batches_this_epoch
+        return float(val_loss), batches_this_epoch
 
     def train(self) -> Dict[str, Any]:
         """
         Trains the supplied model with the supplied parameters.
         """
+        self._profiler.start(self._model if self._profile_modules else None)
+        try:
+            metrics = self._train()
+        except BaseException:
+            # Whatever went wrong, finish writing the checkpoints we already have.
+            self._checkpoint_writer.wait(raise_errors=False)
+            raise
+        finally:
+            self._profiler.stop()
+        self._checkpoint_writer.wait()
+        return metrics
+
+    def _train(self) -> Dict[str, Any]:
         try:
             epoch_counter, validation_metric_per_epoch = self._restore_checkpoint()
         except RuntimeError:
@@ -720,7 +1023,9 @@ class Trainer:
             train_metrics = self._train_epoch(epoch)
 
             if self._validation_data is not None:
-                with torch.no_grad():
+                # The phases that the iterator records while validating (its "tensorization") are
+                # named "validation_...", like the trainer's own validation phases.
+                with torch.no_grad(), self._profiler.record_prefix("validation_"):
                     # We have a validation set, so compute all the metrics on it.
                     val_loss, num_batches = self._validation_loss()
                     val_metrics = self._get_metrics(val_loss, num_batches, reset=True)
@@ -744,9 +1049,12 @@ class Trainer:
                 best_epoch_val_metrics = {}
                 this_epoch_val_metric = None
 
-            self._save_checkpoint(epoch, validation_metric_per_epoch, is_best=is_best_so_far)
-            self._metrics_to_tensorboard(epoch, train_metrics, val_metrics=val_metrics)
+            with self._profiler.phase("checkpoint"):
+                self._save_checkpoint(epoch, validation_metric_per_epoch, is_best=is_best_so_far)
+            with self._profiler.phase("tensorboard"):
+                self._metrics_to_tensorboard(epoch, train_metrics, val_metrics=val_metrics)
             self._metrics_to_console(train_metrics, val_metrics)
+            self._profile_to_tensorboard_and_file(epoch)
 
             if self._learning_rate_scheduler:
                 # The LRScheduler API is agnostic to whether your schedule requires a validation metric -
@@ -812,7 +1120,8 @@ class Trainer:
                          is_best: Optional[bool] = None) -> None:
         """
         Saves a checkpoint of the model to self._serialization_dir.
-        Is a no-op if self._serialization_dir is None.
+        Is a no-op if self._serialization_dir is None, or if this isn't the rank 0 process of a
+        distributed training run.
 
         Parameters
         ----------
@@ -824,23 +1133,24 @@ class Trainer:
             be copied to a "best.th" file. The value of this flag should
             be based on some validation metric computed by your model.
         """
-        if self._serialization_dir is not None:
+        if self._serialization_dir is not None and self._is_master:
             model_path = os.path.join(self._serialization_dir, "model_state_epoch_{}.th".format(epoch))
-            model_state = self._model.state_dict()
-            torch.save(model_state, model_path)
+            # We take copies of the states now, because training goes on while they are written.
+            model_state = _copy_to_cpu(self._model.state_dict())
 
-            training_state = {'epoch': epoch,
-                              'val_metric_per_epoch': val_metric_per_epoch,
-                              'optimizer': self._optimizer.state_dict(),
-                              'batch_num_total': self._batch_num_total}
+            training_state = _copy_to_cpu({'epoch': epoch,
+                                           'val_metric_per_epoch': val_metric_per_epoch,
+                                           'optimizer': self._optimizer.state_dict(),
+                                           'batch_num_total': self._batch_num_total})
             training_path = os.path.join(self._serialization_dir,
                                          "training_state_epoch_{}.th".format(epoch))
-            torch.save(training_state, training_path)
+            copies: List[Tuple[str, str]] = []
             if is_best:
                 logger.info("Best validation performance so far. "
                             "Copying weights to '%s/best.th'.", self._serialization_dir)
-                shutil.copyfile(model_path, os.path.join(self._serialization_dir, "best.th"))
+                copies.append((model_path, os.path.join(self._serialization_dir, "best.th")))
 
+            files_to_remove: List[str] = []
             if self._num_serialized_models_to_keep and self._num_serialized_models_to_keep >= 0:
                 self._serialized_paths.append([time.time(), model_path, training_path])
                 if len(self._serialized_paths) > self._num_serialized_models_to_keep:
@@ -857,8 +1167,12 @@ class Trainer:
                             remove_path = False
                             self._last_permanent_saved_checkpoint_time = save_time
                     if remove_path:
-                        for fname in paths_to_remove[1:]:
-                            os.remove(fname)
+                        files_to_remove = paths_to_remove[1:]
+
+            # The training state is written first, because a checkpoint is found by its model state.
+            self._checkpoint_writer.write([(training_state, training_path), (model_state, model_path)],
+                                          copies=copies,
+                                          paths_to_remove=files_to_remove)
 
     def find_latest_checkpoint(self) -> Tuple[str, str]:
         """
@@ -970,7 +1284,9 @@ class Trainer:
                     train_data: Iterable[Instance],
                     validation_data: Optional[Iterable[Instance]],
                     params: Params,
-                    validation_iterator: DataIterator = None) -> 'Trainer':
+                    validation_iterator: DataIterator = None,
+                    distributed_rank: int = None,
+                    distributed_world_size: int = 1) -> 'Trainer':
 
         patience = params.pop_int("patience", None)
         validation_metric = params.pop("validation_metric", "-loss")
@@ -997,6 +1313,12 @@ class Trainer:
         model_save_interval = params.pop_float("model_save_interval", None)
         summary_interval = params.pop_int("summary_interval", 100)
         histogram_interval = params.pop_int("histogram_interval", None)
+        num_gradient_accumulation_steps = params.pop_int("num_gradient_accumulation_steps", 1)
+        metrics_interval = params.pop_int("metrics_interval", 1)
+        profile = params.pop_bool("profile", False)
+        profile_modules = params.pop_bool("profile_modules", False)
+        background_checkpointing = params.pop_bool("background_checkpointing", True)
+        max_pending_checkpoints = params.pop_int("max_pending_checkpoints", 1)
 
         params.assert_empty(cls.__name__)
         return Trainer(model, optimizer, iterator,
@@ -1015,4 +1337,12 @@ class Trainer:
                        keep_serialized_model_every_num_seconds=keep_serialized_model_every_num_seconds,
                        model_save_interval=model_save_interval,
                        summary_interval=summary_interval,
-                       histogram_interval=histogram_interval)
+                       histogram_interval=histogram_interval,
+                       num_gradient_accumulation_steps=num_gradient_accumulation_steps,
+                       metrics_interval=metrics_interval,
+                       profile=profile,
+                       profile_modules=profile_modules,
+                       distributed_rank=distributed_rank,
+                       distributed_world_size=distributed_world_size,
+                       background_checkpointing=background_checkpointing,
+                       max_pending_checkpoints=max_pending_checkpoints)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(os.path.join(__file__, os.pardir))))
+import argparse
+import logging
+
+from allennlp.modules.token_embedders.embedding import convert_embeddings_text_file
+
+logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                    level=logging.INFO)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts a pretrained embeddings text file into a binary "
+                                                 "format which loads much faster.  By default the converted "
+                                                 "file is written next to the text file, and is then used "
+                                                 "automatically when the text file is a 'pretrained_file'.")
+    parser.add_argument('file_uri', type=str,
+                        help='the path, URL or "(archive_uri)#file_path_inside_the_archive" of the text file')
+    parser.add_argument('--output-path', type=str, default=None,
+                        help='where to write the converted (.npy) file')
+    parser.add_argument('--embedding-dim', type=int, default=None,
+                        help='the dimension of the embeddings (by default, that of the first line)')
+    args = parser.parse_args()
+    convert_embeddings_text_file(args.file_uri, args.output_path, args.embedding_dim)
@@ -1,6 +1,5 @@
 #! /usr/bin/env python
 import json
-import pickle
 import argparse
 from typing import Tuple, List
 import os
@@ -34,7 +33,9 @@ def process_data(input_file: str,
                  max_path_length: int,
                  max_num_logical_forms: int,
                  ignore_agenda: bool,
-                 write_sequences: bool) -> None:
+                 write_sequences: bool,
+                 num_processes: int = 1,
+                 walker_cache_directory: str = None) -> None:
     """
     Reads an NLVR dataset and returns a JSON representation containing sentences, labels, correct and
     incorrect logical forms. The output will contain at most `max_num_logical_forms` logical forms
@@ -44,13 +45,12 @@ def process_data(input_file: str,
     processed_data: JsonDict = []
     # We can instantiate the ``ActionSpaceWalker`` with any world because the action space is the
     # same for all the ``NlvrWorlds``. It is just the execution that differs.
-    serialized_walker_path = f"serialized_action_space_walker_pl={max_path_length}.pkl"
-    if os.path.isfile(serialized_walker_path):
-        print("Reading walker from serialized file", file=sys.stderr)
-        walker = pickle.load(open(serialized_walker_path, "rb"))
-    else:
-        walker = ActionSpaceWalker(NlvrWorld({}), max_path_length=max_path_length)
-        pickle.dump(walker, open(serialized_walker_path, "wb"))
+    # The walker saves the paths it finds in the cache directory, so later runs don't need to
+    # walk the action space again.
+    walker = ActionSpaceWalker(NlvrWorld({}),
+                               max_path_length=max_path_length,
+                               num_processes=num_processes,
+                               cache_directory=walker_cache_directory)
     for line in open(input_file):
         instance_id, sentence, structured_reps, label_strings = read_json_line(line)
         worlds = [NlvrWorld(structured_rep) for structured_rep in structured_reps]
@@ -120,10 +120,17 @@ if __name__ == "__main__":
                         "flag is set, action sequences instead of logical forms will be written "
                         "to the json file. This will avoid having to parse the logical forms again "
                         "in the NlvrDatasetReader.", action='store_true')
+    parser.add_argument("--num-processes", type=int, dest="num_processes", default=1,
+                        help="Number of processes to walk the action space with")
+    parser.add_argument("--walker-cache-directory", type=str, dest="walker_cache_directory",
+                        default=None, help="Directory to cache the paths in the action space in "
+                        "(by default, they are not cached)")
     args = parser.parse_args()
     process_data(args.input,
                  args.output,
                  args.max_path_length,
                  args.max_num_logical_forms,
                  args.ignore_agenda,
-                 args.write_sequences)
+                 args.write_sequences,
+                 args.num_processes,
+                 args.walker_cache_directory)